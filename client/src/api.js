@@ -0,0 +1,24 @@
+// fetch() for the API that reads its own writes. For a few seconds after a write
+// (as long as DB_REPLICA_MAX_LAG lets a replica lag), reads are sent with
+// X-Read-Consistency: primary: they skip the nginx micro-cache (client/nginx.conf)
+// and the read replicas (server/replicas.py), so a list refetched after a save shows it.
+const READ_YOUR_WRITES_MS = 5000
+
+let lastWrite = -Infinity
+
+export function wrote() {
+    lastWrite = Date.now()
+}
+
+export async function apiFetch(url, options = {}) {
+    const method = (options.method || 'GET').toUpperCase()
+    if (method !== 'GET' && method !== 'HEAD') {
+        const res = await fetch(url, options)
+        wrote()
+        return res
+    }
+    if (Date.now() - lastWrite < READ_YOUR_WRITES_MS) {
+        options = { ...options, headers: { ...options.headers, 'X-Read-Consistency': 'primary' } }
+    }
+    return fetch(url, options)
+}
@@ -3,8 +3,6 @@ import { Filter, Calendar, Tv, Play, X } from 'lucide-react';
 import SearchableSelect from './SearchableSelect';
 
 const FilterBar = ({ onFilterChange }) => {
-    const [channels, setChannels] = useState([]);
-    const [videos, setVideos] = useState([]);
     const [filters, setFilters] = useState({
         channel_id: '',
         video_id: '',
@@ -13,15 +11,7 @@ const FilterBar = ({ onFilterChange }) => {
     });
 
     useEffect(() => {
-        fetch('/api/channels').then(res => res.json()).then(data => setChannels(data.items || []));
-    }, []);
-
-    useEffect(() => {
-        if (filters.channel_id) {
-            // Fetch videos for this channel if needed, or just allow search
-            fetch(`/api/videos?channel_id=${filters.channel_id}`).then(res => res.json()).then(data => setVideos(data.items || []));
-        } else {
-            setVideos([]);
+        if (!filters.channel_id) {
             setFilters(f => ({ ...f, video_id: '' }));
         }
     }, [filters.channel_id]);
@@ -47,22 +37,23 @@ const FilterBar = ({ onFilterChange }) => {
 
             <div style={{ width: '250px' }}>
                 <SearchableSelect
-                    options={channels}
+                    source="channels"
                     value={filters.channel_id}
                     onChange={v => handleChange('channel_id', v)}
                     placeholder="Filtrar por Canal..."
-                    labelKey="nome"
+                    labelKey="label"
                     valueKey="id"
                 />
             </div>
 
             <div style={{ width: '250px' }}>
                 <SearchableSelect
-                    options={videos}
+                    source={filters.channel_id ? 'videos' : undefined}
+                    filters={{ channel_id: filters.channel_id }}
                     value={filters.video_id}
                     onChange={v => handleChange('video_id', v)}
                     placeholder="Filtrar por Vídeo..."
-                    labelKey="titulo"
+                    labelKey="label"
                     valueKey="id_video"
                     disabled={!filters.channel_id}
                 />
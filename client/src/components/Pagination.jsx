@@ -1,18 +1,21 @@
 import { ChevronLeft, ChevronRight } from 'lucide-react';
 
-const Pagination = ({ total, page, limit, onPageChange }) => {
+// Window of page buttons around the current page: totals can be in the millions
+const WINDOW = 2;
+
+const Pagination = ({ total, estimated = false, page, limit, onPageChange }) => {
     const totalPages = Math.ceil(total / limit);
     if (totalPages <= 1) return null;
 
     const pages = [];
-    for (let i = 1; i <= totalPages; i++) {
+    for (let i = Math.max(1, page - WINDOW); i <= Math.min(totalPages, page + WINDOW); i++) {
         pages.push(i);
     }
 
     return (
         <div className="pagination">
             <div className="pagination-info">
-                Mostrando {Math.min((page - 1) * limit + 1, total)} - {Math.min(page * limit, total)} de {total} registros
+                Mostrando {Math.min((page - 1) * limit + 1, total)} - {Math.min(page * limit, total)} de {estimated ? '~' : ''}{total} registros
             </div>
             <div className="pagination-controls">
                 <button
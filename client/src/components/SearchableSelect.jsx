@@ -1,14 +1,41 @@
 import { useState, useRef, useEffect } from 'react';
 import { Search, ChevronDown, Check } from 'lucide-react';
 
-const SearchableSelect = ({ options, value, onChange, placeholder, labelKey = 'nome', valueKey = 'id' }) => {
+// Options per request when searching a large table through /api/lookup
+const LOOKUP_LIMIT = 20;
+
+// Either filters a static `options` list, or, given a `source` entity, asks
+// /api/lookup/<source> for labels starting with what was typed. `selectedLabel`
+// names the current value before the remote options are loaded (edit forms);
+// `filters` adds query parameters to the lookup (e.g. { channel_id: 3 }).
+// `valueKey` may be a function for options keyed by several columns.
+const SearchableSelect = ({ options = [], source, filters, value, onChange, placeholder, labelKey = 'nome', valueKey = 'id', selectedLabel }) => {
     const [isOpen, setIsOpen] = useState(false);
     const [search, setSearch] = useState('');
+    const [remoteOptions, setRemoteOptions] = useState([]);
+    const [picked, setPicked] = useState(null);
     const containerRef = useRef(null);
 
-    const selectedOption = options.find(opt => String(opt[valueKey]) === String(value));
+    useEffect(() => {
+        if (!source || !isOpen) return;
+        const params = new URLSearchParams({ ...filters, q: search, limit: LOOKUP_LIMIT });
+        const timer = setTimeout(() => {
+            fetch(`/api/lookup/${source}?${params}`)
+                .then(res => res.json())
+                .then(data => setRemoteOptions(data));
+        }, 200);
+        return () => clearTimeout(timer);
+    }, [source, JSON.stringify(filters), search, isOpen]);
+
+    const valueOf = typeof valueKey === 'function' ? valueKey : (opt) => opt[valueKey];
+    const isSelected = (opt) => opt && String(valueOf(opt)) === String(value);
+
+    const selectedOption = source
+        ? (isSelected(picked) ? picked : remoteOptions.find(isSelected))
+        : options.find(isSelected);
+    const selectedText = selectedOption ? selectedOption[labelKey] : (value ? selectedLabel || '' : '');
 
-    const filteredOptions = options.filter(opt =>
+    const filteredOptions = source ? remoteOptions : options.filter(opt =>
         String(opt[labelKey]).toLowerCase().includes(search.toLowerCase())
     );
 
@@ -23,7 +50,8 @@ const SearchableSelect = ({ options, value, onChange, placeholder, labelKey = 'n
     }, []);
 
     const handleSelect = (option) => {
-        onChange(option[valueKey]);
+        onChange(valueOf(option), option);
+        setPicked(option);
         setIsOpen(false);
         setSearch('');
     };
@@ -39,8 +67,8 @@ const SearchableSelect = ({ options, value, onChange, placeholder, labelKey = 'n
                     type="text"
                     id={`search-select-${placeholder.replace(/\s+/g, '-').toLowerCase()}`}
                     name={`search-select-${placeholder.replace(/\s+/g, '-').toLowerCase()}`}
-                    placeholder={selectedOption ? selectedOption[labelKey] : placeholder}
-                    value={isOpen ? search : (selectedOption ? selectedOption[labelKey] : '')}
+                    placeholder={selectedText || placeholder}
+                    value={isOpen ? search : selectedText}
                     onChange={(e) => setSearch(e.target.value)}
                     onFocus={() => setIsOpen(true)}
                     readOnly={!isOpen}
@@ -56,13 +84,13 @@ const SearchableSelect = ({ options, value, onChange, placeholder, labelKey = 'n
                     {filteredOptions.length > 0 ? (
                         filteredOptions.map((opt) => (
                             <div
-                                key={opt[valueKey]}
-                                className={`smart-select-item ${String(opt[valueKey]) === String(value) ? 'selected' : ''}`}
+                                key={valueOf(opt)}
+                                className={`smart-select-item ${isSelected(opt) ? 'selected' : ''}`}
                                 onClick={() => handleSelect(opt)}
                             >
                                 <div style={{ display: 'flex', justifyContent: 'space-between', alignItems: 'center' }}>
                                     <span>{opt[labelKey]}</span>
-                                    {String(opt[valueKey]) === String(value) && <Check size={14} />}
+                                    {isSelected(opt) && <Check size={14} />}
                                 </div>
                             </div>
                         ))
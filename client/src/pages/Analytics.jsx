@@ -14,6 +14,8 @@ import {
 } from 'chart.js';
 import { Bar, Line, Pie } from 'react-chartjs-2';
 import FilterBar from '../components/FilterBar';
+import { refreshViews } from '../refreshViews';
+import { apiFetch } from '../api';
 
 ChartJS.register(
     CategoryScale,
@@ -44,11 +46,8 @@ const AnalyticsPage = () => {
 
         const queryParams = new URLSearchParams(cleanFilters).toString();
         try {
-            const [rev, theme, plat] = await Promise.all([
-                fetch(`/api/reports/revenue-over-time?${queryParams}`).then(res => res.json()),
-                fetch(`/api/reports/distribution-by-theme?${queryParams}`).then(res => res.json()),
-                fetch(`/api/reports/drilldown-performance?${queryParams}`).then(res => res.json())
-            ]);
+            const data = await apiFetch(`/api/analytics?${queryParams}`).then(res => res.json());
+            const { revenue: rev, themes: theme, performance: plat } = data;
             setRevenueData(Array.isArray(rev) ? [...rev].reverse() : []);
             setThemeData(Array.isArray(theme) ? theme : []);
             setPlatformData(Array.isArray(plat) ? plat : []);
@@ -67,7 +66,7 @@ const AnalyticsPage = () => {
 
     const handleRefresh = async () => {
         setIsRefreshing(true);
-        await fetch('/api/reports/refresh', { method: 'POST' });
+        await refreshViews();
         await fetchData(filters);
         setIsRefreshing(false);
     };
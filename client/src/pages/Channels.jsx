@@ -3,10 +3,10 @@ import { Tv, Plus, Trash2, Eye, Save, X, Search } from 'lucide-react';
 import Modal from '../components/Modal';
 import SearchableSelect from '../components/SearchableSelect';
 import Pagination from '../components/Pagination';
+import { apiFetch } from '../api';
 
 const ChannelsPage = () => {
     const [items, setItems] = useState([]);
-    const [users, setUsers] = useState([]);
     const [platforms, setPlatforms] = useState([]);
     const [loading, setLoading] = useState(true);
     const [selected, setSelected] = useState(null);
@@ -19,29 +19,29 @@ const ChannelsPage = () => {
     const [searchTerm, setSearchTerm] = useState('');
     const [page, setPage] = useState(1);
     const [total, setTotal] = useState(0);
+    const [estimated, setEstimated] = useState(false);
 
     useEffect(() => {
         fetchItems();
-        fetchUsers();
         fetchPlatforms();
     }, [page, searchTerm]);
 
     const fetchItems = () => {
         setLoading(true);
-        fetch(`/api/channels?q=${searchTerm}&page=${page}`)
+        apiFetch(`/api/channels?q=${searchTerm}&page=${page}`)
             .then(res => res.json())
             .then(data => {
                 setItems(data.items);
                 setTotal(data.total);
+                setEstimated(data.total_estimated);
                 setLoading(false);
             });
     };
 
-    const fetchUsers = () => fetch('/api/users').then(res => res.json()).then(data => setUsers(data.items || data));
-    const fetchPlatforms = () => fetch('/api/platforms').then(res => res.json()).then(data => setPlatforms(data.items || data));
+    const fetchPlatforms = () => apiFetch('/api/lookup/platforms').then(res => res.json()).then(data => setPlatforms(data));
 
     const fetchDetail = (id) => {
-        fetch(`/api/channels/${id}`).then(res => res.json()).then(data => setSelected(data));
+        apiFetch(`/api/channels/${id}`).then(res => res.json()).then(data => setSelected(data));
     };
 
     const handleOpenCreate = () => {
@@ -59,6 +59,7 @@ const ChannelsPage = () => {
             data: i.data.split('T')[0],
             descricao: i.descricao,
             id_streamer: i.id_streamer,
+            streamer_nick: i.streamer_nick,
             nro_plataforma: i.nro_plataforma
         });
         setIsModalOpen(true);
@@ -69,7 +70,7 @@ const ChannelsPage = () => {
         const url = editMode ? `/api/channels/${formData.id}` : '/api/channels';
         const method = editMode ? 'PUT' : 'POST';
 
-        const res = await fetch(url, {
+        const res = await apiFetch(url, {
             method: method,
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify({ ...formData, id_streamer: parseInt(formData.id_streamer), nro_plataforma: parseInt(formData.nro_plataforma) })
@@ -145,6 +146,7 @@ const ChannelsPage = () => {
                     </table>
                     <Pagination
                         total={total}
+                        estimated={estimated}
                         page={page}
                         limit={10}
                         onPageChange={setPage}
@@ -189,7 +191,7 @@ const ChannelsPage = () => {
                         </div>
 
                         <button className="btn btn-danger" style={{ width: '100%', marginTop: '3rem' }} onClick={() => {
-                            if (confirm('Excluir canal?')) fetch(`/api/channels/${selected.id}`, { method: 'DELETE' }).then(() => { fetchItems(); setSelected(null); });
+                            if (confirm('Excluir canal?')) apiFetch(`/api/channels/${selected.id}`, { method: 'DELETE' }).then(() => { fetchItems(); setSelected(null); });
                         }}>
                             <Trash2 size={18} /> Encerrar Operações do Canal
                         </button>
@@ -203,12 +205,13 @@ const ChannelsPage = () => {
                     <div className="form-group">
                         <label>Responsável (Streamer)</label>
                         <SearchableSelect
-                            options={users}
+                            source="users"
                             value={formData.id_streamer}
                             onChange={(val) => setFormData({ ...formData, id_streamer: val })}
                             placeholder="Buscar streamer..."
-                            labelKey="nick"
+                            labelKey="label"
                             valueKey="id"
+                            selectedLabel={formData.streamer_nick}
                         />
                     </div>
                     <div className="form-group">
@@ -218,8 +221,8 @@ const ChannelsPage = () => {
                             value={formData.nro_plataforma}
                             onChange={(val) => setFormData({ ...formData, nro_plataforma: val })}
                             placeholder="Selecionar plataforma..."
-                            labelKey="nome"
-                            valueKey="nro"
+                            labelKey="label"
+                            valueKey="id"
                         />
                     </div>
                     <div className="form-group">
@@ -1,6 +1,8 @@
 import { useEffect, useState } from 'react'
 import { Activity, Crown, Gem, TrendingUp, DollarSign, RefreshCcw, Play, Users } from 'lucide-react'
 import FilterBar from '../components/FilterBar'
+import { refreshViews } from '../refreshViews'
+import { apiFetch } from '../api'
 
 const Dashboard = () => {
     const [status, setStatus] = useState({ message: 'Conectando...', db_status: 'unknown' })
@@ -24,29 +26,24 @@ const Dashboard = () => {
             ...cleanFilters
         }).toString();
 
-        fetch(`/api/ranking/faturamento?${queryParams}`)
+        apiFetch(`/api/dashboard?${queryParams}`)
             .then(res => res.json())
-            .then(data => setRanking(Array.isArray(data) ? data : []))
-            .catch(() => setRanking([]))
-
-        fetch(`/api/ranking/videos-virais?${queryParams}`)
-            .then(res => res.json())
-            .then(data => setVideos(Array.isArray(data) ? data : []))
-            .catch(() => setVideos([]))
-
-        fetch(`/api/ranking/streamers?limit=${limit}`)
-            .then(res => res.json())
-            .then(data => setStreamers(Array.isArray(data) ? data : []))
-            .catch(() => setStreamers([]))
-
-        fetch(`/api/ranking/top-viewers?${queryParams}`)
-            .then(res => res.json())
-            .then(data => setViewers(Array.isArray(data) ? data : []))
-            .catch(() => setViewers([]))
+            .then(data => {
+                setRanking(Array.isArray(data.ranking) ? data.ranking : [])
+                setVideos(Array.isArray(data.videos) ? data.videos : [])
+                setStreamers(Array.isArray(data.streamers) ? data.streamers : [])
+                setViewers(Array.isArray(data.viewers) ? data.viewers : [])
+            })
+            .catch(() => {
+                setRanking([])
+                setVideos([])
+                setStreamers([])
+                setViewers([])
+            })
     }
 
     useEffect(() => {
-        fetch('/api/').then(res => res.json()).then(data => setStatus(data))
+        apiFetch('/api/').then(res => res.json()).then(data => setStatus(data))
     }, [])
 
     useEffect(() => {
@@ -55,7 +52,7 @@ const Dashboard = () => {
 
     const handleRefresh = async () => {
         setIsRefreshing(true)
-        await fetch('/api/reports/refresh', { method: 'POST' })
+        await refreshViews()
         fetchAllRankings(filterLimit, globalFilters)
         setIsRefreshing(false)
     }
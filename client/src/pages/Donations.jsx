@@ -3,11 +3,10 @@ import { Plus, Trash2, Save, ReceiptText, CheckCircle2, Clock, XCircle, Search }
 import Modal from '../components/Modal';
 import SearchableSelect from '../components/SearchableSelect';
 import Pagination from '../components/Pagination';
+import { apiFetch } from '../api';
 
 const DonationsPage = () => {
     const [items, setItems] = useState([]);
-    const [users, setUsers] = useState([]);
-    const [videos, setVideos] = useState([]);
     const [loading, setLoading] = useState(true);
 
     const [isModalOpen, setIsModalOpen] = useState(false);
@@ -18,27 +17,24 @@ const DonationsPage = () => {
     const [searchTerm, setSearchTerm] = useState('');
     const [page, setPage] = useState(1);
     const [total, setTotal] = useState(0);
+    const [estimated, setEstimated] = useState(false);
 
     useEffect(() => {
         fetchItems();
-        fetchUsers();
-        fetchVideos();
     }, [page, searchTerm]);
 
     const fetchItems = () => {
         setLoading(true);
-        fetch(`/api/donations?q=${searchTerm}&page=${page}`)
+        apiFetch(`/api/donations?q=${searchTerm}&page=${page}`)
             .then(res => res.json())
             .then(data => {
                 setItems(data.items);
                 setTotal(data.total);
+                setEstimated(data.total_estimated);
                 setLoading(false);
             });
     };
 
-    const fetchUsers = () => fetch('/api/users').then(res => res.json()).then(data => setUsers(data.items || data));
-    const fetchVideos = () => fetch('/api/videos').then(res => res.json()).then(data => setVideos(data.items || data));
-
     const handleOpenCreate = () => {
         setEditMode(false);
         setFormData({ id_video: '', id_usuario: '', valor: '', status: 'recebido' });
@@ -53,29 +49,31 @@ const DonationsPage = () => {
             id_usuario: i.id_usuario,
             seq_comentario: i.seq_comentario,
             seq_pg: i.seq_pg,
+            datah_comentario: i.datah_comentario,
             valor: i.valor,
-            status: i.status
+            status: i.status,
+            nick: i.nick,
+            video_titulo: i.video_titulo
         });
         setIsModalOpen(true);
     };
 
     const handleSubmit = async (e) => {
         e.preventDefault();
-        const video = videos.find(v => String(v.id_video) === String(formData.id_video));
-        if (!video) return;
+        if (!formData.id_video) return;
 
         const url = editMode
-            ? `/api/donations/${formData.id_video}/${formData.id_canal}/${formData.id_usuario}/${formData.seq_comentario}/${formData.seq_pg}`
+            ? `/api/donations/${formData.id_video}/${formData.id_canal}/${formData.id_usuario}/${formData.seq_comentario}/${formData.seq_pg}/${encodeURIComponent(formData.datah_comentario)}`
             : '/api/donations';
         const method = editMode ? 'PUT' : 'POST';
 
-        const res = await fetch(url, {
+        const res = await apiFetch(url, {
             method: method,
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify({
                 ...formData,
                 id_video: parseInt(formData.id_video),
-                id_canal: video.id_canal,
+                id_canal: parseInt(formData.id_canal),
                 id_usuario: parseInt(formData.id_usuario),
                 valor: parseFloat(formData.valor)
             })
@@ -152,7 +150,7 @@ const DonationsPage = () => {
                                             EDIT
                                         </button>
                                         <button className="btn btn-danger" style={{ height: 'auto', padding: '0.5rem' }} onClick={() => {
-                                            if (confirm('Reverter doação?')) fetch(`/api/donations/${i.id_video}/${i.id_canal}/${i.id_usuario}/${i.seq_comentario}/${i.seq_pg}`, { method: 'DELETE' }).then(fetchItems);
+                                            if (confirm('Reverter doação?')) apiFetch(`/api/donations/${i.id_video}/${i.id_canal}/${i.id_usuario}/${i.seq_comentario}/${i.seq_pg}/${encodeURIComponent(i.datah_comentario)}`, { method: 'DELETE' }).then(fetchItems);
                                         }}>
                                             <Trash2 size={18} />
                                         </button>
@@ -164,6 +162,7 @@ const DonationsPage = () => {
                 </table>
                 <Pagination
                     total={total}
+                    estimated={estimated}
                     page={page}
                     limit={10}
                     onPageChange={setPage}
@@ -175,24 +174,26 @@ const DonationsPage = () => {
                     <div className="form-group">
                         <label>Conteúdo Associado</label>
                         <SearchableSelect
-                            options={videos.map(v => ({ ...v, label: `${v.titulo} (${v.canal_nome})` }))}
-                            value={formData.id_video}
-                            onChange={(val) => setFormData({ ...formData, id_video: val })}
-                            placeholder="Buscar vídeo por título ou canal..."
+                            source="videos"
+                            value={formData.id_video ? `${formData.id_canal}/${formData.id_video}` : ''}
+                            onChange={(val, v) => setFormData({ ...formData, id_video: v.id_video, id_canal: v.id_canal })}
+                            placeholder="Buscar vídeo por título..."
                             labelKey="label"
-                            valueKey="id_video"
+                            valueKey={v => `${v.id_canal}/${v.id_video}`}
+                            selectedLabel={formData.video_titulo}
                             disabled={editMode}
                         />
                     </div>
                     <div className="form-group">
                         <label>Usuário Integrante</label>
                         <SearchableSelect
-                            options={users}
+                            source="users"
                             value={formData.id_usuario}
                             onChange={(val) => setFormData({ ...formData, id_usuario: val })}
                             placeholder="Selecionar doador..."
-                            labelKey="nick"
+                            labelKey="label"
                             valueKey="id"
+                            selectedLabel={formData.nick}
                             disabled={editMode}
                         />
                     </div>
@@ -3,6 +3,7 @@ import { Globe, Plus, Trash2, Eye, Save, X, Building2, Search } from 'lucide-rea
 import Modal from '../components/Modal';
 import SearchableSelect from '../components/SearchableSelect';
 import Pagination from '../components/Pagination';
+import { apiFetch } from '../api';
 
 const Platforms = () => {
     const [platforms, setPlatforms] = useState([]);
@@ -17,6 +18,7 @@ const Platforms = () => {
     const [searchTerm, setSearchTerm] = useState('');
     const [page, setPage] = useState(1);
     const [total, setTotal] = useState(0);
+    const [estimated, setEstimated] = useState(false);
 
     useEffect(() => {
         fetchPlatforms();
@@ -25,21 +27,22 @@ const Platforms = () => {
 
     const fetchPlatforms = () => {
         setLoading(true);
-        fetch(`/api/platforms?q=${searchTerm}&page=${page}`)
+        apiFetch(`/api/platforms?q=${searchTerm}&page=${page}`)
             .then(res => res.json())
             .then(data => {
                 setPlatforms(data.items);
                 setTotal(data.total);
+                setEstimated(data.total_estimated);
                 setLoading(false);
             });
     };
 
     const fetchCompanies = () => {
-        fetch('/api/companies').then(res => res.json()).then(data => setCompanies(data));
+        apiFetch('/api/lookup/companies').then(res => res.json()).then(data => setCompanies(data));
     };
 
     const fetchPlatformDetail = (nro) => {
-        fetch(`/api/platforms/${nro}`).then(res => res.json()).then(data => setSelectedPlatform(data));
+        apiFetch(`/api/platforms/${nro}`).then(res => res.json()).then(data => setSelectedPlatform(data));
     };
 
     const handleOpenCreate = () => {
@@ -65,7 +68,7 @@ const Platforms = () => {
         const url = editMode ? `/api/platforms/${formData.nro}` : '/api/platforms';
         const method = editMode ? 'PUT' : 'POST';
 
-        const res = await fetch(url, {
+        const res = await apiFetch(url, {
             method: method,
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify({
@@ -147,6 +150,7 @@ const Platforms = () => {
                     </table>
                     <Pagination
                         total={total}
+                        estimated={estimated}
                         page={page}
                         limit={10}
                         onPageChange={setPage}
@@ -188,7 +192,7 @@ const Platforms = () => {
                             </div>
 
                             <button className="btn btn-danger" style={{ width: '100%', marginTop: 'auto' }} onClick={() => {
-                                if (confirm('Remover plataforma?')) fetch(`/api/platforms/${selectedPlatform.nro}`, { method: 'DELETE' }).then(() => { fetchPlatforms(); setSelectedPlatform(null); });
+                                if (confirm('Remover plataforma?')) apiFetch(`/api/platforms/${selectedPlatform.nro}`, { method: 'DELETE' }).then(() => { fetchPlatforms(); setSelectedPlatform(null); });
                             }}>
                                 <Trash2 size={18} /> Remover Registro
                             </button>
@@ -207,7 +211,8 @@ const Platforms = () => {
                             value={formData.empresa_fund}
                             onChange={(val) => setFormData({ ...formData, empresa_fund: val })}
                             placeholder="Pesquisar empresa..."
-                            valueKey="nro"
+                            labelKey="label"
+                            valueKey="id"
                         />
                     </div>
                     <div className="form-group">
@@ -217,7 +222,8 @@ const Platforms = () => {
                             value={formData.empresa_respo}
                             onChange={(val) => setFormData({ ...formData, empresa_respo: val })}
                             placeholder="Pesquisar empresa..."
-                            valueKey="nro"
+                            labelKey="label"
+                            valueKey="id"
                         />
                     </div>
                     <div className="form-group"><label>Data de Fundação</label><input type="date" required value={formData.data_fund} onChange={e => setFormData({ ...formData, data_fund: e.target.value })} /></div>
@@ -3,6 +3,7 @@ import { Users as UsersIcon, Plus, Trash2, Eye, Save, X, Mail, Phone, Calendar,
 import Modal from '../components/Modal';
 import SearchableSelect from '../components/SearchableSelect';
 import Pagination from '../components/Pagination';
+import { apiFetch } from '../api';
 
 const UsersPage = () => {
     const [items, setItems] = useState([]);
@@ -17,6 +18,7 @@ const UsersPage = () => {
     const [searchTerm, setSearchTerm] = useState('');
     const [page, setPage] = useState(1);
     const [total, setTotal] = useState(0);
+    const [estimated, setEstimated] = useState(false);
 
     useEffect(() => {
         fetchItems();
@@ -25,21 +27,22 @@ const UsersPage = () => {
 
     const fetchItems = () => {
         setLoading(true);
-        fetch(`/api/users?q=${searchTerm}&page=${page}`)
+        apiFetch(`/api/users?q=${searchTerm}&page=${page}`)
             .then(res => res.json())
             .then(data => {
                 setItems(data.items);
                 setTotal(data.total);
+                setEstimated(data.total_estimated);
                 setLoading(false);
             });
     };
 
     const fetchCountries = () => {
-        fetch('/api/countries').then(res => res.json()).then(data => setCountries(data));
+        apiFetch('/api/lookup/countries').then(res => res.json()).then(data => setCountries(data));
     };
 
     const fetchDetail = (id) => {
-        fetch(`/api/users/${id}`).then(res => res.json()).then(data => setSelected(data));
+        apiFetch(`/api/users/${id}`).then(res => res.json()).then(data => setSelected(data));
     };
 
     const handleOpenCreate = () => {
@@ -67,7 +70,7 @@ const UsersPage = () => {
         const url = editMode ? `/api/users/${formData.id}` : '/api/users';
         const method = editMode ? 'PUT' : 'POST';
 
-        const res = await fetch(url, {
+        const res = await apiFetch(url, {
             method: method,
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify({ ...formData, id_pais: parseInt(formData.id_pais) })
@@ -137,6 +140,7 @@ const UsersPage = () => {
                     </table>
                     <Pagination
                         total={total}
+                        estimated={estimated}
                         page={page}
                         limit={10}
                         onPageChange={setPage}
@@ -187,7 +191,7 @@ const UsersPage = () => {
                         </div>
 
                         <button className="btn btn-danger" style={{ width: '100%', marginTop: '3rem' }} onClick={() => {
-                            if (confirm('Excluir usuário?')) fetch(`/api/users/${selected.id}`, { method: 'DELETE' }).then(() => { fetchItems(); setSelected(null); });
+                            if (confirm('Excluir usuário?')) apiFetch(`/api/users/${selected.id}`, { method: 'DELETE' }).then(() => { fetchItems(); setSelected(null); });
                         }}>
                             <Trash2 size={18} /> Excluir Conta Permanetemente
                         </button>
@@ -211,6 +215,7 @@ const UsersPage = () => {
                             value={formData.id_pais}
                             onChange={(val) => setFormData({ ...formData, id_pais: val })}
                             placeholder="Selecionar país..."
+                            labelKey="label"
                             valueKey="id"
                         />
                     </div>
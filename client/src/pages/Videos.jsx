@@ -3,10 +3,10 @@ import { Film, Plus, Trash2, Eye, Save, X, Layers, PlayCircle, Users, Search } f
 import Modal from '../components/Modal';
 import SearchableSelect from '../components/SearchableSelect';
 import Pagination from '../components/Pagination';
+import { apiFetch } from '../api';
 
 const VideosPage = () => {
     const [items, setItems] = useState([]);
-    const [channels, setChannels] = useState([]);
     const [loading, setLoading] = useState(true);
     const [selected, setSelected] = useState(null);
 
@@ -18,27 +18,26 @@ const VideosPage = () => {
     const [searchTerm, setSearchTerm] = useState('');
     const [page, setPage] = useState(1);
     const [total, setTotal] = useState(0);
+    const [estimated, setEstimated] = useState(false);
 
     useEffect(() => {
         fetchItems();
-        fetchChannels();
     }, [page, searchTerm]);
 
     const fetchItems = () => {
         setLoading(true);
-        fetch(`/api/videos?q=${searchTerm}&page=${page}`)
+        apiFetch(`/api/videos?q=${searchTerm}&page=${page}`)
             .then(res => res.json())
             .then(data => {
                 setItems(data.items);
                 setTotal(data.total);
+                setEstimated(data.total_estimated);
                 setLoading(false);
             });
     };
 
-    const fetchChannels = () => fetch('/api/channels').then(res => res.json()).then(data => setChannels(data.items || data));
-
     const fetchDetail = (id_canal, id_video) => {
-        fetch(`/api/videos/${id_canal}/${id_video}`).then(res => res.json()).then(data => setSelected(data));
+        apiFetch(`/api/videos/${id_canal}/${id_video}`).then(res => res.json()).then(data => setSelected(data));
     };
 
     const handleOpenCreate = () => {
@@ -52,6 +51,7 @@ const VideosPage = () => {
         setFormData({
             id_video: v.id_video,
             id_canal: v.id_canal,
+            canal_nome: v.canal_nome,
             titulo: v.titulo,
             datah: v.datah.substring(0, 16),
             tema: v.tema,
@@ -67,7 +67,7 @@ const VideosPage = () => {
         const url = editMode ? `/api/videos/${formData.id_canal}/${formData.id_video}` : '/api/videos';
         const method = editMode ? 'PUT' : 'POST';
 
-        const res = await fetch(url, {
+        const res = await apiFetch(url, {
             method: method,
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify({ ...formData, id_canal: parseInt(formData.id_canal), duracao: parseInt(formData.duracao), visu_simul: parseInt(formData.visu_simul), visu_total: parseInt(formData.visu_total) })
@@ -139,6 +139,7 @@ const VideosPage = () => {
                     </table>
                     <Pagination
                         total={total}
+                        estimated={estimated}
                         page={page}
                         limit={10}
                         onPageChange={setPage}
@@ -192,7 +193,7 @@ const VideosPage = () => {
                         </div>
 
                         <button className="btn btn-danger" style={{ width: '100%', marginTop: '3rem' }} onClick={() => {
-                            if (confirm('Excluir mídia?')) fetch(`/api/videos/${selected.id_canal}/${selected.id_video}`, { method: 'DELETE' }).then(() => { fetchItems(); setSelected(null); });
+                            if (confirm('Excluir mídia?')) apiFetch(`/api/videos/${selected.id_canal}/${selected.id_video}`, { method: 'DELETE' }).then(() => { fetchItems(); setSelected(null); });
                         }}>
                             <Trash2 size={18} /> Remover do Sistema
                         </button>
@@ -205,12 +206,13 @@ const VideosPage = () => {
                     <div className="form-group">
                         <label>Canal de Origem</label>
                         <SearchableSelect
-                            options={channels}
+                            source="channels"
                             value={formData.id_canal}
                             onChange={(val) => setFormData({ ...formData, id_canal: val })}
                             placeholder="Buscar canal..."
-                            labelKey="nome"
+                            labelKey="label"
                             valueKey="id"
+                            selectedLabel={formData.canal_nome}
                             disabled={editMode}
                         />
                     </div>
@@ -0,0 +1,19 @@
+import { wrote } from './api'
+
+// Queues a refresh of the materialized views (POST /api/reports/refresh returns a job at once)
+// and resolves with the job once it has finished, polling its status.
+export async function refreshViews({ interval = 1000, timeout = 120000 } = {}) {
+    let job = await fetch('/api/reports/refresh', { method: 'POST' }).then(res => res.json())
+    const deadline = Date.now() + timeout
+    while ((job.status === 'queued' || job.status === 'running') && Date.now() < deadline) {
+        await new Promise(resolve => setTimeout(resolve, interval))
+        const res = await fetch(`/api/reports/refresh/${job.job_id}`)
+        // Not the job's end: keep polling until the deadline (a 404 is a job not stored yet or a worker
+        // that can't see it, a 5xx a passing failure)
+        if (!res.ok) continue
+        job = await res.json()
+    }
+    // The views changed: the reads that follow skip the caches and replicas that still hold the old ones
+    wrote()
+    return job
+}
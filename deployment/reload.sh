@@ -0,0 +1,5 @@
+#!/bin/bash
+# Gracefully replace the backend workers (gunicorn HUP): new workers start
+# while the old ones finish their requests, with no dropped connections
+cd "$(dirname "$0")"
+docker compose -p streamerdata kill -s HUP backend
@@ -0,0 +1,12 @@
+#!/bin/sh
+# Clones the primary into an empty data directory as a standby (-R writes
+# primary_conninfo and standby.signal), then starts Postgres as usual
+set -e
+if [ ! -s "$PGDATA/PG_VERSION" ]; then
+    until pg_isready -h db -U postgres; do sleep 1; done
+    mkdir -p "$PGDATA"
+    chown postgres:postgres "$PGDATA"
+    chmod 700 "$PGDATA"
+    su postgres -c "pg_basebackup -h db -U replicator -D $PGDATA -R -X stream --progress"
+fi
+exec docker-entrypoint.sh postgres
@@ -186,6 +186,9 @@ CREATE TABLE system_antig.participa (
         ON UPDATE CASCADE
 );
 
+-- Comentários e doações são particionados por mês do comentário (ver "Particionamento mensal" abaixo).
+-- A PK de uma tabela particionada precisa conter a coluna de partição, por isso dataH entra na chave. Ela só barra
+-- a repetição do mesmo instante: a unicidade de (id_video, id_canal, id_usuario, seq) fica com comentario_chave
 CREATE TABLE system_antig.comentario (
     id_video INTEGER NOT NULL,
     id_canal INTEGER NOT NULL,
@@ -194,14 +197,14 @@ CREATE TABLE system_antig.comentario (
     texto TEXT NOT NULL,
     dataH TIMESTAMP NOT NULL,
     coment_on BOOLEAN,
-    PRIMARY KEY (id_video, id_canal, id_usuario, seq),
+    PRIMARY KEY (id_video, id_canal, id_usuario, seq, dataH),
     FOREIGN KEY (id_video, id_canal) REFERENCES system_antig.Video(id_video, id_canal)
         ON DELETE CASCADE
         ON UPDATE CASCADE,
     FOREIGN KEY (id_usuario) REFERENCES system_antig.Usuario(id)
         ON DELETE CASCADE
         ON UPDATE CASCADE
-);
+) PARTITION BY RANGE (dataH);
 
 CREATE TYPE system_antig.status_doacao_enum AS ENUM('recusado', 'recebido', 'lido');
 CREATE TABLE system_antig.doacao (
@@ -212,11 +215,12 @@ CREATE TABLE system_antig.doacao (
     seq_pg INTEGER NOT NULL,
     valor NUMERIC(10, 2) NOT NULL,
     status system_antig.status_doacao_enum NOT NULL, -- ENUM para {recusado, recebido ou lido}
-    PRIMARY KEY (id_video, id_canal, id_usuario, seq_comentario, seq_pg),
-    FOREIGN KEY (id_video, id_canal, id_usuario, seq_comentario) REFERENCES system_antig.Comentario(id_video, id_canal, id_usuario, seq)
+    datah_comentario TIMESTAMP NOT NULL, -- Cópia de comentario.dataH: a chave de partição, mantida pela FK (ON UPDATE CASCADE)
+    PRIMARY KEY (id_video, id_canal, id_usuario, seq_comentario, seq_pg, datah_comentario),
+    FOREIGN KEY (id_video, id_canal, id_usuario, seq_comentario, datah_comentario) REFERENCES system_antig.Comentario(id_video, id_canal, id_usuario, seq, dataH)
         ON DELETE CASCADE
         ON UPDATE CASCADE
-);
+) PARTITION BY RANGE (datah_comentario);
 
 CREATE TABLE system_antig.bitCoin (
     id_video INTEGER NOT NULL,
@@ -225,9 +229,10 @@ CREATE TABLE system_antig.bitCoin (
     seq_comentario INTEGER NOT NULL,
     seq_doacao INTEGER NOT NULL,
     TxID VARCHAR(64) NOT NULL,
+    datah_comentario TIMESTAMP NOT NULL, -- Chave de partição da doação (para a FK)
     PRIMARY KEY (id_video, id_canal, id_usuario, seq_comentario, seq_doacao),
     UNIQUE (TxID),
-    FOREIGN KEY (id_video, id_canal, id_usuario, seq_comentario, seq_doacao) REFERENCES system_antig.Doacao(id_video, id_canal, id_usuario, seq_comentario, seq_pg)
+    FOREIGN KEY (id_video, id_canal, id_usuario, seq_comentario, seq_doacao, datah_comentario) REFERENCES system_antig.Doacao(id_video, id_canal, id_usuario, seq_comentario, seq_pg, datah_comentario)
         ON DELETE CASCADE
         ON UPDATE CASCADE
 );
@@ -239,9 +244,10 @@ CREATE TABLE system_antig.payPal (
     seq_comentario INTEGER NOT NULL,
     seq_doacao INTEGER NOT NULL,
     IdPayPal VARCHAR(50) NOT NULL, -- ID PayPal de pagamento
+    datah_comentario TIMESTAMP NOT NULL, -- Chave de partição da doação (para a FK)
     PRIMARY KEY (id_video, id_canal, id_usuario, seq_comentario, seq_doacao),
     UNIQUE (IdPayPal),
-    FOREIGN KEY (id_video, id_canal, id_usuario, seq_comentario, seq_doacao) REFERENCES system_antig.Doacao(id_video, id_canal, id_usuario, seq_comentario, seq_pg)
+    FOREIGN KEY (id_video, id_canal, id_usuario, seq_comentario, seq_doacao, datah_comentario) REFERENCES system_antig.Doacao(id_video, id_canal, id_usuario, seq_comentario, seq_pg, datah_comentario)
         ON DELETE CASCADE
         ON UPDATE CASCADE
 );
@@ -254,8 +260,9 @@ CREATE TABLE system_antig.cartaoCredito (
     seq_doacao INTEGER NOT NULL,
     nro VARCHAR(16) NOT NULL,
     bandeira VARCHAR(20) NOT NULL,
+    datah_comentario TIMESTAMP NOT NULL, -- Chave de partição da doação (para a FK)
     PRIMARY KEY (id_video, id_canal, id_usuario, seq_comentario, seq_doacao),
-    FOREIGN KEY (id_video, id_canal, id_usuario, seq_comentario, seq_doacao) REFERENCES system_antig.Doacao(id_video, id_canal, id_usuario, seq_comentario, seq_pg)
+    FOREIGN KEY (id_video, id_canal, id_usuario, seq_comentario, seq_doacao, datah_comentario) REFERENCES system_antig.Doacao(id_video, id_canal, id_usuario, seq_comentario, seq_pg, datah_comentario)
         ON DELETE CASCADE
         ON UPDATE CASCADE
 );
@@ -267,57 +274,403 @@ CREATE TABLE system_antig.mecanismoPlat (
     seq_comentario INTEGER NOT NULL,
     seq_doacao INTEGER NOT NULL,
     seq_plataforma INTEGER NOT NULL, -- Número sequencial da plataforma
+    datah_comentario TIMESTAMP NOT NULL, -- Chave de partição da doação (para a FK)
     PRIMARY KEY (id_video, id_canal, id_usuario, seq_comentario, seq_doacao),
     UNIQUE (seq_plataforma),
-    FOREIGN KEY (id_video, id_canal, id_usuario, seq_comentario, seq_doacao) REFERENCES system_antig.Doacao(id_video, id_canal, id_usuario, seq_comentario, seq_pg)
+    FOREIGN KEY (id_video, id_canal, id_usuario, seq_comentario, seq_doacao, datah_comentario) REFERENCES system_antig.Doacao(id_video, id_canal, id_usuario, seq_comentario, seq_pg, datah_comentario)
         ON DELETE CASCADE
         ON UPDATE CASCADE
 );
 
+------------------------------------------ Particionamento mensal ------------------------------------------------------
+-- comentario e doacao crescem sem limite, e os rankings e relatórios por período filtram pela data do comentário.
+-- Cada mês fica numa partição própria das duas tabelas (comentario_2025_01, doacao_2025_01...): um filtro por data só
+-- lê os meses do intervalo (partition pruning), VACUUM e manutenção de índices trabalham mês a mês, e um mês antigo sai
+-- das tabelas com um DETACH em vez de um DELETE. doacao guarda a data do comentário (datah_comentario), então as duas
+-- tabelas têm os mesmos limites: os filtros por data das doações dispensam o JOIN com comentario, e um JOIN pela chave
+-- completa pode ser feito partição a partição (enable_partitionwise_join).
+-- Não há partição padrão: gravar num mês sem partição é erro. A API cria os próximos meses com antecedência
+-- (server/partitions.py) e as cargas criam os meses dos seus dados antes de gravar.
+
+-- Chave de cada comentário, numa tabela não particionada: a PK de comentario inclui dataH, então só ela impede dois
+-- comentários com o mesmo (id_video, id_canal, id_usuario, seq) em instantes ou meses diferentes. Também dá a dataH
+-- de um comentário pela chave com uma busca num índice só, em vez de uma por partição de comentario.
+CREATE TABLE system_antig.comentario_chave (
+    id_video INTEGER NOT NULL,
+    id_canal INTEGER NOT NULL,
+    id_usuario INTEGER NOT NULL,
+    seq INTEGER NOT NULL,
+    dataH TIMESTAMP NOT NULL, -- dataH do comentário: em que partição ele está
+    PRIMARY KEY (id_video, id_canal, id_usuario, seq)
+);
+
+-- Mantém comentario_chave a cada comando em comentario: uma chave repetida falha o comando inteiro
+CREATE OR REPLACE FUNCTION system_antig.fn_comentario_chave()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        DELETE FROM system_antig.comentario_chave k
+        USING antigas o
+        WHERE k.id_video = o.id_video AND k.id_canal = o.id_canal AND k.id_usuario = o.id_usuario AND k.seq = o.seq;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO system_antig.comentario_chave (id_video, id_canal, id_usuario, seq, dataH)
+        SELECT id_video, id_canal, id_usuario, seq, dataH FROM novas;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_comentario_chave_ins AFTER INSERT ON system_antig.comentario
+REFERENCING NEW TABLE AS novas FOR EACH STATEMENT EXECUTE FUNCTION system_antig.fn_comentario_chave();
+CREATE TRIGGER trg_comentario_chave_upd AFTER UPDATE ON system_antig.comentario
+REFERENCING OLD TABLE AS antigas NEW TABLE AS novas FOR EACH STATEMENT EXECUTE FUNCTION system_antig.fn_comentario_chave();
+CREATE TRIGGER trg_comentario_chave_del AFTER DELETE ON system_antig.comentario
+REFERENCING OLD TABLE AS antigas FOR EACH STATEMENT EXECUTE FUNCTION system_antig.fn_comentario_chave();
+
+-- Refaz comentario_chave a partir de comentario (cargas que desligam as triggers, como server/bulk_load.py)
+CREATE OR REPLACE PROCEDURE system_antig.sp_reconstruir_comentario_chave()
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    TRUNCATE system_antig.comentario_chave;
+    INSERT INTO system_antig.comentario_chave (id_video, id_canal, id_usuario, seq, dataH)
+    SELECT id_video, id_canal, id_usuario, seq, dataH FROM system_antig.comentario;
+END;
+$$;
+
+-- Cria as partições mensais que faltam em comentario e doacao para cobrir [p_de, p_ate]
+CREATE OR REPLACE PROCEDURE system_antig.sp_criar_particoes(
+    p_de TIMESTAMP DEFAULT now(),
+    p_ate TIMESTAMP DEFAULT now() + INTERVAL '3 months'
+)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    _mes DATE;
+    _tabela TEXT;
+BEGIN
+    -- Vários workers chamam ao mesmo tempo: um cria, os outros encontram as partições prontas
+    PERFORM pg_advisory_xact_lock(hashtext('system_antig.sp_criar_particoes'));
+    FOR _mes IN SELECT generate_series(date_trunc('month', p_de), date_trunc('month', p_ate), INTERVAL '1 month')::DATE
+    LOOP
+        FOREACH _tabela IN ARRAY ARRAY['comentario', 'doacao']
+        LOOP
+            -- Só cria o que falta: CREATE ... PARTITION OF bloqueia a tabela-mãe
+            IF to_regclass(format('system_antig.%I', _tabela || to_char(_mes, '_YYYY_MM'))) IS NULL THEN
+                EXECUTE format('CREATE TABLE system_antig.%I PARTITION OF system_antig.%I FOR VALUES FROM (%L) TO (%L)',
+                               _tabela || to_char(_mes, '_YYYY_MM'), _tabela, _mes, (_mes + INTERVAL '1 month')::DATE);
+            END IF;
+        END LOOP;
+    END LOOP;
+END;
+$$;
+
+-- Mês corrente e os três seguintes; cargas com datas antigas criam os meses delas
+CALL system_antig.sp_criar_particoes();
+
+-- Arquiva um mês encerrado: as partições dele saem de comentario e doacao (DETACH, sem reescrever linhas) e vão, com
+-- os pagamentos das doações do mês, para o schema system_antig_arquivo, de onde seguem para um pg_dump e um DROP.
+-- Os agregados (agg_faturamento_canal, doacao_diaria) descontam o mês, como numa remoção. Tudo numa transação; os
+-- DETACH bloqueiam comentario e doacao por um instante.
+CREATE OR REPLACE PROCEDURE system_antig.sp_arquivar_mes(p_mes DATE)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    _mes DATE := date_trunc('month', p_mes);
+    _fim DATE := date_trunc('month', p_mes) + INTERVAL '1 month';
+    _sufixo TEXT := to_char(p_mes, '_YYYY_MM');
+    _tabela TEXT;
+    _fk TEXT;
+BEGIN
+    IF _fim > now() THEN
+        RAISE EXCEPTION 'Só meses encerrados podem ser arquivados: %', to_char(_mes, 'YYYY-MM');
+    END IF;
+    IF to_regclass('system_antig.comentario' || _sufixo) IS NULL OR to_regclass('system_antig.doacao' || _sufixo) IS NULL THEN
+        RAISE EXCEPTION 'Mês sem partição em comentario/doacao: %', to_char(_mes, 'YYYY-MM');
+    END IF;
+    CREATE SCHEMA IF NOT EXISTS system_antig_arquivo;
+
+    -- Os pagamentos (tabelas não particionadas) referenciam as doações: são copiados e removidos antes
+    FOREACH _tabela IN ARRAY ARRAY['bitcoin', 'paypal', 'cartaocredito', 'mecanismoplat']
+    LOOP
+        EXECUTE format('CREATE TABLE system_antig_arquivo.%I AS SELECT * FROM system_antig.%I WHERE datah_comentario >= %L AND datah_comentario < %L',
+                       _tabela || _sufixo, _tabela, _mes, _fim);
+        EXECUTE format('DELETE FROM system_antig.%I WHERE datah_comentario >= %L AND datah_comentario < %L', _tabela, _mes, _fim);
+    END LOOP;
+
+    -- O DETACH não dispara as triggers dos agregados
+    UPDATE system_antig.agg_faturamento_canal a
+    SET val_doacoes = a.val_doacoes - m.total
+    FROM (
+        SELECT id_canal, SUM(valor) AS total
+        FROM system_antig.doacao
+        WHERE datah_comentario >= _mes AND datah_comentario < _fim
+        GROUP BY id_canal
+    ) m
+    WHERE a.id_canal = m.id_canal;
+    DELETE FROM system_antig.doacao_diaria WHERE dia >= _mes AND dia < _fim;
+    -- As chaves do mês ficam livres, e doações novas não acham mais os comentários arquivados
+    DELETE FROM system_antig.comentario_chave WHERE dataH >= _mes AND dataH < _fim;
+
+    -- doacao antes de comentario, que ela referencia. Arquivada, a partição perde as FKs: não prende mais vídeos,
+    -- usuários e comentários, nem é checada contra eles
+    FOREACH _tabela IN ARRAY ARRAY['doacao', 'comentario']
+    LOOP
+        EXECUTE format('ALTER TABLE system_antig.%I DETACH PARTITION system_antig.%I', _tabela, _tabela || _sufixo);
+        FOR _fk IN
+            SELECT conname FROM pg_constraint
+            -- Só as FKs de topo: as derivadas (uma por partição referenciada) caem junto
+            WHERE conrelid = format('system_antig.%I', _tabela || _sufixo)::regclass AND contype = 'f' AND conparentid = 0
+        LOOP
+            EXECUTE format('ALTER TABLE system_antig.%I DROP CONSTRAINT %I', _tabela || _sufixo, _fk);
+        END LOOP;
+        EXECUTE format('ALTER TABLE system_antig.%I SET SCHEMA system_antig_arquivo', _tabela || _sufixo);
+    END LOOP;
+END;
+$$;
+
+-- Devolve um mês arquivado (ainda em system_antig_arquivo) às tabelas e aos agregados. O ATTACH recria as FKs e as
+-- valida: vídeos e usuários removidos depois do arquivamento impedem a volta, assim como comentários gravados
+-- depois com a chave de um comentário do mês (comentario_chave)
+CREATE OR REPLACE PROCEDURE system_antig.sp_restaurar_mes(p_mes DATE)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    _mes DATE := date_trunc('month', p_mes);
+    _fim DATE := date_trunc('month', p_mes) + INTERVAL '1 month';
+    _sufixo TEXT := to_char(p_mes, '_YYYY_MM');
+    _tabela TEXT;
+    _ocupada BOOLEAN;
+BEGIN
+    IF to_regclass('system_antig_arquivo.comentario' || _sufixo) IS NULL OR to_regclass('system_antig_arquivo.doacao' || _sufixo) IS NULL THEN
+        RAISE EXCEPTION 'Mês não arquivado: %', to_char(_mes, 'YYYY-MM');
+    END IF;
+
+    -- Partições vazias criadas no lugar (sp_criar_particoes) dão a vez às arquivadas
+    FOREACH _tabela IN ARRAY ARRAY['doacao', 'comentario']
+    LOOP
+        IF to_regclass('system_antig.' || _tabela || _sufixo) IS NOT NULL THEN
+            EXECUTE format('SELECT EXISTS (SELECT 1 FROM system_antig.%I)', _tabela || _sufixo) INTO _ocupada;
+            IF _ocupada THEN
+                RAISE EXCEPTION 'A partição %.% já tem linhas novas', _tabela, _tabela || _sufixo;
+            END IF;
+            -- Fora da tabela-mãe primeiro: as FKs que referenciam doacao dependem das partições dela
+            EXECUTE format('ALTER TABLE system_antig.%I DETACH PARTITION system_antig.%I', _tabela, _tabela || _sufixo);
+            EXECUTE format('DROP TABLE system_antig.%I', _tabela || _sufixo);
+        END IF;
+    END LOOP;
+
+    FOREACH _tabela IN ARRAY ARRAY['comentario', 'doacao']
+    LOOP
+        EXECUTE format('ALTER TABLE system_antig_arquivo.%I SET SCHEMA system_antig', _tabela || _sufixo);
+        EXECUTE format('ALTER TABLE system_antig.%I ATTACH PARTITION system_antig.%I FOR VALUES FROM (%L) TO (%L)',
+                       _tabela, _tabela || _sufixo, _mes, _fim);
+    END LOOP;
+
+    INSERT INTO system_antig.comentario_chave (id_video, id_canal, id_usuario, seq, dataH)
+    SELECT id_video, id_canal, id_usuario, seq, dataH
+    FROM system_antig.comentario
+    WHERE dataH >= _mes AND dataH < _fim;
+
+    FOREACH _tabela IN ARRAY ARRAY['bitcoin', 'paypal', 'cartaocredito', 'mecanismoplat']
+    LOOP
+        EXECUTE format('INSERT INTO system_antig.%I SELECT * FROM system_antig_arquivo.%I', _tabela, _tabela || _sufixo);
+        EXECUTE format('DROP TABLE system_antig_arquivo.%I', _tabela || _sufixo);
+    END LOOP;
+
+    UPDATE system_antig.agg_faturamento_canal a
+    SET val_doacoes = a.val_doacoes + m.total
+    FROM (
+        SELECT id_canal, SUM(valor) AS total
+        FROM system_antig.doacao
+        WHERE datah_comentario >= _mes AND datah_comentario < _fim
+        GROUP BY id_canal
+    ) m
+    WHERE a.id_canal = m.id_canal;
+    INSERT INTO system_antig.doacao_diaria (id_canal, id_usuario, dia, status, total, qtd)
+    SELECT id_canal, id_usuario, datah_comentario::DATE, status, SUM(valor), COUNT(*)
+    FROM system_antig.doacao
+    WHERE datah_comentario >= _mes AND datah_comentario < _fim
+    GROUP BY id_canal, id_usuario, datah_comentario::DATE, status;
+END;
+$$;
+
+-- Partições de comentario e doacao, nas tabelas ou arquivadas, com tamanho e linhas estimadas (do último ANALYZE)
+CREATE VIEW system_antig.v_particoes AS
+SELECT left(c.relname, -8) AS tabela,
+       to_date(right(c.relname, 7), 'YYYY_MM') AS mes,
+       n.nspname = 'system_antig_arquivo' AS arquivada,
+       GREATEST(c.reltuples, 0)::BIGINT AS linhas_estimadas,
+       pg_total_relation_size(c.oid) AS bytes
+FROM pg_class c
+JOIN pg_namespace n ON n.oid = c.relnamespace
+WHERE c.relkind = 'r'
+  AND c.relname ~ '^(comentario|doacao)_\d{4}_\d{2}$'
+  AND n.nspname IN ('system_antig', 'system_antig_arquivo');
+
+------------------------------------------ Chaves geradas pelo servidor ------------------------------------------------
+-- As chaves artificiais vêm de sequências (DEFAULT nextval): cada nextval entrega um valor novo mesmo com várias
+-- inserções simultâneas, sem o SELECT MAX(...) + 1 antes de cada INSERT (uma ida ao banco a mais e duas transações
+-- recebendo a mesma chave). Cargas que gravam chaves explícitas (seed_data.sql, populate_data.py, bulk_load.py)
+-- chamam sp_sincronizar_sequencias no fim, para a sequência seguir depois do maior valor gravado.
+CREATE SEQUENCE system_antig.plataforma_nro_seq AS INTEGER OWNED BY system_antig.plataforma.nro;
+CREATE SEQUENCE system_antig.usuario_id_seq AS INTEGER OWNED BY system_antig.usuario.id;
+CREATE SEQUENCE system_antig.canal_id_seq AS INTEGER OWNED BY system_antig.canal.id;
+-- id_video só precisa ser único no canal; uma sequência global atende (os números só deixam de ser contíguos por canal)
+CREATE SEQUENCE system_antig.video_id_video_seq AS INTEGER OWNED BY system_antig.video.id_video;
+-- seq_pg numera os pagamentos de um comentário; global, duas doações simultâneas no mesmo comentário não colidem
+CREATE SEQUENCE system_antig.doacao_seq_pg_seq AS INTEGER OWNED BY system_antig.doacao.seq_pg;
+CREATE SEQUENCE system_antig.mecanismoplat_seq_plataforma_seq AS INTEGER OWNED BY system_antig.mecanismoPlat.seq_plataforma;
+
+ALTER TABLE system_antig.plataforma ALTER COLUMN nro SET DEFAULT nextval('system_antig.plataforma_nro_seq');
+ALTER TABLE system_antig.usuario ALTER COLUMN id SET DEFAULT nextval('system_antig.usuario_id_seq');
+ALTER TABLE system_antig.canal ALTER COLUMN id SET DEFAULT nextval('system_antig.canal_id_seq');
+ALTER TABLE system_antig.video ALTER COLUMN id_video SET DEFAULT nextval('system_antig.video_id_video_seq');
+ALTER TABLE system_antig.doacao ALTER COLUMN seq_pg SET DEFAULT nextval('system_antig.doacao_seq_pg_seq');
+ALTER TABLE system_antig.mecanismoPlat ALTER COLUMN seq_plataforma SET DEFAULT nextval('system_antig.mecanismoplat_seq_plataforma_seq');
+
+-- Leva cada sequência ao maior valor já gravado na sua coluna (nunca para trás)
+CREATE OR REPLACE PROCEDURE system_antig.sp_sincronizar_sequencias()
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    _s RECORD;
+    _maior BIGINT;
+BEGIN
+    FOR _s IN
+        SELECT * FROM (VALUES
+            ('plataforma_nro_seq', 'plataforma', 'nro'),
+            ('usuario_id_seq', 'usuario', 'id'),
+            ('canal_id_seq', 'canal', 'id'),
+            ('video_id_video_seq', 'video', 'id_video'),
+            ('doacao_seq_pg_seq', 'doacao', 'seq_pg'),
+            ('mecanismoplat_seq_plataforma_seq', 'mecanismoplat', 'seq_plataforma')
+        ) AS s(sequencia, tabela, coluna)
+    LOOP
+        EXECUTE format('SELECT MAX(%I) FROM system_antig.%I', _s.coluna, _s.tabela) INTO _maior;
+        SELECT GREATEST(_maior, p.last_value) INTO _maior
+        FROM pg_sequences p
+        WHERE p.schemaname = 'system_antig' AND p.sequencename = _s.sequencia;
+        IF _maior IS NOT NULL THEN
+            PERFORM setval(format('system_antig.%I', _s.sequencia), _maior);
+        END IF;
+    END LOOP;
+END;
+$$;
+
 ------------------------------------------ triggers --------------------------------------------------------------------
+-- Canais com visualizações a recalcular, anotados pelas cargas em lote
+CREATE TABLE system_antig.canal_visu_pendente (
+    id_canal INTEGER NOT NULL,
+    PRIMARY KEY (id_canal)
+);
+
+-- Recalcula por completo o total de visualizações dos canais informados
+CREATE OR REPLACE FUNCTION system_antig.fn_recalcular_qtd_visualizacoes(_canais INTEGER[])
+RETURNS VOID AS $$
+    UPDATE system_antig.canal c
+    SET qtd_visualizacoes = COALESCE((
+        SELECT SUM(v.visu_total) FROM system_antig.video v WHERE v.id_canal = c.id
+    ), 0)
+    WHERE c.id = ANY(_canais);
+$$ LANGUAGE sql;
+
 -- Função Lógica
+-- Trigger por instrução: aplica ao canal a diferença (+novas -antigas) de visualizações,
+-- uma única atualização por canal mesmo quando a instrução insere centenas de vídeos.
+-- Com system_antig.carga_em_lote = 'on' (SET LOCAL) apenas anota os canais afetados;
+-- sp_aplicar_visualizacoes_pendentes() recalcula todos de uma vez no fim da carga.
 CREATE OR REPLACE FUNCTION system_antig.fn_manter_qtd_visualizacoes()
 RETURNS TRIGGER AS $$
-DECLARE
-    id_canal_afetado INTEGER;
 BEGIN
-    -- Descobre qual canal precisa ser atualizado
-    IF (TG_OP = 'DELETE') THEN
-        id_canal_afetado := OLD.id_canal;
-    ELSE
-        id_canal_afetado := NEW.id_canal;
+    IF current_setting('system_antig.carga_em_lote', true) = 'on' THEN
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            INSERT INTO system_antig.canal_visu_pendente (id_canal)
+            SELECT DISTINCT id_canal FROM novas
+            ON CONFLICT DO NOTHING;
+        END IF;
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            INSERT INTO system_antig.canal_visu_pendente (id_canal)
+            SELECT DISTINCT id_canal FROM antigas
+            ON CONFLICT DO NOTHING;
+        END IF;
+        RETURN NULL;
     END IF;
 
-    -- Atualiza o canal somando as visualizações de todos os vídeos dele
-    UPDATE system_antig.canal
-    SET qtd_visualizacoes = (
-        SELECT COALESCE(SUM(visu_total), 0)
-        FROM system_antig.video
-        WHERE id_canal = id_canal_afetado
-    )
-    WHERE id = id_canal_afetado;
-
-    -- Se houve troca de canal (UPDATE do id_canal), atualiza o canal antigo também
-    IF (TG_OP = 'UPDATE' AND OLD.id_canal IS DISTINCT FROM NEW.id_canal) THEN
-        UPDATE system_antig.canal
-        SET qtd_visualizacoes = (
-            SELECT COALESCE(SUM(visu_total), 0)
-            FROM system_antig.video
-            WHERE id_canal = OLD.id_canal
-        )
-        WHERE id = OLD.id_canal;
+    IF TG_OP = 'INSERT' THEN
+        UPDATE system_antig.canal c
+        SET qtd_visualizacoes = COALESCE(c.qtd_visualizacoes, 0) + d.delta
+        FROM (
+            SELECT id_canal, SUM(COALESCE(visu_total, 0)) AS delta FROM novas GROUP BY id_canal
+        ) d
+        WHERE c.id = d.id_canal AND d.delta <> 0;
+    ELSIF TG_OP = 'DELETE' THEN
+        UPDATE system_antig.canal c
+        SET qtd_visualizacoes = COALESCE(c.qtd_visualizacoes, 0) - d.delta
+        FROM (
+            SELECT id_canal, SUM(COALESCE(visu_total, 0)) AS delta FROM antigas GROUP BY id_canal
+        ) d
+        WHERE c.id = d.id_canal AND d.delta <> 0;
+    ELSIF EXISTS (SELECT id_canal FROM antigas EXCEPT SELECT id_canal FROM novas) THEN
+        -- Algum canal perdeu todos os vídeos da instrução, inclusive pela cascata da troca de PK
+        -- do canal (que já leva o total para o novo id): recalcula os canais envolvidos
+        PERFORM system_antig.fn_recalcular_qtd_visualizacoes(ARRAY(
+            SELECT id_canal FROM antigas UNION SELECT id_canal FROM novas
+        ));
+    ELSE
+        UPDATE system_antig.canal c
+        SET qtd_visualizacoes = COALESCE(c.qtd_visualizacoes, 0) + d.delta
+        FROM (
+            SELECT id_canal, SUM(delta) AS delta
+            FROM (
+                SELECT id_canal, COALESCE(visu_total, 0) AS delta FROM novas
+                UNION ALL
+                SELECT id_canal, -COALESCE(visu_total, 0) FROM antigas
+            ) t
+            GROUP BY id_canal
+        ) d
+        WHERE c.id = d.id_canal AND d.delta <> 0;
     END IF;
 
     RETURN NULL;
 END;
 $$ LANGUAGE plpgsql;
 
--- Criação da Trigger
-CREATE OR REPLACE TRIGGER trg_atualiza_visu_canal
-AFTER INSERT OR UPDATE OF visu_total, id_canal OR DELETE ON system_antig.video
-FOR EACH ROW
+-- Criação das Triggers (tabelas de transição exigem uma trigger por evento e não aceitam lista de colunas)
+CREATE OR REPLACE TRIGGER trg_atualiza_visu_canal_ins
+AFTER INSERT ON system_antig.video
+REFERENCING NEW TABLE AS novas
+FOR EACH STATEMENT
 EXECUTE FUNCTION system_antig.fn_manter_qtd_visualizacoes();
 
+CREATE OR REPLACE TRIGGER trg_atualiza_visu_canal_upd
+AFTER UPDATE ON system_antig.video
+REFERENCING OLD TABLE AS antigas NEW TABLE AS novas
+FOR EACH STATEMENT
+EXECUTE FUNCTION system_antig.fn_manter_qtd_visualizacoes();
+
+CREATE OR REPLACE TRIGGER trg_atualiza_visu_canal_del
+AFTER DELETE ON system_antig.video
+REFERENCING OLD TABLE AS antigas
+FOR EACH STATEMENT
+EXECUTE FUNCTION system_antig.fn_manter_qtd_visualizacoes();
+
+-- Fim de carga em lote: recalcula os canais anotados e limpa a lista
+CREATE OR REPLACE PROCEDURE system_antig.sp_aplicar_visualizacoes_pendentes()
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    _canais INTEGER[];
+BEGIN
+    WITH pendentes AS (
+        DELETE FROM system_antig.canal_visu_pendente RETURNING id_canal
+    )
+    SELECT ARRAY(SELECT id_canal FROM pendentes) INTO _canais;
+    PERFORM system_antig.fn_recalcular_qtd_visualizacoes(_canais);
+END;
+$$;
+
 
 -- Função Lógica
 CREATE OR REPLACE FUNCTION system_antig.fn_manter_qtd_users_plataforma()
@@ -624,6 +977,151 @@ $$;
 
 ------------------------------------------------- Transactions ---------------------------------------------------------
 
+-- Escrita em lote: recebem um array JSON de linhas, inserem todas numa única instrução (os triggers de instrução
+-- rodam uma vez por lote) e devolvem uma linha de resultado por entrada, na ordem recebida (ordem 1, 2, ...):
+-- as chaves gravadas, ou em erro o motivo da recusa. Uma linha recusada não impede as demais.
+CREATE OR REPLACE FUNCTION system_antig.f_inserir_videos(p_videos JSONB)
+RETURNS TABLE (ordem BIGINT, id_video INTEGER, id_canal INTEGER, erro TEXT)
+LANGUAGE sql
+AS $$
+    WITH entrada AS (
+        SELECT x.ordem, v.id_canal, v.titulo, v.datah, v.tema, v.duracao, v.visu_simul, v.visu_total,
+               CASE
+                   WHEN NOT EXISTS (SELECT 1 FROM system_antig.canal c WHERE c.id = v.id_canal) THEN 'Canal inexistente'
+                   WHEN ROW_NUMBER() OVER (PARTITION BY v.titulo, v.datah ORDER BY x.ordem) > 1 THEN 'Vídeo repetido no lote (titulo, datah)'
+               END AS erro
+        FROM jsonb_array_elements(p_videos) WITH ORDINALITY AS x(linha, ordem)
+        CROSS JOIN LATERAL jsonb_populate_record(NULL::system_antig.video, x.linha) AS v
+    ),
+    inseridos AS (
+        INSERT INTO system_antig.video (id_canal, titulo, datah, tema, duracao, visu_simul, visu_total)
+        SELECT e.id_canal, e.titulo, e.datah, e.tema, e.duracao, COALESCE(e.visu_simul, 0), COALESCE(e.visu_total, 0)
+        FROM entrada e
+        WHERE e.erro IS NULL
+        ORDER BY e.ordem
+        ON CONFLICT DO NOTHING
+        RETURNING id_video, id_canal, titulo, datah
+    )
+    SELECT e.ordem, i.id_video, i.id_canal,
+           CASE WHEN i.id_video IS NULL THEN COALESCE(e.erro, 'Vídeo já cadastrado (titulo, datah)') END
+    FROM entrada e
+    LEFT JOIN inseridos i ON e.erro IS NULL AND i.titulo = e.titulo AND i.datah = e.datah
+    ORDER BY e.ordem;
+$$;
+
+-- Doações, com o registro do meio de pagamento opcional de cada uma (tipo_pagamento e os campos de
+-- sp_registrar_doacao_unificada). Sem seq_comentario, a doação fica no comentário mais recente do doador no vídeo;
+-- sem seq_pg (ou seq_plataforma), o valor vem da sequência.
+CREATE OR REPLACE FUNCTION system_antig.f_inserir_doacoes(p_doacoes JSONB)
+RETURNS TABLE (ordem BIGINT, id_video INTEGER, id_canal INTEGER, id_usuario INTEGER, seq_comentario INTEGER, seq_pg INTEGER, datah_comentario TIMESTAMP, erro TEXT)
+LANGUAGE sql
+-- A data do comentário (chave de partição) só aparece durante a execução: replanejar as consultas a doacao sobre
+-- todas as partições a cada chamada custava mais que executá-las. O plano genérico é montado uma vez por conexão
+SET plan_cache_mode = force_generic_plan
+AS $$
+    WITH entrada AS (
+        SELECT x.ordem, d.id_video, d.id_canal, d.id_usuario, d.seq_pg, d.valor, d.status,
+               COALESCE(d.seq_comentario, (
+                   SELECT MAX(c.seq) FROM system_antig.comentario_chave c
+                   WHERE c.id_video = d.id_video AND c.id_canal = d.id_canal AND c.id_usuario = d.id_usuario
+               )) AS seq_comentario,
+               x.linha->>'tipo_pagamento' AS tipo,
+               x.linha->>'txid' AS txid,
+               x.linha->>'id_paypal' AS id_paypal,
+               x.linha->>'nro_cartao' AS nro_cartao,
+               x.linha->>'bandeira' AS bandeira,
+               (x.linha->>'seq_plataforma')::INTEGER AS seq_plataforma,
+               -- Identificador do pagamento que precisa ser único na tabela filha
+               CASE x.linha->>'tipo_pagamento'
+                   WHEN 'bitcoin' THEN x.linha->>'txid'
+                   WHEN 'paypal' THEN x.linha->>'id_paypal'
+                   WHEN 'plataforma' THEN x.linha->>'seq_plataforma'
+               END AS chave_pagamento
+        FROM jsonb_array_elements(p_doacoes) WITH ORDINALITY AS x(linha, ordem)
+        CROSS JOIN LATERAL jsonb_populate_record(NULL::system_antig.doacao, x.linha) AS d
+    ),
+    -- A data do comentário é a chave de partição da doação e dos pagamentos; vem sempre do comentário, pela sua
+    -- chave (no máximo uma linha em comentario_chave)
+    comentada AS (
+        SELECT e.*, (
+                   SELECT c.datah FROM system_antig.comentario_chave c
+                   WHERE c.id_video = e.id_video AND c.id_canal = e.id_canal AND c.id_usuario = e.id_usuario AND c.seq = e.seq_comentario
+               ) AS datah_comentario
+        FROM entrada e
+    ),
+    validada AS (
+        SELECT e.*,
+               CASE
+                   WHEN e.seq_comentario IS NULL THEN 'O doador não comentou neste vídeo'
+                   WHEN e.datah_comentario IS NULL THEN 'Comentário inexistente'
+                   WHEN e.tipo NOT IN ('bitcoin', 'paypal', 'cartao', 'plataforma') THEN 'Tipo inválido. Use: bitcoin, paypal, cartao ou plataforma.'
+                   WHEN e.tipo = 'bitcoin' AND e.txid IS NULL THEN 'Para Bitcoin, informe o TxID'
+                   WHEN e.tipo = 'paypal' AND e.id_paypal IS NULL THEN 'Para PayPal, informe o IDPayPal'
+                   WHEN e.tipo = 'cartao' AND (e.nro_cartao IS NULL OR e.bandeira IS NULL) THEN 'Para Cartão, informe número e bandeira'
+                   WHEN e.tipo = 'bitcoin' AND EXISTS (SELECT 1 FROM system_antig.bitcoin b WHERE b.txid = e.txid) THEN 'TxID já registrado'
+                   WHEN e.tipo = 'paypal' AND EXISTS (SELECT 1 FROM system_antig.paypal p WHERE p.idpaypal = e.id_paypal) THEN 'IDPayPal já registrado'
+                   WHEN e.tipo = 'plataforma' AND EXISTS (SELECT 1 FROM system_antig.mecanismoPlat m WHERE m.seq_plataforma = e.seq_plataforma) THEN 'seq_plataforma já registrado'
+                   WHEN e.seq_pg IS NOT NULL AND EXISTS (
+                       SELECT 1 FROM system_antig.doacao o
+                       WHERE o.id_video = e.id_video AND o.id_canal = e.id_canal AND o.id_usuario = e.id_usuario
+                         AND o.seq_comentario = e.seq_comentario AND o.seq_pg = e.seq_pg AND o.datah_comentario = e.datah_comentario
+                   ) THEN 'Doação já registrada'
+                   -- Chaves informadas que se repetem dentro do lote: vale a primeira
+                   WHEN e.seq_pg IS NOT NULL AND ROW_NUMBER() OVER (
+                       PARTITION BY e.id_video, e.id_canal, e.id_usuario, e.seq_comentario, e.seq_pg ORDER BY e.ordem
+                   ) > 1 THEN 'Doação repetida no lote'
+                   WHEN e.chave_pagamento IS NOT NULL AND ROW_NUMBER() OVER (
+                       PARTITION BY e.tipo, e.chave_pagamento ORDER BY e.ordem
+                   ) > 1 THEN 'Pagamento repetido no lote'
+               END AS erro
+        FROM comentada e
+    ),
+    -- nextval torna a CTE volátil: ela é avaliada uma única vez e as inserções abaixo leem as mesmas chaves
+    chaves AS (
+        SELECT v.ordem, v.id_video, v.id_canal, v.id_usuario, v.seq_comentario, v.datah_comentario,
+               COALESCE(v.seq_pg, nextval('system_antig.doacao_seq_pg_seq'))::INTEGER AS seq_pg,
+               v.valor, v.status, v.tipo, v.txid, v.id_paypal, v.nro_cartao, v.bandeira,
+               CASE WHEN v.tipo = 'plataforma' THEN COALESCE(v.seq_plataforma, nextval('system_antig.mecanismoplat_seq_plataforma_seq'))::INTEGER END AS seq_plataforma
+        FROM validada v
+        WHERE v.erro IS NULL
+    ),
+    doacoes AS (
+        INSERT INTO system_antig.doacao (id_video, id_canal, id_usuario, seq_comentario, seq_pg, valor, status, datah_comentario)
+        SELECT k.id_video, k.id_canal, k.id_usuario, k.seq_comentario, k.seq_pg, k.valor, k.status, k.datah_comentario
+        FROM chaves k
+        ORDER BY k.ordem
+        ON CONFLICT DO NOTHING
+        RETURNING id_video, id_canal, id_usuario, seq_comentario, seq_pg, datah_comentario
+    ),
+    pagamentos AS (
+        SELECT k.*
+        FROM chaves k
+        JOIN doacoes d ON d.id_video = k.id_video AND d.id_canal = k.id_canal AND d.id_usuario = k.id_usuario
+                      AND d.seq_comentario = k.seq_comentario AND d.seq_pg = k.seq_pg AND d.datah_comentario = k.datah_comentario
+    ),
+    bitcoins AS (
+        INSERT INTO system_antig.bitcoin (id_video, id_canal, id_usuario, seq_comentario, seq_doacao, TxID, datah_comentario)
+        SELECT p.id_video, p.id_canal, p.id_usuario, p.seq_comentario, p.seq_pg, p.txid, p.datah_comentario FROM pagamentos p WHERE p.tipo = 'bitcoin'
+    ),
+    paypals AS (
+        INSERT INTO system_antig.paypal (id_video, id_canal, id_usuario, seq_comentario, seq_doacao, IdPayPal, datah_comentario)
+        SELECT p.id_video, p.id_canal, p.id_usuario, p.seq_comentario, p.seq_pg, p.id_paypal, p.datah_comentario FROM pagamentos p WHERE p.tipo = 'paypal'
+    ),
+    cartoes AS (
+        INSERT INTO system_antig.cartaoCredito (id_video, id_canal, id_usuario, seq_comentario, seq_doacao, nro, bandeira, datah_comentario)
+        SELECT p.id_video, p.id_canal, p.id_usuario, p.seq_comentario, p.seq_pg, p.nro_cartao, p.bandeira, p.datah_comentario FROM pagamentos p WHERE p.tipo = 'cartao'
+    ),
+    plataformas AS (
+        INSERT INTO system_antig.mecanismoPlat (id_video, id_canal, id_usuario, seq_comentario, seq_doacao, seq_plataforma, datah_comentario)
+        SELECT p.id_video, p.id_canal, p.id_usuario, p.seq_comentario, p.seq_pg, p.seq_plataforma, p.datah_comentario FROM pagamentos p WHERE p.tipo = 'plataforma'
+    )
+    SELECT v.ordem, p.id_video, p.id_canal, p.id_usuario, p.seq_comentario, p.seq_pg, p.datah_comentario,
+           CASE WHEN p.ordem IS NULL THEN COALESCE(v.erro, 'Doação já registrada') END
+    FROM validada v
+    LEFT JOIN pagamentos p ON p.ordem = v.ordem
+    ORDER BY v.ordem;
+$$;
+
 CREATE OR REPLACE PROCEDURE system_antig.sp_registrar_doacao_unificada(
     -- 1. Parâmetros da Tabela Pai (DOACAO)
     -- Note que NÃO tem _tipo_pagamento aqui para inserir na tabela
@@ -631,7 +1129,7 @@ CREATE OR REPLACE PROCEDURE system_antig.sp_registrar_doacao_unificada(
     _id_canal INT,
     _id_usuario INT,
     _seq_comentario INT,
-    _seq_pg INT,
+    _seq_pg INT, -- NULL: vem da sequência
     _valor NUMERIC,
     _status system_antig.status_doacao_enum,
 
@@ -648,42 +1146,20 @@ CREATE OR REPLACE PROCEDURE system_antig.sp_registrar_doacao_unificada(
 )
 LANGUAGE plpgsql
 AS $$
+DECLARE
+    _erro TEXT;
 BEGIN
-    -- Validação de Segurança
-    IF _tipo_pagamento NOT IN ('bitcoin', 'paypal', 'cartao', 'plataforma') THEN
-        RAISE EXCEPTION 'Tipo inválido. Use: bitcoin, paypal, cartao ou plataforma.';
-    END IF;
-
-    -- 1. Inserir na Tabela Pai (DOACAO)
-    -- Veja: Inserimos APENAS as colunas que existem na sua tabela. O tipo não entra aqui.
-    INSERT INTO system_antig.doacao (id_video, id_canal, id_usuario, seq_comentario, seq_pg, valor, status)
-    VALUES (_id_video, _id_canal, _id_usuario, _seq_comentario, _seq_pg, _valor, _status);
-
-    -- 2. Lógica de Decisão (Factory)
-    -- Aqui usamos a variável apenas para saber em qual tabela filha gravar
-    IF _tipo_pagamento = 'bitcoin' THEN
-        IF _txid IS NULL THEN RAISE EXCEPTION 'Para Bitcoin, informe o TxID'; END IF;
-
-        INSERT INTO system_antig.bitcoin (id_video, id_canal, id_usuario, seq_comentario, seq_doacao, TxID)
-        VALUES (_id_video, _id_canal, _id_usuario, _seq_comentario, _seq_pg, _txid);
-
-    ELSIF _tipo_pagamento = 'paypal' THEN
-        IF _id_paypal IS NULL THEN RAISE EXCEPTION 'Para PayPal, informe o IDPayPal'; END IF;
-
-        INSERT INTO system_antig.paypal (id_video, id_canal, id_usuario, seq_comentario, seq_doacao, IdPayPal)
-        VALUES (_id_video, _id_canal, _id_usuario, _seq_comentario, _seq_pg, _id_paypal);
-
-    ELSIF _tipo_pagamento = 'cartao' THEN
-        IF _nro_cartao IS NULL THEN RAISE EXCEPTION 'Para Cartão, informe número e bandeira'; END IF;
-
-        INSERT INTO system_antig.cartaoCredito (id_video, id_canal, id_usuario, seq_comentario, seq_doacao, nro, bandeira)
-        VALUES (_id_video, _id_canal, _id_usuario, _seq_comentario, _seq_pg, _nro_cartao, _bandeira);
-
-    ELSIF _tipo_pagamento = 'plataforma' THEN
-        IF _seq_plataforma IS NULL THEN RAISE EXCEPTION 'Informe o seq_plataforma'; END IF;
-
-        INSERT INTO system_antig.mecanismoPlat (id_video, id_canal, id_usuario, seq_comentario, seq_doacao, seq_plataforma)
-        VALUES (_id_video, _id_canal, _id_usuario, _seq_comentario, _seq_pg, _seq_plataforma);
+    -- Uma doação é um lote de uma linha: mesma validação e mesmas inserções (pai e filha) de f_inserir_doacoes
+    SELECT r.erro INTO _erro
+    FROM system_antig.f_inserir_doacoes(jsonb_build_array(jsonb_build_object(
+        'id_video', _id_video, 'id_canal', _id_canal, 'id_usuario', _id_usuario,
+        'seq_comentario', _seq_comentario, 'seq_pg', _seq_pg, 'valor', _valor, 'status', _status,
+        'tipo_pagamento', _tipo_pagamento, 'txid', _txid, 'id_paypal', _id_paypal,
+        'nro_cartao', _nro_cartao, 'bandeira', _bandeira, 'seq_plataforma', _seq_plataforma
+    ))) r;
+
+    IF _erro IS NOT NULL THEN
+        RAISE EXCEPTION '%', _erro;
     END IF;
 
     -- O COMMIT é automático ao final se não houver erro.
@@ -728,8 +1204,10 @@ $$;----------------------------------------------------------------------------I
 -- foi escolhido b+tree porque o indice hash n tem a opcao de include e criacao de indice em multiplas colunas
 -- ignora o status "recusado", é criado só para status validos e acelera a leitura
 -- a de valor é para acelerar a soma dos valores lendo apenas o indice, ajudando no custo da consulta sem precisar acessar a tabela principal
+-- canal antes de vídeo: um canal inteiro é um único intervalo do índice em cada partição mensal, e um vídeo continua
+-- sendo uma busca pela chave completa
 CREATE INDEX idx_doacao_recebidas_lidas
-ON system_antig.doacao (id_video, id_canal) INCLUDE (valor)
+ON system_antig.doacao (id_canal, id_video) INCLUDE (valor)
 WHERE status IN ('lido', 'recebido');
 
 
@@ -755,12 +1233,56 @@ ON system_antig.inscricao (id_membro);
 CREATE INDEX idx_empresa_nome
 ON system_antig.empresa (nome);
 
+-- 6. Paginação por cursor das doações (API /api/donations)
+-- a listagem ordena por valor DESC com a PK como desempate; o cursor carrega essa chave e a próxima página vira
+-- uma comparação de linha (valor, pk...) < (...), que o índice (lido de trás para frente) resolve sem OFFSET
+CREATE INDEX idx_doacao_valor_pk
+ON system_antig.doacao (valor, id_video, id_canal, id_usuario, seq_comentario, seq_pg, datah_comentario);
+
+-- 7. Paginação por cursor dos vídeos (API /api/videos), com e sem filtro de canal
+-- as colunas em INCLUDE servem o relatório drilldown-performance (/api/reports/drilldown-performance): os vídeos
+-- de um período (ou de um canal num período) e suas visualizações saem só do índice (index-only scan), já
+-- ordenados por canal para o GROUP BY; as doações por vídeo vêm de idx_doacao_recebidas_lidas
+CREATE INDEX idx_video_datah_pk
+ON system_antig.video (datah, id_video, id_canal) INCLUDE (visu_total);
+
+CREATE INDEX idx_video_canal_datah
+ON system_antig.video (id_canal, datah, id_video) INCLUDE (visu_total, visu_simul);
+
+-- 8. Busca textual (filtro q das listagens e /api/search/{entidade})
+-- ILIKE '%termo%' não usa b-tree; os índices GIN de trigramas (pg_trgm) atendem ILIKE com curinga dos dois lados
+-- e o operador de similaridade (%), usado para tolerar erros de digitação.
+-- Termos com menos de 3 letras não formam trigrama: para eles a busca é por prefixo, atendida pelos b-tree em
+-- lower(coluna) COLLATE "C" (a collation C permite LIKE 'abc%' e devolve as linhas já ordenadas para o LIMIT)
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX idx_usuario_nick_trgm ON system_antig.usuario USING GIN (nick gin_trgm_ops);
+CREATE INDEX idx_usuario_email_trgm ON system_antig.usuario USING GIN (email gin_trgm_ops);
+CREATE INDEX idx_canal_nome_trgm ON system_antig.canal USING GIN (nome gin_trgm_ops);
+CREATE INDEX idx_video_titulo_trgm ON system_antig.video USING GIN (titulo gin_trgm_ops);
+CREATE INDEX idx_plataforma_nome_trgm ON system_antig.plataforma USING GIN (nome gin_trgm_ops);
+
+CREATE INDEX idx_usuario_nick_prefixo ON system_antig.usuario ((lower(nick) COLLATE "C"));
+CREATE INDEX idx_canal_nome_prefixo ON system_antig.canal ((lower(nome) COLLATE "C"));
+CREATE INDEX idx_video_titulo_prefixo ON system_antig.video ((lower(titulo) COLLATE "C"));
+CREATE INDEX idx_plataforma_nome_prefixo ON system_antig.plataforma ((lower(nome) COLLATE "C"));
+
+-- 9. Detalhe de plataforma e de usuário (/api/platforms/{nro}, /api/users/{id})
+-- os canais de uma plataforma ou de um streamer saem paginados por id (cursor); sem estes índices cada detalhe
+-- varria canal inteiro
+CREATE INDEX idx_canal_plataforma_id
+ON system_antig.canal (nro_plataforma, id);
+
+CREATE INDEX idx_canal_streamer_id
+ON system_antig.canal (id_streamer, id);
+
 
 --------------------------------------------------------------VIEWS----------------------------------------------------
 
 -- 1. Materializada
 -- na consulta 8 há muitos lefts joins com tabelas volumosas, a escolha do materializado foi para diminuir o overhead excessivo, pois a materializada pré calcula o total permitindo uma leitura simples
-CREATE MATERIALIZED VIEW system_antig.mv_faturamento_canal AS
+-- A consulta de cálculo completo fica numa view normal, reaproveitada pela reconstrução e pelo verificador dos agregados incrementais
+CREATE VIEW system_antig.v_faturamento_canal_calc AS
 WITH ReceitaPatrocinio AS (
     SELECT id_canal, SUM(valor) AS total_patrocinio
     FROM system_antig.patrocinio
@@ -792,7 +1314,10 @@ SELECT
 FROM system_antig.canal c
 LEFT JOIN ReceitaPatrocinio rp ON c.id = rp.id_canal
 LEFT JOIN ReceitaAportes ra ON c.id = ra.id_canal
-LEFT JOIN ReceitaDoacoes rd ON c.id = rd.id_canal
+LEFT JOIN ReceitaDoacoes rd ON c.id = rd.id_canal;
+
+CREATE MATERIALIZED VIEW system_antig.mv_faturamento_canal AS
+SELECT * FROM system_antig.v_faturamento_canal_calc
 WITH DATA;
 
 -- 2. Virtual: Detalhes de membros por usuário (otimiza C2, C6 - sua sugestão)
@@ -820,18 +1345,20 @@ SELECT
     CASE
         WHEN v.visu_total > 0 THEN (COUNT(com.seq)::NUMERIC / v.visu_total) * 100
         ELSE 0
-    END AS taxa_engajamento
+    END AS taxa_engajamento,
+    -- Chave completa do vídeo (id_video só é único dentro do canal); usada no JOIN da API
+    v.id_canal
 FROM system_antig.video v
 JOIN system_antig.canal c ON v.id_canal = c.id
 LEFT JOIN system_antig.comentario com
     ON v.id_video = com.id_video AND v.id_canal = com.id_canal
-GROUP BY v.id_video, v.titulo, c.nome, v.visu_total
+GROUP BY v.id_video, v.id_canal, v.titulo, c.nome, v.visu_total
 HAVING v.visu_total > 1000 -- Apenas vídeos com relevância mínima
 ORDER BY taxa_engajamento DESC;
 
 -- 4. Materializada
 --Consolida dados dispersos de múltiplos canais para gerar o perfil de performance do Streamer. Materializada pois o cálculo de audiência total de um influenciador envolve varrer os historicos de video
-CREATE MATERIALIZED VIEW system_antig.mv_performance_streamers AS
+CREATE VIEW system_antig.v_performance_streamers_calc AS
 SELECT
     u.id AS id_streamer,
     u.nick,
@@ -844,7 +1371,10 @@ SELECT
 FROM system_antig.usuario u
 JOIN system_antig.canal c ON u.id = c.id_streamer
 LEFT JOIN system_antig.video v ON c.id = v.id_canal
-GROUP BY u.id, u.nick
+GROUP BY u.id, u.nick;
+
+CREATE MATERIALIZED VIEW system_antig.mv_performance_streamers AS
+SELECT * FROM system_antig.v_performance_streamers_calc
 WITH DATA;
 
 -- 5. Virtual
@@ -866,15 +1396,77 @@ CREATE UNIQUE INDEX idx_mv_faturamento_unique ON system_antig.mv_faturamento_can
 -- Para mv_performance_streamers (A chave única é o id_streamer)
 CREATE UNIQUE INDEX idx_mv_performance_unique ON system_antig.mv_performance_streamers (id_streamer);
 
-CREATE OR REPLACE PROCEDURE system_antig.sp_refresh_views_analiticas()
+-- Estado de atualização de cada view materializada: quando foi atualizada, quanto demorou e o contador de linhas
+-- escritas nas tabelas de origem naquele momento. O agendador da API (server/refresh.py) compara esse contador com o
+-- atual (pg_stat_user_tables) para atualizar uma view só depois de um volume mínimo de alterações, e o estado é
+-- compartilhado por todos os workers.
+CREATE TABLE system_antig.mv_atualizacao (
+    visao TEXT PRIMARY KEY,
+    tabelas_origem TEXT[] NOT NULL,
+    atualizada_em TIMESTAMPTZ,
+    duracao_ms NUMERIC(12, 1),
+    alteracoes_base BIGINT NOT NULL DEFAULT 0
+);
+
+INSERT INTO system_antig.mv_atualizacao (visao, tabelas_origem) VALUES
+    ('mv_faturamento_canal', ARRAY['canal', 'patrocinio', 'inscricao', 'nivelcanal', 'video', 'doacao']),
+    ('mv_performance_streamers', ARRAY['usuario', 'canal', 'video']);
+
+-- Linhas inseridas, atualizadas e removidas desde o último reset das estatísticas (contador cumulativo).
+-- Uma tabela particionada não tem contadores próprios: somam-se os das suas partições. Arquivar um mês leva os
+-- contadores dele junto, e a queda conta como um reset em v_mv_atualizacao
+CREATE OR REPLACE FUNCTION system_antig.f_alteracoes_tabelas(p_tabelas TEXT[])
+RETURNS BIGINT
+LANGUAGE sql STABLE
+AS $$
+    SELECT COALESCE(SUM(pg_stat_get_tuples_inserted(p.relid) + pg_stat_get_tuples_updated(p.relid)
+                        + pg_stat_get_tuples_deleted(p.relid)), 0)::BIGINT
+    FROM unnest(p_tabelas) AS t(tabela)
+    CROSS JOIN LATERAL pg_partition_tree(to_regclass(format('system_antig.%I', t.tabela))) p;
+$$;
+
+CREATE VIEW system_antig.v_mv_atualizacao AS
+SELECT
+    a.visao,
+    a.atualizada_em,
+    a.duracao_ms,
+    -- Um reset das estatísticas zera o contador; nesse caso conta tudo desde o reset
+    CASE WHEN atual.total >= a.alteracoes_base THEN atual.total - a.alteracoes_base ELSE atual.total END AS alteracoes_pendentes
+FROM system_antig.mv_atualizacao a
+CROSS JOIN LATERAL (SELECT system_antig.f_alteracoes_tabelas(a.tabelas_origem) AS total) atual;
+
+-- Atualiza uma view sem bloquear leituras (graças aos índices únicos acima) e registra o estado.
+-- O contador é lido antes do REFRESH: alterações feitas durante ele contam para a próxima atualização.
+CREATE OR REPLACE PROCEDURE system_antig.sp_atualizar_visao(p_visao TEXT)
 LANGUAGE plpgsql
 AS $$
+DECLARE
+    v_inicio TIMESTAMPTZ := clock_timestamp();
+    v_alteracoes BIGINT;
 BEGIN
-    -- Atualiza o Faturamento sem bloquear leituras (Graças ao idx_mv_faturamento_unique)
-    REFRESH MATERIALIZED VIEW CONCURRENTLY system_antig.mv_faturamento_canal;
+    SELECT system_antig.f_alteracoes_tabelas(tabelas_origem) INTO v_alteracoes
+    FROM system_antig.mv_atualizacao WHERE visao = p_visao;
+    IF NOT FOUND THEN
+        RAISE EXCEPTION 'View materializada desconhecida: %', p_visao;
+    END IF;
 
-    -- Atualiza a Performance sem bloquear leituras (Graças ao idx_mv_performance_unique)
-    REFRESH MATERIALIZED VIEW CONCURRENTLY system_antig.mv_performance_streamers;
+    EXECUTE format('REFRESH MATERIALIZED VIEW CONCURRENTLY system_antig.%I', p_visao);
+
+    UPDATE system_antig.mv_atualizacao
+    SET atualizada_em = v_inicio,
+        duracao_ms = EXTRACT(EPOCH FROM clock_timestamp() - v_inicio) * 1000,
+        alteracoes_base = v_alteracoes
+    WHERE visao = p_visao;
+END;
+$$;
+
+CREATE OR REPLACE PROCEDURE system_antig.sp_refresh_views_analiticas()
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    -- Faturamento e Performance, cada uma em modo concorrente
+    CALL system_antig.sp_atualizar_visao('mv_faturamento_canal');
+    CALL system_antig.sp_atualizar_visao('mv_performance_streamers');
 
     RAISE NOTICE 'Views Analíticas atualizadas com sucesso (modo concorrente) em: %', NOW();
 END;
@@ -882,4 +1474,540 @@ $$;
 
 -- 4. Atualizar as Views Materializadas
 REFRESH MATERIALIZED VIEW system_antig.mv_faturamento_canal;
-REFRESH MATERIALIZED VIEW system_antig.mv_performance_streamers;
\ No newline at end of file
+REFRESH MATERIALIZED VIEW system_antig.mv_performance_streamers;
+UPDATE system_antig.mv_atualizacao SET atualizada_em = now(), alteracoes_base = system_antig.f_alteracoes_tabelas(tabelas_origem);
+
+------------------------------------------------ Agregados Incrementais ------------------------------------------------
+-- Tabelas-resumo com as mesmas colunas e chaves únicas das views materializadas, mantidas por triggers de instrução
+-- (FOR EACH STATEMENT) com tabelas de transição. Cada INSERT/UPDATE/DELETE aplica só o delta das linhas afetadas,
+-- em vez de um REFRESH que relê doacao, video, inscricao e patrocinio inteiros.
+-- f_ranking_faturamento_total e a API leem destas tabelas; as MVs continuam existindo para consultas ad-hoc.
+-- TRUNCATE nas tabelas de origem não é capturado: depois de um, rode CALL system_antig.sp_reconstruir_agregados();
+
+-- Acelera o recálculo por canal (e os filtros por canal da API): a PK de video começa por id_video
+CREATE INDEX IF NOT EXISTS idx_video_id_canal
+ON system_antig.video (id_canal);
+
+CREATE TABLE system_antig.agg_faturamento_canal (
+    id_canal INTEGER NOT NULL,
+    nome_canal VARCHAR(100) NOT NULL,
+    val_patrocinio DOUBLE PRECISION NOT NULL DEFAULT 0,
+    val_aportes DOUBLE PRECISION NOT NULL DEFAULT 0,
+    val_doacoes NUMERIC NOT NULL DEFAULT 0,
+    faturamento_bruto DOUBLE PRECISION GENERATED ALWAYS AS (val_patrocinio + val_aportes + val_doacoes) STORED,
+    PRIMARY KEY (id_canal)
+);
+
+CREATE TABLE system_antig.agg_performance_streamers (
+    id_streamer INTEGER NOT NULL,
+    nick VARCHAR(50) NOT NULL,
+    qtd_canais BIGINT NOT NULL DEFAULT 0,
+    total_videos_postados BIGINT NOT NULL DEFAULT 0,
+    audiencia_total_acumulada NUMERIC NOT NULL DEFAULT 0,
+    PRIMARY KEY (id_streamer)
+);
+
+-- O ranking ordena por faturamento; com o índice o TOP-K não precisa ordenar a tabela toda
+CREATE INDEX idx_agg_faturamento_bruto ON system_antig.agg_faturamento_canal (faturamento_bruto DESC);
+CREATE INDEX idx_agg_performance_audiencia ON system_antig.agg_performance_streamers (audiencia_total_acumulada DESC);
+
+-- Recalcula do zero as linhas de alguns streamers (usado quando canais mudam de dono, são criados ou removidos)
+CREATE OR REPLACE FUNCTION system_antig.fn_recalcular_performance_streamers(_ids INTEGER[])
+RETURNS VOID AS $$
+BEGIN
+    DELETE FROM system_antig.agg_performance_streamers WHERE id_streamer = ANY(_ids);
+    INSERT INTO system_antig.agg_performance_streamers
+    SELECT * FROM system_antig.v_performance_streamers_calc WHERE id_streamer = ANY(_ids);
+END;
+$$ LANGUAGE plpgsql;
+
+-- Recalcula o total de aportes de alguns canais (mudança de nível ou do valor de um nível)
+CREATE OR REPLACE FUNCTION system_antig.fn_recalcular_aportes(_canais INTEGER[])
+RETURNS VOID AS $$
+BEGIN
+    UPDATE system_antig.agg_faturamento_canal a
+    SET val_aportes = COALESCE((
+        SELECT SUM(nc.valor)
+        FROM system_antig.inscricao i
+        JOIN system_antig.nivelcanal nc ON i.id_canal = nc.id_canal AND i.nivel = nc.nivel
+        WHERE i.id_canal = a.id_canal
+    ), 0)
+    WHERE a.id_canal = ANY(_canais);
+END;
+$$ LANGUAGE plpgsql;
+
+-- Recalcula do zero as linhas de faturamento de alguns canais. Usado quando linhas trocam de canal: a ordem em que
+-- as triggers das cascatas (ON UPDATE CASCADE) disparam não é garantida, então só um recálculo é seguro ali
+CREATE OR REPLACE FUNCTION system_antig.fn_recalcular_faturamento(_canais INTEGER[])
+RETURNS VOID AS $$
+BEGIN
+    DELETE FROM system_antig.agg_faturamento_canal WHERE id_canal = ANY(_canais);
+    INSERT INTO system_antig.agg_faturamento_canal (id_canal, nome_canal, val_patrocinio, val_aportes, val_doacoes)
+    SELECT id_canal, nome_canal, val_patrocinio, val_aportes, val_doacoes
+    FROM system_antig.v_faturamento_canal_calc
+    WHERE id_canal = ANY(_canais);
+END;
+$$ LANGUAGE plpgsql;
+
+-- Doações: soma/subtrai o valor por canal
+CREATE OR REPLACE FUNCTION system_antig.fn_agg_doacao()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'UPDATE' THEN
+        IF EXISTS (SELECT id_canal FROM antigas EXCEPT SELECT id_canal FROM novas) THEN
+            PERFORM system_antig.fn_recalcular_faturamento(ARRAY(
+                SELECT id_canal FROM antigas UNION SELECT id_canal FROM novas
+            ));
+            RETURN NULL;
+        END IF;
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        UPDATE system_antig.agg_faturamento_canal a
+        SET val_doacoes = a.val_doacoes - o.total
+        FROM (SELECT id_canal, SUM(valor) AS total FROM antigas GROUP BY id_canal) o
+        WHERE a.id_canal = o.id_canal;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        UPDATE system_antig.agg_faturamento_canal a
+        SET val_doacoes = a.val_doacoes + n.total
+        FROM (SELECT id_canal, SUM(valor) AS total FROM novas GROUP BY id_canal) n
+        WHERE a.id_canal = n.id_canal;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Patrocínios: soma/subtrai o valor por canal
+CREATE OR REPLACE FUNCTION system_antig.fn_agg_patrocinio()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'UPDATE' THEN
+        IF EXISTS (SELECT id_canal FROM antigas EXCEPT SELECT id_canal FROM novas) THEN
+            PERFORM system_antig.fn_recalcular_faturamento(ARRAY(
+                SELECT id_canal FROM antigas UNION SELECT id_canal FROM novas
+            ));
+            RETURN NULL;
+        END IF;
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        UPDATE system_antig.agg_faturamento_canal a
+        SET val_patrocinio = a.val_patrocinio - o.total
+        FROM (SELECT id_canal, SUM(valor) AS total FROM antigas GROUP BY id_canal) o
+        WHERE a.id_canal = o.id_canal;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        UPDATE system_antig.agg_faturamento_canal a
+        SET val_patrocinio = a.val_patrocinio + n.total
+        FROM (SELECT id_canal, SUM(valor) AS total FROM novas GROUP BY id_canal) n
+        WHERE a.id_canal = n.id_canal;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Inscrições: o valor vem do nível (nivelcanal); troca de nível recalcula os canais afetados
+CREATE OR REPLACE FUNCTION system_antig.fn_agg_inscricao()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        UPDATE system_antig.agg_faturamento_canal a
+        SET val_aportes = a.val_aportes + n.total
+        FROM (
+            SELECT i.id_canal, SUM(nc.valor) AS total
+            FROM novas i
+            JOIN system_antig.nivelcanal nc ON i.id_canal = nc.id_canal AND i.nivel = nc.nivel
+            GROUP BY i.id_canal
+        ) n
+        WHERE a.id_canal = n.id_canal;
+    ELSIF TG_OP = 'DELETE' THEN
+        UPDATE system_antig.agg_faturamento_canal a
+        SET val_aportes = a.val_aportes - o.total
+        FROM (
+            SELECT i.id_canal, SUM(nc.valor) AS total
+            FROM antigas i
+            JOIN system_antig.nivelcanal nc ON i.id_canal = nc.id_canal AND i.nivel = nc.nivel
+            GROUP BY i.id_canal
+        ) o
+        WHERE a.id_canal = o.id_canal;
+    ELSE
+        PERFORM system_antig.fn_recalcular_aportes(ARRAY(
+            SELECT id_canal FROM antigas UNION SELECT id_canal FROM novas
+        ));
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION system_antig.fn_agg_nivelcanal()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM system_antig.fn_recalcular_aportes(ARRAY(
+        SELECT o.id_canal
+        FROM antigas o
+        JOIN novas n ON o.id_canal = n.id_canal AND o.nivel = n.nivel
+        WHERE o.valor IS DISTINCT FROM n.valor
+    ));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Vídeos: quantidade e audiência por streamer (dono do canal)
+CREATE OR REPLACE FUNCTION system_antig.fn_agg_video()
+RETURNS TRIGGER AS $$
+BEGIN
+    -- Vídeos que mudaram de canal (inclusive pela cascata de troca de PK do canal): recalcula os donos envolvidos
+    IF TG_OP = 'UPDATE' THEN
+        IF EXISTS (SELECT id_canal FROM antigas EXCEPT SELECT id_canal FROM novas) THEN
+            PERFORM system_antig.fn_recalcular_performance_streamers(ARRAY(
+                SELECT DISTINCT id_streamer FROM system_antig.canal
+                WHERE id IN (SELECT id_canal FROM antigas UNION SELECT id_canal FROM novas)
+            ));
+            RETURN NULL;
+        END IF;
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        UPDATE system_antig.agg_performance_streamers a
+        SET total_videos_postados = a.total_videos_postados - o.qtd,
+            audiencia_total_acumulada = a.audiencia_total_acumulada - o.total
+        FROM (
+            SELECT c.id_streamer, COUNT(*) AS qtd, COALESCE(SUM(v.visu_total), 0) AS total
+            FROM antigas v
+            JOIN system_antig.canal c ON v.id_canal = c.id
+            GROUP BY c.id_streamer
+        ) o
+        WHERE a.id_streamer = o.id_streamer;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        UPDATE system_antig.agg_performance_streamers a
+        SET total_videos_postados = a.total_videos_postados + n.qtd,
+            audiencia_total_acumulada = a.audiencia_total_acumulada + n.total
+        FROM (
+            SELECT c.id_streamer, COUNT(*) AS qtd, COALESCE(SUM(v.visu_total), 0) AS total
+            FROM novas v
+            JOIN system_antig.canal c ON v.id_canal = c.id
+            GROUP BY c.id_streamer
+        ) n
+        WHERE a.id_streamer = n.id_streamer;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Canais: cria/remove a linha de faturamento, acompanha o nome e recalcula os streamers envolvidos
+CREATE OR REPLACE FUNCTION system_antig.fn_agg_canal()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO system_antig.agg_faturamento_canal (id_canal, nome_canal)
+        SELECT id, nome FROM novas
+        ON CONFLICT (id_canal) DO NOTHING;
+        PERFORM system_antig.fn_recalcular_performance_streamers(ARRAY(SELECT DISTINCT id_streamer FROM novas));
+    ELSIF TG_OP = 'DELETE' THEN
+        DELETE FROM system_antig.agg_faturamento_canal a USING antigas o WHERE a.id_canal = o.id;
+        PERFORM system_antig.fn_recalcular_performance_streamers(ARRAY(SELECT DISTINCT id_streamer FROM antigas));
+    ELSE
+        UPDATE system_antig.agg_faturamento_canal a
+        SET nome_canal = n.nome
+        FROM novas n
+        WHERE a.id_canal = n.id AND a.nome_canal IS DISTINCT FROM n.nome;
+
+        -- Troca de PK (ON UPDATE CASCADE): rara, recalcula por completo os canais e streamers da instrução.
+        -- As cascatas em video/doacao/patrocinio também recalculam (a ordem entre elas e esta trigger não é fixa)
+        IF EXISTS (SELECT 1 FROM novas n WHERE NOT EXISTS (SELECT 1 FROM antigas o WHERE o.id = n.id)) THEN
+            PERFORM system_antig.fn_recalcular_faturamento(ARRAY(
+                SELECT id FROM antigas UNION SELECT id FROM novas
+            ));
+            PERFORM system_antig.fn_recalcular_performance_streamers(ARRAY(
+                SELECT id_streamer FROM antigas UNION SELECT id_streamer FROM novas
+            ));
+        ELSE
+            PERFORM system_antig.fn_recalcular_performance_streamers(ARRAY(
+                SELECT o.id_streamer FROM antigas o JOIN novas n ON o.id = n.id WHERE o.id_streamer IS DISTINCT FROM n.id_streamer
+                UNION
+                SELECT n.id_streamer FROM antigas o JOIN novas n ON o.id = n.id WHERE o.id_streamer IS DISTINCT FROM n.id_streamer
+            ));
+        END IF;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Usuários: só o nick aparece no agregado
+CREATE OR REPLACE FUNCTION system_antig.fn_agg_usuario()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE system_antig.agg_performance_streamers a
+    SET nick = n.nick
+    FROM novas n
+    WHERE a.id_streamer = n.id AND a.nick IS DISTINCT FROM n.nick;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Triggers com tabela de transição aceitam um único evento cada, por isso uma trigger por operação
+CREATE TRIGGER trg_agg_doacao_ins AFTER INSERT ON system_antig.doacao
+REFERENCING NEW TABLE AS novas FOR EACH STATEMENT EXECUTE FUNCTION system_antig.fn_agg_doacao();
+CREATE TRIGGER trg_agg_doacao_upd AFTER UPDATE ON system_antig.doacao
+REFERENCING OLD TABLE AS antigas NEW TABLE AS novas FOR EACH STATEMENT EXECUTE FUNCTION system_antig.fn_agg_doacao();
+CREATE TRIGGER trg_agg_doacao_del AFTER DELETE ON system_antig.doacao
+REFERENCING OLD TABLE AS antigas FOR EACH STATEMENT EXECUTE FUNCTION system_antig.fn_agg_doacao();
+
+CREATE TRIGGER trg_agg_patrocinio_ins AFTER INSERT ON system_antig.patrocinio
+REFERENCING NEW TABLE AS novas FOR EACH STATEMENT EXECUTE FUNCTION system_antig.fn_agg_patrocinio();
+CREATE TRIGGER trg_agg_patrocinio_upd AFTER UPDATE ON system_antig.patrocinio
+REFERENCING OLD TABLE AS antigas NEW TABLE AS novas FOR EACH STATEMENT EXECUTE FUNCTION system_antig.fn_agg_patrocinio();
+CREATE TRIGGER trg_agg_patrocinio_del AFTER DELETE ON system_antig.patrocinio
+REFERENCING OLD TABLE AS antigas FOR EACH STATEMENT EXECUTE FUNCTION system_antig.fn_agg_patrocinio();
+
+CREATE TRIGGER trg_agg_inscricao_ins AFTER INSERT ON system_antig.inscricao
+REFERENCING NEW TABLE AS novas FOR EACH STATEMENT EXECUTE FUNCTION system_antig.fn_agg_inscricao();
+CREATE TRIGGER trg_agg_inscricao_upd AFTER UPDATE ON system_antig.inscricao
+REFERENCING OLD TABLE AS antigas NEW TABLE AS novas FOR EACH STATEMENT EXECUTE FUNCTION system_antig.fn_agg_inscricao();
+CREATE TRIGGER trg_agg_inscricao_del AFTER DELETE ON system_antig.inscricao
+REFERENCING OLD TABLE AS antigas FOR EACH STATEMENT EXECUTE FUNCTION system_antig.fn_agg_inscricao();
+
+CREATE TRIGGER trg_agg_nivelcanal_upd AFTER UPDATE ON system_antig.nivelcanal
+REFERENCING OLD TABLE AS antigas NEW TABLE AS novas FOR EACH STATEMENT EXECUTE FUNCTION system_antig.fn_agg_nivelcanal();
+
+CREATE TRIGGER trg_agg_video_ins AFTER INSERT ON system_antig.video
+REFERENCING NEW TABLE AS novas FOR EACH STATEMENT EXECUTE FUNCTION system_antig.fn_agg_video();
+CREATE TRIGGER trg_agg_video_upd AFTER UPDATE ON system_antig.video
+REFERENCING OLD TABLE AS antigas NEW TABLE AS novas FOR EACH STATEMENT EXECUTE FUNCTION system_antig.fn_agg_video();
+CREATE TRIGGER trg_agg_video_del AFTER DELETE ON system_antig.video
+REFERENCING OLD TABLE AS antigas FOR EACH STATEMENT EXECUTE FUNCTION system_antig.fn_agg_video();
+
+CREATE TRIGGER trg_agg_canal_ins AFTER INSERT ON system_antig.canal
+REFERENCING NEW TABLE AS novas FOR EACH STATEMENT EXECUTE FUNCTION system_antig.fn_agg_canal();
+CREATE TRIGGER trg_agg_canal_upd AFTER UPDATE ON system_antig.canal
+REFERENCING OLD TABLE AS antigas NEW TABLE AS novas FOR EACH STATEMENT EXECUTE FUNCTION system_antig.fn_agg_canal();
+CREATE TRIGGER trg_agg_canal_del AFTER DELETE ON system_antig.canal
+REFERENCING OLD TABLE AS antigas FOR EACH STATEMENT EXECUTE FUNCTION system_antig.fn_agg_canal();
+
+CREATE TRIGGER trg_agg_usuario_upd AFTER UPDATE ON system_antig.usuario
+REFERENCING OLD TABLE AS antigas NEW TABLE AS novas FOR EACH STATEMENT EXECUTE FUNCTION system_antig.fn_agg_usuario();
+
+-- Reconstrói os agregados a partir do cálculo completo (carga inicial, depois de TRUNCATE ou para corrigir divergências)
+CREATE OR REPLACE PROCEDURE system_antig.sp_reconstruir_agregados()
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    LOCK TABLE system_antig.agg_faturamento_canal, system_antig.agg_performance_streamers IN EXCLUSIVE MODE;
+
+    DELETE FROM system_antig.agg_faturamento_canal;
+    INSERT INTO system_antig.agg_faturamento_canal (id_canal, nome_canal, val_patrocinio, val_aportes, val_doacoes)
+    SELECT id_canal, nome_canal, val_patrocinio, val_aportes, val_doacoes
+    FROM system_antig.v_faturamento_canal_calc;
+
+    DELETE FROM system_antig.agg_performance_streamers;
+    INSERT INTO system_antig.agg_performance_streamers
+    SELECT * FROM system_antig.v_performance_streamers_calc;
+END;
+$$;
+
+-- Verificador de consistência: compara os agregados com o cálculo completo e devolve só as divergências
+-- (valores em ponto flutuante toleram 0.01 de erro acumulado)
+CREATE OR REPLACE FUNCTION system_antig.f_verificar_agregados()
+RETURNS TABLE (
+    tabela TEXT,
+    chave INTEGER,
+    coluna TEXT,
+    esperado TEXT,
+    atual TEXT
+)
+LANGUAGE sql
+AS $$
+    WITH fat AS (
+        SELECT COALESCE(e.id_canal, a.id_canal) AS chave, e AS esp, a AS atu,
+               e.id_canal IS NULL AS sobrando, a.id_canal IS NULL AS faltando
+        FROM system_antig.v_faturamento_canal_calc e
+        FULL JOIN system_antig.agg_faturamento_canal a ON e.id_canal = a.id_canal
+    ),
+    perf AS (
+        SELECT COALESCE(e.id_streamer, a.id_streamer) AS chave, e AS esp, a AS atu,
+               e.id_streamer IS NULL AS sobrando, a.id_streamer IS NULL AS faltando
+        FROM system_antig.v_performance_streamers_calc e
+        FULL JOIN system_antig.agg_performance_streamers a ON e.id_streamer = a.id_streamer
+    )
+    SELECT 'agg_faturamento_canal', chave, 'linha',
+           CASE WHEN faltando THEN 'presente' ELSE 'ausente' END,
+           CASE WHEN faltando THEN 'ausente' ELSE 'presente' END
+    FROM fat WHERE faltando OR sobrando
+    UNION ALL
+    SELECT 'agg_faturamento_canal', chave, d.coluna, d.esperado, d.atual
+    FROM fat,
+    LATERAL (VALUES
+        ('nome_canal', (esp).nome_canal::TEXT, (atu).nome_canal::TEXT, (esp).nome_canal IS DISTINCT FROM (atu).nome_canal),
+        ('val_patrocinio', (esp).val_patrocinio::TEXT, (atu).val_patrocinio::TEXT, abs((esp).val_patrocinio - (atu).val_patrocinio) > 0.01),
+        ('val_aportes', (esp).val_aportes::TEXT, (atu).val_aportes::TEXT, abs((esp).val_aportes - (atu).val_aportes) > 0.01),
+        ('val_doacoes', (esp).val_doacoes::TEXT, (atu).val_doacoes::TEXT, (esp).val_doacoes <> (atu).val_doacoes)
+    ) AS d(coluna, esperado, atual, diverge)
+    WHERE NOT faltando AND NOT sobrando AND d.diverge
+    UNION ALL
+    SELECT 'agg_performance_streamers', chave, 'linha',
+           CASE WHEN faltando THEN 'presente' ELSE 'ausente' END,
+           CASE WHEN faltando THEN 'ausente' ELSE 'presente' END
+    FROM perf WHERE faltando OR sobrando
+    UNION ALL
+    SELECT 'agg_performance_streamers', chave, d.coluna, d.esperado, d.atual
+    FROM perf,
+    LATERAL (VALUES
+        ('nick', (esp).nick::TEXT, (atu).nick::TEXT, (esp).nick IS DISTINCT FROM (atu).nick),
+        ('qtd_canais', (esp).qtd_canais::TEXT, (atu).qtd_canais::TEXT, (esp).qtd_canais <> (atu).qtd_canais),
+        ('total_videos_postados', (esp).total_videos_postados::TEXT, (atu).total_videos_postados::TEXT, (esp).total_videos_postados <> (atu).total_videos_postados),
+        ('audiencia_total_acumulada', (esp).audiencia_total_acumulada::TEXT, (atu).audiencia_total_acumulada::TEXT, (esp).audiencia_total_acumulada <> (atu).audiencia_total_acumulada)
+    ) AS d(coluna, esperado, atual, diverge)
+    WHERE NOT faltando AND NOT sobrando AND d.diverge;
+$$;
+
+-- O ranking passa a ler o agregado incremental, sempre atualizado
+CREATE OR REPLACE FUNCTION system_antig.f_ranking_faturamento_total(
+    k_limite INTEGER DEFAULT 10
+)
+RETURNS TABLE (
+    rank_faturamento BIGINT,
+    id_canal INTEGER,
+    nome_canal VARCHAR,
+    faturamento_total NUMERIC
+)
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    RETURN QUERY
+    SELECT
+       RANK() OVER (ORDER BY a.faturamento_bruto DESC) AS rank_faturamento,
+       a.id_canal,
+       a.nome_canal,
+       a.faturamento_bruto::NUMERIC(10, 2) AS faturamento_total
+    FROM
+       system_antig.agg_faturamento_canal a
+    ORDER BY
+       a.faturamento_bruto DESC
+    LIMIT k_limite;
+END;
+$$;
+
+CALL system_antig.sp_reconstruir_agregados();
+
+------------------------------------------------ Rollup Diário de Doações ------------------------------------------------
+-- Os rankings e relatórios filtrados por data agregavam as doações linha a linha. doacao_diaria guarda soma e quantidade
+-- por (canal, doador, dia, status), mantida por triggers; consultas por intervalo de dias leem só o rollup.
+CREATE TABLE system_antig.doacao_diaria (
+    id_canal INTEGER NOT NULL,
+    id_usuario INTEGER NOT NULL,
+    dia DATE NOT NULL, -- dia de doacao.datah_comentario
+    status system_antig.status_doacao_enum NOT NULL,
+    total NUMERIC NOT NULL DEFAULT 0,
+    qtd BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (id_canal, dia, id_usuario, status)
+);
+
+-- Filtros só por data (sem canal)
+CREATE INDEX idx_doacao_diaria_dia
+ON system_antig.doacao_diaria (dia) INCLUDE (id_canal, id_usuario, status, total);
+
+-- Top doadores: depois de ranquear pelo rollup, contamos os vídeos apoiados apenas dos K primeiros
+-- o mesmo índice pagina as doações do detalhe do usuário (/api/users/{id}): valor DESC com a PK como desempate
+CREATE INDEX IF NOT EXISTS idx_doacao_usuario_valor
+ON system_antig.doacao (id_usuario, valor, id_video, id_canal, seq_comentario, seq_pg, datah_comentario);
+
+-- Aplica deltas (positivos ou negativos) e remove as linhas que zeraram
+CREATE OR REPLACE FUNCTION system_antig.fn_doacao_diaria_aplicar(
+    _canais INTEGER[],
+    _usuarios INTEGER[],
+    _dias DATE[],
+    _status system_antig.status_doacao_enum[],
+    _totais NUMERIC[],
+    _qtds BIGINT[]
+)
+RETURNS VOID AS $$
+BEGIN
+    INSERT INTO system_antig.doacao_diaria AS r (id_canal, id_usuario, dia, status, total, qtd)
+    SELECT x.c, x.u, x.d, x.s, SUM(x.t), SUM(x.q)
+    FROM unnest(_canais, _usuarios, _dias, _status, _totais, _qtds) AS x(c, u, d, s, t, q)
+    GROUP BY x.c, x.u, x.d, x.s
+    ON CONFLICT (id_canal, dia, id_usuario, status) DO UPDATE
+    SET total = r.total + EXCLUDED.total,
+        qtd = r.qtd + EXCLUDED.qtd;
+
+    DELETE FROM system_antig.doacao_diaria r
+    USING unnest(_canais, _usuarios, _dias, _status) AS x(c, u, d, s)
+    WHERE r.id_canal = x.c AND r.id_usuario = x.u AND r.dia = x.d AND r.status = x.s AND r.qtd = 0;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Recalcula do zero os pares (canal, doador) afetados; usado quando uma atualização troca chaves das doações
+CREATE OR REPLACE FUNCTION system_antig.fn_doacao_diaria_recalcular(_canais INTEGER[], _usuarios INTEGER[])
+RETURNS VOID AS $$
+BEGIN
+    DELETE FROM system_antig.doacao_diaria r
+    USING unnest(_canais, _usuarios) AS p(c, u)
+    WHERE r.id_canal = p.c AND r.id_usuario = p.u;
+
+    INSERT INTO system_antig.doacao_diaria (id_canal, id_usuario, dia, status, total, qtd)
+    SELECT d.id_canal, d.id_usuario, d.datah_comentario::DATE, d.status, SUM(d.valor), COUNT(*)
+    FROM system_antig.doacao d
+    WHERE (d.id_canal, d.id_usuario) IN (SELECT * FROM unnest(_canais, _usuarios))
+    GROUP BY d.id_canal, d.id_usuario, d.datah_comentario::DATE, d.status;
+END;
+$$ LANGUAGE plpgsql;
+
+-- O dia vem de datah_comentario. Um comentário com dataH alterado chega aqui como UPDATE das suas doações (a FK
+-- propaga a data, mudando a doação de partição se preciso), e um comentário removido como DELETE delas
+CREATE OR REPLACE FUNCTION system_antig.fn_doacao_diaria_doacao()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM system_antig.fn_doacao_diaria_aplicar(
+            array_agg(n.id_canal), array_agg(n.id_usuario), array_agg(n.datah_comentario::DATE), array_agg(n.status), array_agg(n.valor), array_agg(1::BIGINT)
+        )
+        FROM novas n;
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM system_antig.fn_doacao_diaria_aplicar(
+            array_agg(o.id_canal), array_agg(o.id_usuario), array_agg(o.datah_comentario::DATE), array_agg(o.status), array_agg(-o.valor), array_agg(-1::BIGINT)
+        )
+        FROM antigas o;
+    ELSIF EXISTS (
+        SELECT id_video, id_canal, id_usuario, seq_comentario, seq_pg FROM antigas
+        EXCEPT
+        SELECT id_video, id_canal, id_usuario, seq_comentario, seq_pg FROM novas
+    ) THEN
+        -- Troca de chave (cascata de canal/usuário): não dá para parear linha antiga e nova, recalcula os pares envolvidos
+        PERFORM system_antig.fn_doacao_diaria_recalcular(array_agg(p.id_canal), array_agg(p.id_usuario))
+        FROM (SELECT id_canal, id_usuario FROM antigas UNION SELECT id_canal, id_usuario FROM novas) p;
+    ELSE
+        PERFORM system_antig.fn_doacao_diaria_aplicar(
+            array_agg(x.id_canal), array_agg(x.id_usuario), array_agg(x.dia), array_agg(x.status), array_agg(x.total), array_agg(x.qtd)
+        )
+        FROM (
+            SELECT n.id_canal, n.id_usuario, n.datah_comentario::DATE AS dia, n.status, n.valor AS total, 1::BIGINT AS qtd
+            FROM novas n
+            UNION ALL
+            SELECT o.id_canal, o.id_usuario, o.datah_comentario::DATE, o.status, -o.valor, -1
+            FROM antigas o
+        ) x;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_doacao_diaria_ins AFTER INSERT ON system_antig.doacao
+REFERENCING NEW TABLE AS novas FOR EACH STATEMENT EXECUTE FUNCTION system_antig.fn_doacao_diaria_doacao();
+CREATE TRIGGER trg_doacao_diaria_upd AFTER UPDATE ON system_antig.doacao
+REFERENCING OLD TABLE AS antigas NEW TABLE AS novas FOR EACH STATEMENT EXECUTE FUNCTION system_antig.fn_doacao_diaria_doacao();
+CREATE TRIGGER trg_doacao_diaria_del AFTER DELETE ON system_antig.doacao
+REFERENCING OLD TABLE AS antigas FOR EACH STATEMENT EXECUTE FUNCTION system_antig.fn_doacao_diaria_doacao();
+
+CREATE OR REPLACE PROCEDURE system_antig.sp_reconstruir_doacao_diaria()
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    LOCK TABLE system_antig.doacao_diaria IN EXCLUSIVE MODE;
+    DELETE FROM system_antig.doacao_diaria;
+    INSERT INTO system_antig.doacao_diaria (id_canal, id_usuario, dia, status, total, qtd)
+    SELECT d.id_canal, d.id_usuario, d.datah_comentario::DATE, d.status, SUM(d.valor), COUNT(*)
+    FROM system_antig.doacao d
+    GROUP BY d.id_canal, d.id_usuario, d.datah_comentario::DATE, d.status;
+END;
+$$;
+
+CALL system_antig.sp_reconstruir_doacao_diaria();
\ No newline at end of file
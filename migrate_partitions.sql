@@ -0,0 +1,652 @@
+-- Migração de um banco existente para o particionamento mensal de comentario e doacao (ver "Particionamento mensal"
+-- em full_setup.sql), com os dados no lugar. Para bancos criados com um full_setup.sql anterior a ele:
+--
+--     psql -d system_antig -v ON_ERROR_STOP=1 -1 -f migrate_partitions.sql
+--     psql -d system_antig -c "ANALYZE system_antig.comentario, system_antig.doacao, system_antig.comentario_chave"
+--
+-- Tudo numa transação: um erro desfaz a migração inteira. comentario, doacao e as tabelas de pagamento ficam
+-- bloqueadas (ACCESS EXCLUSIVE) do início ao fim, enquanto as linhas são copiadas para as partições; pare a API
+-- (ou aceite que as escritas e leituras dessas tabelas esperem) durante a migração. Os agregados e doacao_diaria não
+-- mudam: as doações e as suas datas continuam as mesmas.
+
+LOCK TABLE system_antig.comentario, system_antig.doacao, system_antig.bitcoin, system_antig.paypal,
+           system_antig.cartaocredito, system_antig.mecanismoplat IN ACCESS EXCLUSIVE MODE;
+
+-- 1. As triggers de comentario que moviam doacao_diaria saem: a data passa a viajar com a doação (datah_comentario)
+DROP TRIGGER trg_doacao_diaria_comentario_del ON system_antig.comentario;
+DROP TRIGGER trg_doacao_diaria_comentario_upd ON system_antig.comentario;
+DROP FUNCTION system_antig.fn_doacao_diaria_comentario_del();
+DROP FUNCTION system_antig.fn_doacao_diaria_comentario_upd();
+
+-- 2. Pagamentos: recebem a data do comentário doado (parte da chave de doacao) e soltam a FK de 5 colunas
+DO $$
+DECLARE
+    _tabela TEXT;
+    _fk TEXT;
+BEGIN
+    FOREACH _tabela IN ARRAY ARRAY['bitcoin', 'paypal', 'cartaocredito', 'mecanismoplat']
+    LOOP
+        EXECUTE format('ALTER TABLE system_antig.%I ADD COLUMN datah_comentario TIMESTAMP', _tabela);
+        EXECUTE format('UPDATE system_antig.%I p SET datah_comentario = c.dataH FROM system_antig.comentario c '
+                       'WHERE c.id_video = p.id_video AND c.id_canal = p.id_canal AND c.id_usuario = p.id_usuario AND c.seq = p.seq_comentario',
+                       _tabela);
+        EXECUTE format('ALTER TABLE system_antig.%I ALTER COLUMN datah_comentario SET NOT NULL', _tabela);
+        FOR _fk IN
+            SELECT conname FROM pg_constraint
+            WHERE conrelid = format('system_antig.%I', _tabela)::regclass AND contype = 'f'
+              AND confrelid = 'system_antig.doacao'::regclass
+        LOOP
+            EXECUTE format('ALTER TABLE system_antig.%I DROP CONSTRAINT %I', _tabela, _fk);
+        END LOOP;
+    END LOOP;
+END;
+$$;
+
+-- 3. As tabelas atuais saem do caminho (com nomes livres para as novas) até a cópia terminar
+ALTER SEQUENCE system_antig.doacao_seq_pg_seq OWNED BY NONE;
+ALTER TABLE system_antig.doacao ALTER COLUMN seq_pg DROP DEFAULT;
+DROP INDEX system_antig.idx_doacao_recebidas_lidas;
+DROP INDEX system_antig.idx_doacao_valor_pk;
+DROP INDEX system_antig.idx_doacao_usuario_valor;
+-- As constraints levam o nome da tabela (doacao_pkey, comentario_datah_not_null...): renomeadas também
+DO $$
+DECLARE
+    _tabela TEXT;
+    _constraint TEXT;
+BEGIN
+    FOREACH _tabela IN ARRAY ARRAY['doacao', 'comentario']
+    LOOP
+        FOR _constraint IN
+            SELECT conname FROM pg_constraint
+            WHERE conrelid = format('system_antig.%I', _tabela)::regclass AND contype <> 'f'
+        LOOP
+            EXECUTE format('ALTER TABLE system_antig.%I RENAME CONSTRAINT %I TO %I',
+                           _tabela, _constraint, regexp_replace(_constraint, '^' || _tabela, _tabela || '_antiga'));
+        END LOOP;
+        EXECUTE format('ALTER TABLE system_antig.%I RENAME TO %I', _tabela, _tabela || '_antiga');
+    END LOOP;
+END;
+$$;
+
+-- 4. As tabelas particionadas, como em full_setup.sql. As FKs vêm depois da cópia: validar cada uma de uma vez sai
+-- mais barato que linha a linha
+CREATE TABLE system_antig.comentario (
+    id_video INTEGER NOT NULL,
+    id_canal INTEGER NOT NULL,
+    id_usuario INTEGER NOT NULL, -- FK para Usuario(ID)
+    seq INTEGER NOT NULL, -- Número sequencial do comentário por video e usuario
+    texto TEXT NOT NULL,
+    dataH TIMESTAMP NOT NULL,
+    coment_on BOOLEAN,
+    PRIMARY KEY (id_video, id_canal, id_usuario, seq, dataH)
+) PARTITION BY RANGE (dataH);
+
+CREATE TABLE system_antig.doacao (
+    id_video INTEGER NOT NULL,
+    id_canal INTEGER NOT NULL,
+    id_usuario INTEGER NOT NULL,
+    seq_comentario INTEGER NOT NULL,
+    seq_pg INTEGER NOT NULL,
+    valor NUMERIC(10, 2) NOT NULL,
+    status system_antig.status_doacao_enum NOT NULL, -- ENUM para {recusado, recebido ou lido}
+    datah_comentario TIMESTAMP NOT NULL, -- Cópia de comentario.dataH: a chave de partição, mantida pela FK (ON UPDATE CASCADE)
+    PRIMARY KEY (id_video, id_canal, id_usuario, seq_comentario, seq_pg, datah_comentario)
+) PARTITION BY RANGE (datah_comentario);
+
+-- 5. comentario_chave e os procedimentos de partições, arquivamento e restauração (de full_setup.sql)
+-- Chave de cada comentário, numa tabela não particionada: a PK de comentario inclui dataH, então só ela impede dois
+-- comentários com o mesmo (id_video, id_canal, id_usuario, seq) em instantes ou meses diferentes. Também dá a dataH
+-- de um comentário pela chave com uma busca num índice só, em vez de uma por partição de comentario.
+CREATE TABLE system_antig.comentario_chave (
+    id_video INTEGER NOT NULL,
+    id_canal INTEGER NOT NULL,
+    id_usuario INTEGER NOT NULL,
+    seq INTEGER NOT NULL,
+    dataH TIMESTAMP NOT NULL, -- dataH do comentário: em que partição ele está
+    PRIMARY KEY (id_video, id_canal, id_usuario, seq)
+);
+
+-- Mantém comentario_chave a cada comando em comentario: uma chave repetida falha o comando inteiro
+CREATE OR REPLACE FUNCTION system_antig.fn_comentario_chave()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        DELETE FROM system_antig.comentario_chave k
+        USING antigas o
+        WHERE k.id_video = o.id_video AND k.id_canal = o.id_canal AND k.id_usuario = o.id_usuario AND k.seq = o.seq;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO system_antig.comentario_chave (id_video, id_canal, id_usuario, seq, dataH)
+        SELECT id_video, id_canal, id_usuario, seq, dataH FROM novas;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_comentario_chave_ins AFTER INSERT ON system_antig.comentario
+REFERENCING NEW TABLE AS novas FOR EACH STATEMENT EXECUTE FUNCTION system_antig.fn_comentario_chave();
+CREATE TRIGGER trg_comentario_chave_upd AFTER UPDATE ON system_antig.comentario
+REFERENCING OLD TABLE AS antigas NEW TABLE AS novas FOR EACH STATEMENT EXECUTE FUNCTION system_antig.fn_comentario_chave();
+CREATE TRIGGER trg_comentario_chave_del AFTER DELETE ON system_antig.comentario
+REFERENCING OLD TABLE AS antigas FOR EACH STATEMENT EXECUTE FUNCTION system_antig.fn_comentario_chave();
+
+-- Refaz comentario_chave a partir de comentario (cargas que desligam as triggers, como server/bulk_load.py)
+CREATE OR REPLACE PROCEDURE system_antig.sp_reconstruir_comentario_chave()
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    TRUNCATE system_antig.comentario_chave;
+    INSERT INTO system_antig.comentario_chave (id_video, id_canal, id_usuario, seq, dataH)
+    SELECT id_video, id_canal, id_usuario, seq, dataH FROM system_antig.comentario;
+END;
+$$;
+
+-- Cria as partições mensais que faltam em comentario e doacao para cobrir [p_de, p_ate]
+CREATE OR REPLACE PROCEDURE system_antig.sp_criar_particoes(
+    p_de TIMESTAMP DEFAULT now(),
+    p_ate TIMESTAMP DEFAULT now() + INTERVAL '3 months'
+)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    _mes DATE;
+    _tabela TEXT;
+BEGIN
+    -- Vários workers chamam ao mesmo tempo: um cria, os outros encontram as partições prontas
+    PERFORM pg_advisory_xact_lock(hashtext('system_antig.sp_criar_particoes'));
+    FOR _mes IN SELECT generate_series(date_trunc('month', p_de), date_trunc('month', p_ate), INTERVAL '1 month')::DATE
+    LOOP
+        FOREACH _tabela IN ARRAY ARRAY['comentario', 'doacao']
+        LOOP
+            -- Só cria o que falta: CREATE ... PARTITION OF bloqueia a tabela-mãe
+            IF to_regclass(format('system_antig.%I', _tabela || to_char(_mes, '_YYYY_MM'))) IS NULL THEN
+                EXECUTE format('CREATE TABLE system_antig.%I PARTITION OF system_antig.%I FOR VALUES FROM (%L) TO (%L)',
+                               _tabela || to_char(_mes, '_YYYY_MM'), _tabela, _mes, (_mes + INTERVAL '1 month')::DATE);
+            END IF;
+        END LOOP;
+    END LOOP;
+END;
+$$;
+
+-- Mês corrente e os três seguintes; cargas com datas antigas criam os meses delas
+CALL system_antig.sp_criar_particoes();
+
+-- Arquiva um mês encerrado: as partições dele saem de comentario e doacao (DETACH, sem reescrever linhas) e vão, com
+-- os pagamentos das doações do mês, para o schema system_antig_arquivo, de onde seguem para um pg_dump e um DROP.
+-- Os agregados (agg_faturamento_canal, doacao_diaria) descontam o mês, como numa remoção. Tudo numa transação; os
+-- DETACH bloqueiam comentario e doacao por um instante.
+CREATE OR REPLACE PROCEDURE system_antig.sp_arquivar_mes(p_mes DATE)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    _mes DATE := date_trunc('month', p_mes);
+    _fim DATE := date_trunc('month', p_mes) + INTERVAL '1 month';
+    _sufixo TEXT := to_char(p_mes, '_YYYY_MM');
+    _tabela TEXT;
+    _fk TEXT;
+BEGIN
+    IF _fim > now() THEN
+        RAISE EXCEPTION 'Só meses encerrados podem ser arquivados: %', to_char(_mes, 'YYYY-MM');
+    END IF;
+    IF to_regclass('system_antig.comentario' || _sufixo) IS NULL OR to_regclass('system_antig.doacao' || _sufixo) IS NULL THEN
+        RAISE EXCEPTION 'Mês sem partição em comentario/doacao: %', to_char(_mes, 'YYYY-MM');
+    END IF;
+    CREATE SCHEMA IF NOT EXISTS system_antig_arquivo;
+
+    -- Os pagamentos (tabelas não particionadas) referenciam as doações: são copiados e removidos antes
+    FOREACH _tabela IN ARRAY ARRAY['bitcoin', 'paypal', 'cartaocredito', 'mecanismoplat']
+    LOOP
+        EXECUTE format('CREATE TABLE system_antig_arquivo.%I AS SELECT * FROM system_antig.%I WHERE datah_comentario >= %L AND datah_comentario < %L',
+                       _tabela || _sufixo, _tabela, _mes, _fim);
+        EXECUTE format('DELETE FROM system_antig.%I WHERE datah_comentario >= %L AND datah_comentario < %L', _tabela, _mes, _fim);
+    END LOOP;
+
+    -- O DETACH não dispara as triggers dos agregados
+    UPDATE system_antig.agg_faturamento_canal a
+    SET val_doacoes = a.val_doacoes - m.total
+    FROM (
+        SELECT id_canal, SUM(valor) AS total
+        FROM system_antig.doacao
+        WHERE datah_comentario >= _mes AND datah_comentario < _fim
+        GROUP BY id_canal
+    ) m
+    WHERE a.id_canal = m.id_canal;
+    DELETE FROM system_antig.doacao_diaria WHERE dia >= _mes AND dia < _fim;
+    -- As chaves do mês ficam livres, e doações novas não acham mais os comentários arquivados
+    DELETE FROM system_antig.comentario_chave WHERE dataH >= _mes AND dataH < _fim;
+
+    -- doacao antes de comentario, que ela referencia. Arquivada, a partição perde as FKs: não prende mais vídeos,
+    -- usuários e comentários, nem é checada contra eles
+    FOREACH _tabela IN ARRAY ARRAY['doacao', 'comentario']
+    LOOP
+        EXECUTE format('ALTER TABLE system_antig.%I DETACH PARTITION system_antig.%I', _tabela, _tabela || _sufixo);
+        FOR _fk IN
+            SELECT conname FROM pg_constraint
+            -- Só as FKs de topo: as derivadas (uma por partição referenciada) caem junto
+            WHERE conrelid = format('system_antig.%I', _tabela || _sufixo)::regclass AND contype = 'f' AND conparentid = 0
+        LOOP
+            EXECUTE format('ALTER TABLE system_antig.%I DROP CONSTRAINT %I', _tabela || _sufixo, _fk);
+        END LOOP;
+        EXECUTE format('ALTER TABLE system_antig.%I SET SCHEMA system_antig_arquivo', _tabela || _sufixo);
+    END LOOP;
+END;
+$$;
+
+-- Devolve um mês arquivado (ainda em system_antig_arquivo) às tabelas e aos agregados. O ATTACH recria as FKs e as
+-- valida: vídeos e usuários removidos depois do arquivamento impedem a volta, assim como comentários gravados
+-- depois com a chave de um comentário do mês (comentario_chave)
+CREATE OR REPLACE PROCEDURE system_antig.sp_restaurar_mes(p_mes DATE)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    _mes DATE := date_trunc('month', p_mes);
+    _fim DATE := date_trunc('month', p_mes) + INTERVAL '1 month';
+    _sufixo TEXT := to_char(p_mes, '_YYYY_MM');
+    _tabela TEXT;
+    _ocupada BOOLEAN;
+BEGIN
+    IF to_regclass('system_antig_arquivo.comentario' || _sufixo) IS NULL OR to_regclass('system_antig_arquivo.doacao' || _sufixo) IS NULL THEN
+        RAISE EXCEPTION 'Mês não arquivado: %', to_char(_mes, 'YYYY-MM');
+    END IF;
+
+    -- Partições vazias criadas no lugar (sp_criar_particoes) dão a vez às arquivadas
+    FOREACH _tabela IN ARRAY ARRAY['doacao', 'comentario']
+    LOOP
+        IF to_regclass('system_antig.' || _tabela || _sufixo) IS NOT NULL THEN
+            EXECUTE format('SELECT EXISTS (SELECT 1 FROM system_antig.%I)', _tabela || _sufixo) INTO _ocupada;
+            IF _ocupada THEN
+                RAISE EXCEPTION 'A partição %.% já tem linhas novas', _tabela, _tabela || _sufixo;
+            END IF;
+            -- Fora da tabela-mãe primeiro: as FKs que referenciam doacao dependem das partições dela
+            EXECUTE format('ALTER TABLE system_antig.%I DETACH PARTITION system_antig.%I', _tabela, _tabela || _sufixo);
+            EXECUTE format('DROP TABLE system_antig.%I', _tabela || _sufixo);
+        END IF;
+    END LOOP;
+
+    FOREACH _tabela IN ARRAY ARRAY['comentario', 'doacao']
+    LOOP
+        EXECUTE format('ALTER TABLE system_antig_arquivo.%I SET SCHEMA system_antig', _tabela || _sufixo);
+        EXECUTE format('ALTER TABLE system_antig.%I ATTACH PARTITION system_antig.%I FOR VALUES FROM (%L) TO (%L)',
+                       _tabela, _tabela || _sufixo, _mes, _fim);
+    END LOOP;
+
+    INSERT INTO system_antig.comentario_chave (id_video, id_canal, id_usuario, seq, dataH)
+    SELECT id_video, id_canal, id_usuario, seq, dataH
+    FROM system_antig.comentario
+    WHERE dataH >= _mes AND dataH < _fim;
+
+    FOREACH _tabela IN ARRAY ARRAY['bitcoin', 'paypal', 'cartaocredito', 'mecanismoplat']
+    LOOP
+        EXECUTE format('INSERT INTO system_antig.%I SELECT * FROM system_antig_arquivo.%I', _tabela, _tabela || _sufixo);
+        EXECUTE format('DROP TABLE system_antig_arquivo.%I', _tabela || _sufixo);
+    END LOOP;
+
+    UPDATE system_antig.agg_faturamento_canal a
+    SET val_doacoes = a.val_doacoes + m.total
+    FROM (
+        SELECT id_canal, SUM(valor) AS total
+        FROM system_antig.doacao
+        WHERE datah_comentario >= _mes AND datah_comentario < _fim
+        GROUP BY id_canal
+    ) m
+    WHERE a.id_canal = m.id_canal;
+    INSERT INTO system_antig.doacao_diaria (id_canal, id_usuario, dia, status, total, qtd)
+    SELECT id_canal, id_usuario, datah_comentario::DATE, status, SUM(valor), COUNT(*)
+    FROM system_antig.doacao
+    WHERE datah_comentario >= _mes AND datah_comentario < _fim
+    GROUP BY id_canal, id_usuario, datah_comentario::DATE, status;
+END;
+$$;
+
+-- Partições de comentario e doacao, nas tabelas ou arquivadas, com tamanho e linhas estimadas (do último ANALYZE)
+CREATE VIEW system_antig.v_particoes AS
+SELECT left(c.relname, -8) AS tabela,
+       to_date(right(c.relname, 7), 'YYYY_MM') AS mes,
+       n.nspname = 'system_antig_arquivo' AS arquivada,
+       GREATEST(c.reltuples, 0)::BIGINT AS linhas_estimadas,
+       pg_total_relation_size(c.oid) AS bytes
+FROM pg_class c
+JOIN pg_namespace n ON n.oid = c.relnamespace
+WHERE c.relkind = 'r'
+  AND c.relname ~ '^(comentario|doacao)_\d{4}_\d{2}$'
+  AND n.nspname IN ('system_antig', 'system_antig_arquivo');
+
+-- Os meses que os dados já ocupam (os seguintes foram criados acima)
+DO $$
+DECLARE
+    _de TIMESTAMP;
+    _ate TIMESTAMP;
+BEGIN
+    SELECT MIN(dataH), MAX(dataH) INTO _de, _ate FROM system_antig.comentario_antiga;
+    CALL system_antig.sp_criar_particoes(_de, _ate);
+END;
+$$;
+
+-- 6. Cópia das linhas. As triggers dos agregados e de doacao_diaria ainda não existem nas tabelas novas: os totais
+-- já contam estas doações. A de comentario_chave já existe e registra as chaves copiadas
+INSERT INTO system_antig.comentario (id_video, id_canal, id_usuario, seq, texto, dataH, coment_on)
+SELECT id_video, id_canal, id_usuario, seq, texto, dataH, coment_on FROM system_antig.comentario_antiga;
+
+INSERT INTO system_antig.doacao (id_video, id_canal, id_usuario, seq_comentario, seq_pg, valor, status, datah_comentario)
+SELECT d.id_video, d.id_canal, d.id_usuario, d.seq_comentario, d.seq_pg, d.valor, d.status, c.dataH
+FROM system_antig.doacao_antiga d
+JOIN system_antig.comentario_antiga c
+  ON c.id_video = d.id_video AND c.id_canal = d.id_canal AND c.id_usuario = d.id_usuario AND c.seq = d.seq_comentario;
+
+-- 7. As views passam a ler as tabelas novas; depois disso nada mais depende das antigas, e os nomes das suas
+-- constraints ficam livres para as das novas
+CREATE OR REPLACE VIEW system_antig.v_faturamento_canal_calc AS
+WITH ReceitaPatrocinio AS (
+    SELECT id_canal, SUM(valor) AS total_patrocinio
+    FROM system_antig.patrocinio
+    GROUP BY id_canal
+),
+ReceitaAportes AS (
+    SELECT i.id_canal, SUM(nc.valor) AS total_aportes
+    FROM system_antig.inscricao i
+    JOIN system_antig.nivelcanal nc
+      ON i.id_canal = nc.id_canal AND i.nivel = nc.nivel
+    GROUP BY i.id_canal
+),
+ReceitaDoacoes AS (
+    SELECT v.id_canal, SUM(d.valor) AS total_doacoes
+    FROM system_antig.doacao d
+    JOIN system_antig.video v
+      ON d.id_video = v.id_video AND d.id_canal = v.id_canal
+    GROUP BY v.id_canal
+)
+SELECT
+    c.id AS id_canal,
+    c.nome AS nome_canal,
+    COALESCE(rp.total_patrocinio, 0.00) AS val_patrocinio,
+    COALESCE(ra.total_aportes, 0.00) AS val_aportes,
+    COALESCE(rd.total_doacoes, 0.00) AS val_doacoes,
+    (COALESCE(rp.total_patrocinio, 0.00) +
+     COALESCE(ra.total_aportes, 0.00) +
+     COALESCE(rd.total_doacoes, 0.00)) AS faturamento_bruto
+FROM system_antig.canal c
+LEFT JOIN ReceitaPatrocinio rp ON c.id = rp.id_canal
+LEFT JOIN ReceitaAportes ra ON c.id = ra.id_canal
+LEFT JOIN ReceitaDoacoes rd ON c.id = rd.id_canal;
+
+CREATE OR REPLACE VIEW system_antig.v_videos_virais AS
+SELECT
+    v.id_video,
+    v.titulo,
+    c.nome AS nome_canal,
+    v.visu_total,
+    COUNT(com.seq) AS total_comentarios,
+    -- Cálculo de Engajamento: (Comentarios / Visualizações) * 100
+    -- CASE para evitar divisão por zero
+    CASE
+        WHEN v.visu_total > 0 THEN (COUNT(com.seq)::NUMERIC / v.visu_total) * 100
+        ELSE 0
+    END AS taxa_engajamento,
+    -- Chave completa do vídeo (id_video só é único dentro do canal); usada no JOIN da API
+    v.id_canal
+FROM system_antig.video v
+JOIN system_antig.canal c ON v.id_canal = c.id
+LEFT JOIN system_antig.comentario com
+    ON v.id_video = com.id_video AND v.id_canal = com.id_canal
+GROUP BY v.id_video, v.id_canal, v.titulo, c.nome, v.visu_total
+HAVING v.visu_total > 1000 -- Apenas vídeos com relevância mínima
+ORDER BY taxa_engajamento DESC;
+
+DROP TABLE system_antig.doacao_antiga;
+DROP TABLE system_antig.comentario_antiga;
+
+-- 8. Índices, chave gerada, FKs e triggers das tabelas novas
+-- canal antes de vídeo: um canal inteiro é um único intervalo do índice em cada partição mensal
+CREATE INDEX idx_doacao_recebidas_lidas
+ON system_antig.doacao (id_canal, id_video) INCLUDE (valor)
+WHERE status IN ('lido', 'recebido');
+CREATE INDEX idx_doacao_valor_pk
+ON system_antig.doacao (valor, id_video, id_canal, id_usuario, seq_comentario, seq_pg, datah_comentario);
+CREATE INDEX idx_doacao_usuario_valor
+ON system_antig.doacao (id_usuario, valor, id_video, id_canal, seq_comentario, seq_pg, datah_comentario);
+
+ALTER TABLE system_antig.doacao ALTER COLUMN seq_pg SET DEFAULT nextval('system_antig.doacao_seq_pg_seq');
+ALTER SEQUENCE system_antig.doacao_seq_pg_seq OWNED BY system_antig.doacao.seq_pg;
+
+ALTER TABLE system_antig.comentario
+    ADD FOREIGN KEY (id_video, id_canal) REFERENCES system_antig.Video(id_video, id_canal)
+        ON DELETE CASCADE
+        ON UPDATE CASCADE,
+    ADD FOREIGN KEY (id_usuario) REFERENCES system_antig.Usuario(id)
+        ON DELETE CASCADE
+        ON UPDATE CASCADE;
+ALTER TABLE system_antig.doacao
+    ADD FOREIGN KEY (id_video, id_canal, id_usuario, seq_comentario, datah_comentario) REFERENCES system_antig.Comentario(id_video, id_canal, id_usuario, seq, dataH)
+        ON DELETE CASCADE
+        ON UPDATE CASCADE;
+ALTER TABLE system_antig.bitCoin
+    ADD FOREIGN KEY (id_video, id_canal, id_usuario, seq_comentario, seq_doacao, datah_comentario) REFERENCES system_antig.Doacao(id_video, id_canal, id_usuario, seq_comentario, seq_pg, datah_comentario)
+        ON DELETE CASCADE
+        ON UPDATE CASCADE;
+ALTER TABLE system_antig.payPal
+    ADD FOREIGN KEY (id_video, id_canal, id_usuario, seq_comentario, seq_doacao, datah_comentario) REFERENCES system_antig.Doacao(id_video, id_canal, id_usuario, seq_comentario, seq_pg, datah_comentario)
+        ON DELETE CASCADE
+        ON UPDATE CASCADE;
+ALTER TABLE system_antig.cartaoCredito
+    ADD FOREIGN KEY (id_video, id_canal, id_usuario, seq_comentario, seq_doacao, datah_comentario) REFERENCES system_antig.Doacao(id_video, id_canal, id_usuario, seq_comentario, seq_pg, datah_comentario)
+        ON DELETE CASCADE
+        ON UPDATE CASCADE;
+ALTER TABLE system_antig.mecanismoPlat
+    ADD FOREIGN KEY (id_video, id_canal, id_usuario, seq_comentario, seq_doacao, datah_comentario) REFERENCES system_antig.Doacao(id_video, id_canal, id_usuario, seq_comentario, seq_pg, datah_comentario)
+        ON DELETE CASCADE
+        ON UPDATE CASCADE;
+
+CREATE TRIGGER trg_agg_doacao_ins AFTER INSERT ON system_antig.doacao
+REFERENCING NEW TABLE AS novas FOR EACH STATEMENT EXECUTE FUNCTION system_antig.fn_agg_doacao();
+CREATE TRIGGER trg_agg_doacao_upd AFTER UPDATE ON system_antig.doacao
+REFERENCING OLD TABLE AS antigas NEW TABLE AS novas FOR EACH STATEMENT EXECUTE FUNCTION system_antig.fn_agg_doacao();
+CREATE TRIGGER trg_agg_doacao_del AFTER DELETE ON system_antig.doacao
+REFERENCING OLD TABLE AS antigas FOR EACH STATEMENT EXECUTE FUNCTION system_antig.fn_agg_doacao();
+
+-- 9. doacao_diaria lê o dia de datah_comentario, sem JOIN com comentario
+-- Recalcula do zero os pares (canal, doador) afetados; usado quando uma atualização troca chaves das doações
+CREATE OR REPLACE FUNCTION system_antig.fn_doacao_diaria_recalcular(_canais INTEGER[], _usuarios INTEGER[])
+RETURNS VOID AS $$
+BEGIN
+    DELETE FROM system_antig.doacao_diaria r
+    USING unnest(_canais, _usuarios) AS p(c, u)
+    WHERE r.id_canal = p.c AND r.id_usuario = p.u;
+
+    INSERT INTO system_antig.doacao_diaria (id_canal, id_usuario, dia, status, total, qtd)
+    SELECT d.id_canal, d.id_usuario, d.datah_comentario::DATE, d.status, SUM(d.valor), COUNT(*)
+    FROM system_antig.doacao d
+    WHERE (d.id_canal, d.id_usuario) IN (SELECT * FROM unnest(_canais, _usuarios))
+    GROUP BY d.id_canal, d.id_usuario, d.datah_comentario::DATE, d.status;
+END;
+$$ LANGUAGE plpgsql;
+
+-- O dia vem de datah_comentario. Um comentário com dataH alterado chega aqui como UPDATE das suas doações (a FK
+-- propaga a data, mudando a doação de partição se preciso), e um comentário removido como DELETE delas
+CREATE OR REPLACE FUNCTION system_antig.fn_doacao_diaria_doacao()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM system_antig.fn_doacao_diaria_aplicar(
+            array_agg(n.id_canal), array_agg(n.id_usuario), array_agg(n.datah_comentario::DATE), array_agg(n.status), array_agg(n.valor), array_agg(1::BIGINT)
+        )
+        FROM novas n;
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM system_antig.fn_doacao_diaria_aplicar(
+            array_agg(o.id_canal), array_agg(o.id_usuario), array_agg(o.datah_comentario::DATE), array_agg(o.status), array_agg(-o.valor), array_agg(-1::BIGINT)
+        )
+        FROM antigas o;
+    ELSIF EXISTS (
+        SELECT id_video, id_canal, id_usuario, seq_comentario, seq_pg FROM antigas
+        EXCEPT
+        SELECT id_video, id_canal, id_usuario, seq_comentario, seq_pg FROM novas
+    ) THEN
+        -- Troca de chave (cascata de canal/usuário): não dá para parear linha antiga e nova, recalcula os pares envolvidos
+        PERFORM system_antig.fn_doacao_diaria_recalcular(array_agg(p.id_canal), array_agg(p.id_usuario))
+        FROM (SELECT id_canal, id_usuario FROM antigas UNION SELECT id_canal, id_usuario FROM novas) p;
+    ELSE
+        PERFORM system_antig.fn_doacao_diaria_aplicar(
+            array_agg(x.id_canal), array_agg(x.id_usuario), array_agg(x.dia), array_agg(x.status), array_agg(x.total), array_agg(x.qtd)
+        )
+        FROM (
+            SELECT n.id_canal, n.id_usuario, n.datah_comentario::DATE AS dia, n.status, n.valor AS total, 1::BIGINT AS qtd
+            FROM novas n
+            UNION ALL
+            SELECT o.id_canal, o.id_usuario, o.datah_comentario::DATE, o.status, -o.valor, -1
+            FROM antigas o
+        ) x;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE PROCEDURE system_antig.sp_reconstruir_doacao_diaria()
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    LOCK TABLE system_antig.doacao_diaria IN EXCLUSIVE MODE;
+    DELETE FROM system_antig.doacao_diaria;
+    INSERT INTO system_antig.doacao_diaria (id_canal, id_usuario, dia, status, total, qtd)
+    SELECT d.id_canal, d.id_usuario, d.datah_comentario::DATE, d.status, SUM(d.valor), COUNT(*)
+    FROM system_antig.doacao d
+    GROUP BY d.id_canal, d.id_usuario, d.datah_comentario::DATE, d.status;
+END;
+$$;
+
+CREATE TRIGGER trg_doacao_diaria_ins AFTER INSERT ON system_antig.doacao
+REFERENCING NEW TABLE AS novas FOR EACH STATEMENT EXECUTE FUNCTION system_antig.fn_doacao_diaria_doacao();
+CREATE TRIGGER trg_doacao_diaria_upd AFTER UPDATE ON system_antig.doacao
+REFERENCING OLD TABLE AS antigas NEW TABLE AS novas FOR EACH STATEMENT EXECUTE FUNCTION system_antig.fn_doacao_diaria_doacao();
+CREATE TRIGGER trg_doacao_diaria_del AFTER DELETE ON system_antig.doacao
+REFERENCING OLD TABLE AS antigas FOR EACH STATEMENT EXECUTE FUNCTION system_antig.fn_doacao_diaria_doacao();
+
+-- 10. Funções que mudaram com a chave de partição. f_inserir_doacoes devolve datah_comentario: o tipo de retorno
+-- muda, então ela é recriada
+DROP FUNCTION system_antig.f_inserir_doacoes(JSONB);
+-- Doações, com o registro do meio de pagamento opcional de cada uma (tipo_pagamento e os campos de
+-- sp_registrar_doacao_unificada). Sem seq_comentario, a doação fica no comentário mais recente do doador no vídeo;
+-- sem seq_pg (ou seq_plataforma), o valor vem da sequência.
+CREATE OR REPLACE FUNCTION system_antig.f_inserir_doacoes(p_doacoes JSONB)
+RETURNS TABLE (ordem BIGINT, id_video INTEGER, id_canal INTEGER, id_usuario INTEGER, seq_comentario INTEGER, seq_pg INTEGER, datah_comentario TIMESTAMP, erro TEXT)
+LANGUAGE sql
+-- A data do comentário (chave de partição) só aparece durante a execução: replanejar as consultas a doacao sobre
+-- todas as partições a cada chamada custava mais que executá-las. O plano genérico é montado uma vez por conexão
+SET plan_cache_mode = force_generic_plan
+AS $$
+    WITH entrada AS (
+        SELECT x.ordem, d.id_video, d.id_canal, d.id_usuario, d.seq_pg, d.valor, d.status,
+               COALESCE(d.seq_comentario, (
+                   SELECT MAX(c.seq) FROM system_antig.comentario_chave c
+                   WHERE c.id_video = d.id_video AND c.id_canal = d.id_canal AND c.id_usuario = d.id_usuario
+               )) AS seq_comentario,
+               x.linha->>'tipo_pagamento' AS tipo,
+               x.linha->>'txid' AS txid,
+               x.linha->>'id_paypal' AS id_paypal,
+               x.linha->>'nro_cartao' AS nro_cartao,
+               x.linha->>'bandeira' AS bandeira,
+               (x.linha->>'seq_plataforma')::INTEGER AS seq_plataforma,
+               -- Identificador do pagamento que precisa ser único na tabela filha
+               CASE x.linha->>'tipo_pagamento'
+                   WHEN 'bitcoin' THEN x.linha->>'txid'
+                   WHEN 'paypal' THEN x.linha->>'id_paypal'
+                   WHEN 'plataforma' THEN x.linha->>'seq_plataforma'
+               END AS chave_pagamento
+        FROM jsonb_array_elements(p_doacoes) WITH ORDINALITY AS x(linha, ordem)
+        CROSS JOIN LATERAL jsonb_populate_record(NULL::system_antig.doacao, x.linha) AS d
+    ),
+    -- A data do comentário é a chave de partição da doação e dos pagamentos; vem sempre do comentário, pela sua
+    -- chave (no máximo uma linha em comentario_chave)
+    comentada AS (
+        SELECT e.*, (
+                   SELECT c.datah FROM system_antig.comentario_chave c
+                   WHERE c.id_video = e.id_video AND c.id_canal = e.id_canal AND c.id_usuario = e.id_usuario AND c.seq = e.seq_comentario
+               ) AS datah_comentario
+        FROM entrada e
+    ),
+    validada AS (
+        SELECT e.*,
+               CASE
+                   WHEN e.seq_comentario IS NULL THEN 'O doador não comentou neste vídeo'
+                   WHEN e.datah_comentario IS NULL THEN 'Comentário inexistente'
+                   WHEN e.tipo NOT IN ('bitcoin', 'paypal', 'cartao', 'plataforma') THEN 'Tipo inválido. Use: bitcoin, paypal, cartao ou plataforma.'
+                   WHEN e.tipo = 'bitcoin' AND e.txid IS NULL THEN 'Para Bitcoin, informe o TxID'
+                   WHEN e.tipo = 'paypal' AND e.id_paypal IS NULL THEN 'Para PayPal, informe o IDPayPal'
+                   WHEN e.tipo = 'cartao' AND (e.nro_cartao IS NULL OR e.bandeira IS NULL) THEN 'Para Cartão, informe número e bandeira'
+                   WHEN e.tipo = 'bitcoin' AND EXISTS (SELECT 1 FROM system_antig.bitcoin b WHERE b.txid = e.txid) THEN 'TxID já registrado'
+                   WHEN e.tipo = 'paypal' AND EXISTS (SELECT 1 FROM system_antig.paypal p WHERE p.idpaypal = e.id_paypal) THEN 'IDPayPal já registrado'
+                   WHEN e.tipo = 'plataforma' AND EXISTS (SELECT 1 FROM system_antig.mecanismoPlat m WHERE m.seq_plataforma = e.seq_plataforma) THEN 'seq_plataforma já registrado'
+                   WHEN e.seq_pg IS NOT NULL AND EXISTS (
+                       SELECT 1 FROM system_antig.doacao o
+                       WHERE o.id_video = e.id_video AND o.id_canal = e.id_canal AND o.id_usuario = e.id_usuario
+                         AND o.seq_comentario = e.seq_comentario AND o.seq_pg = e.seq_pg AND o.datah_comentario = e.datah_comentario
+                   ) THEN 'Doação já registrada'
+                   -- Chaves informadas que se repetem dentro do lote: vale a primeira
+                   WHEN e.seq_pg IS NOT NULL AND ROW_NUMBER() OVER (
+                       PARTITION BY e.id_video, e.id_canal, e.id_usuario, e.seq_comentario, e.seq_pg ORDER BY e.ordem
+                   ) > 1 THEN 'Doação repetida no lote'
+                   WHEN e.chave_pagamento IS NOT NULL AND ROW_NUMBER() OVER (
+                       PARTITION BY e.tipo, e.chave_pagamento ORDER BY e.ordem
+                   ) > 1 THEN 'Pagamento repetido no lote'
+               END AS erro
+        FROM comentada e
+    ),
+    -- nextval torna a CTE volátil: ela é avaliada uma única vez e as inserções abaixo leem as mesmas chaves
+    chaves AS (
+        SELECT v.ordem, v.id_video, v.id_canal, v.id_usuario, v.seq_comentario, v.datah_comentario,
+               COALESCE(v.seq_pg, nextval('system_antig.doacao_seq_pg_seq'))::INTEGER AS seq_pg,
+               v.valor, v.status, v.tipo, v.txid, v.id_paypal, v.nro_cartao, v.bandeira,
+               CASE WHEN v.tipo = 'plataforma' THEN COALESCE(v.seq_plataforma, nextval('system_antig.mecanismoplat_seq_plataforma_seq'))::INTEGER END AS seq_plataforma
+        FROM validada v
+        WHERE v.erro IS NULL
+    ),
+    doacoes AS (
+        INSERT INTO system_antig.doacao (id_video, id_canal, id_usuario, seq_comentario, seq_pg, valor, status, datah_comentario)
+        SELECT k.id_video, k.id_canal, k.id_usuario, k.seq_comentario, k.seq_pg, k.valor, k.status, k.datah_comentario
+        FROM chaves k
+        ORDER BY k.ordem
+        ON CONFLICT DO NOTHING
+        RETURNING id_video, id_canal, id_usuario, seq_comentario, seq_pg, datah_comentario
+    ),
+    pagamentos AS (
+        SELECT k.*
+        FROM chaves k
+        JOIN doacoes d ON d.id_video = k.id_video AND d.id_canal = k.id_canal AND d.id_usuario = k.id_usuario
+                      AND d.seq_comentario = k.seq_comentario AND d.seq_pg = k.seq_pg AND d.datah_comentario = k.datah_comentario
+    ),
+    bitcoins AS (
+        INSERT INTO system_antig.bitcoin (id_video, id_canal, id_usuario, seq_comentario, seq_doacao, TxID, datah_comentario)
+        SELECT p.id_video, p.id_canal, p.id_usuario, p.seq_comentario, p.seq_pg, p.txid, p.datah_comentario FROM pagamentos p WHERE p.tipo = 'bitcoin'
+    ),
+    paypals AS (
+        INSERT INTO system_antig.paypal (id_video, id_canal, id_usuario, seq_comentario, seq_doacao, IdPayPal, datah_comentario)
+        SELECT p.id_video, p.id_canal, p.id_usuario, p.seq_comentario, p.seq_pg, p.id_paypal, p.datah_comentario FROM pagamentos p WHERE p.tipo = 'paypal'
+    ),
+    cartoes AS (
+        INSERT INTO system_antig.cartaoCredito (id_video, id_canal, id_usuario, seq_comentario, seq_doacao, nro, bandeira, datah_comentario)
+        SELECT p.id_video, p.id_canal, p.id_usuario, p.seq_comentario, p.seq_pg, p.nro_cartao, p.bandeira, p.datah_comentario FROM pagamentos p WHERE p.tipo = 'cartao'
+    ),
+    plataformas AS (
+        INSERT INTO system_antig.mecanismoPlat (id_video, id_canal, id_usuario, seq_comentario, seq_doacao, seq_plataforma, datah_comentario)
+        SELECT p.id_video, p.id_canal, p.id_usuario, p.seq_comentario, p.seq_pg, p.seq_plataforma, p.datah_comentario FROM pagamentos p WHERE p.tipo = 'plataforma'
+    )
+    SELECT v.ordem, p.id_video, p.id_canal, p.id_usuario, p.seq_comentario, p.seq_pg, p.datah_comentario,
+           CASE WHEN p.ordem IS NULL THEN COALESCE(v.erro, 'Doação já registrada') END
+    FROM validada v
+    LEFT JOIN pagamentos p ON p.ordem = v.ordem
+    ORDER BY v.ordem;
+$$;
+
+-- Linhas inseridas, atualizadas e removidas desde o último reset das estatísticas (contador cumulativo).
+-- Uma tabela particionada não tem contadores próprios: somam-se os das suas partições. Arquivar um mês leva os
+-- contadores dele junto, e a queda conta como um reset em v_mv_atualizacao
+CREATE OR REPLACE FUNCTION system_antig.f_alteracoes_tabelas(p_tabelas TEXT[])
+RETURNS BIGINT
+LANGUAGE sql STABLE
+AS $$
+    SELECT COALESCE(SUM(pg_stat_get_tuples_inserted(p.relid) + pg_stat_get_tuples_updated(p.relid)
+                        + pg_stat_get_tuples_deleted(p.relid)), 0)::BIGINT
+    FROM unnest(p_tabelas) AS t(tabela)
+    CROSS JOIN LATERAL pg_partition_tree(to_regclass(format('system_antig.%I', t.tabela))) p;
+$$;
+
+-- 11. As sequências acompanham as chaves existentes (seq_pg passou a pertencer à doacao nova)
+CALL system_antig.sp_sincronizar_sequencias();
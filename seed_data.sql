@@ -74,28 +74,32 @@ INSERT INTO system_antig.comentario (id_video, id_canal, id_usuario, seq, texto,
 (3, 2, 6, 1, 'Que susto!', NOW(), true);
 
 -- 9. Doações (Tabela Pai e Tabelas Filhas)
+-- datah_comentario copia a data do comentário doado (chave de partição de doacao e dos pagamentos)
 -- Doação 1: $100 no vídeo do Gaules (via Bitcoin)
-INSERT INTO system_antig.doacao (id_video, id_canal, id_usuario, seq_comentario, seq_pg, valor, status) 
-VALUES (1, 1, 6, 1, 1, 100.00, 'lido');
+INSERT INTO system_antig.doacao (id_video, id_canal, id_usuario, seq_comentario, seq_pg, valor, status, datah_comentario)
+SELECT 1, 1, 6, 1, 1, 100.00, 'lido', dataH FROM system_antig.comentario WHERE id_video = 1 AND id_canal = 1 AND id_usuario = 6 AND seq = 1;
 
-INSERT INTO system_antig.bitCoin (id_video, id_canal, id_usuario, seq_comentario, seq_doacao, TxID)
-VALUES (1, 1, 6, 1, 1, 'tx_hash_abc_123');
+INSERT INTO system_antig.bitCoin (id_video, id_canal, id_usuario, seq_comentario, seq_doacao, TxID, datah_comentario)
+SELECT 1, 1, 6, 1, 1, 'tx_hash_abc_123', datah_comentario FROM system_antig.doacao WHERE id_video = 1 AND id_canal = 1 AND id_usuario = 6 AND seq_comentario = 1 AND seq_pg = 1;
 
 -- Doação 2: $500 no vídeo do Gaules (via Cartão)
-INSERT INTO system_antig.doacao (id_video, id_canal, id_usuario, seq_comentario, seq_pg, valor, status) 
-VALUES (1, 1, 6, 1, 2, 500.00, 'recebido');
+INSERT INTO system_antig.doacao (id_video, id_canal, id_usuario, seq_comentario, seq_pg, valor, status, datah_comentario)
+SELECT 1, 1, 6, 1, 2, 500.00, 'recebido', dataH FROM system_antig.comentario WHERE id_video = 1 AND id_canal = 1 AND id_usuario = 6 AND seq = 1;
 
-INSERT INTO system_antig.cartaoCredito (id_video, id_canal, id_usuario, seq_comentario, seq_doacao, nro, bandeira)
-VALUES (1, 1, 6, 1, 2, '4555888899990000', 'Mastercard');
+INSERT INTO system_antig.cartaoCredito (id_video, id_canal, id_usuario, seq_comentario, seq_doacao, nro, bandeira, datah_comentario)
+SELECT 1, 1, 6, 1, 2, '4555888899990000', 'Mastercard', datah_comentario FROM system_antig.doacao WHERE id_video = 1 AND id_canal = 1 AND id_usuario = 6 AND seq_comentario = 1 AND seq_pg = 2;
 
 -- Doação 3: $50 no vídeo do Alan (via PayPal)
-INSERT INTO system_antig.doacao (id_video, id_canal, id_usuario, seq_comentario, seq_pg, valor, status) 
-VALUES (3, 2, 6, 1, 1, 50.00, 'lido');
+INSERT INTO system_antig.doacao (id_video, id_canal, id_usuario, seq_comentario, seq_pg, valor, status, datah_comentario)
+SELECT 3, 2, 6, 1, 1, 50.00, 'lido', dataH FROM system_antig.comentario WHERE id_video = 3 AND id_canal = 2 AND id_usuario = 6 AND seq = 1;
 
-INSERT INTO system_antig.payPal (id_video, id_canal, id_usuario, seq_comentario, seq_doacao, IdPayPal)
-VALUES (3, 2, 6, 1, 1, 'paypal_id_xyz');
+INSERT INTO system_antig.payPal (id_video, id_canal, id_usuario, seq_comentario, seq_doacao, IdPayPal, datah_comentario)
+SELECT 3, 2, 6, 1, 1, 'paypal_id_xyz', datah_comentario FROM system_antig.doacao WHERE id_video = 3 AND id_canal = 2 AND id_usuario = 6 AND seq_comentario = 1 AND seq_pg = 1;
 
--- 10. Atualizar Views Materializadas
+-- 10. Sequências das chaves: continuam depois dos ids gravados acima
+CALL system_antig.sp_sincronizar_sequencias();
+
+-- 11. Atualizar Views Materializadas
 -- IMPORTANTE: Views materializadas precisam ser atualizadas explicitamente após inserts
 REFRESH MATERIALIZED VIEW system_antig.mv_faturamento_canal;
 REFRESH MATERIALIZED VIEW system_antig.mv_performance_streamers;
@@ -0,0 +1,124 @@
+"""Load benchmark: sync (threadpool + psycopg2) vs async (psycopg 3) data paths.
+
+Sync routes run on Starlette's threadpool, which is capped at 40 threads by
+default. This benchmark reproduces that: the sync path pushes every call
+through ``anyio.to_thread.run_sync`` (the same limiter Starlette uses) into
+``execute_query_sync``, while the async path awaits ``execute_query`` on the
+event loop. A few clients keep slow queries in flight the whole time to mimic a
+long ``drilldown-performance`` report, and we measure how cheap lookups fare.
+
+Run from ``server/``:
+
+    python -m benchmarks.async_vs_sync --clients 200 --duration 10 --slow-clients 40
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=200, help="concurrent cheap-query clients")
+    parser.add_argument("--slow-clients", type=int, default=40, help="concurrent slow-query clients")
+    parser.add_argument("--slow-seconds", type=float, default=1.0, help="duration of each slow query")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds to run each path")
+    parser.add_argument("--pool-size", type=int, default=60, help="DB_POOL_MAX used by both pools")
+    parser.add_argument("--threads", type=int, default=40, help="threadpool size for the sync path")
+    parser.add_argument("--path", choices=["sync", "async", "both"], default="both")
+    return parser.parse_args()
+
+
+CHEAP_QUERY = "SELECT * FROM system_antig.usuario WHERE id = %s"
+SLOW_QUERY = "SELECT pg_sleep(%s)"
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[k]
+
+
+async def run_path(name, call, args, user_ids):
+    latencies = []
+    errors = 0
+    stop_at = time.perf_counter() + args.duration
+
+    async def cheap_client(i):
+        nonlocal errors
+        n = i
+        while time.perf_counter() < stop_at:
+            start = time.perf_counter()
+            try:
+                await call(CHEAP_QUERY, (user_ids[n % len(user_ids)],), False)
+                latencies.append(time.perf_counter() - start)
+            except Exception:
+                errors += 1
+            n += args.clients
+
+    async def slow_client():
+        while time.perf_counter() < stop_at:
+            try:
+                await call(SLOW_QUERY, (args.slow_seconds,), False)
+            except Exception:
+                pass
+
+    started = time.perf_counter()
+    await asyncio.gather(
+        *(cheap_client(i) for i in range(args.clients)),
+        *(slow_client() for _ in range(args.slow_clients)),
+    )
+    elapsed = time.perf_counter() - started
+
+    print(f"\n[{name}] {len(latencies)} requests in {elapsed:.1f}s, {errors} errors")
+    print(f"  throughput: {len(latencies) / elapsed:,.0f} req/s")
+    if latencies:
+        print(
+            "  latency ms: p50 {:.1f}  p95 {:.1f}  p99 {:.1f}  mean {:.1f}".format(
+                percentile(latencies, 50) * 1000,
+                percentile(latencies, 95) * 1000,
+                percentile(latencies, 99) * 1000,
+                statistics.mean(latencies) * 1000,
+            )
+        )
+
+
+async def main(args):
+    import anyio.to_thread
+
+    import main as api
+    from db import async_pool, pool
+
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    limiter.total_tokens = args.threads
+
+    await async_pool.open(wait=True)
+    try:
+        rows = await api.execute_query("SELECT id FROM system_antig.usuario ORDER BY id LIMIT 1000")
+        user_ids = [r["id"] for r in rows] or [1]
+
+        async def sync_call(query, params, fetch_all):
+            return await anyio.to_thread.run_sync(api.execute_query_sync, query, params, fetch_all)
+
+        print(
+            f"clients={args.clients} slow_clients={args.slow_clients} slow={args.slow_seconds}s "
+            f"pool={args.pool_size} threads={args.threads} duration={args.duration}s"
+        )
+        if args.path in ("sync", "both"):
+            await run_path("sync", sync_call, args, user_ids)
+            pool.closeall()
+        if args.path in ("async", "both"):
+            await run_path("async", api.execute_query, args, user_ids)
+    finally:
+        await async_pool.close()
+        pool.closeall()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    os.environ["DB_POOL_MAX"] = str(args.pool_size)
+    os.environ["DB_POOL_TIMEOUT"] = str(max(30.0, args.slow_seconds * 4))
+    asyncio.run(main(args))
@@ -0,0 +1,110 @@
+"""Benchmark: N single-row POSTs vs one batch POST, for videos and donations.
+
+``POST /api/videos`` and ``POST /api/donations`` insert one row per request
+(each INSERT also runs the statement-level triggers of the aggregates and the
+daily rollup once). ``POST /api/videos/batch`` and ``POST /api/donations/batch``
+send the rows as one JSON array to ``f_inserir_videos`` / ``f_inserir_doacoes``:
+one round trip, one INSERT per table, keys from sequences. Requests go
+through the ASGI app in-process; the rows are deleted after each measurement.
+Run from ``server/``:
+
+    python -m benchmarks.batch_writes --rows 100,1000
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", default="100,1000", help="comma-separated batch sizes")
+    return parser.parse_args()
+
+
+def video_rows(channels, n, label):
+    return [
+        {
+            "id_canal": channels[i % len(channels)], "titulo": f"batch bench {label} {i}",
+            "datah": "2024-01-01 12:00:00", "tema": "Bench", "duracao": 60, "visu_simul": 10, "visu_total": 1000,
+        }
+        for i in range(n)
+    ]
+
+
+def donation_rows(comments, n):
+    return [
+        {
+            "id_video": c["id_video"], "id_canal": c["id_canal"], "id_usuario": c["id_usuario"],
+            "seq_comentario": c["seq"], "valor": 10.0, "status": "recebido",
+            # Every other donation carries a payment record, as sp_registrar_doacao_unificada would write
+            **({"tipo_pagamento": "cartao", "nro_cartao": "4000000000000000", "bandeira": "Visa"} if i % 2 else {}),
+        }
+        for i, c in enumerate(comments[i % len(comments)] for i in range(n))
+    ]
+
+
+async def post(client, path, body):
+    response = await client.post(path, json=body)
+    if response.status_code >= 400:
+        raise SystemExit(f"POST {path} failed: {response.status_code} {response.text[:200]}")
+    return response.json()
+
+
+async def singles(client, path, rows):
+    return [await post(client, path, row) for row in rows]
+
+
+async def main(args):
+    import httpx
+
+    import main as api
+    from db import async_pool
+
+    await async_pool.open(wait=True)
+    try:
+        channels = [r["id"] for r in await api.execute_query("SELECT id FROM system_antig.canal ORDER BY id LIMIT 20")]
+        comments = await api.execute_query(
+            "SELECT id_video, id_canal, id_usuario, seq FROM system_antig.comentario ORDER BY id_video, id_canal LIMIT 500"
+        )
+        transport = httpx.ASGITransport(app=api.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            print(f"{'entity':<10} {'rows':>6} {'single ms':>10} {'batch ms':>9} {'speedup':>8}  rows/s single / batch")
+            for n in [int(value) for value in args.rows.split(",")]:
+                # Videos
+                started = time.perf_counter()
+                await singles(client, "/api/videos", video_rows(channels, n, "single"))
+                single = time.perf_counter() - started
+                started = time.perf_counter()
+                batch = await post(client, "/api/videos/batch", video_rows(channels, n, "batch"))
+                batched = time.perf_counter() - started
+                assert batch["inserted"] == n, batch["results"][:3]
+                await api.execute_query("DELETE FROM system_antig.video WHERE titulo LIKE 'batch bench %'")
+                print(f"{'videos':<10} {n:>6} {single * 1000:>10.0f} {batched * 1000:>9.0f} {single / batched:>7.1f}x  "
+                      f"{n / single:.0f} / {n / batched:.0f}")
+
+                # Donations
+                started = time.perf_counter()
+                created = await singles(client, "/api/donations", donation_rows(comments, n))
+                single = time.perf_counter() - started
+                started = time.perf_counter()
+                batch = await post(client, "/api/donations/batch", donation_rows(comments, n))
+                batched = time.perf_counter() - started
+                assert batch["inserted"] == n, batch["results"][:3]
+                keys = [{column: row[column] for column in api.DONATION_KEY} for row in created + batch["results"]]
+                await api.execute_query(
+                    "DELETE FROM system_antig.doacao WHERE (id_video, id_canal, id_usuario, seq_comentario, seq_pg, datah_comentario) IN "
+                    "(SELECT * FROM jsonb_to_recordset(%s) AS k(id_video int, id_canal int, id_usuario int, seq_comentario int, "
+                    "seq_pg int, datah_comentario timestamp))",
+                    (json.dumps(keys),),
+                )
+                print(f"{'donations':<10} {n:>6} {single * 1000:>10.0f} {batched * 1000:>9.0f} {single / batched:>7.1f}x  "
+                      f"{n / single:.0f} / {n / batched:.0f}")
+    finally:
+        await async_pool.close()
+
+
+if __name__ == "__main__":
+    os.environ["CACHE_ENABLED"] = "0"
+    asyncio.run(main(parse_args()))
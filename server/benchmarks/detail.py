@@ -0,0 +1,118 @@
+"""Benchmark: detail endpoints, one query per collection vs one query in all.
+
+The detail routes used to read the parent row, then each child collection
+with a query of its own (each on a pooled connection of its own), and sent
+every child row: ``/api/channels/{id}`` returned all of a channel's videos.
+They now run one statement that builds a bounded page of each collection
+with ``json_agg`` (``detail.py``). For the largest channel, user and video
+this benchmark times the old sequence of queries and the current route
+function, and reports the encoded response size. ``--videos`` first adds that
+many videos to the largest channel (deleted afterwards), to see how the old
+response grows with a mega-channel while the page stays the same size.
+Run from ``server/``:
+
+    python -m benchmarks.detail --videos 100000 --repeat 20
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+# The detail queries as they were: the parent row, then each child collection (by name) in full
+OLD = {
+    "channel": [
+        ("SELECT c.*, u.nick as streamer_nick, p.nome as platform_name FROM system_antig.canal c "
+         "JOIN system_antig.usuario u ON c.id_streamer = u.id JOIN system_antig.plataforma p ON c.nro_plataforma = p.nro "
+         "WHERE c.id = %s", None),
+        ("SELECT * FROM system_antig.video WHERE id_canal = %s ORDER BY datah DESC", "videos"),
+    ],
+    "user": [
+        ("SELECT * FROM system_antig.usuario WHERE id = %s", None),
+        ("SELECT * FROM system_antig.canal WHERE id_streamer = %s", "channels"),
+        ("SELECT * FROM system_antig.doacao WHERE id_usuario = %s LIMIT 10", "donations"),
+    ],
+    "video": [
+        ("SELECT v.*, c.nome as canal_nome FROM system_antig.video v JOIN system_antig.canal c ON v.id_canal = c.id "
+         "WHERE v.id_video = %s AND v.id_canal = %s", None),
+        ("SELECT d.*, u.nick FROM system_antig.doacao d JOIN system_antig.usuario u ON d.id_usuario = u.id "
+         "WHERE d.id_video = %s AND d.id_canal = %s", "donations"),
+    ],
+}
+
+TITLE = "detail bench %"
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--videos", type=int, default=0, help="videos to add to the largest channel first")
+    parser.add_argument("--repeat", type=int, default=20, help="calls per measurement")
+    return parser.parse_args()
+
+
+async def old_detail(api, entity, key):
+    row = None
+    for query, name in OLD[entity]:
+        if name is None:
+            row = await api.execute_query(query, key, fetch_all=False)
+        else:
+            row[name] = await api.execute_query(query, key, as_rows=True)
+    return row
+
+
+async def timed(call, repeat):
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = await call()
+        times.append((time.perf_counter() - started) * 1000)
+    return statistics.median(times), result
+
+
+async def main(args):
+    import main as api
+    from db import async_pool
+    from serialize import dumps
+
+    await async_pool.open(wait=True)
+    try:
+        channel = (await api.execute_query(
+            "SELECT id_canal FROM system_antig.video GROUP BY id_canal ORDER BY COUNT(*) DESC LIMIT 1", fetch_all=False
+        ))["id_canal"]
+        if args.videos:
+            await api.execute_query(
+                "INSERT INTO system_antig.video (id_canal, titulo, datah, tema, duracao, visu_simul, visu_total) "
+                "SELECT %s, 'detail bench ' || i, now() - i * interval '1 minute', 'Bench', 60, 10, 1000 "
+                "FROM generate_series(1, %s) i",
+                (channel, args.videos),
+            )
+        user = (await api.execute_query(
+            "SELECT id_usuario FROM system_antig.doacao GROUP BY id_usuario ORDER BY COUNT(*) DESC LIMIT 1", fetch_all=False
+        ))["id_usuario"]
+        video = await api.execute_query(
+            "SELECT id_video, id_canal FROM system_antig.doacao GROUP BY id_video, id_canal ORDER BY COUNT(*) DESC LIMIT 1",
+            fetch_all=False,
+        )
+        cases = [
+            ("channel", (channel,), lambda: api.get_channel(channel, None, api.DETAIL_LIMIT, None)),
+            ("user", (user,), lambda: api.get_user(user, None, api.DETAIL_LIMIT, None, None)),
+            ("video", (video["id_video"], video["id_canal"]),
+             lambda: api.get_video(video["id_canal"], video["id_video"], None, api.DETAIL_LIMIT, None)),
+        ]
+
+        print(f"repeat={args.repeat} limit={api.DETAIL_LIMIT} extra videos={args.videos}")
+        print(f"{'detail':<8} {'queries':>7} {'old ms':>8} {'new ms':>8} {'speedup':>8} {'old bytes':>10} {'new bytes':>10}")
+        for entity, key, new_detail in cases:
+            old_ms, old = await timed(lambda: old_detail(api, entity, key), args.repeat)
+            new_ms, new = await timed(new_detail, args.repeat)
+            print(f"{entity:<8} {len(OLD[entity]):>7} {old_ms:>8.2f} {new_ms:>8.2f} {old_ms / new_ms:>7.1f}x "
+                  f"{len(dumps(old)):>10} {len(dumps(new)):>10}")
+    finally:
+        if args.videos:
+            await api.execute_query("DELETE FROM system_antig.video WHERE titulo LIKE %s", (TITLE,))
+        await async_pool.close()
+
+
+if __name__ == "__main__":
+    os.environ["CACHE_ENABLED"] = "0"
+    asyncio.run(main(parse_args()))
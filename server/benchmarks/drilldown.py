@@ -0,0 +1,149 @@
+"""Benchmark: drilldown-performance before and after pre-aggregating the donations.
+
+The old report joined ``canal -> video -> doacao`` and summed the result, so
+every video was repeated once per donation before the ``GROUP BY``: the rows
+fed to the aggregate grew with donations and videos together, and the views
+were counted once per donation. The current query (``main.drilldown_performance_query``)
+sums the donations per video first and joins one row per video.
+
+For each date range and for the whole report and one channel, this benchmark
+runs both queries with ``EXPLAIN (ANALYZE, FORMAT JSON)`` and reports the
+median execution time and the largest row count any join produced. ``--steps``
+runs ``populate_data.py`` between rounds, so the growth of each column can be
+read against the table sizes. Run from ``server/``:
+
+    python -m benchmarks.drilldown --steps 3 --repeat 5
+
+``check_drilldown.py`` checks the results against a per-entity recompute.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+from datetime import date, timedelta
+
+# The report as it was before donations were pre-aggregated
+OLD_CHANNELS = """
+    SELECT
+        c.nome as entity_name,
+        COUNT(v.id_video) as total_items,
+        SUM(v.visu_total) as total_views,
+        COALESCE(SUM(d.valor), 0) as total_revenue
+    FROM system_antig.canal c
+    LEFT JOIN system_antig.video v ON c.id = v.id_canal
+    LEFT JOIN system_antig.doacao d ON v.id_video = d.id_video AND v.id_canal = d.id_canal
+    {where}
+    GROUP BY c.id, c.nome
+    ORDER BY total_revenue DESC
+"""
+
+OLD_VIDEOS = """
+    SELECT
+        v.titulo as entity_name,
+        v.visu_total as total_views,
+        v.visu_simul as peak_views,
+        COALESCE(SUM(d.valor), 0) as total_revenue
+    FROM system_antig.video v
+    LEFT JOIN system_antig.doacao d ON v.id_video = d.id_video AND v.id_canal = d.id_canal
+    {where}
+    GROUP BY v.id_video, v.id_canal, v.titulo, v.visu_total, v.visu_simul
+    ORDER BY total_revenue DESC
+"""
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--steps", type=int, default=1, help="measurement rounds, with populate_data.py run between them")
+    parser.add_argument("--repeat", type=int, default=5, help="EXPLAIN ANALYZE runs per query")
+    return parser.parse_args()
+
+
+def old_query(channel_id, start_date, end_date):
+    where, params = [], []
+    if start_date:
+        where.append("v.datah >= %s")
+        params.append(start_date)
+    if end_date:
+        where.append("v.datah <= %s")
+        params.append(end_date)
+    if channel_id:
+        where.append("v.id_canal = %s")
+        params.append(channel_id)
+    where_str = "WHERE " + " AND ".join(where) if where else ""
+    return (OLD_VIDEOS if channel_id else OLD_CHANNELS).format(where=where_str), tuple(params)
+
+
+def join_rows(plan):
+    """Largest number of rows any join node in ``plan`` produced (over all its loops)."""
+    rows = 0
+    if plan["Node Type"] in ("Hash Join", "Merge Join", "Nested Loop"):
+        rows = round(plan["Actual Rows"] * plan["Actual Loops"])
+    return max([rows] + [join_rows(child) for child in plan.get("Plans", [])])
+
+
+async def explain(conn, query, params, repeat):
+    times = []
+    for _ in range(repeat):
+        cur = await conn.execute("EXPLAIN (ANALYZE, FORMAT JSON) " + query, params)
+        plan = (await cur.fetchone())["QUERY PLAN"]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        times.append(plan[0]["Execution Time"])
+    return statistics.median(times), join_rows(plan[0]["Plan"])
+
+
+async def measure(api, args):
+    from db import async_pool
+
+    counts = await api.execute_query(
+        "SELECT (SELECT COUNT(*) FROM system_antig.video) as videos, "
+        "(SELECT COUNT(*) FROM system_antig.doacao) as doacoes",
+        fetch_all=False,
+    )
+    channel = await api.execute_query(
+        "SELECT id_canal FROM system_antig.doacao GROUP BY id_canal ORDER BY COUNT(*) DESC LIMIT 1",
+        fetch_all=False,
+    )
+    today = date.today()
+    ranges = [("all", None), ("1 year", today - timedelta(days=365)), ("30 days", today - timedelta(days=30))]
+
+    print(f"\nvideo={counts['videos']} doacao={counts['doacoes']} repeat={args.repeat}")
+    print(f"{'report':<9} {'range':<8} {'old ms':>9} {'new ms':>9} {'speedup':>8} {'old join rows':>14} {'new join rows':>14}")
+    async with async_pool.connection() as conn:
+        for channel_id in (None, channel and channel["id_canal"]):
+            for label, start in ranges:
+                start_date = start.isoformat() if start else None
+                old_ms, old_rows = await explain(conn, *old_query(channel_id, start_date, None), args.repeat)
+                new_ms, new_rows = await explain(
+                    conn, *api.drilldown_performance_query(channel_id, start_date, None), args.repeat
+                )
+                print(
+                    f"{'channel' if channel_id else 'channels':<9} {label:<8} {old_ms:>9.2f} {new_ms:>9.2f} "
+                    f"{old_ms / new_ms:>7.1f}x {old_rows:>14} {new_rows:>14}"
+                )
+
+
+async def main(args):
+    import main as api
+    import populate_data
+    import psycopg
+    from db import async_pool, conninfo
+
+    await async_pool.open(wait=True)
+    try:
+        for step in range(args.steps):
+            if step:
+                await asyncio.to_thread(populate_data.populate_data)
+            # Fresh statistics and visibility map, so both queries get the plans production would
+            async with await psycopg.AsyncConnection.connect(conninfo(), autocommit=True) as conn:
+                await conn.execute("VACUUM (ANALYZE) system_antig.video, system_antig.doacao, system_antig.canal")
+            await measure(api, args)
+    finally:
+        await async_pool.close()
+
+
+if __name__ == "__main__":
+    # Measure the queries, not the result cache
+    os.environ["CACHE_ENABLED"] = "0"
+    asyncio.run(main(parse_args()))
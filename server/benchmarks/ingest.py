@@ -0,0 +1,119 @@
+"""Benchmark: video ingestion cost of the channel view-count trigger.
+
+Inserts ``--videos`` rows in statements of ``--batch`` rows spread over the
+existing channels, then bumps ``visu_total`` on all of them, under three
+maintenance modes:
+
+* ``per-row``   the old ``FOR EACH ROW`` trigger that re-sums the channel's
+  videos and updates the ``canal`` row once per video (installed for the run)
+* ``statement`` the statement-level delta trigger (one update per channel per statement)
+* ``bulk``      ``SET LOCAL system_antig.carga_em_lote = 'on'`` plus one
+  ``sp_aplicar_visualizacoes_pendentes()`` at the end
+
+Every mode runs in its own transaction, checks ``canal.qtd_visualizacoes``
+against a full re-sum and is rolled back. Run from ``server/``:
+
+    python -m benchmarks.ingest --videos 20000 --batch 500
+"""
+import argparse
+import asyncio
+import time
+
+LEGACY_TRIGGER = """
+    DROP TRIGGER trg_atualiza_visu_canal_ins ON system_antig.video;
+    DROP TRIGGER trg_atualiza_visu_canal_upd ON system_antig.video;
+    DROP TRIGGER trg_atualiza_visu_canal_del ON system_antig.video;
+    CREATE FUNCTION system_antig.fn_manter_qtd_visualizacoes_por_linha()
+    RETURNS TRIGGER AS $$
+    BEGIN
+        UPDATE system_antig.canal
+        SET qtd_visualizacoes = (
+            SELECT COALESCE(SUM(visu_total), 0) FROM system_antig.video WHERE id_canal = NEW.id_canal
+        )
+        WHERE id = NEW.id_canal;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+    CREATE TRIGGER trg_atualiza_visu_canal
+    AFTER INSERT OR UPDATE OF visu_total, id_canal ON system_antig.video
+    FOR EACH ROW EXECUTE FUNCTION system_antig.fn_manter_qtd_visualizacoes_por_linha();
+"""
+
+INSERT_BATCH = """
+    INSERT INTO system_antig.video (id_video, id_canal, titulo, datah, tema, duracao, visu_simul, visu_total)
+    SELECT %(base)s::int + g, canais[1 + (g * 7919) %% array_length(canais, 1)],
+           'bench ' || (%(base)s::int + g), now(), 'Bench', 60, 10, 1000 + g %% 5000
+    FROM generate_series(%(start)s::int, %(stop)s::int) g,
+         (SELECT ARRAY(SELECT id FROM system_antig.canal ORDER BY id) AS canais) c
+"""
+
+BUMP_VIEWS = "UPDATE system_antig.video SET visu_total = visu_total + 1 WHERE id_video > %(base)s"
+
+DRIFT = """
+    SELECT COUNT(*) as n
+    FROM system_antig.canal c
+    LEFT JOIN (SELECT id_canal, SUM(visu_total) AS total FROM system_antig.video GROUP BY id_canal) v ON v.id_canal = c.id
+    WHERE c.qtd_visualizacoes IS DISTINCT FROM COALESCE(v.total, 0)
+"""
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--videos", type=int, default=20_000, help="videos to insert per mode")
+    parser.add_argument("--batch", type=int, default=500, help="rows per INSERT statement")
+    parser.add_argument("--modes", default="per-row,statement,bulk", help="comma-separated modes to run")
+    return parser.parse_args()
+
+
+async def run_mode(conn, mode, args):
+    if mode == "per-row":
+        await conn.execute(LEGACY_TRIGGER)
+    elif mode == "bulk":
+        await conn.execute("SET LOCAL system_antig.carga_em_lote = 'on'")
+    base = (await (await conn.execute("SELECT COALESCE(MAX(id_video), 0) as n FROM system_antig.video")).fetchone())["n"]
+
+    started = time.perf_counter()
+    for start in range(1, args.videos + 1, args.batch):
+        stop = min(start + args.batch - 1, args.videos)
+        await conn.execute(INSERT_BATCH, {"base": base, "start": start, "stop": stop})
+    if mode == "bulk":
+        await conn.execute("CALL system_antig.sp_aplicar_visualizacoes_pendentes()")
+    insert_ms = (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    await conn.execute(BUMP_VIEWS, {"base": base})
+    if mode == "bulk":
+        await conn.execute("CALL system_antig.sp_aplicar_visualizacoes_pendentes()")
+    update_ms = (time.perf_counter() - started) * 1000
+
+    drift = (await (await conn.execute(DRIFT)).fetchone())["n"]
+    return insert_ms, update_ms, drift
+
+
+async def main(args):
+    from db import async_pool
+
+    await async_pool.open(wait=True)
+    try:
+        async with async_pool.connection() as conn:
+            counts = await (await conn.execute(
+                "SELECT (SELECT COUNT(*) FROM system_antig.video) as videos, (SELECT COUNT(*) FROM system_antig.canal) as canais"
+            )).fetchone()
+            await conn.rollback()
+            print(f"video={counts['videos']} canal={counts['canais']} inserting={args.videos} batch={args.batch}")
+            print(f"\n{'mode':<10} {'insert ms':>10} {'rows/s':>9} {'update ms':>10} {'drift':>6}")
+            for mode in args.modes.split(","):
+                try:
+                    insert_ms, update_ms, drift = await run_mode(conn, mode, args)
+                finally:
+                    await conn.rollback()
+                print(
+                    f"{mode:<10} {insert_ms:>10.1f} {args.videos / insert_ms * 1000:>9.0f} "
+                    f"{update_ms:>10.1f} {drift:>6}"
+                )
+    finally:
+        await async_pool.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
@@ -0,0 +1,81 @@
+"""Benchmark: OFFSET pages vs cursor (keyset) pages at increasing depth.
+
+For each depth the previous page is fetched once (untimed) to obtain its
+``next_cursor``; then the same page is requested both ways and the median
+latency is reported. OFFSET cost grows with the page number, cursor cost
+should stay flat. ``--count`` selects the total-count strategy; the default
+``none`` keeps the count out of the measurement.
+
+Run from ``server/`` (``--populate`` grows the dataset first):
+
+    python -m benchmarks.pagination --populate 9 --repeat 20
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--populate", type=int, default=0, help="run populate_data.py this many times first")
+    parser.add_argument("--repeat", type=int, default=20, help="calls per depth and path")
+    parser.add_argument("--count", choices=["exact", "estimated", "cached", "none"], default="none")
+    parser.add_argument("--depths", default="1,10,100,1000,3000", help="comma-separated page numbers")
+    return parser.parse_args()
+
+
+async def timed(call, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = await call()
+        samples.append(time.perf_counter() - start)
+    return result, statistics.median(samples) * 1000
+
+
+async def main(args):
+    import main as api
+    from db import async_pool
+
+    endpoints = [
+        ("donations", api.list_donations),
+        ("videos", api.list_videos),
+        ("users", api.list_users),
+    ]
+    depths = [int(d) for d in args.depths.split(",")]
+
+    await async_pool.open(wait=True)
+    try:
+        print(f"repeat={args.repeat} count={args.count}")
+        print(f"\n{'endpoint':<10} {'page':>6} {'offset ms':>10} {'cursor ms':>10} {'speedup':>8}  match")
+        for name, route in endpoints:
+            for page in depths:
+                if page == 1:
+                    cursor = None
+                else:
+                    previous = await route(page=page - 1, count=args.count)
+                    cursor = previous["next_cursor"]
+                    if cursor is None:
+                        break
+                by_offset, offset_ms = await timed(lambda: route(page=page, count=args.count), args.repeat)
+                by_cursor, cursor_ms = await timed(lambda: route(page=page, cursor=cursor, count=args.count), args.repeat)
+                match = by_offset["items"] == by_cursor["items"]
+                print(
+                    f"{name:<10} {page:>6} {offset_ms:>10.2f} {cursor_ms:>10.2f} "
+                    f"{offset_ms / cursor_ms:>7.1f}x  {'yes' if match else 'NO'}"
+                )
+    finally:
+        await async_pool.close()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    os.environ["CACHE_ENABLED"] = "0"
+    if args.populate:
+        import populate_data
+
+        for _ in range(args.populate):
+            populate_data.populate_data()
+    asyncio.run(main(args))
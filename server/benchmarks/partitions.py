@@ -0,0 +1,130 @@
+"""Benchmark: date-filtered donation queries with and without partition pruning.
+
+``comentario`` and ``doacao`` are partitioned by the month of the comment. The
+raw (sub-day) paths of the revenue ranking, top viewers and revenue-over-time
+used to join ``doacao`` to ``comentario`` to filter on ``comentario.datah``;
+on the partitioned tables that join still reads every month of ``doacao``.
+They now filter on ``doacao.datah_comentario``, the partition key, so only
+the months in range are read. For a window of one month, one quarter and all
+time, this benchmark runs both forms of each query with
+``EXPLAIN (ANALYZE, FORMAT JSON)`` and reports the median planning and
+execution times and how many partitions the plan read. Run from ``server/``
+(after ``--populate`` rounds of ``populate_data.py``, if given):
+
+    python -m benchmarks.partitions --populate 4 --repeat 5
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import statistics
+
+JOIN = ("JOIN system_antig.comentario c ON d.id_video = c.id_video AND d.id_canal = c.id_canal "
+        "AND d.id_usuario = c.id_usuario AND d.seq_comentario = c.seq")
+
+# (name, old query with the comentario join, current query on the partition key)
+QUERIES = [
+    ("faturamento",
+     f"""SELECT d.id_canal, SUM(d.valor) as faturamento FROM system_antig.doacao d {JOIN}
+         WHERE c.datah >= %s AND c.datah <= %s GROUP BY d.id_canal ORDER BY faturamento DESC LIMIT 10""",
+     """SELECT d.id_canal, SUM(d.valor) as faturamento FROM system_antig.doacao d
+         WHERE d.datah_comentario >= %s AND d.datah_comentario <= %s GROUP BY d.id_canal ORDER BY faturamento DESC LIMIT 10"""),
+    ("top-viewers",
+     f"""SELECT d.id_usuario, COUNT(DISTINCT d.id_video), SUM(d.valor) as total FROM system_antig.doacao d {JOIN}
+         WHERE c.datah >= %s AND c.datah <= %s GROUP BY d.id_usuario ORDER BY total DESC LIMIT 10""",
+     """SELECT d.id_usuario, COUNT(DISTINCT d.id_video), SUM(d.valor) as total FROM system_antig.doacao d
+         WHERE d.datah_comentario >= %s AND d.datah_comentario <= %s GROUP BY d.id_usuario ORDER BY total DESC LIMIT 10"""),
+    ("revenue-month",
+     f"""SELECT TO_CHAR(c.datah, 'YYYY-MM') as month, SUM(d.valor) FROM system_antig.doacao d {JOIN}
+         WHERE d.status IN ('lido', 'recebido') AND c.datah >= %s AND c.datah <= %s GROUP BY month""",
+     """SELECT TO_CHAR(d.datah_comentario, 'YYYY-MM') as month, SUM(d.valor) FROM system_antig.doacao d
+         WHERE d.status IN ('lido', 'recebido') AND d.datah_comentario >= %s AND d.datah_comentario <= %s GROUP BY month"""),
+]
+
+PARTITION = re.compile(r"^(comentario|doacao)_\d{4}_\d{2}$")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--populate", type=int, default=0, help="run populate_data.py this many times first")
+    parser.add_argument("--repeat", type=int, default=5, help="EXPLAIN ANALYZE runs per query")
+    return parser.parse_args()
+
+
+def partitions_read(plan):
+    """Partitions of comentario/doacao that ``plan`` actually scanned (pruned ones never run)."""
+    found = set()
+    if PARTITION.match(plan.get("Relation Name", "")) and plan.get("Actual Loops", 0) > 0:
+        found.add(plan["Relation Name"])
+    for child in plan.get("Plans", []):
+        found |= partitions_read(child)
+    return found
+
+
+async def explain(conn, query, params, repeat):
+    planning, execution = [], []
+    for _ in range(repeat):
+        cur = await conn.execute("EXPLAIN (ANALYZE, FORMAT JSON) " + query, params)
+        plan = (await cur.fetchone())["QUERY PLAN"]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        planning.append(plan[0]["Planning Time"])
+        execution.append(plan[0]["Execution Time"])
+    return statistics.median(planning), statistics.median(execution), len(partitions_read(plan[0]["Plan"]))
+
+
+async def main(args):
+    import main as api
+    import populate_data
+    import psycopg
+    from db import async_pool, conninfo
+
+    for _ in range(args.populate):
+        await asyncio.to_thread(populate_data.populate_data)
+    async with await psycopg.AsyncConnection.connect(conninfo(), autocommit=True) as conn:
+        await conn.execute("VACUUM (ANALYZE) system_antig.comentario, system_antig.doacao")
+
+    await async_pool.open(wait=True)
+    try:
+        bounds = await api.execute_query(
+            "SELECT MIN(datah_comentario) as first, MAX(datah_comentario) as last, COUNT(*) as doacoes, "
+            "(SELECT COUNT(*) FROM system_antig.v_particoes WHERE NOT arquivada) as partitions "
+            "FROM system_antig.doacao",
+            fetch_all=False,
+        )
+        # The busiest full month, so a one-month window has data to read
+        month = (await api.execute_query(
+            "SELECT date_trunc('month', datah_comentario) as month FROM system_antig.doacao "
+            "GROUP BY 1 ORDER BY COUNT(*) DESC LIMIT 1",
+            fetch_all=False,
+        ))["month"]
+        windows = [
+            ("1 month", f"{month:%Y-%m}-01T00:00:00", None, "1 month"),
+            ("3 months", f"{month:%Y-%m}-01T00:00:00", None, "3 months"),
+            ("all", bounds["first"].isoformat(), bounds["last"].isoformat(), None),
+        ]
+
+        print(f"doacao={bounds['doacoes']} partitions (comentario + doacao)={bounds['partitions']} repeat={args.repeat}")
+        print(f"{'query':<14} {'window':<9} {'old plan':>9} {'old ms':>9} {'old parts':>10} "
+              f"{'new plan':>9} {'new ms':>9} {'new parts':>10} {'speedup':>8}")
+        async with async_pool.connection() as conn:
+            for label, start, end, length in windows:
+                if end is None:
+                    cur = await conn.execute("SELECT (%s::timestamp + %s::interval - interval '1 microsecond')::text as e",
+                                             (start, length))
+                    end = (await cur.fetchone())["e"]
+                for name, old, new in QUERIES:
+                    old_plan, old_ms, old_parts = await explain(conn, old, (start, end), args.repeat)
+                    new_plan, new_ms, new_parts = await explain(conn, new, (start, end), args.repeat)
+                    print(f"{name:<14} {label:<9} {old_plan:>9.2f} {old_ms:>9.2f} {old_parts:>10} "
+                          f"{new_plan:>9.2f} {new_ms:>9.2f} {new_parts:>10} "
+                          f"{(old_plan + old_ms) / (new_plan + new_ms):>7.1f}x")
+    finally:
+        await async_pool.close()
+
+
+if __name__ == "__main__":
+    # Measure the queries, not the result cache
+    os.environ["CACHE_ENABLED"] = "0"
+    asyncio.run(main(parse_args()))
@@ -0,0 +1,115 @@
+"""Benchmark: date-filtered rankings on doacao_diaria vs the raw doacao rows.
+
+Whole-day bounds (``2025-01-01``) are answered from the daily rollup, while a
+bound with a time of day (``2025-01-01T00:00:00``) falls back to the raw rows.
+This benchmark calls each route both ways over the same inclusive range, checks
+that the results agree and reports per-call latency.
+
+Grow the dataset first to see the gap at scale; ``--populate 9`` on top of the
+default seed gives roughly a 10x dataset. Run from ``server/``:
+
+    python -m benchmarks.rollup --populate 9 --repeat 20
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+from datetime import date, timedelta
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--populate", type=int, default=0, help="run populate_data.py this many times first")
+    parser.add_argument("--repeat", type=int, default=20, help="calls per endpoint, range and path")
+    return parser.parse_args()
+
+
+def ranges(today):
+    return [
+        ("30 days", today - timedelta(days=30), today),
+        ("90 days", today - timedelta(days=90), today),
+        ("1 year", today - timedelta(days=365), today),
+        ("since start", None, today),
+    ]
+
+
+def raw_bounds(start, end):
+    # Same inclusive range, but with a time of day so day_range() rejects it
+    return (
+        f"{start.isoformat()}T00:00:00" if start else None,
+        f"{end.isoformat()}T23:59:59.999999" if end else None,
+    )
+
+
+def rounded(rows):
+    return [{k: round(float(v), 2) if not isinstance(v, str) else v for k, v in row.items()} for row in rows]
+
+
+async def timed(call, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = await call()
+        samples.append(time.perf_counter() - start)
+    return result, statistics.median(samples) * 1000
+
+
+async def main(args):
+    import main as api
+    from db import async_pool
+
+    endpoints = [
+        ("ranking/faturamento", api.get_ranking_faturamento),
+        ("ranking/top-viewers", api.get_top_viewers),
+        ("reports/revenue-over-time", api.get_revenue_over_time),
+    ]
+
+    await async_pool.open(wait=True)
+    try:
+        counts = await api.execute_query(
+            "SELECT (SELECT COUNT(*) FROM system_antig.doacao) as doacoes, "
+            "(SELECT COUNT(*) FROM system_antig.comentario) as comentarios, "
+            "(SELECT COUNT(*) FROM system_antig.doacao_diaria) as linhas_rollup",
+            fetch_all=False,
+        )
+        channel = await api.execute_query(
+            "SELECT id_canal FROM system_antig.doacao GROUP BY id_canal ORDER BY COUNT(*) DESC LIMIT 1",
+            fetch_all=False,
+        )
+        print(
+            f"doacao={counts['doacoes']} comentario={counts['comentarios']} "
+            f"doacao_diaria={counts['linhas_rollup']} repeat={args.repeat}"
+        )
+        print(f"\n{'endpoint':<27} {'range':<12} {'channel':>7} {'raw ms':>9} {'rollup ms':>10} {'speedup':>8}  match")
+
+        for label, start, end in ranges(date.today()):
+            for channel_id in (None, channel and channel["id_canal"]):
+                for name, route in endpoints:
+                    raw_start, raw_end = raw_bounds(start, end)
+                    day_start = start.isoformat() if start else None
+                    raw, raw_ms = await timed(
+                        lambda: route(channel_id=channel_id, start_date=raw_start, end_date=raw_end), args.repeat
+                    )
+                    rolled, rollup_ms = await timed(
+                        lambda: route(channel_id=channel_id, start_date=day_start, end_date=end.isoformat()), args.repeat
+                    )
+                    match = rounded(raw) == rounded(rolled)
+                    print(
+                        f"{name:<27} {label:<12} {channel_id or '-':>7} {raw_ms:>9.2f} {rollup_ms:>10.2f} "
+                        f"{raw_ms / rollup_ms:>7.1f}x  {'yes' if match else 'NO'}"
+                    )
+    finally:
+        await async_pool.close()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    # Measure the queries, not the result cache
+    os.environ["CACHE_ENABLED"] = "0"
+    if args.populate:
+        import populate_data
+
+        for _ in range(args.populate):
+            populate_data.populate_data()
+    asyncio.run(main(args))
@@ -0,0 +1,93 @@
+"""Benchmark: /api/search typeahead latency with and without the trigram indexes.
+
+Inserts ``--users`` synthetic users (syllable nicks, unique by suffix) inside a
+transaction, ANALYZEs, then times each search query as the route builds it:
+once with the planner free to use the pg_trgm/prefix indexes and once with
+index scans disabled, which is what every keystroke cost before. The
+transaction is rolled back at the end unless ``--keep`` is given.
+
+Run from ``server/``:
+
+    python -m benchmarks.search --users 1000000
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+QUERIES = ["jo", "mar", "john", "silva", "jonh", "anabel", "x7"]
+
+GENERATE_USERS = """
+    INSERT INTO system_antig.usuario (id, nick, email, data_nasc, telefone, end_postal, id_pais)
+    SELECT base.id + g,
+           s.nick || '_' || g,
+           s.nick || '.' || g || '@example.com',
+           DATE '1980-01-01' + (g %% 12000),
+           'bench-' || g,
+           lpad((g %% 99999)::text, 5, '0'),
+           (SELECT MIN(id) FROM system_antig.pais)
+    FROM (SELECT COALESCE(MAX(id), 0) AS id FROM system_antig.usuario) base,
+         generate_series(1, %s) g,
+         LATERAL (
+             SELECT string_agg(syl[1 + floor(random() * array_length(syl, 1))::int], '') AS nick
+             FROM generate_series(1, 2 + g %% 3),
+                  (SELECT ARRAY['jo', 'hn', 'ma', 'ria', 'an', 'na', 'bel', 'sil', 'va', 'car', 'los',
+                                'lu', 'cas', 'pe', 'dro', 'ju', 'lia', 'fer', 'nan', 'da', 'mi', 'guel',
+                                'ra', 'fa', 'el', 'so', 'phi', 'ti', 'ago', 'be', 'tri', 'ze'] AS syl) a
+         ) s
+"""
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=1_000_000, help="synthetic users to insert")
+    parser.add_argument("--repeat", type=int, default=20, help="runs per query and path")
+    parser.add_argument("--keep", action="store_true", help="commit the synthetic users")
+    return parser.parse_args()
+
+
+async def timed(conn, query, params, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        cur = await conn.execute(query, params)
+        rows = await cur.fetchall()
+        samples.append(time.perf_counter() - start)
+    return rows, statistics.median(samples) * 1000
+
+
+async def main(args):
+    from db import async_pool
+    from search import SEARCH_ENTITIES
+
+    users = SEARCH_ENTITIES["users"]
+    await async_pool.open(wait=True)
+    try:
+        async with async_pool.connection() as conn:
+            started = time.perf_counter()
+            await conn.execute(GENERATE_USERS, (args.users,))
+            await conn.execute("ANALYZE system_antig.usuario")
+            total = (await (await conn.execute("SELECT COUNT(*) as n FROM system_antig.usuario")).fetchone())["n"]
+            print(f"usuario rows={total} (generated in {time.perf_counter() - started:.1f}s) repeat={args.repeat}")
+            print(f"\n{'q':<8} {'rows':>4} {'indexed ms':>11} {'seq scan ms':>12} {'speedup':>8}")
+
+            for q in QUERIES:
+                query, params = users.query(q, 10)
+                rows, indexed_ms = await timed(conn, query, params, args.repeat)
+                await conn.execute("SET LOCAL enable_indexscan = off")
+                await conn.execute("SET LOCAL enable_bitmapscan = off")
+                _, seq_ms = await timed(conn, query, params, max(1, args.repeat // 5))
+                await conn.execute("SET LOCAL enable_indexscan = on")
+                await conn.execute("SET LOCAL enable_bitmapscan = on")
+                print(f"{q:<8} {len(rows):>4} {indexed_ms:>11.2f} {seq_ms:>12.2f} {seq_ms / indexed_ms:>7.1f}x")
+
+            if args.keep:
+                await conn.commit()
+            else:
+                await conn.rollback()
+    finally:
+        await async_pool.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
@@ -0,0 +1,97 @@
+"""Benchmark: dict rows + ``jsonable_encoder`` vs tuple rows + orjson.
+
+The current path fetches one dict per row, walks the result with FastAPI's
+``jsonable_encoder`` and renders it with ``JSONResponse``. The new path
+fetches tuples into a ``Rows`` and encodes it with ``serialize.dumps``, as a
+list of objects (``records``) or one array per column (``columns``). Each
+size is timed on the same donation rows (``valor`` is numeric, ``datah`` a
+timestamp), fetch and encode separately, and the median of ``--repeat`` runs
+is reported. Both paths must produce the same JSON.
+
+Run from ``server/``:
+
+    python -m benchmarks.serialization --sizes 10,100,1000,10000 --repeat 30
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+
+QUERY = """
+    SELECT d.*, c.datah, u.nick
+    FROM system_antig.doacao d
+    JOIN system_antig.comentario c ON d.id_video = c.id_video AND d.id_canal = c.id_canal AND d.id_usuario = c.id_usuario AND d.seq_comentario = c.seq
+    JOIN system_antig.usuario u ON u.id = d.id_usuario
+    ORDER BY d.valor DESC
+    LIMIT %s
+"""
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10,100,1000,10000", help="comma-separated row counts")
+    parser.add_argument("--repeat", type=int, default=30, help="runs per size and path")
+    return parser.parse_args()
+
+
+def median_ms(samples):
+    return statistics.median(samples) * 1000
+
+
+async def measure(fetch, encode, repeat):
+    fetch_times, encode_times = [], []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = await fetch()
+        fetched = time.perf_counter()
+        body = encode(result)
+        fetch_times.append(fetched - start)
+        encode_times.append(time.perf_counter() - fetched)
+    return body, median_ms(fetch_times), median_ms(encode_times)
+
+
+async def main(args):
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+
+    import main as api
+    from db import async_pool
+    from serialize import dumps
+
+    paths = {
+        "dict+jsonable": (False, lambda rows: JSONResponse(jsonable_encoder(rows)).body),
+        "rows+orjson": (True, lambda rows: dumps(rows)),
+        "rows+orjson columns": (True, lambda rows: dumps(rows, "columns")),
+    }
+
+    await async_pool.open(wait=True)
+    try:
+        print(f"repeat={args.repeat}")
+        print(f"\n{'rows':>6}  {'path':<20} {'fetch ms':>9} {'encode ms':>10} {'total ms':>9} {'speedup':>8} {'KiB':>8}  same")
+        for size in (int(s) for s in args.sizes.split(",")):
+            baseline = reference = None
+            for name, (as_rows, encode) in paths.items():
+                body, fetch_ms, encode_ms = await measure(
+                    lambda: api.execute_query(QUERY, (size,), as_rows=as_rows), encode, args.repeat
+                )
+                total = fetch_ms + encode_ms
+                parsed = json.loads(body)
+                if baseline is None:
+                    baseline, reference = total, parsed
+                if name.endswith("columns"):
+                    # Back to records to compare with the reference
+                    parsed = [dict(zip(parsed, values)) for values in zip(*parsed.values())]
+                print(
+                    f"{size:>6}  {name:<20} {fetch_ms:>9.2f} {encode_ms:>10.2f} {total:>9.2f} "
+                    f"{baseline / total:>7.1f}x {len(body) / 1024:>8.1f}  {'yes' if parsed == reference else 'NO'}"
+                )
+    finally:
+        await async_pool.close()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    os.environ["CACHE_ENABLED"] = "0"
+    asyncio.run(main(args))
@@ -0,0 +1,582 @@
+"""End-to-end benchmark of every API route, with a regression gate.
+
+For each ``--scales`` factor the suite builds (once, or again with
+``--prepare``) a database ``system_antig_bench_sf<N>`` from ``full_setup.sql``,
+``seed_data.sql`` and a ``bulk_load.py`` dataset of that scale, then drives
+the API against it in two modes:
+
+* ``micro``  each route alone, ``--repeat`` sequential requests after a warmup.
+  Write routes run as create -> update -> delete cycles, so the data is left
+  as it was; ``POST /api/reports/refresh`` runs a tenth as often.
+* ``load``   each read route under ``--concurrency`` clients for ``--duration``
+  seconds.
+
+Requests go through the ASGI app in-process (routing, validation and
+serialization included, no network), or to a running server with ``--url``
+(needs ``httpx``; start it with ``DB_NAME=system_antig_bench_sf<N>``). The
+result cache is off unless ``--cache`` is given, so the numbers are the
+queries' cost. ``--pgdata DIR`` runs the whole thing on a throwaway cluster
+(``initdb`` + ``pg_ctl`` from ``PG_BIN`` or the ``PATH``) on ``--port``.
+
+p50/p95/p99, mean and throughput per route are written as JSON to
+``--output``. With ``--baseline``, a route whose ``--metric`` grew by more than
+``--threshold`` (and by more than ``--min-delta-ms``), or whose load-mode
+throughput fell by more than ``--threshold``, fails the run with exit code 1.
+``--save-baseline`` stores this run as the new baseline. Run from ``server/``:
+
+    python -m benchmarks.suite --scales 1,10 --save-baseline
+    python -m benchmarks.suite --scales 1,10 --baseline benchmarks/results/baseline.json
+"""
+import argparse
+import asyncio
+import json
+import math
+import multiprocessing
+import os
+import re
+import shutil
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+RESULTS_DIR = os.path.join("benchmarks", "results")
+
+# Keys the routes are called with, picked from the loaded data
+SAMPLE = """
+    WITH canal AS (
+        SELECT id, nome FROM system_antig.canal ORDER BY qtd_visualizacoes DESC, id LIMIT 1
+    ), video AS (
+        SELECT v.id_video, v.titulo FROM system_antig.video v, canal
+        WHERE v.id_canal = canal.id ORDER BY v.visu_total DESC LIMIT 1
+    ), comentario AS (
+        SELECT c.id_video, c.id_canal, c.id_usuario, c.seq, c.datah FROM system_antig.comentario c, canal
+        WHERE c.id_canal = canal.id ORDER BY c.id_video DESC, c.seq LIMIT 1
+    )
+    SELECT canal.id as channel, canal.nome as channel_name, video.id_video as video, video.titulo as video_title,
+           u.id as user_id, u.nick,
+           (SELECT MIN(nro) FROM system_antig.plataforma) as platform,
+           (SELECT MIN(nro) FROM system_antig.empresa) as company,
+           (SELECT MIN(id) FROM system_antig.pais) as country,
+           (SELECT MAX(datah)::date - 90 FROM system_antig.video) as start_date,
+           (SELECT MAX(datah)::date FROM system_antig.video) as end_date,
+           comentario.id_video as c_video, comentario.id_canal as c_channel,
+           comentario.id_usuario as c_user, comentario.seq as c_seq, comentario.datah as c_datah,
+           (SELECT COALESCE(MAX(seq_pg), 0) + 1 FROM system_antig.doacao d
+            WHERE (d.id_video, d.id_canal, d.id_usuario, d.seq_comentario)
+                = (comentario.id_video, comentario.id_canal, comentario.id_usuario, comentario.seq)) as c_seq_pg
+    FROM canal, video, comentario, system_antig.usuario u
+    WHERE u.id = comentario.id_usuario
+"""
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    group = parser.add_argument_group("data")
+    group.add_argument("--scales", default="1", help="comma-separated datagen scale factors")
+    group.add_argument("--seed", type=int, default=42)
+    group.add_argument("--prepare", action="store_true", help="rebuild the benchmark databases even if they exist")
+    group.add_argument("--workers", type=int, default=multiprocessing.cpu_count(), help="bulk_load generator processes")
+    group.add_argument("--pgdata", help="run on a throwaway cluster in this directory (created if missing)")
+    group.add_argument("--port", type=int, default=5499, help="port of the --pgdata cluster")
+    group = parser.add_argument_group("run")
+    group.add_argument("--modes", default="micro,load", help="comma-separated: micro, load")
+    group.add_argument("--routes", help="only routes whose name matches this regex")
+    group.add_argument("--repeat", type=int, default=30, help="micro: requests per route")
+    group.add_argument("--warmup", type=int, default=3, help="micro: unmeasured requests per route")
+    group.add_argument("--concurrency", type=int, default=16, help="load: concurrent clients")
+    group.add_argument("--duration", type=float, default=3.0, help="load: seconds per route")
+    group.add_argument("--cache", action="store_true", help="leave the result cache on")
+    group.add_argument("--url", help="benchmark a running server instead of the in-process app")
+    group = parser.add_argument_group("report")
+    group.add_argument("--output", default=os.path.join(RESULTS_DIR, "latest.json"))
+    group.add_argument("--baseline", help="results file to compare against")
+    group.add_argument("--save-baseline", action="store_true", help=f"also write {RESULTS_DIR}/baseline.json")
+    group.add_argument("--metric", choices=["p50_ms", "p95_ms", "p99_ms", "mean_ms"], default="p95_ms")
+    group.add_argument("--threshold", type=float, default=0.25, help="allowed relative regression")
+    group.add_argument("--min-delta-ms", type=float, default=2.0, help="ignore latency regressions smaller than this")
+    return parser.parse_args()
+
+
+# --- Routes ---
+
+def route(name, path, method="GET", params=None, body=None, load=True, **path_params):
+    return {
+        "name": name, "method": method, "path": path, "params": params or {}, "body": body,
+        "load": load, "path_params": path_params,
+    }
+
+
+def read_routes(k):
+    """Every GET route, plus the refresh; filtered variants take the slower code paths."""
+    channel = {"channel_id": k["channel"]}
+    days = {"start_date": str(k["start_date"]), "end_date": str(k["end_date"])}
+    nick = k["nick"][:4]
+    word = k["video_title"].split()[0]
+    return [
+        route("root", "/api/"),
+        route("pool", "/api/pool"),
+        route("cache", "/api/cache"),
+        route("metrics", "/metrics"),
+        route("metrics.queries", "/api/metrics/queries"),
+        route("ranking.faturamento", "/api/ranking/faturamento"),
+        route("ranking.faturamento[filtered]", "/api/ranking/faturamento", params={**channel, **days}),
+        route("ranking.videos-virais", "/api/ranking/videos-virais"),
+        route("ranking.videos-virais[channel]", "/api/ranking/videos-virais", params=channel),
+        route("ranking.streamers", "/api/ranking/streamers"),
+        route("ranking.streamers[range]", "/api/ranking/streamers", params=days),
+        route("ranking.top-viewers", "/api/ranking/top-viewers"),
+        route("ranking.top-viewers[filtered]", "/api/ranking/top-viewers", params={**channel, **days}),
+        route("search.users", "/api/search/{entity}", params={"q": nick}, entity="users"),
+        route("search.channels", "/api/search/{entity}", params={"q": k["channel_name"][:5]}, entity="channels"),
+        route("search.videos", "/api/search/{entity}", params={"q": word}, entity="videos"),
+        route("platforms.list", "/api/platforms"),
+        route("platforms.detail", "/api/platforms/{nro}", nro=k["platform"]),
+        route("users.list", "/api/users"),
+        route("users.list[q]", "/api/users", params={"q": nick}),
+        route("users.list[page]", "/api/users", params={"page": 5}),
+        route("users.detail", "/api/users/{id}", id=k["user_id"]),
+        route("channels.list", "/api/channels"),
+        route("channels.detail", "/api/channels/{id}", id=k["channel"]),
+        route("videos.list", "/api/videos"),
+        route("videos.list[channel]", "/api/videos", params=channel),
+        route("videos.detail", "/api/videos/{id_canal}/{id_video}", id_canal=k["channel"], id_video=k["video"]),
+        route("donations.list", "/api/donations"),
+        route("donations.list[q]", "/api/donations", params={"q": nick}),
+        route("reports.revenue-over-time", "/api/reports/revenue-over-time"),
+        route("reports.revenue-over-time[filtered]", "/api/reports/revenue-over-time", params={**channel, **days}),
+        route("reports.distribution-by-theme", "/api/reports/distribution-by-theme"),
+        route("reports.drilldown-performance", "/api/reports/drilldown-performance"),
+        route("reports.drilldown-performance[channel]", "/api/reports/drilldown-performance", params=channel),
+        route("dashboard", "/api/dashboard"),
+        route("dashboard[filtered]", "/api/dashboard", params={**channel, **days}),
+        route("analytics", "/api/analytics"),
+        route("analytics[channel]", "/api/analytics", params=channel),
+        route("lookup.users", "/api/lookup/{entity}", params={"q": nick[:2]}, entity="users"),
+        route("lookup.videos", "/api/lookup/{entity}", params=channel, entity="videos"),
+        route("lookup.platforms", "/api/lookup/{entity}", entity="platforms"),
+        route("companies", "/api/companies"),
+        route("countries", "/api/countries"),
+        route("export.videos[channel]", "/api/export/{entity}", params={"format": "csv", **channel}, entity="videos"),
+        route("export.comments[channel]", "/api/export/{entity}", params={"format": "ndjson", **channel}, entity="comments"),
+        route("reports.refresh.status", "/api/reports/refresh"),
+        route("reports.refresh", "/api/reports/refresh", method="POST", load=False),
+    ]
+
+
+def write_cycles(k):
+    """Create -> update -> delete per entity; ``{id}`` is the created key."""
+    platform = {"nome": "bench platform", "empresa_fund": k["company"], "empresa_respo": k["company"], "data_fund": "2020-01-01"}
+    user = {
+        "nick": "bench_user", "email": "bench@example.com", "data_nasc": "1990-01-01",
+        "telefone": "bench-0", "end_postal": "00000-000", "id_pais": k["country"],
+    }
+    channel = {
+        "nome": "bench channel", "tipo": "publico", "data": "2024-01-01", "descricao": "bench",
+        "id_streamer": k["user_id"], "nro_plataforma": k["platform"],
+    }
+    video = {
+        "id_canal": k["channel"], "titulo": "bench video", "datah": "2024-01-01 12:00:00", "tema": "Bench",
+        "duracao": 60, "visu_simul": 10, "visu_total": 1000,
+    }
+    key = {"id_video": k["c_video"], "id_canal": k["c_channel"], "id_usuario": k["c_user"], "seq_comentario": k["c_seq"]}
+    donation = {**key, "seq_pg": k["c_seq_pg"], "valor": 10.0, "status": "recebido"}
+    donation_path = "/api/donations/{id_video}/{id_canal}/{id_usuario}/{seq_comentario}/{seq_pg}/{datah_comentario}"
+    donation_key = {**key, "seq_pg": k["c_seq_pg"], "datah_comentario": k["c_datah"].isoformat()}
+    return {
+        "platforms": [
+            route("platforms.create", "/api/platforms", "POST", body=platform),
+            route("platforms.update", "/api/platforms/{nro}", "PUT", body={**platform, "nome": "bench platform 2"}, nro="{id}"),
+            route("platforms.delete", "/api/platforms/{nro}", "DELETE", nro="{id}"),
+        ],
+        "users": [
+            route("users.create", "/api/users", "POST", body=user),
+            route("users.update", "/api/users/{id}", "PUT", body={**user, "nick": "bench_user_2"}, id="{id}"),
+            route("users.delete", "/api/users/{id}", "DELETE", id="{id}"),
+        ],
+        "channels": [
+            route("channels.create", "/api/channels", "POST", body=channel),
+            route("channels.update", "/api/channels/{id}", "PUT", body={**channel, "nome": "bench channel 2"}, id="{id}"),
+            route("channels.delete", "/api/channels/{id}", "DELETE", id="{id}"),
+        ],
+        "videos": [
+            route("videos.create", "/api/videos", "POST", body=video),
+            route("videos.update", "/api/videos/{id_canal}/{id_video}", "PUT", body={**video, "visu_total": 2000},
+                  id_canal=k["channel"], id_video="{id}"),
+            route("videos.delete", "/api/videos/{id_canal}/{id_video}", "DELETE", id_canal=k["channel"], id_video="{id}"),
+        ],
+        "donations": [
+            route("donations.create", "/api/donations", "POST", body=donation),
+            route("donations.update", donation_path, "PUT", body={**donation, "status": "lido"}, **donation_key),
+            route("donations.delete", donation_path, "DELETE", **donation_key),
+        ],
+        # One-row batches: the route's overhead; benchmarks.batch_writes times larger ones
+        "videos.batch": [
+            route("videos.create[batch]", "/api/videos/batch", "POST", body=[{**video, "titulo": "bench batch video"}]),
+            route("videos.delete[batch]", "/api/videos/{id_canal}/{id_video}", "DELETE", id_canal=k["channel"], id_video="{id}"),
+        ],
+        "donations.batch": [
+            route("donations.create[batch]", "/api/donations/batch", "POST", body=[donation]),
+            route("donations.delete[batch]", donation_path, "DELETE", **donation_key),
+        ],
+    }
+
+
+def uncovered(app, specs):
+    """``METHOD /path`` of the app routes no spec exercises."""
+    covered = {(spec["method"], spec["path"]) for spec in specs}
+    missing = []
+    for r in app.routes:
+        for method in sorted(getattr(r, "methods", None) or ()):
+            if method != "HEAD" and r.path.startswith("/api/") and (method, r.path) not in covered:
+                missing.append(f"{method} {r.path}")
+    return missing
+
+
+# --- Clients ---
+
+class AppClient:
+    """Calls the ASGI app directly: the full request path minus the network."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def request(self, method, path, params=None, body=None):
+        from urllib.parse import urlencode
+
+        payload = json.dumps(body).encode() if body is not None else b""
+        headers = [(b"host", b"bench")]
+        if body is not None:
+            headers += [(b"content-type", b"application/json"), (b"content-length", str(len(payload)).encode())]
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": method,
+            "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "",
+            "query_string": urlencode(params or {}).encode(), "headers": headers,
+            "client": ("127.0.0.1", 0), "server": ("bench", 80),
+        }
+        sent = False
+        status = 500
+        chunks = []
+
+        async def receive():
+            nonlocal sent
+            if sent:
+                await asyncio.Event().wait()
+            sent = True
+            return {"type": "http.request", "body": payload, "more_body": False}
+
+        async def send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+
+        await self.app(scope, receive, send)
+        return status, b"".join(chunks)
+
+    async def close(self):
+        pass
+
+
+class HttpClient:
+    def __init__(self, url, concurrency):
+        try:
+            import httpx
+        except ImportError:
+            raise SystemExit("--url needs httpx: pip install httpx")
+        self.client = httpx.AsyncClient(
+            base_url=url, timeout=60, limits=httpx.Limits(max_connections=concurrency * 2),
+        )
+
+    async def request(self, method, path, params=None, body=None):
+        response = await self.client.request(method, path, params=params, json=body)
+        return response.status_code, response.content
+
+    async def close(self):
+        await self.client.aclose()
+
+
+# --- Measurement ---
+
+def summarize(samples, errors, elapsed=None):
+    """Latency percentiles (nearest rank) in ms, and throughput over ``elapsed`` seconds."""
+    samples = sorted(samples)
+    n = len(samples)
+
+    def pct(p):
+        return round(samples[min(n - 1, max(0, math.ceil(p * n) - 1))] * 1000, 3) if n else None
+
+    return {
+        "n": n,
+        "errors": errors,
+        "p50_ms": pct(0.50),
+        "p95_ms": pct(0.95),
+        "p99_ms": pct(0.99),
+        "mean_ms": round(sum(samples) / n * 1000, 3) if n else None,
+        "rps": round(n / (elapsed if elapsed is not None else sum(samples)), 1) if n else 0.0,
+    }
+
+
+def concrete(spec, created=None):
+    path_params = {k: created if v == "{id}" else v for k, v in spec["path_params"].items()}
+    return spec["path"].format(**path_params)
+
+
+async def timed(client, spec, created=None):
+    started = time.perf_counter()
+    status, body = await client.request(spec["method"], concrete(spec, created), spec["params"], spec["body"])
+    return time.perf_counter() - started, status, body
+
+
+async def run_micro(client, reads, cycles, args):
+    results = {}
+    for spec in reads:
+        repeat = args.repeat if spec["method"] == "GET" else max(1, args.repeat // 10)
+        for _ in range(args.warmup if spec["method"] == "GET" else 0):
+            await timed(client, spec)
+        samples, errors = [], 0
+        for _ in range(repeat):
+            elapsed, status, _ = await timed(client, spec)
+            samples.append(elapsed)
+            errors += status >= 400
+        results[spec["name"]] = summarize(samples, errors)
+        report_line(spec["name"], results[spec["name"]])
+
+    for steps in cycles.values():
+        samples = {spec["name"]: [] for spec in steps}
+        errors = dict.fromkeys(samples, 0)
+        for _ in range(args.repeat):
+            created = None
+            for spec in steps:
+                elapsed, status, body = await timed(client, spec, created)
+                samples[spec["name"]].append(elapsed)
+                errors[spec["name"]] += status >= 400
+                if created is None and status < 400:
+                    payload = json.loads(body)
+                    # Batch routes: the first row's key
+                    created = payload.get("id") or (payload.get("results") or [{}])[0].get("id_video")
+        for spec in steps:
+            results[spec["name"]] = summarize(samples[spec["name"]], errors[spec["name"]])
+            report_line(spec["name"], results[spec["name"]])
+    return results
+
+
+async def run_load(client, reads, args):
+    results = {}
+    for spec in reads:
+        if not spec["load"]:
+            continue
+        samples, errors = [], 0
+        deadline = time.perf_counter() + args.duration
+
+        async def worker():
+            nonlocal errors
+            while time.perf_counter() < deadline:
+                elapsed, status, _ = await timed(client, spec)
+                samples.append(elapsed)
+                errors += status >= 400
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        results[spec["name"]] = summarize(samples, errors, time.perf_counter() - started)
+        report_line(spec["name"], results[spec["name"]])
+    return results
+
+
+def report_header(title):
+    print(f"\n{title}")
+    print(f"  {'route':<40} {'n':>6} {'err':>4} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'req/s':>9}")
+
+
+def report_line(name, stats):
+    fmt = lambda v: f"{v:>9.2f}" if v is not None else f"{'-':>9}"
+    print(f"  {name:<40} {stats['n']:>6} {stats['errors']:>4} {fmt(stats['p50_ms'])} {fmt(stats['p95_ms'])} "
+          f"{fmt(stats['p99_ms'])} {stats['rps']:>9.1f}", flush=True)
+
+
+def measure(db_name, args):
+    """Runs in a fresh process, so ``db`` and ``cache`` pick up the benchmark settings at import."""
+    os.environ["DB_NAME"] = db_name
+    os.environ.setdefault("DB_POOL_MAX", str(max(10, args.concurrency)))
+    if not args.cache:
+        os.environ["CACHE_ENABLED"] = "0"
+    return asyncio.run(_measure(args))
+
+
+async def _measure(args):
+    import main as api
+    from db import async_pool
+
+    await async_pool.open(wait=True)
+    client = HttpClient(args.url, args.concurrency) if args.url else AppClient(api.app)
+    try:
+        async with async_pool.connection() as conn:
+            k = await (await conn.execute(SAMPLE)).fetchone()
+            server_version = (await (await conn.execute("SHOW server_version")).fetchone())["server_version"]
+            await conn.rollback()
+        reads, cycles = read_routes(k), write_cycles(k)
+        missing = uncovered(api.app, reads + [spec for steps in cycles.values() for spec in steps])
+        if missing:
+            print(f"  not covered: {', '.join(missing)}")
+        if args.routes:
+            pattern = re.compile(args.routes)
+            reads = [spec for spec in reads if pattern.search(spec["name"])]
+            cycles = {name: steps for name, steps in cycles.items() if any(pattern.search(s["name"]) for s in steps)}
+
+        results = {}
+        if "micro" in args.modes:
+            report_header(f"micro: {args.repeat} sequential requests per route")
+            results["micro"] = await run_micro(client, reads, cycles, args)
+        if "load" in args.modes:
+            report_header(f"load: {args.concurrency} clients for {args.duration:g}s per route")
+            results["load"] = await run_load(client, reads, args)
+        return {"server_version": server_version, "results": results}
+    finally:
+        await client.close()
+        await async_pool.close()
+
+
+# --- Setup ---
+
+def start_postgres(pgdata, port):
+    """Start (initializing if needed) a local cluster and point the DB_* settings at it; returns a stop function."""
+    bin_dir = os.getenv("PG_BIN")
+
+    def tool(name):
+        path = os.path.join(bin_dir, name) if bin_dir else shutil.which(name)
+        if not path or not os.path.exists(path):
+            raise SystemExit(f"{name} not found: set PG_BIN to the PostgreSQL bin directory")
+        return path
+
+    pgdata = os.path.abspath(pgdata)
+    if not os.path.exists(os.path.join(pgdata, "PG_VERSION")):
+        subprocess.run([tool("initdb"), "-D", pgdata, "-U", "postgres", "--auth=trust", "-E", "UTF8"],
+                       check=True, stdout=subprocess.DEVNULL)
+    pg_ctl = tool("pg_ctl")
+    running = subprocess.run([pg_ctl, "-D", pgdata, "status"], stdout=subprocess.DEVNULL).returncode == 0
+    if not running:
+        subprocess.run([pg_ctl, "-D", pgdata, "-l", os.path.join(pgdata, "server.log"), "-w",
+                        "-o", f"-p {port} -k {pgdata} -c listen_addresses=''", "start"],
+                       check=True, stdout=subprocess.DEVNULL)
+    os.environ.update({"DB_HOST": pgdata, "DB_PORT": str(port), "DB_USER": "postgres"})
+
+    def stop():
+        if not running:
+            subprocess.run([pg_ctl, "-D", pgdata, "-w", "-m", "fast", "stop"], check=True, stdout=subprocess.DEVNULL)
+    return stop
+
+
+def prepare_database(name, scale, args):
+    """Create ``name`` with the schema, seed data and a ``bulk_load.py`` dataset at ``scale``, unless it exists."""
+    import psycopg
+    from psycopg.conninfo import conninfo_to_dict, make_conninfo
+
+    from db import conninfo
+
+    admin = make_conninfo(**{**conninfo_to_dict(conninfo()), "dbname": "postgres"})
+    with psycopg.connect(admin, autocommit=True) as conn:
+        exists = conn.execute("SELECT 1 FROM pg_database WHERE datname = %s", (name,)).fetchone()
+        if exists and not args.prepare:
+            print(f"Using existing database {name} (--prepare rebuilds it)")
+            return
+        print(f"Building {name} at scale {scale:g}")
+        conn.execute(f'DROP DATABASE IF EXISTS "{name}" WITH (FORCE)')
+        conn.execute(f'CREATE DATABASE "{name}"')
+
+    with psycopg.connect(make_conninfo(admin, dbname=name), autocommit=True) as conn:
+        for script in ("full_setup.sql", "seed_data.sql"):
+            with open(os.path.join(ROOT, script), encoding="utf-8") as f:
+                conn.execute(f.read())
+    subprocess.run(
+        [sys.executable, "bulk_load.py", "--scale", str(scale), "--seed", str(args.seed),
+         "--workers", str(args.workers), "--drop-indexes"],
+        env={**os.environ, "DB_NAME": name}, check=True,
+    )
+
+
+def database_name(scale):
+    return f"system_antig_bench_sf{scale:g}".replace(".", "_")
+
+
+# --- Regression gate ---
+
+def compare(current, baseline, metric, threshold, min_delta_ms):
+    """Routes slower than the baseline, as (scale, mode, route, what, baseline, current)."""
+    regressions = []
+    for scale, modes in current["results"].items():
+        for mode, routes in modes.items():
+            for name, stats in routes.items():
+                base = baseline["results"].get(scale, {}).get(mode, {}).get(name)
+                if not base or stats[metric] is None or base[metric] is None:
+                    continue
+                if stats[metric] > base[metric] * (1 + threshold) and stats[metric] - base[metric] > min_delta_ms:
+                    regressions.append((scale, mode, name, metric, base[metric], stats[metric]))
+                if mode == "load" and stats["rps"] < base["rps"] * (1 - threshold):
+                    regressions.append((scale, mode, name, "rps", base["rps"], stats["rps"]))
+    return regressions
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(args):
+    args.modes = args.modes.split(",")
+    scales = [float(s) for s in args.scales.split(",")]
+    if args.url and len(scales) > 1:
+        raise SystemExit("--url benchmarks one server: give a single --scales value")
+
+    stop = start_postgres(args.pgdata, args.port) if args.pgdata else None
+    run = {
+        "meta": {
+            "started_at": datetime.now().isoformat(timespec="seconds"),
+            "revision": git_revision(),
+            "python": sys.version.split()[0],
+            "settings": {k: v for k, v in vars(args).items() if k not in ("output", "baseline", "save_baseline")},
+        },
+        "results": {},
+    }
+    try:
+        for scale in scales:
+            name = database_name(scale)
+            prepare_database(name, scale, args)
+            print(f"\n=== scale {scale:g} ({name}) ===")
+            with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context("spawn")) as executor:
+                measured = executor.submit(measure, name, args).result()
+            run["meta"]["server_version"] = measured["server_version"]
+            run["results"][f"sf{scale:g}"] = measured["results"]
+    finally:
+        if stop:
+            stop()
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(run, f, indent=2)
+    print(f"\nResults written to {args.output}")
+    if args.save_baseline:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        shutil.copyfile(args.output, os.path.join(RESULTS_DIR, "baseline.json"))
+        print(f"Baseline saved to {os.path.join(RESULTS_DIR, 'baseline.json')}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(run, baseline, args.metric, args.threshold, args.min_delta_ms)
+        print(f"\nRegression gate ({args.metric} +{args.threshold:.0%}, > {args.min_delta_ms:g} ms; "
+              f"throughput -{args.threshold:.0%}) against {args.baseline} ({baseline['meta'].get('revision')}):")
+        for scale, mode, name, what, before, after in regressions:
+            print(f"  REGRESSION {scale:<6} {mode:<6} {name:<40} {what:<7} {before:>10.2f} -> {after:>10.2f}")
+        if regressions:
+            print(f"  {len(regressions)} regression(s)")
+            sys.exit(1)
+        print("  no regressions")
+
+
+if __name__ == "__main__":
+    main(parse_args())
@@ -0,0 +1,156 @@
+"""Benchmark: API throughput from 1 to N gunicorn workers.
+
+For each worker count this starts the production server
+(``gunicorn -c gunicorn.conf.py main:app``, ``WEB_WORKERS=<n>``) on a local
+port, waits until it answers, and drives a mix of read routes (rankings,
+reports, lists and details) with ``--clients`` concurrent HTTP clients for
+``--duration`` seconds. The clients are split over ``--load-procs`` processes
+so the load generator is not the bottleneck. Every run uses the same
+``DB_CONNECTION_BUDGET``, so the pools shrink as workers are added. The result
+cache is off, so each request runs its queries. Run from ``server/`` (the
+speedup is bounded by the cores Postgres and the load generator leave free):
+
+    python -m benchmarks.workers --workers 1,2,4 --clients 64 --duration 15
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import signal
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from benchmarks.suite import summarize
+
+ROUTES = [
+    "/api/ranking/faturamento",
+    "/api/ranking/top-viewers",
+    "/api/reports/distribution-by-theme",
+    "/api/videos",
+    "/api/channels/{channel}",
+    "/api/users/{user}",
+    "/api/lookup/platforms",
+]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", default=f"1,{len(os.sched_getaffinity(0))}", help="comma-separated worker counts")
+    parser.add_argument("--clients", type=int, default=64, help="concurrent HTTP clients")
+    parser.add_argument("--duration", type=float, default=15, help="seconds of load per worker count")
+    parser.add_argument("--load-procs", type=int, default=2, help="processes generating the load")
+    parser.add_argument("--budget", type=int, default=40, help="DB_CONNECTION_BUDGET for every run")
+    parser.add_argument("--port", type=int, default=8911)
+    return parser.parse_args()
+
+
+def sample_keys():
+    from db import pool
+
+    with pool.connection() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT id FROM system_antig.canal ORDER BY qtd_visualizacoes DESC, id LIMIT 1")
+        channel = cur.fetchone()[0]
+        cur.execute("SELECT id_usuario FROM system_antig.doacao GROUP BY id_usuario ORDER BY COUNT(*) DESC LIMIT 1")
+        user = cur.fetchone()[0]
+    pool.closeall()
+    return {"channel": channel, "user": user}
+
+
+def start_server(workers, args):
+    env = {
+        **os.environ,
+        "WEB_WORKERS": str(workers),
+        "WEB_BIND": f"127.0.0.1:{args.port}",
+        "DB_CONNECTION_BUDGET": str(args.budget),
+        "CACHE_ENABLED": "0",
+        "REFRESH_SCHEDULER": "0",
+        "SLOW_QUERY_MS": "100000",
+    }
+    return subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "main:app"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+
+
+def wait_ready(url, server, timeout=30):
+    import httpx
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise SystemExit(f"gunicorn exited with code {server.returncode}")
+        try:
+            if httpx.get(f"{url}/api/pool", timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise SystemExit("gunicorn did not answer in time")
+
+
+async def drive(url, paths, clients, duration):
+    import httpx
+
+    samples, errors = [], 0
+    deadline = time.monotonic() + duration
+
+    async def client(index, http):
+        nonlocal errors
+        i = index
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            try:
+                response = await http.get(paths[i % len(paths)])
+                ok = response.status_code < 400
+            except httpx.HTTPError:
+                ok = False
+            if ok:
+                samples.append(time.perf_counter() - started)
+            else:
+                errors += 1
+            i += 1
+
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+    async with httpx.AsyncClient(base_url=url, timeout=60, limits=limits) as http:
+        await asyncio.gather(*(client(index, http) for index in range(clients)))
+    return samples, errors
+
+
+def load_proc(url, paths, clients, duration):
+    return asyncio.run(drive(url, paths, clients, duration))
+
+
+def main(args):
+    keys = sample_keys()
+    paths = [route.format(**keys) for route in ROUTES]
+    url = f"http://127.0.0.1:{args.port}"
+    per_proc = max(1, args.clients // args.load_procs)
+
+    print(f"clients={args.clients} duration={args.duration:g}s budget={args.budget} load procs={args.load_procs}")
+    print(f"{'workers':>7} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7} {'scaling':>8}")
+    base = None
+    for workers in [int(value) for value in args.workers.split(",")]:
+        server = start_server(workers, args)
+        try:
+            wait_ready(url, server)
+            # Warm every worker's pool and plans before measuring
+            load_proc(url, paths, args.clients, 2)
+            with ProcessPoolExecutor(args.load_procs, mp_context=multiprocessing.get_context("spawn")) as executor:
+                started = time.perf_counter()
+                futures = [executor.submit(load_proc, url, paths, per_proc, args.duration) for _ in range(args.load_procs)]
+                results = [future.result() for future in futures]
+                elapsed = time.perf_counter() - started
+        finally:
+            server.send_signal(signal.SIGTERM)
+            server.wait(timeout=60)
+        stats = summarize([s for samples, _ in results for s in samples], sum(e for _, e in results), elapsed)
+        base = base or stats["rps"]
+        print(f"{workers:>7} {stats['rps']:>8.1f} {stats['p50_ms']:>8.2f} {stats['p95_ms']:>8.2f} "
+              f"{stats['p99_ms']:>8.2f} {stats['errors']:>7} {stats['rps'] / base:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main(parse_args())
@@ -0,0 +1,237 @@
+"""Streaming bulk loader for the ``datagen.py`` dataset.
+
+``populate_data.py`` is meant for a demo-sized dataset; this tool is for
+load-testing at scale. Users and channels are generated and copied first,
+then the facts (videos, comments, donations and their payment rows) are
+generated in ``--workers`` processes, one chunk of videos at a time, and
+streamed by ``--loaders`` connections with ``COPY ... FROM STDIN`` (CSV or
+binary) while the workers keep generating the next ones. The dataset options
+(``--scale``, ``--seed``, skews, payment mix, ``--config``...) are those of
+``datagen.py``; the same options on the same starting database load the same
+rows.
+
+Keys continue after the current ``MAX`` of each key column, read once up
+front. During the load the user triggers on the fact tables are disabled and
+the derived data (channel view counts, incremental aggregates, daily donation
+rollup, materialized views) is rebuilt once at the end. ``--drop-indexes``
+also drops the secondary indexes first and recreates them in parallel
+afterwards. Writes made through the API while the load runs are covered by
+that final rebuild.
+
+Run from ``server/``:
+
+    python bulk_load.py --scale 200 --channel-skew 1.2 --workers 8 --loaders 4 --drop-indexes
+"""
+import argparse
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import psycopg
+
+import datagen
+from datagen import COLUMNS, DIMENSIONS, FACTS
+from db import conninfo
+
+# Wire types for binary COPY; enums travel as their text label
+BINARY_TYPES = {
+    "usuario": ("int4", "text", "text", "date", "text", "text", "int4"),
+    "canal": ("int4", "text", "text", "date", "text", "int4", "int4"),
+    "video": ("int4", "int4", "text", "timestamp", "text", "int4", "int4", "int8"),
+    "comentario": ("int4", "int4", "int4", "int4", "text", "timestamp", "bool"),
+    "doacao": ("int4", "int4", "int4", "int4", "int4", "numeric", "text", "timestamp"),
+    "bitcoin": ("int4", "int4", "int4", "int4", "int4", "text", "timestamp"),
+    "paypal": ("int4", "int4", "int4", "int4", "int4", "text", "timestamp"),
+    "cartaocredito": ("int4", "int4", "int4", "int4", "int4", "text", "text", "timestamp"),
+    "mecanismoplat": ("int4", "int4", "int4", "int4", "int4", "int4", "timestamp"),
+}
+
+# Current key maxima; generated ids start right after them
+OFFSETS = """
+    SELECT (SELECT COALESCE(MAX(id), 0) FROM system_antig.usuario) as usuario,
+           (SELECT COALESCE(MAX(id), 0) FROM system_antig.canal) as canal,
+           (SELECT COALESCE(MAX(id_video), 0) FROM system_antig.video) as video,
+           (SELECT COALESCE(MAX(seq_plataforma), 0) FROM system_antig.mecanismoplat) as seq_plataforma
+"""
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    datagen.add_arguments(parser)
+    group = parser.add_argument_group("loading")
+    group.add_argument("--workers", type=int, default=multiprocessing.cpu_count(), help="generator processes")
+    group.add_argument("--loaders", type=int, default=4, help="parallel COPY connections")
+    group.add_argument("--format", choices=["csv", "binary"], default="csv", help="COPY format")
+    group.add_argument("--drop-indexes", action="store_true", help="drop secondary indexes during the load")
+    group.add_argument("--skip-rebuild", action="store_true", help="leave derived data and MVs stale (rebuild later)")
+    return parser.parse_args()
+
+
+# --- Loading (threads in the main process) ---
+
+class Loader:
+    """COPYs chunks over one connection per thread and keeps per-table counters."""
+
+    def __init__(self, fmt):
+        self.format = fmt
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+        self.rows = dict.fromkeys(COLUMNS, 0)
+        self.seconds = dict.fromkeys(COLUMNS, 0.0)
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = psycopg.connect(conninfo())
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def load(self, chunk):
+        """COPY ``{table: (count, payload)}`` in one transaction, tables in the chunk's (foreign-key) order."""
+        conn = self._connection()
+        timings = {}
+        with conn.transaction():
+            cur = conn.cursor()
+            for table, (count, payload) in chunk.items():
+                started = time.perf_counter()
+                sql = f"COPY system_antig.{table} ({', '.join(COLUMNS[table])}) FROM STDIN (FORMAT {self.format.upper()})"
+                with cur.copy(sql) as copy:
+                    if self.format == "csv":
+                        copy.write(payload)
+                    else:
+                        copy.set_types(BINARY_TYPES[table])
+                        for row in payload:
+                            copy.write_row(row)
+                timings[table] = (count, time.perf_counter() - started)
+        with self._lock:
+            for table, (count, seconds) in timings.items():
+                self.rows[table] += count
+                self.seconds[table] += seconds
+
+    def close(self):
+        for conn in self._connections:
+            conn.close()
+
+
+# --- Orchestration ---
+
+def secondary_indexes(conn):
+    """Indexes on the loaded tables that no constraint depends on, as (name, definition)."""
+    indexes = conn.execute("""
+        SELECT i.indexrelid::regclass::text, pg_get_indexdef(i.indexrelid)
+        FROM pg_index i
+        WHERE i.indrelid = ANY(%s::regclass[])
+          AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = i.indexrelid)
+        ORDER BY 1
+    """, ([f"system_antig.{table}" for table in FACTS],)).fetchall()
+    # A partitioned table's index is defined ON ONLY the parent; recreated that way it would skip the partitions
+    return [(name, definition.replace(" ON ONLY ", " ON ", 1)) for name, definition in indexes]
+
+
+def step(label, func, *args):
+    started = time.perf_counter()
+    func(*args)
+    print(f"  {label:<48} {time.perf_counter() - started:>8.1f}s")
+
+
+def encode(fmt, rows):
+    return len(rows), datagen.to_csv(rows) if fmt == "csv" else rows
+
+
+def generate_binary_chunk(index):
+    index, chunk = datagen.generate_chunk(index)
+    return index, {table: (len(rows), rows) for table, rows in chunk.items()}
+
+
+def run_sql(sql):
+    with psycopg.connect(conninfo(), autocommit=True) as conn:
+        conn.execute(sql)
+
+
+def main(args):
+    config = datagen.config_from_args(args)
+    with psycopg.connect(conninfo(), autocommit=True) as conn:
+        offsets = conn.execute(OFFSETS).fetchone()
+        offsets = dict(zip(("usuario", "canal", "video", "seq_plataforma"), offsets))
+        for table, key, ids in (("pais", "id", config["countries"]), ("plataforma", "nro", config["platforms"])):
+            found = {r[0] for r in conn.execute(f"SELECT {key} FROM system_antig.{table} WHERE {key} = ANY(%s)", (ids,))}
+            if missing := sorted(set(ids) - found):
+                raise SystemExit(f"Load the seed data first: {table} {missing} not found.")
+        indexes = secondary_indexes(conn) if args.drop_indexes else []
+
+        dataset = datagen.Dataset(config, offsets)
+        print(
+            f"users={dataset.users} channels={dataset.channels} videos={dataset.videos} "
+            f"from id_video={dataset.first_video} seed={dataset.seed}"
+        )
+        print(f"format={args.format} workers={args.workers} loaders={args.loaders} chunk={dataset.chunk}")
+        print("\nPreparing:")
+        # comentario and doacao are partitioned by month: every month of the dataset needs its partitions
+        step("create monthly partitions", conn.execute, "CALL system_antig.sp_criar_particoes(%s, %s)", dataset.period)
+        for table in FACTS:
+            step(f"disable triggers on {table}", conn.execute, f"ALTER TABLE system_antig.{table} DISABLE TRIGGER USER")
+        for name, _ in indexes:
+            step(f"drop {name}", conn.execute, f"DROP INDEX {name}")
+
+    loader = Loader(args.format)
+    generate = datagen.generate_chunk_csv if args.format == "csv" else generate_binary_chunk
+    # At most two chunks per loader wait in memory; generation pauses beyond that
+    in_flight = threading.BoundedSemaphore(args.loaders * 2)
+
+    started = time.perf_counter()
+    try:
+        # Users and channels go in first, with their triggers on: the facts reference them
+        dimensions = dataset.dimension_rows()
+        loader.load({table: encode(args.format, dimensions[table]) for table in DIMENSIONS})
+        with multiprocessing.Pool(args.workers, datagen.init_worker, (dataset,)) as workers, \
+                ThreadPoolExecutor(args.loaders) as loaders:
+            futures = []
+            failed = threading.Event()
+
+            def done(future):
+                if future.exception():
+                    failed.set()
+                in_flight.release()
+
+            for _, chunk in workers.imap_unordered(generate, range(dataset.chunks)):
+                in_flight.acquire()
+                if failed.is_set():
+                    break
+                future = loaders.submit(loader.load, chunk)
+                future.add_done_callback(done)
+                futures.append(future)
+            for future in futures:
+                future.result()
+    finally:
+        elapsed = time.perf_counter() - started
+        loader.close()
+        total = sum(loader.rows.values())
+        print(f"\nLoaded {total} rows in {elapsed:.1f}s ({total / elapsed:.0f} rows/s overall):")
+        print(f"  {'table':<14} {'rows':>12} {'copy s':>9} {'rows/s/conn':>12}")
+        for table in COLUMNS:
+            seconds = loader.seconds[table]
+            rate = loader.rows[table] / seconds if seconds else 0
+            print(f"  {table:<14} {loader.rows[table]:>12} {seconds:>9.1f} {rate:>12.0f}")
+
+        print("\nRestoring:")
+        with ThreadPoolExecutor(args.loaders) as builders:
+            list(builders.map(lambda index: step(f"create {index[0]}", run_sql, index[1]), indexes))
+        for table in FACTS:
+            step(f"enable triggers on {table}", run_sql, f"ALTER TABLE system_antig.{table} ENABLE TRIGGER USER")
+        # Not optional like the rebuilds below: it enforces the comment keys and donations look comments up in it
+        step("comment keys", run_sql, "CALL system_antig.sp_reconstruir_comentario_chave()")
+        if not args.skip_rebuild:
+            step("channel view counts", run_sql,
+                 "SELECT system_antig.fn_recalcular_qtd_visualizacoes(ARRAY(SELECT id FROM system_antig.canal))")
+            step("incremental aggregates", run_sql, "CALL system_antig.sp_reconstruir_agregados()")
+            step("daily donation rollup", run_sql, "CALL system_antig.sp_reconstruir_doacao_diaria()")
+            step("materialized views", run_sql, "CALL system_antig.sp_refresh_views_analiticas()")
+        step("key sequences", run_sql, "CALL system_antig.sp_sincronizar_sequencias()")
+        step("analyze", run_sql, f"ANALYZE {', '.join(f'system_antig.{table}' for table in COLUMNS)}")
+
+
+if __name__ == "__main__":
+    main(parse_args())
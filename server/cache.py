@@ -0,0 +1,276 @@
+import functools
+import hashlib
+import inspect
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from dotenv import load_dotenv
+
+from serialize import dumps, pack, unpack
+
+load_dotenv()
+
+
+# Pseudo-table every entry depends on; bumping it drops the whole cache.
+ALL = "*"
+# Pseudo-table bumped by every write. No key includes it: it counts the writes a
+# read replica must have replayed before its rows may be cached (see replicas.py).
+WRITES = "#writes"
+
+
+def encode(value):
+    # The encoding the API responds with, so a shared-backend hit returns
+    # exactly what a miss would have.
+    return dumps(value)
+
+
+def normalize(value):
+    """Canonical form of a filter value, so equivalent requests share a key."""
+    if isinstance(value, str):
+        value = value.strip()
+        try:
+            parsed = datetime.fromisoformat(value)
+        except ValueError:
+            return value
+        if parsed.time() == datetime.min.time() and len(value) <= 10:
+            return parsed.date().isoformat()
+        return parsed.isoformat()
+    return value
+
+
+class MemoryBackend:
+    """Process-local LRU with per-entry TTL and a byte budget."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (expires_at, size, tables, value)
+        self._versions = {}
+        # Table versions start over with the process; this tells them apart from a previous run's
+        self.epoch = os.urandom(4).hex()
+        self._bytes = 0
+        self._records = {}  # name -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.expirations = 0
+
+    async def versions(self, tables):
+        return [self._versions.get(t, 0) for t in tables]
+
+    async def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                self._drop(key)
+                self.expirations += 1
+                return None
+            self._entries.move_to_end(key)
+            return entry[3]
+
+    async def set(self, key, value, ttl, tables):
+        size = len(encode(value)) + len(key)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (time.monotonic() + ttl, size, tables, value)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    async def invalidate(self, tables):
+        with self._lock:
+            for table in (WRITES, *tables):
+                self._versions[table] = self._versions.get(table, 0) + 1
+            if ALL in tables:
+                stale = list(self._entries)
+            else:
+                stale = [k for k, entry in self._entries.items() if entry[2] & tables]
+            for key in stale:
+                self._drop(key)
+            return len(stale)
+
+    # Records: small state the workers share (refresh jobs, see refresh.py), kept apart
+    # from the entries, so neither evicted for space nor dropped by an invalidation
+    async def put_record(self, name, value, ttl):
+        with self._lock:
+            now = time.monotonic()
+            self._records = {k: entry for k, entry in self._records.items() if entry[0] >= now}
+            self._records[name] = (now + ttl, value)
+
+    async def get_record(self, name):
+        entry = self._records.get(name)
+        return entry[1] if entry and entry[0] >= time.monotonic() else None
+
+    def _drop(self, key):
+        entry = self._entries.pop(key)
+        self._bytes -= entry[1]
+
+    def stats(self):
+        return {
+            "backend": "memory",
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+class RedisBackend:
+    """Shared cache for several workers or hosts.
+
+    Entries expire through Redis TTLs; the byte budget and LRU eviction are
+    Redis' own (``maxmemory`` + ``maxmemory-policy allkeys-lru``). Table
+    versions live in Redis too, so a write handled by one worker invalidates
+    the entries every other worker would read.
+    """
+
+    def __init__(self, url, prefix="sd1"):
+        import redis.asyncio as redis
+
+        self._redis = redis.from_url(url)
+        self.prefix = prefix
+        # Versions are shared and outlive the process
+        self.epoch = prefix
+
+    async def versions(self, tables):
+        if not tables:
+            return []
+        values = await self._redis.mget([f"{self.prefix}:ver:{t}" for t in tables])
+        return [int(v or 0) for v in values]
+
+    async def get(self, key):
+        raw = await self._redis.get(f"{self.prefix}:cache:{key}")
+        return None if raw is None else unpack(raw)
+
+    async def set(self, key, value, ttl, tables):
+        await self._redis.set(f"{self.prefix}:cache:{key}", pack(value), ex=max(int(ttl), 1))
+
+    async def put_record(self, name, value, ttl):
+        await self._redis.set(f"{self.prefix}:record:{name}", pack(value), ex=max(int(ttl), 1))
+
+    async def get_record(self, name):
+        raw = await self._redis.get(f"{self.prefix}:record:{name}")
+        return None if raw is None else unpack(raw)
+
+    async def invalidate(self, tables):
+        async with self._redis.pipeline(transaction=False) as pipe:
+            # WRITES first: whoever sees a table's new version sees the new count too
+            for table in (WRITES, *tables):
+                pipe.incr(f"{self.prefix}:ver:{table}")
+            await pipe.execute()
+        return 0
+
+    def stats(self):
+        return {"backend": "redis"}
+
+
+class ResultCache:
+    """Caches endpoint results keyed by endpoint name + normalized filters.
+
+    Every cached endpoint declares the tables it reads. The current version of
+    those tables is part of the key, so ``invalidate("doacao")`` makes every
+    entry that depends on ``doacao`` unreachable at once, for all workers
+    sharing the backend.
+    """
+
+    def __init__(self, backend, ttl, enabled=True):
+        self.backend = backend
+        self.ttl = ttl
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        # Highest WRITES count this worker has seen, from its own writes or any version lookup
+        self.writes = 0
+
+    async def versions(self, tables):
+        """Current versions of ``tables``, noting the write count read along with them."""
+        *versions, writes = await self.backend.versions([*tables, WRITES])
+        self.writes = max(self.writes, writes)
+        return versions
+
+    async def make_key(self, endpoint, arguments, tables):
+        filters = {k: normalize(v) for k, v in sorted(arguments.items()) if v is not None}
+        versions = await self.versions(sorted(tables) + [ALL])
+        raw = json.dumps([endpoint, filters, versions], default=str, separators=(",", ":"))
+        return f"{endpoint}:{hashlib.sha1(raw.encode()).hexdigest()}"
+
+    async def memoize(self, name, arguments, tables, compute, ttl=None):
+        """Return the cached value of ``name`` for ``arguments``, awaiting ``compute()`` on a miss."""
+        if not self.enabled:
+            return await compute()
+        tables = frozenset(tables)
+        key = await self.make_key(name, arguments, tables)
+        value = await self.backend.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+        self.misses += 1
+        value = await compute()
+        await self.backend.set(key, value, ttl or self.ttl, tables)
+        return value
+
+    def cached(self, *tables, ttl=None):
+        def decorator(func):
+            signature = inspect.signature(func)
+
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return await func(*args, **kwargs)
+                bound = signature.bind(*args, **kwargs)
+                bound.apply_defaults()
+                return await self.memoize(
+                    func.__name__, bound.arguments, tables, lambda: func(*args, **kwargs), ttl
+                )
+
+            wrapper.tables = frozenset(tables)
+            return wrapper
+
+        return decorator
+
+    async def invalidate(self, *tables):
+        self.invalidations += 1
+        dropped = await self.backend.invalidate(frozenset(tables))
+        await self.versions(())
+        return dropped
+
+    async def clear(self):
+        self.invalidations += 1
+        dropped = await self.backend.invalidate(frozenset([ALL]))
+        await self.versions(())
+        return dropped
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "invalidations": self.invalidations,
+            **self.backend.stats(),
+        }
+
+
+def _build_backend():
+    if os.getenv("CACHE_BACKEND", "memory") == "redis":
+        return RedisBackend(os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+    return MemoryBackend(int(os.getenv("CACHE_MAX_BYTES", str(64 * 1024 * 1024))))
+
+
+result_cache = ResultCache(
+    _build_backend(),
+    ttl=float(os.getenv("CACHE_TTL", "60")),
+    enabled=os.getenv("CACHE_ENABLED", "1") != "0",
+)
@@ -0,0 +1,33 @@
+import argparse
+import sys
+
+from db import pool
+
+
+def check_aggregates(repair=False):
+    with pool.connection() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT * FROM system_antig.f_verificar_agregados()")
+        diffs = cur.fetchall()
+
+        if not diffs:
+            print("Aggregates are consistent with a full recompute.")
+            return 0
+
+        print(f"{len(diffs)} divergence(s) found:")
+        for tabela, chave, coluna, esperado, atual in diffs:
+            print(f"  {tabela}[{chave}].{coluna}: expected {esperado}, got {atual}")
+
+        if repair:
+            print("Rebuilding aggregates...")
+            cur.execute("CALL system_antig.sp_reconstruir_agregados()")
+            conn.commit()
+            print("Done.")
+            return 0
+        return 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the incremental aggregates against a full recompute.")
+    parser.add_argument("--repair", action="store_true", help="rebuild the aggregates when they diverge")
+    sys.exit(check_aggregates(parser.parse_args().repair))
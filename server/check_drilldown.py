@@ -0,0 +1,98 @@
+import argparse
+import sys
+
+from db import pool
+from main import drilldown_performance_query
+
+# Straightforward per-entity subqueries: slow, but with no joins to fan out
+REFERENCE_CHANNELS = """
+    SELECT
+        c.nome as entity_name,
+        (SELECT COUNT(*) FROM system_antig.video v WHERE v.id_canal = c.id {range}) as total_items,
+        (SELECT SUM(v.visu_total) FROM system_antig.video v WHERE v.id_canal = c.id {range}) as total_views,
+        (SELECT COALESCE(SUM(d.valor), 0)
+         FROM system_antig.doacao d
+         JOIN system_antig.video v ON v.id_video = d.id_video AND v.id_canal = d.id_canal
+         WHERE d.id_canal = c.id AND d.status IN ('lido', 'recebido') {range}) as total_revenue
+    FROM system_antig.canal c
+    WHERE %(all)s OR EXISTS (SELECT 1 FROM system_antig.video v WHERE v.id_canal = c.id {range})
+"""
+
+REFERENCE_VIDEOS = """
+    SELECT
+        v.titulo as entity_name,
+        v.visu_total as total_views,
+        v.visu_simul as peak_views,
+        (SELECT COALESCE(SUM(d.valor), 0)
+         FROM system_antig.doacao d
+         WHERE d.id_video = v.id_video AND d.id_canal = v.id_canal
+           AND d.status IN ('lido', 'recebido')) as total_revenue
+    FROM system_antig.video v
+    WHERE v.id_canal = %(channel)s {range}
+"""
+
+# A whole-day end bound takes in all of that day
+RANGE = (
+    " AND v.datah >= COALESCE(%(start)s::timestamp, '-infinity')"
+    " AND (%(end)s::text IS NULL OR CASE WHEN length(%(end)s::text) = 10 THEN v.datah < %(end)s::date + 1"
+    " ELSE v.datah <= %(end)s::timestamp END)"
+)
+
+
+def cases(cur):
+    cur.execute(
+        "SELECT id_canal FROM system_antig.video GROUP BY id_canal ORDER BY COUNT(*) DESC LIMIT 2"
+    )
+    channels = [None] + [row[0] for row in cur.fetchall()]
+    cur.execute("SELECT MIN(datah), MAX(datah) FROM system_antig.video")
+    first, last = cur.fetchone()
+    ranges = [(None, None)]
+    if first is not None:
+        middle = first + (last - first) / 2
+        ranges += [(str(first), str(middle)), (str(middle), None), (None, str(middle)), (None, str(middle.date()))]
+    return [(channel, start, end) for channel in channels for start, end in ranges]
+
+
+def check_drilldown():
+    with pool.connection() as conn:
+        cur = conn.cursor()
+        failures = 0
+        checked = cases(cur)
+        for channel, start, end in checked:
+            cur.execute(*drilldown_performance_query(channel, start, end))
+            rows = cur.fetchall()
+            reference = REFERENCE_VIDEOS if channel else REFERENCE_CHANNELS
+            cur.execute(
+                reference.format(range=RANGE),
+                {"channel": channel, "start": start, "end": end, "all": start is None and end is None},
+            )
+            expected = cur.fetchall()
+
+            label = f"channel={channel or '-'} start={start or '-'} end={end or '-'}"
+            revenue = [row[-1] for row in rows]
+            if sorted(rows) != sorted(expected):
+                failures += 1
+                missing = set(expected) - set(rows)
+                extra = set(rows) - set(expected)
+                print(f"  {label}: {len(missing)} row(s) differ from the reference")
+                for row in sorted(missing)[:5]:
+                    print(f"    expected {row}")
+                for row in sorted(extra)[:5]:
+                    print(f"    got      {row}")
+            elif revenue != sorted(revenue, reverse=True):
+                failures += 1
+                print(f"  {label}: rows are not ordered by total_revenue")
+        conn.rollback()
+
+    if failures:
+        print(f"{failures} of {len(checked)} drilldown case(s) diverge from the reference.")
+        return 1
+    print(f"drilldown-performance matches the reference in all {len(checked)} case(s).")
+    return 0
+
+
+if __name__ == "__main__":
+    argparse.ArgumentParser(
+        description="Compare the drilldown-performance report against a per-entity recompute."
+    ).parse_args()
+    sys.exit(check_drilldown())
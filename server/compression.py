@@ -0,0 +1,137 @@
+"""gzip / brotli compression of API responses.
+
+Bodies of at least ``COMPRESS_MIN_BYTES`` with a text-like content type
+(JSON, NDJSON, CSV, text) are compressed with brotli when the client accepts
+``br`` (the ``brotli`` package is in requirements.txt; without it only gzip
+is offered), and with gzip otherwise. Smaller bodies are sent as they are: below about a
+kilobyte the headers outweigh the saving. Streamed responses (the exports)
+are compressed chunk by chunk, each chunk flushed so the client receives it
+at once. Every response that could be compressed carries
+``Vary: Accept-Encoding``, so shared caches keep one copy per encoding.
+
+The levels favour speed (gzip 6, brotli quality 4): a ranking or list body
+compresses in well under a millisecond, a 1.5 MB page of 10k rows in ~10 ms.
+"""
+import os
+import zlib
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 4
+
+COMPRESSIBLE = (b"application/json", b"application/x-ndjson", b"text/")
+
+
+def accepted_encoding(accept_encoding):
+    """``br``, ``gzip`` or None for an ``Accept-Encoding`` header value, honouring ``q=0``."""
+    accepted = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[name.strip().lower()] = quality
+    for encoding in ("br", "gzip"):
+        if encoding == "br" and brotli is None:
+            continue
+        if accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return None
+
+
+class _Compressor:
+    def __init__(self, encoding):
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=BROTLI_QUALITY)
+        else:
+            self._brotli = None
+            self._zlib = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def chunk(self, data):
+        """Compressed ``data``, flushed so it can be decoded on arrival."""
+        if self._brotli:
+            return self._brotli.process(data) + self._brotli.flush()
+        return self._zlib.compress(data) + self._zlib.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data=b""):
+        if self._brotli:
+            return self._brotli.process(data) + self._brotli.finish()
+        return self._zlib.compress(data) + self._zlib.flush()
+
+
+def _vary(headers):
+    for i, (name, value) in enumerate(headers):
+        if name.lower() == b"vary":
+            if b"accept-encoding" not in value.lower():
+                headers[i] = (name, value + b", Accept-Encoding")
+            return
+    headers.append((b"vary", b"Accept-Encoding"))
+
+
+class CompressionMiddleware:
+    """Compresses text-like responses of at least ``COMPRESS_MIN_BYTES`` with brotli or gzip."""
+
+    def __init__(self, app, minimum_size=COMPRESS_MIN_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        accept = b",".join(value for name, value in scope["headers"] if name == b"accept-encoding")
+        encoding = accepted_encoding(accept.decode("latin-1"))
+        start = None
+        compressor = None
+
+        async def send_compressed(message):
+            nonlocal start, compressor
+            if message["type"] == "http.response.start":
+                headers = message.get("headers", [])
+                content_type = next((v for k, v in headers if k.lower() == b"content-type"), b"")
+                encoded = any(k.lower() == b"content-encoding" for k, _ in headers)
+                if message["status"] == 304:
+                    # Carries the headers the full response would have had
+                    headers = list(headers)
+                    _vary(headers)
+                    return await send({**message, "headers": headers})
+                if encoded or not content_type.startswith(COMPRESSIBLE):
+                    return await send(message)
+                # Held back until the first body chunk tells whether (and how) to compress
+                start = {**message, "headers": list(headers)}
+                _vary(start["headers"])
+                return
+            if message["type"] != "http.response.body" or start is None:
+                return await send(message)
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if compressor is None:
+                headers = start["headers"]
+                if encoding is None or (not more_body and len(body) < self.minimum_size):
+                    await send(start)
+                    start = None
+                    return await send(message)
+                compressor = _Compressor(encoding)
+                headers[:] = [(k, v) for k, v in headers if k.lower() != b"content-length"]
+                headers.append((b"content-encoding", encoding.encode()))
+                if not more_body:
+                    body = compressor.finish(body)
+                    headers.append((b"content-length", str(len(body)).encode()))
+                    await send(start)
+                    return await send({**message, "body": body})
+                await send(start)
+            await send({**message, "body": compressor.chunk(body) if more_body else compressor.finish(body)})
+
+        await self.app(scope, receive, send_compressed)
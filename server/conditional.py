@@ -0,0 +1,51 @@
+"""ETags for the JSON read routes, answered without touching the database.
+
+A route's ETag is derived from what its result depends on, not from the
+result itself: the route, its normalized arguments and the result-cache
+version of every table it reads (see ``cache.py``). Writes through the API
+already bump those versions (``result_cache.invalidate``), and refreshing the
+materialized views bumps all of them (``result_cache.clear``), so a request
+whose ``If-None-Match`` still matches is answered ``304`` after one version
+lookup in the cache backend (memory or Redis), before any query runs.
+
+The tag is computed before the route's queries run, so it never claims data
+newer than what the body holds. Writes made outside the API (psql, the bulk
+loaders) do not bump a version; the tag also changes every ``ETAG_TTL``
+seconds, which bounds how long those go unnoticed, as ``CACHE_TTL`` does for
+the result cache. With the in-process memory backend, versions restart with
+the process and differ per worker, so the tag includes a per-process epoch:
+revalidations against another worker get a full response instead of a wrong
+``304``. ``CACHE_BACKEND=redis`` shares versions, and thus tags, between
+workers.
+"""
+import hashlib
+import json
+import os
+import time
+
+from cache import ALL, normalize, result_cache
+
+ETAG_TTL = float(os.getenv("ETAG_TTL", "60"))
+
+# Browsers (and nginx, see client/nginx.conf) may keep a copy but must revalidate it
+CACHE_CONTROL = "no-cache"
+
+
+async def etag(name, arguments, tables):
+    """Weak ETag of ``name`` called with ``arguments``, reading ``tables``."""
+    versions = await result_cache.versions(sorted(tables) + [ALL])
+    filters = {k: normalize(v) for k, v in sorted(arguments.items()) if v is not None}
+    window = int(time.time() // ETAG_TTL) if ETAG_TTL > 0 else 0
+    raw = json.dumps([name, filters, versions, result_cache.backend.epoch, window], default=str, separators=(",", ":"))
+    # Weak: the same tag covers the identity, gzip and brotli encodings of the body
+    return f'W/"{hashlib.sha1(raw.encode()).hexdigest()[:24]}"'
+
+
+def matches(if_none_match, etag):
+    """Whether an ``If-None-Match`` header value matches ``etag`` (weak comparison)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    tag = etag.removeprefix("W/")
+    return tag in (candidate.strip().removeprefix("W/") for candidate in if_none_match.split(","))
@@ -0,0 +1,337 @@
+"""Parametric, reproducible dataset generator for scale benchmarking.
+
+Generates users, channels, videos, comments, donations and the donation
+payment rows (``bitcoin``, ``paypal``, ``cartaocredito``, ``mecanismoplat``)
+from a config: sizes per unit of ``scale``, Zipfian popularity of channels
+(which ones get the videos) and of users (who comments and donates),
+time-of-day / weekday / month weights for timestamps, and the status and
+payment-method mix of donations.
+
+The same config and seed always give the same rows. Facts are generated in
+chunks of ``chunk`` videos, each chunk from its own seed, so the result does
+not depend on how many processes generate it. Ids start right after the
+``offsets`` they are given (the current ``MAX`` of each key in the target
+database, or 0 for files); load into the same starting state to reproduce a run exactly.
+
+Write CSV files (plus ``manifest.json`` and a ``load.sql`` for psql)::
+
+    python datagen.py --scale 10 --seed 7 --out ../data/sf10
+
+or load the database through ``bulk_load.py``, which takes the same options.
+Options can also come from a JSON file (``--config``); command-line values
+win over it, and it wins over the defaults.
+"""
+import argparse
+import bisect
+import csv
+import hashlib
+import io
+import itertools
+import json
+import multiprocessing
+import os
+import random
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+DEFAULTS = {
+    "seed": 42,
+    "scale": 1.0,
+    # Sizes at scale 1
+    "users": 2_000,
+    "channels": 50,
+    "videos": 5_000,
+    "comments_per_video": 10,
+    "donation_rate": 0.3,
+    # Zipf exponents: 0 is uniform, ~1 puts most of the activity on a few channels / users
+    "channel_skew": 1.1,
+    "donor_skew": 1.0,
+    "start": "2024-01-01",
+    "days": 730,
+    # Relative weights, hour 0-23, Monday-Sunday and January-December
+    "hourly": [2, 1, 1, 1, 1, 1, 2, 3, 4, 5, 5, 6, 7, 7, 7, 8, 9, 11, 13, 15, 16, 14, 9, 4],
+    "weekday": [8, 8, 9, 9, 12, 15, 14],
+    "monthly": [11, 8, 8, 8, 8, 9, 12, 11, 8, 9, 9, 12],
+    "status_mix": {"lido": 60, "recebido": 30, "recusado": 10},
+    "payment_mix": {"cartaoCredito": 50, "paypal": 25, "mecanismoPlat": 20, "bitcoin": 5},
+    # Existing rows the generated users and channels point to (seed_data.sql)
+    "countries": [1, 2, 3],
+    "platforms": [10, 11],
+    "chunk": 2_000,
+}
+
+COLUMNS = {
+    "usuario": ("id", "nick", "email", "data_nasc", "telefone", "end_postal", "id_pais"),
+    "canal": ("id", "nome", "tipo", "data", "descricao", "id_streamer", "nro_plataforma"),
+    "video": ("id_video", "id_canal", "titulo", "datah", "tema", "duracao", "visu_simul", "visu_total"),
+    "comentario": ("id_video", "id_canal", "id_usuario", "seq", "texto", "datah", "coment_on"),
+    "doacao": ("id_video", "id_canal", "id_usuario", "seq_comentario", "seq_pg", "valor", "status", "datah_comentario"),
+    "bitcoin": ("id_video", "id_canal", "id_usuario", "seq_comentario", "seq_doacao", "txid", "datah_comentario"),
+    "paypal": ("id_video", "id_canal", "id_usuario", "seq_comentario", "seq_doacao", "idpaypal", "datah_comentario"),
+    "cartaocredito": ("id_video", "id_canal", "id_usuario", "seq_comentario", "seq_doacao", "nro", "bandeira", "datah_comentario"),
+    "mecanismoplat": ("id_video", "id_canal", "id_usuario", "seq_comentario", "seq_doacao", "seq_plataforma", "datah_comentario"),
+}
+
+# Generated once, in the main process, before the facts that reference them
+DIMENSIONS = ("usuario", "canal")
+# Per chunk, in foreign-key order
+FACTS = ("video", "comentario", "doacao", "bitcoin", "paypal", "cartaocredito", "mecanismoplat")
+
+PAYMENT_TABLES = {"bitcoin": "bitcoin", "paypal": "paypal", "cartaoCredito": "cartaocredito", "mecanismoPlat": "mecanismoplat"}
+
+THEMES = ("Gaming", "Just Chatting", "ASMR", "Programming", "Cooking", "Music")
+WORDS = (
+    "epic", "live", "speedrun", "chill", "ranked", "late", "night", "morning", "build", "stream",
+    "marathon", "challenge", "review", "tutorial", "coop", "finale", "debut", "retro", "indie", "hardcore",
+)
+COMMENTS = (
+    "gg", "que jogada!", "manda salve", "primeira vez aqui", "top demais", "kkkkk",
+    "bora!", "faz o desafio", "melhor stream", "valeu pela live", "incrível", "e o som?",
+)
+CARD_BRANDS = ("Visa", "Mastercard", "Elo", "Amex")
+
+
+def load_config(path=None, overrides=None):
+    config = json.loads(json.dumps(DEFAULTS))
+    if path:
+        with open(path) as f:
+            config.update(json.load(f))
+    config.update({k: v for k, v in (overrides or {}).items() if v is not None})
+    unknown = set(config) - set(DEFAULTS)
+    if unknown:
+        raise ValueError(f"Unknown config keys: {', '.join(sorted(unknown))}")
+    unknown = set(config["payment_mix"]) - set(PAYMENT_TABLES)
+    if unknown:
+        raise ValueError(f"Unknown payment methods: {', '.join(sorted(unknown))}")
+    return config
+
+
+def _mix(value):
+    """``paypal=25,bitcoin=5`` -> ``{"paypal": 25.0, "bitcoin": 5.0}``"""
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = float(weight)
+    return mix
+
+
+def add_arguments(parser):
+    """Generator options shared by ``datagen.py`` and ``bulk_load.py``; unset ones fall back to the config."""
+    group = parser.add_argument_group("dataset")
+    group.add_argument("--config", help="JSON file with any of the generator settings")
+    group.add_argument("--seed", type=int)
+    group.add_argument("--scale", type=float, help="multiplies users, channels and videos")
+    group.add_argument("--users", type=int, help="users at scale 1")
+    group.add_argument("--channels", type=int, help="channels at scale 1")
+    group.add_argument("--videos", type=int, help="videos at scale 1")
+    group.add_argument("--comments", dest="comments_per_video", type=int, help="average comments per video")
+    group.add_argument("--donation-rate", type=float, help="share of comments that carry a donation")
+    group.add_argument("--channel-skew", type=float, help="Zipf exponent of channel popularity")
+    group.add_argument("--donor-skew", type=float, help="Zipf exponent of user activity")
+    group.add_argument("--start", help="first day of the generated period (YYYY-MM-DD)")
+    group.add_argument("--days", type=int, help="length of the generated period")
+    group.add_argument("--payment-mix", type=_mix, help="e.g. cartaoCredito=50,paypal=25,mecanismoPlat=20,bitcoin=5")
+    group.add_argument("--chunk", type=int, help="videos per chunk")
+
+
+def config_from_args(args):
+    return load_config(args.config, {k: getattr(args, k, None) for k in DEFAULTS})
+
+
+def _zipf_cumulative(n, skew):
+    return list(itertools.accumulate(1 / rank ** skew for rank in range(1, n + 1)))
+
+
+def _cumulative(weights):
+    return list(itertools.accumulate(weights))
+
+
+class Dataset:
+    """Sizes, id ranges and samplers for one config; shipped once to each worker process."""
+
+    def __init__(self, config, offsets=None):
+        offsets = self.offsets = dict(offsets or {})
+        self.config = config
+        self.seed = config["seed"]
+        scale = config["scale"]
+        self.users = max(1, round(config["users"] * scale))
+        self.channels = max(1, min(round(config["channels"] * scale), self.users))
+        self.videos = max(1, round(config["videos"] * scale))
+        self.chunk = config["chunk"]
+        self.max_comments = max(1, 2 * config["comments_per_video"] - 1)
+
+        self.first_user = offsets.get("usuario", 0) + 1
+        self.first_channel = offsets.get("canal", 0) + 1
+        self.first_video = offsets.get("video", 0) + 1
+        self.first_seq_plataforma = offsets.get("seq_plataforma", 0) + 1
+
+        # Popularity ranks are a seeded shuffle, so the busiest channel/user is not just the lowest id
+        rng = random.Random(f"{self.seed}:ranks")
+        self.channel_ids = list(range(self.first_channel, self.first_channel + self.channels))
+        rng.shuffle(self.channel_ids)
+        self.channel_cum = _zipf_cumulative(self.channels, config["channel_skew"])
+        self.user_ids = list(range(self.first_user, self.first_user + self.users))
+        rng.shuffle(self.user_ids)
+        self.user_cum = _zipf_cumulative(self.users, config["donor_skew"])
+
+        start = date.fromisoformat(config["start"])
+        self.days = [start + timedelta(days=d) for d in range(config["days"])]
+        self.day_cum = _cumulative(
+            config["monthly"][day.month - 1] * config["weekday"][day.weekday()] for day in self.days
+        )
+        self.hour_cum = _cumulative(config["hourly"])
+        self.statuses = list(config["status_mix"])
+        self.status_cum = _cumulative(config["status_mix"].values())
+        self.payments = [PAYMENT_TABLES[name] for name in config["payment_mix"]]
+        self.payment_cum = _cumulative(config["payment_mix"].values())
+
+    @property
+    def chunks(self):
+        return (self.videos + self.chunk - 1) // self.chunk
+
+    @property
+    def period(self):
+        """``(first, end)`` days bounding every comment's datah (comments trail their video by up to 4 hours)."""
+        return self.days[0], self.days[-1] + timedelta(days=2)
+
+    @staticmethod
+    def _pick(rng, values, cum):
+        return values[bisect.bisect_right(cum, rng.random() * cum[-1])]
+
+    def _timestamp(self, rng):
+        day = self._pick(rng, self.days, self.day_cum)
+        hour = self._pick(rng, range(24), self.hour_cum)
+        return datetime(day.year, day.month, day.day, hour) + timedelta(seconds=rng.randrange(3600))
+
+    def dimension_rows(self):
+        rng = random.Random(f"{self.seed}:dimensions")
+        config = self.config
+        users = []
+        for id in range(self.first_user, self.first_user + self.users):
+            users.append((
+                id, f"{rng.choice(WORDS)}_{id}", f"user{id}@example.com",
+                date(1975, 1, 1) + timedelta(days=rng.randrange(10_000)),
+                f"+55{id:011d}", f"{rng.randrange(100_000):05d}-{rng.randrange(1_000):03d}",
+                rng.choice(config["countries"]),
+            ))
+        channels = []
+        for n, id in enumerate(range(self.first_channel, self.first_channel + self.channels)):
+            channels.append((
+                id, f"{rng.choice(WORDS).title()} {rng.choice(WORDS).title()} {id}",
+                rng.choice(("publico", "privado", "misto")), date.fromisoformat(config["start"]) - timedelta(days=rng.randrange(1_000)),
+                f"Canal de {rng.choice(THEMES)}", self.first_user + n, rng.choice(config["platforms"]),
+            ))
+        return {"usuario": users, "canal": channels}
+
+    def chunk_rows(self, index):
+        """Fact rows of chunk ``index`` as ``{table: rows}``."""
+        rng = random.Random(f"{self.seed}:chunk:{index}")
+        rate = self.config["donation_rate"]
+        rows = {table: [] for table in FACTS}
+        videos, comments, donations = rows["video"], rows["comentario"], rows["doacao"]
+
+        first = self.first_video + index * self.chunk
+        for id_video in range(first, min(first + self.chunk, self.first_video + self.videos)):
+            id_canal = self._pick(rng, self.channel_ids, self.channel_cum)
+            datah = self._timestamp(rng)
+            videos.append((
+                id_video, id_canal, f"{rng.choice(WORDS)} {rng.choice(WORDS)} #{id_video}", datah,
+                rng.choice(THEMES), rng.randint(15, 300), rng.randint(50, 10_000),
+                int(rng.lognormvariate(9, 1.2)),
+            ))
+            for seq in range(1, rng.randint(1, self.max_comments) + 1):
+                id_usuario = self._pick(rng, self.user_ids, self.user_cum)
+                comentado = datah + timedelta(minutes=min(rng.expovariate(1 / 45), 240))
+                comments.append((id_video, id_canal, id_usuario, seq, rng.choice(COMMENTS), comentado, True))
+                if rng.random() >= rate:
+                    continue
+                key = (id_video, id_canal, id_usuario, seq, 1)
+                valor = round(min(max(rng.lognormvariate(2.5, 1.0), 1), 99_999), 2)
+                donations.append((*key, Decimal(f"{valor:.2f}"), self._pick(rng, self.statuses, self.status_cum), comentado))
+                method = self._pick(rng, self.payments, self.payment_cum)
+                if method == "bitcoin":
+                    rows[method].append((*key, hashlib.sha256(f"{self.seed}:{key}".encode()).hexdigest(), comentado))
+                elif method == "paypal":
+                    rows[method].append((*key, f"PAYID-{id_canal}-{id_video}-{id_usuario}-{seq}", comentado))
+                elif method == "cartaocredito":
+                    rows[method].append((*key, f"{rng.randrange(10 ** 16):016d}", rng.choice(CARD_BRANDS), comentado))
+                else:
+                    rows[method].append((*key, self.first_seq_plataforma + (id_video - self.first_video) * self.max_comments + seq - 1, comentado))
+        return rows
+
+
+def to_csv(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    for row in rows:
+        writer.writerow(["t" if v is True else v.isoformat(sep=" ") if isinstance(v, datetime) else v for v in row])
+    return buffer.getvalue().encode()
+
+
+# --- Worker processes ---
+
+_dataset = None
+
+
+def init_worker(dataset):
+    global _dataset
+    _dataset = dataset
+
+
+def generate_chunk(index):
+    return index, _dataset.chunk_rows(index)
+
+
+def generate_chunk_csv(index):
+    return index, {table: (len(rows), to_csv(rows)) for table, rows in _dataset.chunk_rows(index).items()}
+
+
+# --- File output ---
+
+def write_files(dataset, out_dir, workers):
+    os.makedirs(out_dir, exist_ok=True)
+    counts = dict.fromkeys(COLUMNS, 0)
+    files = {table: open(os.path.join(out_dir, f"{table}.csv"), "wb") for table in COLUMNS}
+    try:
+        for table, rows in dataset.dimension_rows().items():
+            files[table].write(to_csv(rows))
+            counts[table] = len(rows)
+        # imap keeps chunk order, so the files are byte-for-byte reproducible
+        with multiprocessing.Pool(workers, init_worker, (dataset,)) as pool:
+            for _, chunk in pool.imap(generate_chunk_csv, range(dataset.chunks)):
+                for table, (count, payload) in chunk.items():
+                    files[table].write(payload)
+                    counts[table] += count
+    finally:
+        for f in files.values():
+            f.close()
+
+    with open(os.path.join(out_dir, "manifest.json"), "w") as f:
+        json.dump({"config": dataset.config, "offsets": dataset.offsets, "rows": counts}, f, indent=2)
+    with open(os.path.join(out_dir, "load.sql"), "w") as f:
+        f.write("-- psql -d system_antig -f load.sql (run from this directory)\nBEGIN;\n")
+        f.write("CALL system_antig.sp_criar_particoes('%s', '%s');\n" % dataset.period)
+        for table in DIMENSIONS + FACTS:
+            f.write(f"\\copy system_antig.{table} ({', '.join(COLUMNS[table])}) FROM '{table}.csv' WITH (FORMAT csv)\n")
+        # The files carry explicit keys: move the sequences past them, or the API's next insert collides
+        f.write("CALL system_antig.sp_sincronizar_sequencias();\n")
+        f.write("COMMIT;\n")
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_arguments(parser)
+    parser.add_argument("--out", required=True, help="directory for the CSV files")
+    parser.add_argument("--offsets", type=_mix, default={}, help="ids to start after, e.g. usuario=120,canal=40,video=900")
+    parser.add_argument("--workers", type=int, default=multiprocessing.cpu_count(), help="generator processes")
+    args = parser.parse_args()
+
+    dataset = Dataset(config_from_args(args), {k: int(v) for k, v in args.offsets.items()})
+    print(f"users={dataset.users} channels={dataset.channels} videos={dataset.videos} seed={dataset.seed}")
+    for table, count in write_files(dataset, args.out, args.workers).items():
+        print(f"  {table:<14} {count:>12}")
+
+
+if __name__ == "__main__":
+    main()
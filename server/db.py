@@ -0,0 +1,293 @@
+import os
+import threading
+import time
+import weakref
+from collections import deque
+from contextlib import contextmanager
+
+import orjson
+import psycopg2
+from dotenv import load_dotenv
+from psycopg.conninfo import make_conninfo
+from psycopg.rows import dict_row
+from psycopg.types.json import set_json_loads
+from psycopg_pool import AsyncConnectionPool
+
+load_dotenv()
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection becomes available within the pool timeout."""
+
+
+def db_settings():
+    return {
+        "host": os.getenv("DB_HOST", "localhost"),
+        "database": os.getenv("DB_NAME", "postgres"),
+        "user": os.getenv("DB_USER", "postgres"),
+        "password": os.getenv("DB_PASSWORD", "postgres"),
+        "port": os.getenv("DB_PORT", "5432"),
+    }
+
+
+class ConnectionPool:
+    """Bounded, thread-safe pool of psycopg2 connections.
+
+    At most ``maxconn`` connections exist at any time. Callers that find the
+    pool exhausted wait up to ``timeout`` seconds before ``PoolTimeout`` is
+    raised. Connections idle for longer than ``check_interval`` seconds are
+    pinged on checkout and transparently replaced if the server dropped them.
+    """
+
+    def __init__(self, minconn=1, maxconn=10, timeout=5.0, check_interval=30.0, **conn_kwargs):
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.check_interval = check_interval
+        self.conn_kwargs = conn_kwargs
+
+        self._idle = deque()  # (conn, last_used)
+        self._size = 0
+        self._cond = threading.Condition()
+        self._stats = {
+            "connections_opened": 0,
+            "connections_discarded": 0,
+            "checkouts": 0,
+            "timeouts": 0,
+            "health_check_failures": 0,
+            "wait_time_total": 0.0,
+        }
+
+    def _connect(self):
+        conn = psycopg2.connect(**self.conn_kwargs)
+        self._stats["connections_opened"] += 1
+        return conn
+
+    def warmup(self):
+        with self._cond:
+            missing = self.minconn - self._size
+            self._size += max(missing, 0)
+        for _ in range(max(missing, 0)):
+            try:
+                conn = self._connect()
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                raise
+            with self._cond:
+                self._idle.append((conn, time.monotonic()))
+                self._cond.notify()
+
+    def _healthy(self, conn, last_used):
+        if conn.closed:
+            return False
+        if time.monotonic() - last_used < self.check_interval:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    def getconn(self):
+        start = time.monotonic()
+        deadline = start + self.timeout
+        with self._cond:
+            while not self._idle and self._size >= self.maxconn:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats["timeouts"] += 1
+                    raise PoolTimeout(
+                        f"No database connection available after {self.timeout:g}s "
+                        f"(pool size {self.maxconn})"
+                    )
+                self._cond.wait(remaining)
+            if self._idle:
+                conn, last_used = self._idle.pop()
+            else:
+                conn, last_used = None, None
+                self._size += 1
+            self._stats["checkouts"] += 1
+            self._stats["wait_time_total"] += time.monotonic() - start
+
+        if conn is not None and not self._healthy(conn, last_used):
+            self._stats["health_check_failures"] += 1
+            self._close(conn)
+            conn = None
+        if conn is None:
+            try:
+                conn = self._connect()
+            except Exception:
+                self._release_slot()
+                raise
+        return conn
+
+    def putconn(self, conn, discard=False):
+        if not discard and not conn.closed:
+            try:
+                if conn.info.transaction_status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except Exception:
+                discard = True
+        if discard or conn.closed:
+            self._close(conn)
+            self._release_slot()
+            return
+        with self._cond:
+            self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    def _close(self, conn):
+        self._stats["connections_discarded"] += 1
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _release_slot(self):
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        conn = self.getconn()
+        discard = False
+        try:
+            yield conn
+        except (psycopg2.InterfaceError, psycopg2.OperationalError):
+            discard = True
+            raise
+        finally:
+            self.putconn(conn, discard=discard)
+
+    def closeall(self):
+        with self._cond:
+            while self._idle:
+                conn, _ = self._idle.pop()
+                self._size -= 1
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+
+    def stats(self):
+        with self._cond:
+            idle = len(self._idle)
+            return {
+                "min_size": self.minconn,
+                "max_size": self.maxconn,
+                "size": self._size,
+                "idle": idle,
+                "in_use": self._size - idle,
+                "timeout": self.timeout,
+                **self._stats,
+            }
+
+
+pool = ConnectionPool(
+    minconn=int(os.getenv("DB_POOL_MIN", "1")),
+    maxconn=int(os.getenv("DB_POOL_MAX", "10")),
+    timeout=float(os.getenv("DB_POOL_TIMEOUT", "5")),
+    check_interval=float(os.getenv("DB_POOL_CHECK_INTERVAL", "30")),
+    **db_settings(),
+)
+
+
+# --- Async pool (psycopg 3) ---
+# Routes are ``async def`` and await their queries on this pool, so a slow
+# report only holds a connection, not one of Starlette's worker threads.
+
+_last_used = weakref.WeakKeyDictionary()
+
+
+async def _mark_returned(conn):
+    _last_used[conn] = time.monotonic()
+
+
+async def _configure(conn):
+    # json columns (the detail routes' child collections) are parsed with orjson
+    set_json_loads(orjson.loads, conn)
+
+
+def _make_check(interval):
+    async def check(conn):
+        if time.monotonic() - _last_used.get(conn, 0) < interval:
+            return
+        await conn.execute("SELECT 1")
+        await conn.rollback()
+    return check
+
+
+def conninfo(**overrides):
+    """libpq connection string of the primary; ``overrides`` (e.g. ``host``, ``port``) replace its settings."""
+    settings = db_settings()
+    settings["dbname"] = settings.pop("database")
+    settings.update({key: value for key, value in overrides.items() if value})
+    return make_conninfo(**settings)
+
+
+# Under gunicorn (gunicorn.conf.py) each of the WEB_WORKERS processes has a pool
+# of its own. DB_CONNECTION_BUDGET is what the API may hold in total: each pool
+# is capped at its worker's share, less the connections refresh.py opens outside
+# the pool (one per materialized view), so more workers never means more connections.
+WEB_WORKERS = int(os.getenv("WEB_WORKERS", "1"))
+DB_CONNECTION_BUDGET = int(os.getenv("DB_CONNECTION_BUDGET", "0"))
+DB_RESERVED_CONNECTIONS = int(os.getenv("DB_RESERVED_CONNECTIONS", "2"))
+
+
+def pool_sizes():
+    """(min_size, max_size) of this process' async pool: ``DB_POOL_MIN``/``DB_POOL_MAX``, within its budget share."""
+    max_size = int(os.getenv("DB_POOL_MAX", "10"))
+    if DB_CONNECTION_BUDGET > 0:
+        share = DB_CONNECTION_BUDGET // max(WEB_WORKERS, 1) - DB_RESERVED_CONNECTIONS
+        if share < 1:
+            raise RuntimeError(
+                f"DB_CONNECTION_BUDGET={DB_CONNECTION_BUDGET} leaves no pooled connection for each of "
+                f"{WEB_WORKERS} workers ({DB_RESERVED_CONNECTIONS} reserved per worker)"
+            )
+        max_size = min(max_size, share)
+    return min(int(os.getenv("DB_POOL_MIN", "1")), max_size), max_size
+
+
+def make_async_pool(info, name=None):
+    """An async pool on ``info``, sized and configured like the primary's (``pool_sizes``)."""
+    min_size, max_size = pool_sizes()
+    return AsyncConnectionPool(
+        info,
+        min_size=min_size,
+        max_size=max_size,
+        timeout=float(os.getenv("DB_POOL_TIMEOUT", "5")),
+        max_waiting=int(os.getenv("DB_POOL_MAX_WAITING", "0")),
+        configure=_configure,
+        check=_make_check(float(os.getenv("DB_POOL_CHECK_INTERVAL", "30"))),
+        reset=_mark_returned,
+        kwargs={"row_factory": dict_row},
+        open=False,
+        name=name,
+    )
+
+
+async_pool = make_async_pool(conninfo())
+
+
+def async_pool_stats():
+    stats = async_pool.get_stats()
+    return {
+        "min_size": async_pool.min_size,
+        "max_size": async_pool.max_size,
+        "size": stats.get("pool_size", 0),
+        "idle": stats.get("pool_available", 0),
+        "in_use": stats.get("pool_size", 0) - stats.get("pool_available", 0),
+        "waiting": stats.get("requests_waiting", 0),
+        "timeout": async_pool.timeout,
+        "connections_opened": stats.get("connections_num", 0),
+        "checkouts": stats.get("requests_num", 0),
+        "timeouts": stats.get("requests_errors", 0),
+        "wait_time_total": stats.get("requests_wait_ms", 0) / 1000,
+        "workers": WEB_WORKERS,
+        "connection_budget": DB_CONNECTION_BUDGET,
+    }
@@ -0,0 +1,113 @@
+"""Detail endpoints: one row and its child collections in a single query.
+
+A detail route (``/api/channels/{id}``, ...) used to read the parent row and
+then each child list with its own query and connection, and returned every
+child row: a channel came back with all of its videos. ``Detail.query``
+builds one statement instead. Each child collection is a correlated
+``json_agg`` sub-select with its own ``ORDER BY`` and ``LIMIT``, so the page
+is cut in Postgres, on the child's index, and the whole response is one round
+trip.
+
+Every collection is paged on its own ``Keyset``: the sub-select reads one row
+past ``limit``, and the response carries ``has_more`` and ``next_cursor`` for
+it under ``collections``. Passing that cursor back (``<name>_cursor``) returns
+the next page of that collection; ``include`` names the collections to read,
+so paging one of them need not re-read the others.
+"""
+import os
+
+from fastapi import HTTPException
+
+from serialize import Rows
+
+DETAIL_LIMIT = int(os.getenv("DETAIL_LIMIT", "20"))
+DETAIL_MAX_LIMIT = int(os.getenv("DETAIL_MAX_LIMIT", "100"))
+
+
+class Child:
+    """A child collection: ``select`` from ``from_sql`` where ``parent`` holds, in ``keyset`` order.
+
+    ``parent`` is a condition on the parent query's aliases (``v.id_canal = c.id``).
+    The keyset fields must be among the selected columns.
+    """
+
+    def __init__(self, name, keyset, select, from_sql, parent):
+        self.name = name
+        self.keyset = keyset
+        self.select = select
+        self.from_sql = from_sql
+        self.parent = parent
+
+    def subquery(self, cursor, limit):
+        """Select-list entry (and its params) with the page as a JSON array, or NULL when empty."""
+        conditions = [self.parent]
+        params = []
+        if cursor:
+            condition, values = self.keyset.after(cursor)
+            conditions.append(condition)
+            params.extend(values)
+        direction = " DESC" if self.keyset.descending else ""
+        order = ", ".join(f"x.{field}{direction}" for _, field in self.keyset.columns)
+        sql = f"""(
+            SELECT json_agg(x ORDER BY {order}) FROM (
+                SELECT {self.select} {self.from_sql}
+                WHERE {" AND ".join(conditions)}
+                ORDER BY {self.keyset.order_by()}
+                LIMIT %s
+            ) x
+        ) as {self.name}"""
+        return sql, params + [limit + 1]
+
+    def page(self, items, limit):
+        """Cut the extra row off ``items``: (rows, collection info)."""
+        items = items or []
+        has_more = len(items) > limit
+        items = items[:limit]
+        rows = Rows(list(items[0]) if items else [], [tuple(item.values()) for item in items])
+        return rows, {
+            "limit": limit,
+            "has_more": has_more,
+            "next_cursor": self.keyset.cursor_for(items[-1]) if has_more else None,
+        }
+
+
+class Detail:
+    """A parent row (``select`` from ``from_sql`` where ``key``) plus its child collections."""
+
+    def __init__(self, select, from_sql, key, children):
+        self.select = select
+        self.from_sql = from_sql
+        self.key = key
+        self.children = {child.name: child for child in children}
+
+    def included(self, include):
+        """Children named in ``include`` (comma-separated; all of them when None, none when empty)."""
+        if include is None:
+            return list(self.children.values())
+        names = [name.strip() for name in include.split(",") if name.strip()]
+        unknown = [name for name in names if name not in self.children]
+        if unknown:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown collection '{unknown[0]}' (expected: {', '.join(self.children)})",
+            )
+        return [self.children[name] for name in dict.fromkeys(names)]
+
+    def query(self, children, key_values, cursors, limit):
+        """SQL and params for the parent row with a page of each of ``children``."""
+        columns = [self.select]
+        params = []
+        for child in children:
+            sql, values = child.subquery(cursors.get(child.name), limit)
+            columns.append(sql)
+            params.extend(values)
+        sql = f"SELECT {', '.join(columns)} {self.from_sql} WHERE {self.key}"
+        return sql, tuple(params) + tuple(key_values)
+
+    def page(self, row, children, limit):
+        """Turn each child's JSON page in ``row`` into ``Rows`` and add the ``collections`` paging info."""
+        collections = {}
+        for child in children:
+            row[child.name], collections[child.name] = child.page(row[child.name], limit)
+        row["collections"] = collections
+        return row
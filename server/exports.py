@@ -0,0 +1,172 @@
+"""Streaming exports of large result sets as CSV, NDJSON or Arrow IPC.
+
+The JSON routes fetch a whole result into a list of dicts and serialize it at
+once, so their memory grows with the result. Exports instead stream from the
+database to the response in bounded pieces:
+
+* ``csv``    ``COPY (query) TO STDOUT WITH (FORMAT csv, HEADER)``: PostgreSQL
+  formats the rows, Python only forwards the bytes
+* ``ndjson`` one JSON object per line, read from a server-side cursor
+  ``EXPORT_BATCH_ROWS`` rows at a time
+* ``arrow``  an Arrow IPC stream with one record batch per fetch (pyarrow,
+  in requirements.txt)
+
+Chunks are handed to the response one at a time and the ASGI server only
+asks for the next one once the previous was written to the socket, so a slow
+client slows the fetches down instead of piling rows up in memory. An export
+holds a pooled connection for its whole duration, so at most
+``EXPORT_MAX_CONCURRENT`` run at once; the others wait for a slot.
+"""
+import asyncio
+import io
+import os
+from decimal import Decimal
+
+import psycopg
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+from psycopg.rows import tuple_row
+from psycopg_pool import PoolTimeout, TooManyRequests
+
+from cache import encode
+from replicas import router
+
+EXPORT_BATCH_ROWS = int(os.getenv("EXPORT_BATCH_ROWS", "5000"))
+EXPORT_MAX_CONCURRENT = int(os.getenv("EXPORT_MAX_CONCURRENT", "2"))
+
+# Small pieces (COPY sends one message per row) are gathered up to this size before they are sent
+CHUNK_BYTES = 64 * 1024
+
+MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+
+_slots = asyncio.Semaphore(EXPORT_MAX_CONCURRENT)
+
+
+async def _batches(conn, query, params, row_factory=None):
+    """Yields (description, rows) per fetch from a server-side cursor; at least once, even when empty."""
+    async with conn.cursor(name="export", row_factory=row_factory or conn.row_factory) as cur:
+        await cur.execute(query, params)
+        rows = await cur.fetchmany(EXPORT_BATCH_ROWS)
+        yield cur.description, rows
+        while rows:
+            rows = await cur.fetchmany(EXPORT_BATCH_ROWS)
+            if rows:
+                yield cur.description, rows
+
+
+async def _csv(conn, query, params):
+    # COPY takes no bind parameters, so they are bound client-side
+    statement = psycopg.AsyncClientCursor(conn).mogrify(query, params)
+    buffer = bytearray()
+    async with conn.cursor() as cur:
+        async with cur.copy(f"COPY ({statement}) TO STDOUT WITH (FORMAT csv, HEADER)") as copy:
+            async for data in copy:
+                buffer += data
+                if len(buffer) >= CHUNK_BYTES:
+                    yield bytes(buffer)
+                    buffer.clear()
+    if buffer:
+        yield bytes(buffer)
+
+
+async def _ndjson(conn, query, params):
+    async for _, rows in _batches(conn, query, params):
+        if rows:
+            yield b"".join(encode(row) + b"\n" for row in rows)
+
+
+def _arrow_columns(description):
+    """Arrow schema and a per-column value converter for the cursor's result columns."""
+    import pyarrow as pa
+
+    types = {
+        16: (pa.bool_(), None),
+        20: (pa.int64(), None),
+        21: (pa.int16(), None),
+        23: (pa.int32(), None),
+        700: (pa.float32(), None),
+        701: (pa.float64(), None),
+        # numeric travels as float, as in the JSON responses
+        1700: (pa.float64(), lambda v: float(v) if isinstance(v, Decimal) else v),
+        1082: (pa.date32(), None),
+        1114: (pa.timestamp("us"), None),
+        1184: (pa.timestamp("us", tz="UTC"), None),
+        25: (pa.string(), None),
+        1042: (pa.string(), None),
+        1043: (pa.string(), None),
+    }
+    fields, converters = [], []
+    for column in description:
+        # Anything else (enums, arrays, intervals...) is exported as its text form
+        arrow_type, convert = types.get(column.type_code, (pa.string(), lambda v: v if v is None else str(v)))
+        fields.append(pa.field(column.name, arrow_type))
+        converters.append(convert)
+    return pa.schema(fields), converters
+
+
+async def _arrow(conn, query, params):
+    import pyarrow as pa
+
+    sink = io.BytesIO()
+    writer = None
+    async for description, rows in _batches(conn, query, params, tuple_row):
+        if writer is None:
+            schema, converters = _arrow_columns(description)
+            writer = pa.ipc.new_stream(sink, schema)
+        columns = []
+        for i, convert in enumerate(converters):
+            values = [row[i] for row in rows]
+            columns.append(pa.array([convert(v) for v in values] if convert else values, type=schema.field(i).type))
+        writer.write_batch(pa.RecordBatch.from_arrays(columns, schema=schema))
+        yield sink.getvalue()
+        sink.seek(0)
+        sink.truncate()
+    writer.close()
+    yield sink.getvalue()
+
+
+WRITERS = {"csv": _csv, "ndjson": _ndjson, "arrow": _arrow}
+
+
+async def _export(query, params, fmt):
+    async with _slots:
+        async with router.pool().connection() as conn:
+            async for chunk in WRITERS[fmt](conn, query, params):
+                yield chunk
+
+
+async def _resume(first, body):
+    try:
+        if first:
+            yield first
+        async for chunk in body:
+            yield chunk
+    finally:
+        await body.aclose()
+
+
+async def export_response(query, params, fmt, filename):
+    """A streaming response of ``query`` in ``fmt``; errors before the first chunk still get a status code."""
+    if fmt == "arrow":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise HTTPException(status_code=501, detail="Arrow exports need pyarrow (pip install pyarrow)")
+    body = _export(query, params, fmt)
+    try:
+        first = await anext(body)
+    except StopAsyncIteration:
+        first = b""
+    except (PoolTimeout, TooManyRequests) as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except psycopg.Error as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return StreamingResponse(
+        _resume(first, body),
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{fmt}"'},
+    )
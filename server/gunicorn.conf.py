@@ -0,0 +1,71 @@
+"""Production serving mode: gunicorn managing uvicorn workers.
+
+    gunicorn -c gunicorn.conf.py main:app
+
+``WEB_WORKERS`` processes (default: the CPU cores this process may run on)
+each run the app on their own event loop. Every worker has its own connection
+pool, sized from ``DB_CONNECTION_BUDGET`` (see ``db.py``), and its own
+in-process state. The result cache, the ETag table versions the lookup
+snapshots also follow and the write count of the replica routing must be
+shared between them: with more than one worker the server refuses to start
+unless ``CACHE_BACKEND=redis``.
+
+With ``WEB_PRELOAD=1`` (the default) the master imports the app and loads the
+lookup snapshots before forking, so workers start warm and share those pages
+copy-on-write. ``kill -HUP <master>`` replaces the workers gracefully: new
+ones are forked (after reloading the snapshots) while the old ones finish
+their requests, within ``WEB_GRACEFUL_TIMEOUT`` seconds. A preloaded app keeps
+the code it was started with; with ``WEB_PRELOAD=0`` each worker imports the
+app itself, so a HUP also picks up new code.
+"""
+import os
+import sys
+
+from dotenv import load_dotenv
+
+# The same settings the app reads (cache.py, db.py)
+load_dotenv()
+
+workers = int(os.getenv("WEB_WORKERS") or len(os.sched_getaffinity(0)))
+# Read by db.py, in the master and in every worker, to split the connection budget
+os.environ["WEB_WORKERS"] = str(workers)
+
+worker_class = "uvicorn_worker.UvicornWorker"
+bind = os.getenv("WEB_BIND", "0.0.0.0:8001")
+preload_app = os.getenv("WEB_PRELOAD", "1") == "1"
+graceful_timeout = int(os.getenv("WEB_GRACEFUL_TIMEOUT", "30"))
+keepalive = 5
+# Recycle a worker after this many requests (plus jitter, so they don't all restart at once); 0 = never
+max_requests = int(os.getenv("WEB_MAX_REQUESTS", "0"))
+max_requests_jitter = max_requests // 10
+
+
+def _warm(server):
+    if not preload_app:
+        return
+    from main import warm_snapshots
+
+    try:
+        warm_snapshots()
+    except Exception as e:
+        # Not fatal: each worker loads the snapshots on first use instead
+        server.log.warning("could not preload the lookup snapshots: %s", e)
+    else:
+        server.log.info("lookup snapshots loaded")
+
+
+def on_starting(server):
+    if workers > 1 and os.getenv("CACHE_BACKEND", "memory") != "redis":
+        # Each worker would keep its own cache and table versions, and see only its own writes
+        server.log.error(
+            "%d workers need a shared cache: set CACHE_BACKEND=redis (and REDIS_URL), or WEB_WORKERS=1", workers,
+        )
+        sys.exit(1)
+
+
+def when_ready(server):
+    _warm(server)
+
+
+def on_reload(server):
+    _warm(server)
@@ -1,17 +1,55 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request, Response
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from typing import List, Optional, Any
-import psycopg2
+from typing import Annotated, List, Literal, Optional, Any
 from psycopg2.extras import RealDictCursor
 import os
-import random
+import asyncio
+import functools
+import hashlib
+import inspect
+import time
+from contextlib import asynccontextmanager
 from datetime import date, datetime
 from dotenv import load_dotenv
 
+import psycopg
+from psycopg.rows import tuple_row
+from psycopg.types.json import Jsonb
+from psycopg_pool import PoolTimeout as AsyncPoolTimeout, TooManyRequests
+
+from db import pool, PoolTimeout, async_pool, async_pool_stats
+from cache import encode, result_cache
+from compression import CompressionMiddleware
+from conditional import CACHE_CONTROL, etag, matches
+from detail import DETAIL_LIMIT, DETAIL_MAX_LIMIT, Child, Detail
+from exports import export_response
+from metrics import MetricsMiddleware, record_query, registry
+from pagination import Keyset
+from partitions import maintainer as partitions
+from refresh import VIEWS as MATERIALIZED_VIEWS, refresher
+from replicas import replica_reads, router as replicas
+from search import SEARCH_ENTITIES, SEARCH_MAX_LIMIT
+from serialize import Rows, dumps
+from snapshots import DimensionSnapshot
+
 load_dotenv()
 
-app = FastAPI(title="StreamerData One API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await async_pool.open(wait=False)
+    await replicas.open()
+    refresher.start()
+    partitions.start()
+    yield
+    await partitions.stop()
+    await refresher.stop()
+    await replicas.close()
+    await async_pool.close()
+    pool.closeall()
+
+app = FastAPI(title="StreamerData One API", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -19,21 +57,10 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing"],
 )
-
-def get_db_connection():
-    try:
-        conn = psycopg2.connect(
-            host=os.getenv("DB_HOST", "localhost"),
-            database=os.getenv("DB_NAME", "postgres"),
-            user=os.getenv("DB_USER", "postgres"),
-            password=os.getenv("DB_PASSWORD", "postgres"),
-            port=os.getenv("DB_PORT", "5432")
-        )
-        return conn
-    except Exception as e:
-        print(f"Connection Error: {e}")
-        return None
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(MetricsMiddleware)
 
 # --- Pydantic Models ---
 
@@ -83,58 +110,254 @@ class Donation(BaseModel):
     valor: float
     status: str
 
+class NewDonation(Donation):
+    # Checked here so a bad value rejects the request instead of failing a whole batch in SQL
+    status: Literal["lido", "recebido", "recusado"]
+    # Optional payment record, as in sp_registrar_doacao_unificada
+    tipo_pagamento: Optional[Literal["bitcoin", "paypal", "cartao", "plataforma"]] = None
+    txid: Optional[str] = None
+    id_paypal: Optional[str] = None
+    nro_cartao: Optional[str] = None
+    bandeira: Optional[str] = None
+    seq_plataforma: Optional[int] = None
+
 # --- Helper for Queries ---
 
-def execute_query(query: str, params: tuple = None, fetch_all: bool = True):
+def get_db_connection():
+    try:
+        return pool.getconn()
+    except PoolTimeout as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        print(f"Connection Error: {e}")
+        return None
+
+def execute_query_sync(query: str, params: tuple = None, fetch_all: bool = True):
+    # Blocking variant on the psycopg2 pool, kept for scripts and benchmarks.
     conn = get_db_connection()
     if not conn:
         raise HTTPException(status_code=500, detail="Database connection failed")
     try:
         cur = conn.cursor(cursor_factory=RealDictCursor)
         cur.execute(query, params)
-        if fetch_all:
+        if cur.description is None:
+            result = None
+        elif fetch_all:
             result = cur.fetchall()
         else:
             result = cur.fetchone()
         conn.commit()
         return result
     except Exception as e:
+        if conn.closed:
+            # The server dropped the connection mid-query; don't hand it out again
+            raise HTTPException(status_code=500, detail=str(e))
         conn.rollback()
         raise HTTPException(status_code=400, detail=str(e))
     finally:
-        conn.close()
+        pool.putconn(conn)
+
+async def execute_query(query: str, params: tuple = None, fetch_all: bool = True, as_rows: bool = False):
+    # ``as_rows`` fetches every row as a tuple into a ``Rows`` (see serialize.py) instead of one dict per row
+    requested = time.perf_counter()
+    try:
+        async with replicas.pool().connection() as conn:
+            started = time.perf_counter()
+            try:
+                cur = conn.cursor(row_factory=tuple_row) if as_rows else conn.cursor()
+                await cur.execute(query, params)
+                if cur.description is None:
+                    result = None
+                elif as_rows:
+                    result = Rows([column.name for column in cur.description], await cur.fetchall())
+                elif fetch_all:
+                    result = await cur.fetchall()
+                else:
+                    result = await cur.fetchone()
+            except psycopg.Error as e:
+                if conn.closed:
+                    raise HTTPException(status_code=500, detail=str(e))
+                raise HTTPException(status_code=400, detail=str(e))
+            await record_query(conn, query, params, result, started - requested, time.perf_counter() - started)
+            return result
+    except (AsyncPoolTimeout, TooManyRequests) as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except psycopg.OperationalError as e:
+        print(f"Connection Error: {e}")
+        raise HTTPException(status_code=500, detail="Database connection failed")
 
 # --- Routes ---
+# Routes returning rows are registered with ``json_get``: their result is encoded by
+# serialize.dumps instead of FastAPI's jsonable_encoder, and ``?shape=columns`` sends
+# each row set as one array per column. Given the tables a route reads (cached routes
+# declare them already), its responses carry an ETag from those tables' versions and
+# a matching ``If-None-Match`` gets a 304 before any query runs (see conditional.py).
+# They only read, so their queries may run on a read replica (see replicas.py).
+
+RowShape = Literal["records", "columns"]
+
+def json_get(path: str, tables: tuple = ()):
+    """``app.get`` for a route returning rows. The function itself is left undecorated, so the batch endpoints can still call it."""
+    def decorator(func):
+        read_tables = frozenset(tables) or getattr(func, "tables", None)
+
+        @functools.wraps(func)
+        async def endpoint(*args, request: Request, shape: RowShape = "records", **kwargs):
+            headers = None
+            if read_tables:
+                tag = await etag(func.__name__, {**kwargs, "shape": shape}, read_tables)
+                headers = {"ETag": tag, "Cache-Control": CACHE_CONTROL}
+                if matches(request.headers.get("if-none-match"), tag):
+                    return Response(status_code=304, headers=headers)
+            with replica_reads(request):
+                result = await func(*args, **kwargs)
+            return Response(dumps(result, shape), media_type="application/json", headers=headers)
+
+        signature = inspect.signature(func)
+        extra = [
+            inspect.Parameter("request", inspect.Parameter.KEYWORD_ONLY, annotation=Request),
+            inspect.Parameter("shape", inspect.Parameter.KEYWORD_ONLY, default="records", annotation=RowShape),
+        ]
+        endpoint.__signature__ = signature.replace(parameters=[*signature.parameters.values(), *extra])
+        app.get(path)(endpoint)
+        return func
+    return decorator
+
+def as_day(value: str):
+    """The date of ``value`` if it is a whole day (``YYYY-MM-DD``), else None."""
+    value = value.strip()
+    if len(value) != 10:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        return None
+
+def day_range(start_date: Optional[str], end_date: Optional[str]):
+    """Return (start_day, end_day) when both bounds are whole days (or absent).
+
+    Day-granular ranges are answered from system_antig.doacao_diaria, with both
+    ends inclusive. A bound carrying a time of day returns None so the caller
+    falls back to the raw doacao rows (pruned to the months in range).
+    """
+    days = []
+    for value in (start_date, end_date):
+        if value is None:
+            days.append(None)
+            continue
+        day = as_day(value)
+        if day is None:
+            return None
+        days.append(day)
+    return tuple(days)
+
+def end_bound(column: str, end_date: str):
+    """(condition, parameter) keeping the rows of ``column`` up to ``end_date``, inclusive.
+
+    Every date filter ends the same way: a whole day counts up to its last instant, as
+    the daily rollup does, and a timestamp up to that instant.
+    """
+    day = as_day(end_date)
+    if day is not None:
+        return f"{column} < %s::date + 1", day
+    return f"{column} <= %s", end_date
 
 @app.get("/")
 @app.get("/api/")
-def read_root():
-    conn = get_db_connection()
-    if conn:
-        conn.close()
+async def read_root():
+    try:
+        await execute_query("SELECT 1", fetch_all=False)
         return {"message": "StreamerData Backend v1.1", "db_status": "connected"}
-    return {"message": "StreamerData Backend v1.1", "db_status": "disconnected"}
+    except HTTPException:
+        return {"message": "StreamerData Backend v1.1", "db_status": "disconnected"}
+
+@app.get("/api/pool")
+async def get_pool_stats():
+    return async_pool_stats()
+
+@app.get("/api/replicas")
+async def get_replica_status():
+    return replicas.status()
+
+@app.get("/api/cache")
+async def get_cache_stats():
+    return result_cache.stats()
+
+registry.gauges.append(lambda: {
+    f"db_pool_{name}": (f"Async connection pool {name.replace('_', ' ')}.", value)
+    for name, value in async_pool_stats().items()
+})
+registry.gauges.append(lambda: {
+    "db_replicas_healthy": ("Read replicas currently taking reads.", sum(r.healthy for r in replicas.replicas)),
+    "db_replica_lag_seconds_max": ("Largest replay lag among the read replicas.",
+                                   max((r.lag_seconds or 0 for r in replicas.replicas), default=0)),
+} if replicas.replicas else {})
+registry.gauges.append(lambda: {
+    f"result_cache_{name}": (f"Result cache {name.replace('_', ' ')}.", value)
+    for name, value in result_cache.stats().items() if isinstance(value, (int, float))
+})
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/api/metrics/queries")
+async def get_query_log():
+    """Recent slow or explained statements, newest first."""
+    return list(reversed(registry.log))
 
 # Ranking Routes (Keep existing functionality)
 
-@app.get("/api/ranking/faturamento")
-def get_ranking_faturamento(limit: int = 10, channel_id: Optional[int] = None, start_date: Optional[str] = None, end_date: Optional[str] = None):
+@json_get("/api/ranking/faturamento")
+@result_cache.cached("doacao", "comentario", "canal", "patrocinio", "inscricao")
+async def get_ranking_faturamento(limit: int = 10, channel_id: Optional[int] = None, start_date: Optional[str] = None, end_date: Optional[str] = None):
     # The function f_ranking_faturamento_total doesn't natively support these filters, 
     # so we'll wrap it or use a custom query if filters are present.
     if not any([channel_id, start_date, end_date]):
-        return execute_query("SELECT rank_faturamento as rank, id_canal, nome_canal, faturamento_total as faturamento FROM system_antig.f_ranking_faturamento_total(%s)", (limit,))
-    
+        return await execute_query("SELECT rank_faturamento as rank, id_canal, nome_canal, faturamento_total as faturamento FROM system_antig.f_ranking_faturamento_total(%s)", (limit,), as_rows=True)
+
+    days = day_range(start_date, end_date)
+    if days is not None:
+        where_clauses = []
+        params = []
+        if channel_id:
+            where_clauses.append("r.id_canal = %s")
+            params.append(channel_id)
+        if days[0]:
+            where_clauses.append("r.dia >= %s")
+            params.append(days[0])
+        if days[1]:
+            where_clauses.append("r.dia <= %s")
+            params.append(days[1])
+        where_str = "WHERE " + " AND ".join(where_clauses) if where_clauses else ""
+        params.append(limit)
+        return await execute_query(f"""
+            SELECT 
+                DENSE_RANK() OVER (ORDER BY SUM(r.total) DESC) as rank,
+                r.id_canal,
+                can.nome as nome_canal,
+                SUM(r.total) as faturamento
+            FROM system_antig.doacao_diaria r
+            JOIN system_antig.canal can ON r.id_canal = can.id
+            {where_str}
+            GROUP BY r.id_canal, can.nome
+            ORDER BY faturamento DESC
+            LIMIT %s
+        """, tuple(params), as_rows=True)
+
+    # Sub-day bounds: aggregate the raw donations
     where_clauses = []
     params = []
     if channel_id:
         where_clauses.append("d.id_canal = %s")
         params.append(channel_id)
     if start_date:
-        where_clauses.append("c.datah >= %s")
+        where_clauses.append("d.datah_comentario >= %s")
         params.append(start_date)
     if end_date:
-        where_clauses.append("c.datah <= %s")
-        params.append(end_date)
+        clause, value = end_bound("d.datah_comentario", end_date)
+        where_clauses.append(clause)
+        params.append(value)
     
     where_str = "WHERE " + " AND ".join(where_clauses) if where_clauses else ""
     
@@ -146,17 +369,17 @@ def get_ranking_faturamento(limit: int = 10, channel_id: Optional[int] = None, s
             SUM(d.valor) as faturamento
         FROM system_antig.doacao d
         JOIN system_antig.canal can ON d.id_canal = can.id
-        JOIN system_antig.comentario c ON d.id_video = c.id_video AND d.id_canal = c.id_canal AND d.id_usuario = c.id_usuario AND d.seq_comentario = c.seq
         {where_str}
         GROUP BY d.id_canal, can.nome
         ORDER BY faturamento DESC
         LIMIT %s
     """
     params.append(limit)
-    return execute_query(query, tuple(params))
+    return await execute_query(query, tuple(params), as_rows=True)
 
-@app.get("/api/ranking/videos-virais")
-def get_videos_virais(limit: int = 10, channel_id: Optional[int] = None, start_date: Optional[str] = None, end_date: Optional[str] = None):
+@json_get("/api/ranking/videos-virais")
+@result_cache.cached("video", "canal", "comentario")
+async def get_videos_virais(limit: int = 10, channel_id: Optional[int] = None, start_date: Optional[str] = None, end_date: Optional[str] = None):
     where_clauses = []
     params = []
     if channel_id:
@@ -166,8 +389,9 @@ def get_videos_virais(limit: int = 10, channel_id: Optional[int] = None, start_d
         where_clauses.append("v.datah >= %s")
         params.append(start_date)
     if end_date:
-        where_clauses.append("v.datah <= %s")
-        params.append(end_date)
+        clause, value = end_bound("v.datah", end_date)
+        where_clauses.append(clause)
+        params.append(value)
     
     where_str = "WHERE " + " AND ".join(where_clauses) if where_clauses else ""
     query = f"""
@@ -180,12 +404,14 @@ def get_videos_virais(limit: int = 10, channel_id: Optional[int] = None, start_d
         LIMIT %s
     """
     params.append(limit)
-    return execute_query(query, tuple(params))
+    return await execute_query(query, tuple(params), as_rows=True)
 
-@app.get("/api/ranking/streamers")
-def get_top_streamers(limit: int = 10, start_date: Optional[str] = None, end_date: Optional[str] = None):
+@json_get("/api/ranking/streamers")
+@result_cache.cached("usuario", "canal", "video")
+async def get_top_streamers(limit: int = 10, start_date: Optional[str] = None, end_date: Optional[str] = None):
     if not (start_date or end_date):
-        return execute_query("SELECT nick, qtd_canais as canais, total_videos_postados as videos, audiencia_total_acumulada as audiencia FROM system_antig.mv_performance_streamers ORDER BY audiencia DESC LIMIT %s", (limit,))
+        # agg_performance_streamers is kept current by triggers, no refresh needed
+        return await execute_query("SELECT nick, qtd_canais as canais, total_videos_postados as videos, audiencia_total_acumulada as audiencia FROM system_antig.agg_performance_streamers ORDER BY audiencia DESC LIMIT %s", (limit,), as_rows=True)
     
     where_clauses = []
     params = []
@@ -193,8 +419,9 @@ def get_top_streamers(limit: int = 10, start_date: Optional[str] = None, end_dat
         where_clauses.append("v.datah >= %s")
         params.append(start_date)
     if end_date:
-        where_clauses.append("v.datah <= %s")
-        params.append(end_date)
+        clause, value = end_bound("v.datah", end_date)
+        where_clauses.append(clause)
+        params.append(value)
     
     where_str = "WHERE " + " AND ".join(where_clauses) if where_clauses else ""
     query = f"""
@@ -212,21 +439,71 @@ def get_top_streamers(limit: int = 10, start_date: Optional[str] = None, end_dat
         LIMIT %s
     """
     params.append(limit)
-    return execute_query(query, tuple(params))
+    return await execute_query(query, tuple(params), as_rows=True)
+
+@json_get("/api/ranking/top-viewers")
+@result_cache.cached("usuario", "doacao", "comentario")
+async def get_top_viewers(limit: int = 10, channel_id: Optional[int] = None, start_date: Optional[str] = None, end_date: Optional[str] = None):
+    days = day_range(start_date, end_date)
+    if days is not None:
+        # Rank donors on the daily rollup, then count distinct videos only for the top ones
+        where_clauses = []
+        video_clauses = ["d.id_usuario = t.id_usuario"]
+        params = []
+        if channel_id:
+            where_clauses.append("r.id_canal = %s")
+            params.append(channel_id)
+        if days[0]:
+            where_clauses.append("r.dia >= %s")
+            params.append(days[0])
+        if days[1]:
+            where_clauses.append("r.dia <= %s")
+            params.append(days[1])
+        params.append(limit)
+        if channel_id:
+            video_clauses.append("d.id_canal = %s")
+            params.append(channel_id)
+        if days[0]:
+            video_clauses.append("d.datah_comentario >= %s")
+            params.append(days[0])
+        if days[1]:
+            video_clauses.append("d.datah_comentario < %s::date + 1")
+            params.append(days[1])
+        where_str = "WHERE " + " AND ".join(where_clauses) if where_clauses else ""
+        return await execute_query(f"""
+            WITH top AS (
+                SELECT r.id_usuario, SUM(r.total) as total_doado
+                FROM system_antig.doacao_diaria r
+                {where_str}
+                GROUP BY r.id_usuario
+                ORDER BY total_doado DESC
+                LIMIT %s
+            )
+            SELECT 
+                u.nick,
+                (
+                    SELECT COUNT(DISTINCT d.id_video)
+                    FROM system_antig.doacao d
+                    WHERE {" AND ".join(video_clauses)}
+                ) as videos_apoiados,
+                t.total_doado
+            FROM top t
+            JOIN system_antig.usuario u ON u.id = t.id_usuario
+            ORDER BY t.total_doado DESC
+        """, tuple(params), as_rows=True)
 
-@app.get("/api/ranking/top-viewers")
-def get_top_viewers(limit: int = 10, channel_id: Optional[int] = None, start_date: Optional[str] = None, end_date: Optional[str] = None):
     where_clauses = []
     params = []
     if channel_id:
         where_clauses.append("d.id_canal = %s")
         params.append(channel_id)
     if start_date:
-        where_clauses.append("c.datah >= %s")
+        where_clauses.append("d.datah_comentario >= %s")
         params.append(start_date)
     if end_date:
-        where_clauses.append("c.datah <= %s")
-        params.append(end_date)
+        clause, value = end_bound("d.datah_comentario", end_date)
+        where_clauses.append(clause)
+        params.append(value)
     
     where_str = "WHERE " + " AND ".join(where_clauses) if where_clauses else ""
     query = f"""
@@ -236,168 +513,312 @@ def get_top_viewers(limit: int = 10, channel_id: Optional[int] = None, start_dat
             SUM(d.valor) as total_doado
         FROM system_antig.usuario u
         JOIN system_antig.doacao d ON u.id = d.id_usuario
-        LEFT JOIN system_antig.comentario c ON d.id_video = c.id_video AND d.id_canal = c.id_canal AND d.id_usuario = c.id_usuario AND d.seq_comentario = c.seq
         {where_str}
         GROUP BY u.id, u.nick
         ORDER BY total_doado DESC
         LIMIT %s
     """
     params.append(limit)
-    return execute_query(query, tuple(params))
+    return await execute_query(query, tuple(params), as_rows=True)
 
-# --- CRUD for Platforms ---
+# --- Pagination ---
+# List endpoints accept either ``page`` (OFFSET) or ``cursor``, the opaque
+# ``next_cursor`` of the previous response. A cursor seeks straight to the
+# next page on the sort key's index, so deep pages cost the same as page 1.
+
+PLATFORMS_KEY = Keyset([("nro", "nro")])
+USERS_KEY = Keyset([("id", "id")])
+CHANNELS_KEY = Keyset([("c.id", "id")])
+VIDEOS_KEY = Keyset([("v.datah", "datah"), ("v.id_video", "id_video"), ("v.id_canal", "id_canal")], descending=True)
+DONATIONS_KEY = Keyset([
+    ("d.valor", "valor"), ("d.id_video", "id_video"), ("d.id_canal", "id_canal"),
+    ("d.id_usuario", "id_usuario"), ("d.seq_comentario", "seq_comentario"), ("d.seq_pg", "seq_pg"),
+    ("d.datah_comentario", "datah_comentario"),
+], descending=True)
+
+# ``count`` picks how ``total`` is computed:
+#   exact     - COUNT(*) over the filtered query
+#   estimated - the planner's row estimate; exact COUNT only when the estimate
+#               is small enough for it to be cheap (the default)
+#   cached    - exact COUNT memoized per filter for COUNT_CACHE_TTL seconds,
+#               dropped early by writes to the tables involved
+#   none      - no total; rely on ``has_more``
+CountStrategy = Literal["exact", "estimated", "cached", "none"]
+# 1-based; FastAPI answers 422 below 1 instead of sending Postgres a negative OFFSET
+Page = Annotated[int, Query(ge=1)]
 
-@app.get("/api/platforms")
-def list_platforms(q: Optional[str] = None, page: int = 1):
-    limit = 10
+EXACT_COUNT_BELOW = int(os.getenv("EXACT_COUNT_BELOW", "10000"))
+COUNT_CACHE_TTL = float(os.getenv("COUNT_CACHE_TTL", "300"))
+
+async def count_rows(name: str, strategy: CountStrategy, from_sql: str, where_str: str, params: list, filters: dict, tables: tuple):
+    """Return (total, is_estimate) for a list query."""
+    async def exact():
+        return (await execute_query(f"SELECT COUNT(*) as count {from_sql} {where_str}", tuple(params), fetch_all=False))["count"]
+
+    if strategy == "none":
+        return None, False
+    if strategy == "cached":
+        return await result_cache.memoize(f"{name}:count", filters, tables, exact, ttl=COUNT_CACHE_TTL), False
+    if strategy == "estimated":
+        plan = await execute_query(f"EXPLAIN (FORMAT JSON) SELECT 1 {from_sql} {where_str}", tuple(params), fetch_all=False)
+        estimate = int(plan["QUERY PLAN"][0]["Plan"]["Plan Rows"])
+        if estimate >= EXACT_COUNT_BELOW:
+            return estimate, True
+    return await exact(), False
+
+async def paginate(name: str, keyset: Keyset, select_sql: str, from_sql: str, where_clauses: list, params: list,
+                   filters: dict, tables: tuple, page: int, cursor: Optional[str], count: CountStrategy, limit: int = 10):
+    """One page of a list endpoint plus its total, fetched concurrently.
+
+    The page is read with one extra row, so ``has_more`` is known without a
+    count. ``page`` pages use OFFSET; a ``cursor`` seeks past the last row of
+    the previous page on the keyset instead.
+    """
+    where_str = "WHERE " + " AND ".join(where_clauses) if where_clauses else ""
+    page_clauses = list(where_clauses)
+    page_params = list(params)
     offset = (page - 1) * limit
-    where_clause = ""
+    if cursor:
+        condition, values = keyset.after(cursor)
+        page_clauses.append(condition)
+        page_params.extend(values)
+        offset = 0
+    page_where = "WHERE " + " AND ".join(page_clauses) if page_clauses else ""
+    # LIMIT/OFFSET are ints, written into the SQL: as parameters, the prepared page query keeps being
+    # replanned for each value, which over every monthly partition of doacao costs more than the read
+    query = f"SELECT {select_sql} {from_sql} {page_where} ORDER BY {keyset.order_by()} LIMIT {int(limit) + 1} OFFSET {int(offset)}"
+
+    rows, (total, estimated) = await asyncio.gather(
+        execute_query(query, tuple(page_params), as_rows=True),
+        count_rows(name, count, from_sql, where_str, params, filters, tables),
+    )
+    items = rows[:limit]
+    has_more = len(rows) > limit
+    if total is not None and not cursor:
+        # What we just read bounds the total: exact on the last page, and never below the rows already seen
+        seen = offset + len(items)
+        if not has_more:
+            total, estimated = seen, False
+        elif total <= seen:
+            total = seen + 1
+
+    return {
+        "items": items,
+        "total": total,
+        "total_estimated": estimated,
+        "has_more": has_more,
+        "page": page,
+        "limit": limit,
+        "next_cursor": keyset.cursor_for(items[-1]) if has_more else None,
+    }
+
+# --- Detail ---
+# A detail route answers with one query: the row plus a page of each child
+# collection, built as JSON in the same statement (see detail.py). Each
+# collection is paged by its own cursor; ``include`` picks the collections.
+
+PLATFORM_DETAIL = Detail("p.*", "FROM system_antig.plataforma p", "p.nro = %s", [
+    Child("channels", CHANNELS_KEY, "c.*", "FROM system_antig.canal c", "c.nro_plataforma = p.nro"),
+])
+USER_DETAIL = Detail("u.*", "FROM system_antig.usuario u", "u.id = %s", [
+    Child("channels", CHANNELS_KEY, "c.*", "FROM system_antig.canal c", "c.id_streamer = u.id"),
+    # The user is fixed, so the rest of the donation key orders the page
+    Child("donations", Keyset([
+        ("d.valor", "valor"), ("d.id_video", "id_video"), ("d.id_canal", "id_canal"),
+        ("d.seq_comentario", "seq_comentario"), ("d.seq_pg", "seq_pg"), ("d.datah_comentario", "datah_comentario"),
+    ], descending=True), "d.*", "FROM system_antig.doacao d", "d.id_usuario = u.id"),
+])
+CHANNEL_DETAIL = Detail(
+    "c.*, u.nick as streamer_nick, p.nome as platform_name",
+    "FROM system_antig.canal c JOIN system_antig.usuario u ON c.id_streamer = u.id JOIN system_antig.plataforma p ON c.nro_plataforma = p.nro",
+    "c.id = %s",
+    [Child("videos", Keyset([("v.datah", "datah"), ("v.id_video", "id_video")], descending=True),
+           "v.*", "FROM system_antig.video v", "v.id_canal = c.id")],
+)
+VIDEO_DETAIL = Detail(
+    "v.*, c.nome as canal_nome",
+    "FROM system_antig.video v JOIN system_antig.canal c ON v.id_canal = c.id",
+    "v.id_video = %s AND v.id_canal = %s",
+    [Child("donations", Keyset([
+        ("d.valor", "valor"), ("d.id_usuario", "id_usuario"), ("d.seq_comentario", "seq_comentario"), ("d.seq_pg", "seq_pg"),
+        ("d.datah_comentario", "datah_comentario"),
+    ], descending=True), "d.*, u.nick", "FROM system_antig.doacao d JOIN system_antig.usuario u ON d.id_usuario = u.id",
+        "d.id_video = v.id_video AND d.id_canal = v.id_canal")],
+)
+
+async def get_detail(detail: Detail, key_values: tuple, not_found: str, include: Optional[str], limit: int, **cursors):
+    """The row of ``detail`` with ``limit`` rows of each included collection, in one round trip."""
+    children = detail.included(include)
+    limit = max(1, min(limit, DETAIL_MAX_LIMIT))
+    row = await execute_query(*detail.query(children, key_values, cursors, limit), fetch_all=False)
+    if not row:
+        raise HTTPException(status_code=404, detail=not_found)
+    return detail.page(row, children, limit)
+
+# --- Search ---
+
+@json_get("/api/search/{entity}")
+async def search(entity: str, q: str, limit: int = 10):
+    """Typeahead: best matches for ``q`` as key columns + label, capped at SEARCH_MAX_LIMIT."""
+    if entity not in SEARCH_ENTITIES:
+        raise HTTPException(status_code=404, detail=f"Unknown search entity '{entity}'")
+    q = q.strip()
+    if not q:
+        return []
+    query, params = SEARCH_ENTITIES[entity].query(q, max(1, min(limit, SEARCH_MAX_LIMIT)))
+    return await execute_query(query, params, as_rows=True)
+
+# --- Batch Writes ---
+# The bulk POST routes send their rows as one JSON array to a set-based SQL function
+# (f_inserir_videos, f_inserir_doacoes in full_setup.sql): one round trip and one INSERT
+# per table, so the statement-level triggers run once per batch. Keys come from
+# sequences; a row that cannot be inserted is reported with its reason and does not
+# stop the others.
+
+BATCH_MAX_ROWS = int(os.getenv("BATCH_MAX_ROWS", "5000"))
+
+# datah_comentario (the comment's date) is doacao's partition key: part of its primary key, and what
+# lets a write by key touch a single monthly partition
+DONATION_KEY = ("id_video", "id_canal", "id_usuario", "seq_comentario", "seq_pg", "datah_comentario")
+
+async def insert_batch(function: str, items: list, exclude: set = None):
+    if len(items) > BATCH_MAX_ROWS:
+        raise HTTPException(status_code=413, detail=f"At most {BATCH_MAX_ROWS} rows per batch")
+    payload = Jsonb([item.model_dump(exclude=exclude, exclude_none=True) for item in items])
+    return await execute_query(f"SELECT * FROM system_antig.{function}(%s)", (payload,))
+
+def batch_response(rows, key: tuple):
+    results = []
+    for row in rows:
+        if row["erro"]:
+            results.append({"index": row["ordem"] - 1, "status": "error", "error": row["erro"]})
+        else:
+            results.append({"index": row["ordem"] - 1, "status": "success", **{column: row[column] for column in key}})
+    inserted = sum(result["status"] == "success" for result in results)
+    return {"inserted": inserted, "failed": len(results) - inserted, "results": results}
+
+# --- CRUD for Platforms ---
+
+@json_get("/api/platforms", tables=("plataforma",))
+async def list_platforms(q: Optional[str] = None, page: Page = 1, cursor: Optional[str] = None, count: CountStrategy = "estimated"):
+    where_clauses = []
     params = []
     if q:
-        where_clause = "WHERE nome ILIKE %s"
+        where_clauses.append("nome ILIKE %s")
         params.append(f"%{q}%")
     
-    total = execute_query(f"SELECT COUNT(*) as count FROM system_antig.plataforma {where_clause}", tuple(params), fetch_all=False)["count"]
-    
-    query = f"SELECT * FROM system_antig.plataforma {where_clause} ORDER BY nro LIMIT %s OFFSET %s"
-    params.extend([limit, offset])
-    items = execute_query(query, tuple(params))
-    
-    return {"items": items, "total": total, "page": page, "limit": limit}
+    return await paginate("list_platforms", PLATFORMS_KEY, "*", "FROM system_antig.plataforma", where_clauses, params,
+                          {"q": q}, ("plataforma",), page, cursor, count)
 
-@app.get("/api/platforms/{nro}")
-def get_platform(nro: int):
-    platform = execute_query("SELECT * FROM system_antig.plataforma WHERE nro = %s", (nro,), fetch_all=False)
-    if not platform:
-        raise HTTPException(status_code=404, detail="Platform not found")
+@json_get("/api/platforms/{nro}", tables=("plataforma", "canal"))
+async def get_platform(nro: int, include: Optional[str] = None, limit: int = DETAIL_LIMIT, channels_cursor: Optional[str] = None):
     # Follow FKs: Channels in this platform
-    channels = execute_query("SELECT * FROM system_antig.canal WHERE nro_plataforma = %s", (nro,))
-    platform["channels"] = channels
-    return platform
+    return await get_detail(PLATFORM_DETAIL, (nro,), "Platform not found", include, limit, channels=channels_cursor)
 
 @app.post("/api/platforms")
-def create_platform(p: Platform):
-    next_nro = execute_query("SELECT COALESCE(MAX(nro), 0) + 1 as next_id FROM system_antig.plataforma", fetch_all=False)["next_id"]
-    execute_query("INSERT INTO system_antig.plataforma (nro, nome, empresa_fund, empresa_respo, data_fund) VALUES (%s, %s, %s, %s, %s)", 
-                  (next_nro, p.nome, p.empresa_fund, p.empresa_respo, p.data_fund), fetch_all=False)
-    return {"status": "success", "id": next_nro}
+async def create_platform(p: Platform):
+    # The key comes from the column's sequence (see full_setup.sql)
+    row = await execute_query("INSERT INTO system_antig.plataforma (nome, empresa_fund, empresa_respo, data_fund) VALUES (%s, %s, %s, %s) RETURNING nro", 
+                  (p.nome, p.empresa_fund, p.empresa_respo, p.data_fund), fetch_all=False)
+    await result_cache.invalidate("plataforma")
+    return {"status": "success", "id": row["nro"]}
 
 @app.put("/api/platforms/{nro}")
-def update_platform(nro: int, p: Platform):
-    execute_query("UPDATE system_antig.plataforma SET nome=%s, empresa_fund=%s, empresa_respo=%s, data_fund=%s WHERE nro=%s", 
+async def update_platform(nro: int, p: Platform):
+    await execute_query("UPDATE system_antig.plataforma SET nome=%s, empresa_fund=%s, empresa_respo=%s, data_fund=%s WHERE nro=%s", 
                   (p.nome, p.empresa_fund, p.empresa_respo, p.data_fund, nro), fetch_all=False)
+    await result_cache.invalidate("plataforma")
     return {"status": "success"}
 
 @app.delete("/api/platforms/{nro}")
-def delete_platform(nro: int):
-    execute_query("DELETE FROM system_antig.plataforma WHERE nro=%s", (nro,), fetch_all=False)
+async def delete_platform(nro: int):
+    await execute_query("DELETE FROM system_antig.plataforma WHERE nro=%s", (nro,), fetch_all=False)
+    await result_cache.invalidate("plataforma")
     return {"status": "success"}
 
 # --- CRUD for Users ---
 
-@app.get("/api/users")
-def list_users(q: Optional[str] = None, page: int = 1):
-    limit = 10
-    offset = (page - 1) * limit
-    where_clause = ""
+@json_get("/api/users", tables=("usuario",))
+async def list_users(q: Optional[str] = None, page: Page = 1, cursor: Optional[str] = None, count: CountStrategy = "estimated"):
+    where_clauses = []
     params = []
     if q:
-        where_clause = "WHERE nick ILIKE %s OR email ILIKE %s"
+        where_clauses.append("(nick ILIKE %s OR email ILIKE %s)")
         params.extend([f"%{q}%", f"%{q}%"])
     
-    total = execute_query(f"SELECT COUNT(*) as count FROM system_antig.usuario {where_clause}", tuple(params), fetch_all=False)["count"]
-    
-    query = f"SELECT * FROM system_antig.usuario {where_clause} ORDER BY id LIMIT %s OFFSET %s"
-    params.extend([limit, offset])
-    items = execute_query(query, tuple(params))
-    
-    return {"items": items, "total": total, "page": page, "limit": limit}
-
-@app.get("/api/users/{id}")
-def get_user(id: int):
-    user = execute_query("SELECT * FROM system_antig.usuario WHERE id = %s", (id,), fetch_all=False)
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    # Follow FKs: Channels owned by this user
-    channels = execute_query("SELECT * FROM system_antig.canal WHERE id_streamer = %s", (id,))
-    # Donations made by this user
-    donations = execute_query("SELECT * FROM system_antig.doacao WHERE id_usuario = %s LIMIT 10", (id,))
-    user["channels"] = channels
-    user["donations"] = donations
-    return user
+    return await paginate("list_users", USERS_KEY, "*", "FROM system_antig.usuario", where_clauses, params,
+                          {"q": q}, ("usuario",), page, cursor, count)
+
+@json_get("/api/users/{id}", tables=("usuario", "canal", "doacao"))
+async def get_user(id: int, include: Optional[str] = None, limit: int = DETAIL_LIMIT,
+                   channels_cursor: Optional[str] = None, donations_cursor: Optional[str] = None):
+    # Follow FKs: Channels owned by this user, donations made by this user (largest first)
+    return await get_detail(USER_DETAIL, (id,), "User not found", include, limit,
+                            channels=channels_cursor, donations=donations_cursor)
 
 @app.post("/api/users")
-def create_user(u: User):
-    next_id = execute_query("SELECT COALESCE(MAX(id), 0) + 1 as next_id FROM system_antig.usuario", fetch_all=False)["next_id"]
-    execute_query("INSERT INTO system_antig.usuario (id, nick, email, data_nasc, telefone, end_postal, id_pais) VALUES (%s, %s, %s, %s, %s, %s, %s)", 
-                  (next_id, u.nick, u.email, u.data_nasc, u.telefone, u.end_postal, u.id_pais), fetch_all=False)
-    return {"status": "success", "id": next_id}
+async def create_user(u: User):
+    row = await execute_query("INSERT INTO system_antig.usuario (nick, email, data_nasc, telefone, end_postal, id_pais) VALUES (%s, %s, %s, %s, %s, %s) RETURNING id", 
+                  (u.nick, u.email, u.data_nasc, u.telefone, u.end_postal, u.id_pais), fetch_all=False)
+    await result_cache.invalidate("usuario")
+    return {"status": "success", "id": row["id"]}
 
 @app.put("/api/users/{id}")
-def update_user(id: int, u: User):
-    execute_query("UPDATE system_antig.usuario SET nick=%s, email=%s, data_nasc=%s, telefone=%s, end_postal=%s, id_pais=%s WHERE id=%s", 
+async def update_user(id: int, u: User):
+    await execute_query("UPDATE system_antig.usuario SET nick=%s, email=%s, data_nasc=%s, telefone=%s, end_postal=%s, id_pais=%s WHERE id=%s", 
                   (u.nick, u.email, u.data_nasc, u.telefone, u.end_postal, u.id_pais, id), fetch_all=False)
+    await result_cache.invalidate("usuario")
     return {"status": "success"}
 
 @app.delete("/api/users/{id}")
-def delete_user(id: int):
-    execute_query("DELETE FROM system_antig.usuario WHERE id=%s", (id,), fetch_all=False)
+async def delete_user(id: int):
+    await execute_query("DELETE FROM system_antig.usuario WHERE id=%s", (id,), fetch_all=False)
+    await result_cache.invalidate("usuario", "comentario", "doacao")
     return {"status": "success"}
 
 # --- CRUD for Channels (Streamers) ---
 
-@app.get("/api/channels")
-def list_channels(q: Optional[str] = None, page: int = 1):
-    limit = 10
-    offset = (page - 1) * limit
-    where_clause = ""
+@json_get("/api/channels", tables=("canal", "usuario", "plataforma"))
+async def list_channels(q: Optional[str] = None, page: Page = 1, cursor: Optional[str] = None, count: CountStrategy = "estimated"):
+    where_clauses = []
     params = []
     if q:
-        where_clause = "WHERE c.nome ILIKE %s"
+        where_clauses.append("c.nome ILIKE %s")
         params.append(f"%{q}%")
     
-    total = execute_query(f"SELECT COUNT(*) as count FROM system_antig.canal c {where_clause}", tuple(params), fetch_all=False)["count"]
-    
-    query = f"SELECT c.*, u.nick as streamer_nick, p.nome as platform_name FROM system_antig.canal c JOIN system_antig.usuario u ON c.id_streamer = u.id JOIN system_antig.plataforma p ON c.nro_plataforma = p.nro {where_clause} ORDER BY c.id LIMIT %s OFFSET %s"
-    params.extend([limit, offset])
-    items = execute_query(query, tuple(params))
-    
-    return {"items": items, "total": total, "page": page, "limit": limit}
-
-@app.get("/api/channels/{id}")
-def get_channel(id: int):
-    channel = execute_query("SELECT c.*, u.nick as streamer_nick, p.nome as platform_name FROM system_antig.canal c JOIN system_antig.usuario u ON c.id_streamer = u.id JOIN system_antig.plataforma p ON c.nro_plataforma = p.nro WHERE c.id = %s", (id,), fetch_all=False)
-    if not channel:
-        raise HTTPException(status_code=404, detail="Channel not found")
-    # Videos in this channel
-    videos = execute_query("SELECT * FROM system_antig.video WHERE id_canal = %s ORDER BY datah DESC", (id,))
-    channel["videos"] = videos
-    return channel
+    return await paginate("list_channels", CHANNELS_KEY, "c.*, u.nick as streamer_nick, p.nome as platform_name",
+                          "FROM system_antig.canal c JOIN system_antig.usuario u ON c.id_streamer = u.id JOIN system_antig.plataforma p ON c.nro_plataforma = p.nro",
+                          where_clauses, params, {"q": q}, ("canal", "usuario", "plataforma"), page, cursor, count)
+
+@json_get("/api/channels/{id}", tables=("canal", "usuario", "plataforma", "video"))
+async def get_channel(id: int, include: Optional[str] = None, limit: int = DETAIL_LIMIT, videos_cursor: Optional[str] = None):
+    # Videos in this channel, newest first
+    return await get_detail(CHANNEL_DETAIL, (id,), "Channel not found", include, limit, videos=videos_cursor)
 
 @app.post("/api/channels")
-def create_channel(c: Channel):
-    next_id = execute_query("SELECT COALESCE(MAX(id), 0) + 1 as next_id FROM system_antig.canal", fetch_all=False)["next_id"]
-    execute_query("INSERT INTO system_antig.canal (id, nome, tipo, data, descricao, id_streamer, nro_plataforma) VALUES (%s, %s, %s, %s, %s, %s, %s)", 
-                  (next_id, c.nome, c.tipo, c.data, c.descricao, c.id_streamer, c.nro_plataforma), fetch_all=False)
-    return {"status": "success", "id": next_id}
+async def create_channel(c: Channel):
+    row = await execute_query("INSERT INTO system_antig.canal (nome, tipo, data, descricao, id_streamer, nro_plataforma) VALUES (%s, %s, %s, %s, %s, %s) RETURNING id", 
+                  (c.nome, c.tipo, c.data, c.descricao, c.id_streamer, c.nro_plataforma), fetch_all=False)
+    await result_cache.invalidate("canal")
+    return {"status": "success", "id": row["id"]}
 
 @app.put("/api/channels/{id}")
-def update_channel(id: int, c: Channel):
-    execute_query("UPDATE system_antig.canal SET nome=%s, tipo=%s, data=%s, descricao=%s, id_streamer=%s, nro_plataforma=%s WHERE id=%s", 
+async def update_channel(id: int, c: Channel):
+    await execute_query("UPDATE system_antig.canal SET nome=%s, tipo=%s, data=%s, descricao=%s, id_streamer=%s, nro_plataforma=%s WHERE id=%s", 
                   (c.nome, c.tipo, c.data, c.descricao, c.id_streamer, c.nro_plataforma, id), fetch_all=False)
+    await result_cache.invalidate("canal")
     return {"status": "success"}
 
 @app.delete("/api/channels/{id}")
-def delete_channel(id: int):
-    execute_query("DELETE FROM system_antig.canal WHERE id=%s", (id,), fetch_all=False)
+async def delete_channel(id: int):
+    await execute_query("DELETE FROM system_antig.canal WHERE id=%s", (id,), fetch_all=False)
+    await result_cache.invalidate("canal", "video", "comentario", "doacao")
     return {"status": "success"}
 
 # --- CRUD for Videos ---
 
-@app.get("/api/videos")
-def list_videos(q: Optional[str] = None, channel_id: Optional[int] = None, page: int = 1):
-    limit = 10
-    offset = (page - 1) * limit
+@json_get("/api/videos", tables=("video", "canal"))
+async def list_videos(q: Optional[str] = None, channel_id: Optional[int] = None, page: Page = 1, cursor: Optional[str] = None, count: CountStrategy = "estimated"):
     where_clauses = []
     params = []
     if q:
@@ -407,88 +828,122 @@ def list_videos(q: Optional[str] = None, channel_id: Optional[int] = None, page:
         where_clauses.append("v.id_canal = %s")
         params.append(channel_id)
     
-    where_str = "WHERE " + " AND ".join(where_clauses) if where_clauses else ""
-    
-    total = execute_query(f"SELECT COUNT(*) as count FROM system_antig.video v {where_str}", tuple(params), fetch_all=False)["count"]
-    
-    query = f"SELECT v.*, c.nome as canal_nome FROM system_antig.video v JOIN system_antig.canal c ON v.id_canal = c.id {where_str} ORDER BY v.datah DESC LIMIT %s OFFSET %s"
-    params.extend([limit, offset])
-    items = execute_query(query, tuple(params))
-    
-    return {"items": items, "total": total, "page": page, "limit": limit}
-
-@app.get("/api/videos/{id_canal}/{id_video}")
-def get_video(id_canal: int, id_video: int):
-    video = execute_query("SELECT v.*, c.nome as canal_nome FROM system_antig.video v JOIN system_antig.canal c ON v.id_canal = c.id WHERE v.id_video = %s AND v.id_canal = %s", (id_video, id_canal), fetch_all=False)
-    if not video:
-        raise HTTPException(status_code=404, detail="Video not found")
-    # Donations for this video
-    donations = execute_query("SELECT d.*, u.nick FROM system_antig.doacao d JOIN system_antig.usuario u ON d.id_usuario = u.id WHERE d.id_video = %s AND d.id_canal = %s", (id_video, id_canal))
-    video["donations"] = donations
-    return video
+    return await paginate("list_videos", VIDEOS_KEY, "v.*, c.nome as canal_nome",
+                          "FROM system_antig.video v JOIN system_antig.canal c ON v.id_canal = c.id",
+                          where_clauses, params, {"q": q, "channel_id": channel_id}, ("video", "canal"), page, cursor, count)
+
+@json_get("/api/videos/{id_canal}/{id_video}", tables=("video", "canal", "doacao", "usuario"))
+async def get_video(id_canal: int, id_video: int, include: Optional[str] = None, limit: int = DETAIL_LIMIT,
+                    donations_cursor: Optional[str] = None):
+    # Donations for this video, largest first
+    return await get_detail(VIDEO_DETAIL, (id_video, id_canal), "Video not found", include, limit, donations=donations_cursor)
 
 @app.post("/api/videos")
-def create_video(v: Video):
-    next_id = execute_query("SELECT COALESCE(MAX(id_video), 0) + 1 as next_id FROM system_antig.video WHERE id_canal = %s", (v.id_canal,), fetch_all=False)["next_id"]
-    execute_query("INSERT INTO system_antig.video (id_video, id_canal, titulo, datah, tema, duracao, visu_simul, visu_total) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)", 
-                  (next_id, v.id_canal, v.titulo, v.datah, v.tema, v.duracao, v.visu_simul, v.visu_total), fetch_all=False)
-    return {"status": "success", "id": next_id}
+async def create_video(v: Video):
+    row = await execute_query("INSERT INTO system_antig.video (id_canal, titulo, datah, tema, duracao, visu_simul, visu_total) VALUES (%s, %s, %s, %s, %s, %s, %s) RETURNING id_video", 
+                  (v.id_canal, v.titulo, v.datah, v.tema, v.duracao, v.visu_simul, v.visu_total), fetch_all=False)
+    await result_cache.invalidate("video", "canal")
+    return {"status": "success", "id": row["id_video"]}
+
+@app.post("/api/videos/batch")
+async def create_videos(videos: List[Video]):
+    """Inserts up to ``BATCH_MAX_ROWS`` videos in one statement; ``results`` holds each one's key or error, in order."""
+    rows = await insert_batch("f_inserir_videos", videos, exclude={"id_video"})
+    if any(row["erro"] is None for row in rows):
+        await result_cache.invalidate("video", "canal")
+    return batch_response(rows, ("id_video", "id_canal"))
 
 @app.put("/api/videos/{id_canal}/{id_video}")
-def update_video(id_canal: int, id_video: int, v: Video):
-    execute_query("UPDATE system_antig.video SET titulo=%s, datah=%s, tema=%s, duracao=%s, visu_simul=%s, visu_total=%s WHERE id_video=%s AND id_canal=%s", 
+async def update_video(id_canal: int, id_video: int, v: Video):
+    await execute_query("UPDATE system_antig.video SET titulo=%s, datah=%s, tema=%s, duracao=%s, visu_simul=%s, visu_total=%s WHERE id_video=%s AND id_canal=%s", 
                   (v.titulo, v.datah, v.tema, v.duracao, v.visu_simul, v.visu_total, id_video, id_canal), fetch_all=False)
+    await result_cache.invalidate("video", "canal")
     return {"status": "success"}
 
 @app.delete("/api/videos/{id_canal}/{id_video}")
-def delete_video(id_canal: int, id_video: int):
-    execute_query("DELETE FROM system_antig.video WHERE id_video=%s AND id_canal=%s", (id_video, id_canal), fetch_all=False)
+async def delete_video(id_canal: int, id_video: int):
+    await execute_query("DELETE FROM system_antig.video WHERE id_video=%s AND id_canal=%s", (id_video, id_canal), fetch_all=False)
+    await result_cache.invalidate("video", "canal", "comentario", "doacao")
     return {"status": "success"}
 
 # --- CRUD for Donations ---
 
-@app.get("/api/donations")
-def list_donations(q: Optional[str] = None, page: int = 1):
-    limit = 10
-    offset = (page - 1) * limit
-    where_clause = ""
+@json_get("/api/donations", tables=("doacao", "usuario", "video"))
+async def list_donations(q: Optional[str] = None, page: Page = 1, cursor: Optional[str] = None, count: CountStrategy = "estimated"):
+    where_clauses = []
     params = []
     if q:
-        where_clause = "WHERE u.nick ILIKE %s OR v.titulo ILIKE %s"
+        # Resolve the matching users and videos on their trigram indexes first; an OR across the joined
+        # tables would otherwise filter the whole doacao join row by row. Each IN is a hashed subplan,
+        # so a donation is checked with one hash probe, in every monthly partition of doacao
+        where_clauses.append("(d.id_usuario IN (SELECT id FROM system_antig.usuario WHERE nick ILIKE %s) OR (d.id_video, d.id_canal) IN (SELECT id_video, id_canal FROM system_antig.video WHERE titulo ILIKE %s))")
         params.extend([f"%{q}%", f"%{q}%"])
     
-    total = execute_query(f"SELECT COUNT(*) as count FROM system_antig.doacao d JOIN system_antig.usuario u ON d.id_usuario = u.id JOIN system_antig.video v ON d.id_video = v.id_video AND d.id_canal = v.id_canal {where_clause}", tuple(params), fetch_all=False)["count"]
-    
-    query = f"SELECT d.*, u.nick, v.titulo as video_titulo FROM system_antig.doacao d JOIN system_antig.usuario u ON d.id_usuario = u.id JOIN system_antig.video v ON d.id_video = v.id_video AND d.id_canal = v.id_canal {where_clause} ORDER BY d.valor DESC LIMIT %s OFFSET %s"
-    params.extend([limit, offset])
-    items = execute_query(query, tuple(params))
-    
-    return {"items": items, "total": total, "page": page, "limit": limit}
+    return await paginate("list_donations", DONATIONS_KEY, "d.*, u.nick, v.titulo as video_titulo",
+                          "FROM system_antig.doacao d JOIN system_antig.usuario u ON d.id_usuario = u.id JOIN system_antig.video v ON d.id_video = v.id_video AND d.id_canal = v.id_canal",
+                          where_clauses, params, {"q": q}, ("doacao", "usuario", "video"), page, cursor, count)
 
 @app.post("/api/donations")
-def create_donation(d: Donation):
-    seq_c = d.seq_comentario or random.randint(1, 1000000)
-    seq_p = d.seq_pg or random.randint(1, 1000000)
-    execute_query("INSERT INTO system_antig.doacao (id_video, id_canal, id_usuario, seq_comentario, seq_pg, valor, status) VALUES (%s, %s, %s, %s, %s, %s, %s)", 
-                  (d.id_video, d.id_canal, d.id_usuario, seq_c, seq_p, d.valor, d.status), fetch_all=False)
-    return {"status": "success"}
+async def create_donation(d: NewDonation):
+    # Without seq_comentario the donation goes on the donor's latest comment on the video; seq_pg comes from a sequence
+    row = (await insert_batch("f_inserir_doacoes", [d]))[0]
+    if row["erro"]:
+        raise HTTPException(status_code=400, detail=row["erro"])
+    await result_cache.invalidate("doacao")
+    return {"status": "success", **{column: row[column] for column in DONATION_KEY}}
+
+@app.post("/api/donations/batch")
+async def create_donations(donations: List[NewDonation]):
+    """Inserts up to ``BATCH_MAX_ROWS`` donations (with their payment records) in one statement; ``results`` holds each one's key or error, in order."""
+    rows = await insert_batch("f_inserir_doacoes", donations)
+    if any(row["erro"] is None for row in rows):
+        await result_cache.invalidate("doacao")
+    return batch_response(rows, DONATION_KEY)
 
-@app.put("/api/donations/{id_video}/{id_canal}/{id_usuario}/{seq_comentario}/{seq_pg}")
-def update_donation(id_video: int, id_canal: int, id_usuario: int, seq_comentario: int, seq_pg: int, d: Donation):
-    execute_query("UPDATE system_antig.doacao SET valor=%s, status=%s WHERE id_video=%s AND id_canal=%s AND id_usuario=%s AND seq_comentario=%s AND seq_pg=%s", 
-                  (d.valor, d.status, id_video, id_canal, id_usuario, seq_comentario, seq_pg), fetch_all=False)
+@app.put("/api/donations/{id_video}/{id_canal}/{id_usuario}/{seq_comentario}/{seq_pg}/{datah_comentario}")
+async def update_donation(id_video: int, id_canal: int, id_usuario: int, seq_comentario: int, seq_pg: int, datah_comentario: datetime, d: Donation):
+    await execute_query("UPDATE system_antig.doacao SET valor=%s, status=%s WHERE id_video=%s AND id_canal=%s AND id_usuario=%s AND seq_comentario=%s AND seq_pg=%s AND datah_comentario=%s", 
+                  (d.valor, d.status, id_video, id_canal, id_usuario, seq_comentario, seq_pg, datah_comentario), fetch_all=False)
+    await result_cache.invalidate("doacao")
     return {"status": "success"}
 
-@app.delete("/api/donations/{id_video}/{id_canal}/{id_usuario}/{seq_comentario}/{seq_pg}")
-def delete_donation(id_video: int, id_canal: int, id_usuario: int, seq_comentario: int, seq_pg: int):
-    execute_query("DELETE FROM system_antig.doacao WHERE id_video=%s AND id_canal=%s AND id_usuario=%s AND seq_comentario=%s AND seq_pg=%s", 
-                  (id_video, id_canal, id_usuario, seq_comentario, seq_pg), fetch_all=False)
+@app.delete("/api/donations/{id_video}/{id_canal}/{id_usuario}/{seq_comentario}/{seq_pg}/{datah_comentario}")
+async def delete_donation(id_video: int, id_canal: int, id_usuario: int, seq_comentario: int, seq_pg: int, datah_comentario: datetime):
+    await execute_query("DELETE FROM system_antig.doacao WHERE id_video=%s AND id_canal=%s AND id_usuario=%s AND seq_comentario=%s AND seq_pg=%s AND datah_comentario=%s", 
+                  (id_video, id_canal, id_usuario, seq_comentario, seq_pg, datah_comentario), fetch_all=False)
+    await result_cache.invalidate("doacao")
     return {"status": "success"}
 
 # --- Analytical Endpoints ---
 
-@app.get("/api/reports/revenue-over-time")
-def get_revenue_over_time(channel_id: Optional[int] = None, video_id: Optional[int] = None, start_date: Optional[str] = None, end_date: Optional[str] = None):
+@json_get("/api/reports/revenue-over-time")
+@result_cache.cached("doacao", "comentario")
+async def get_revenue_over_time(channel_id: Optional[int] = None, video_id: Optional[int] = None, start_date: Optional[str] = None, end_date: Optional[str] = None):
+    days = day_range(start_date, end_date)
+    if days is not None and not video_id:
+        # The rollup has no video dimension, so a video filter still reads doacao
+        where_clauses = ["r.status IN ('lido', 'recebido')"]
+        params = []
+        if channel_id:
+            where_clauses.append("r.id_canal = %s")
+            params.append(channel_id)
+        if days[0]:
+            where_clauses.append("r.dia >= %s")
+            params.append(days[0])
+        if days[1]:
+            where_clauses.append("r.dia <= %s")
+            params.append(days[1])
+        return await execute_query(f"""
+            SELECT 
+                TO_CHAR(r.dia, 'YYYY-MM') as month,
+                SUM(r.total) as total
+            FROM system_antig.doacao_diaria r
+            WHERE {" AND ".join(where_clauses)}
+            GROUP BY month
+            ORDER BY month DESC
+            LIMIT 12
+        """, tuple(params), as_rows=True)
+
     where_clauses = ["d.status IN ('lido', 'recebido')"]
     params = []
     if channel_id:
@@ -498,28 +953,29 @@ def get_revenue_over_time(channel_id: Optional[int] = None, video_id: Optional[i
         where_clauses.append("d.id_video = %s")
         params.append(video_id)
     if start_date:
-        where_clauses.append("c.datah >= %s")
+        where_clauses.append("d.datah_comentario >= %s")
         params.append(start_date)
     if end_date:
-        where_clauses.append("c.datah <= %s")
-        params.append(end_date)
+        clause, value = end_bound("d.datah_comentario", end_date)
+        where_clauses.append(clause)
+        params.append(value)
     
     where_str = "WHERE " + " AND ".join(where_clauses)
     
-    return execute_query(f"""
+    return await execute_query(f"""
         SELECT 
-            TO_CHAR(c.datah, 'YYYY-MM') as month,
+            TO_CHAR(d.datah_comentario, 'YYYY-MM') as month,
             SUM(d.valor) as total
         FROM system_antig.doacao d
-        JOIN system_antig.comentario c ON d.id_video = c.id_video AND d.id_canal = c.id_canal AND d.id_usuario = c.id_usuario AND d.seq_comentario = c.seq
         {where_str}
         GROUP BY month
         ORDER BY month DESC
         LIMIT 12
-    """, tuple(params))
+    """, tuple(params), as_rows=True)
 
-@app.get("/api/reports/distribution-by-theme")
-def get_distribution_by_theme(channel_id: Optional[int] = None, start_date: Optional[str] = None, end_date: Optional[str] = None):
+@json_get("/api/reports/distribution-by-theme")
+@result_cache.cached("video")
+async def get_distribution_by_theme(channel_id: Optional[int] = None, start_date: Optional[str] = None, end_date: Optional[str] = None):
     where_clauses = ["tema IS NOT NULL"]
     params = []
     if channel_id:
@@ -529,12 +985,13 @@ def get_distribution_by_theme(channel_id: Optional[int] = None, start_date: Opti
         where_clauses.append("datah >= %s")
         params.append(start_date)
     if end_date:
-        where_clauses.append("datah <= %s")
-        params.append(end_date)
+        clause, value = end_bound("datah", end_date)
+        where_clauses.append(clause)
+        params.append(value)
     
     where_str = "WHERE " + " AND ".join(where_clauses)
     
-    return execute_query(f"""
+    return await execute_query(f"""
         SELECT 
             tema, 
             COUNT(*) as count,
@@ -543,68 +1000,286 @@ def get_distribution_by_theme(channel_id: Optional[int] = None, start_date: Opti
         {where_str}
         GROUP BY tema
         ORDER BY count DESC
-    """, tuple(params))
+    """, tuple(params), as_rows=True)
 
-@app.get("/api/reports/drilldown-performance")
-def get_drilldown_performance(channel_id: Optional[int] = None, start_date: Optional[str] = None, end_date: Optional[str] = None):
+def drilldown_performance_query(channel_id: Optional[int] = None, start_date: Optional[str] = None, end_date: Optional[str] = None):
     # If no channel selected: Aggregate by Channels
     # If channel selected: Aggregate by Videos
-    
+    #
+    # Donations are summed per video first and only then joined to the videos, so each
+    # video contributes one row whatever its number of donations (joining doacao
+    # directly repeated visu_total once per donation). Revenue counts received and read
+    # donations, as the other revenue reports do, which lets the per-video sums read
+    # idx_doacao_recebidas_lidas; video rows come from idx_video_canal_datah /
+    # idx_video_datah_pk, which carry the view counts. doacao is partitioned by month
+    # and a video's donations may sit in any month, so a per-video lookup probes every
+    # partition; one channel's donations are read as one index range per partition.
+
     where_clauses = []
     params = []
     if start_date:
         where_clauses.append("v.datah >= %s")
         params.append(start_date)
     if end_date:
-        where_clauses.append("v.datah <= %s")
-        params.append(end_date)
-        
+        clause, value = end_bound("v.datah", end_date)
+        where_clauses.append(clause)
+        params.append(value)
+    if channel_id:
+        where_clauses.append("v.id_canal = %s")
+        params.append(channel_id)
+
+    where_str = "WHERE " + " AND ".join(where_clauses) if where_clauses else ""
+    if channel_id:
+        # One channel: its donations grouped per video (the parameter precedes the WHERE ones)
+        revenue_join = """LEFT JOIN (
+                SELECT d.id_video, SUM(d.valor) as total
+                FROM system_antig.doacao d
+                WHERE d.id_canal = %s AND d.status IN ('lido', 'recebido')
+                GROUP BY d.id_video
+            ) r ON r.id_video = v.id_video"""
+        params.insert(0, channel_id)
+    elif where_clauses:
+        # Some videos: one index lookup per selected video
+        revenue_join = """LEFT JOIN LATERAL (
+                SELECT SUM(d.valor) as total
+                FROM system_antig.doacao d
+                WHERE d.id_video = v.id_video AND d.id_canal = v.id_canal AND d.status IN ('lido', 'recebido')
+            ) r ON true"""
+    else:
+        # Every video: one pass over the donations, grouped per video
+        revenue_join = """LEFT JOIN (
+                SELECT d.id_video, d.id_canal, SUM(d.valor) as total
+                FROM system_antig.doacao d
+                WHERE d.status IN ('lido', 'recebido')
+                GROUP BY d.id_video, d.id_canal
+            ) r ON r.id_video = v.id_video AND r.id_canal = v.id_canal"""
+
     if not channel_id:
-        where_str = "WHERE " + " AND ".join(where_clauses) if where_clauses else ""
-        return execute_query(f"""
+        # With a date range, channels without videos in it are left out
+        channels_join = "JOIN" if where_clauses else "LEFT JOIN"
+        return f"""
+            WITH por_canal AS (
+                SELECT
+                    v.id_canal,
+                    COUNT(*) as total_items,
+                    SUM(v.visu_total) as total_views,
+                    SUM(r.total) as total_revenue
+                FROM system_antig.video v
+                {revenue_join}
+                {where_str}
+                GROUP BY v.id_canal
+            )
             SELECT 
                 c.nome as entity_name,
-                COUNT(v.id_video) as total_items,
-                SUM(v.visu_total) as total_views,
-                COALESCE(SUM(d.valor), 0) as total_revenue
+                COALESCE(p.total_items, 0) as total_items,
+                p.total_views,
+                COALESCE(p.total_revenue, 0) as total_revenue
             FROM system_antig.canal c
-            LEFT JOIN system_antig.video v ON c.id = v.id_canal
-            LEFT JOIN system_antig.doacao d ON v.id_video = d.id_video AND v.id_canal = d.id_canal
-            {where_str}
-            GROUP BY c.id, c.nome
+            {channels_join} por_canal p ON p.id_canal = c.id
             ORDER BY total_revenue DESC
-        """, tuple(params))
+        """, tuple(params)
     else:
-        where_clauses.append("v.id_canal = %s")
-        params.append(channel_id)
-        where_str = "WHERE " + " AND ".join(where_clauses)
-        return execute_query(f"""
+        return f"""
             SELECT 
                 v.titulo as entity_name,
                 v.visu_total as total_views,
                 v.visu_simul as peak_views,
-                COALESCE(SUM(d.valor), 0) as total_revenue
+                COALESCE(r.total, 0) as total_revenue
             FROM system_antig.video v
-            LEFT JOIN system_antig.doacao d ON v.id_video = d.id_video AND v.id_canal = d.id_canal
+            {revenue_join}
             {where_str}
-            GROUP BY v.id_video, v.id_canal, v.titulo, v.visu_total, v.visu_simul
             ORDER BY total_revenue DESC
-        """, tuple(params))
+        """, tuple(params)
+
+@json_get("/api/reports/drilldown-performance")
+@result_cache.cached("canal", "video", "doacao")
+async def get_drilldown_performance(channel_id: Optional[int] = None, start_date: Optional[str] = None, end_date: Optional[str] = None):
+    return await execute_query(*drilldown_performance_query(channel_id, start_date, end_date), as_rows=True)
+
+# Materialized views are refreshed in the background (see refresh.py): the POST returns a
+# job at once, and concurrent requests share the refresh that hasn't started yet.
+
+@app.post("/api/reports/refresh", status_code=202)
+async def refresh_views(view: List[str] = Query(default=[])):
+    """Queue a refresh of the given materialized views (all by default); poll the returned job."""
+    unknown = sorted(set(view) - set(MATERIALIZED_VIEWS))
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown materialized view(s): {', '.join(unknown)}")
+    return (await refresher.request(view or MATERIALIZED_VIEWS)).as_dict()
+
+@app.get("/api/reports/refresh")
+async def get_refresh_status():
+    """Last refresh time, duration and pending changes of each view, plus the recent jobs."""
+    try:
+        return await refresher.status()
+    except (AsyncPoolTimeout, TooManyRequests) as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+@app.get("/api/reports/refresh/{job_id}")
+async def get_refresh_job(job_id: str):
+    job = await refresher.job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Refresh job not found")
+    return job
 
-@app.post("/api/reports/refresh")
-def refresh_views():
-    execute_query("CALL system_antig.sp_refresh_views_analiticas();", fetch_all=False)
-    return {"status": "success", "message": "Analytical views refreshed"}
+# --- Batch Endpoints ---
+# One request per page: the panels run concurrently, each on its own pooled
+# connection, and a failing panel doesn't take the others down with it.
+
+async def run_panels(panels: dict):
+    async def timed(name, coro):
+        start = time.perf_counter()
+        try:
+            return name, await coro, None
+        except HTTPException as e:
+            return name, [], e.detail
+        finally:
+            timings[name] = round((time.perf_counter() - start) * 1000, 2)
+
+    timings = {}
+    results = await asyncio.gather(*(timed(name, coro) for name, coro in panels.items()))
+    payload = {name: data for name, data, _ in results}
+    payload["timings_ms"] = timings
+    payload["errors"] = {name: error for name, _, error in results if error}
+    return payload
+
+@json_get("/api/dashboard", tables=get_ranking_faturamento.tables | get_videos_virais.tables | get_top_streamers.tables | get_top_viewers.tables)
+async def get_dashboard(limit: int = 10, channel_id: Optional[int] = None, start_date: Optional[str] = None, end_date: Optional[str] = None):
+    return await run_panels({
+        "ranking": get_ranking_faturamento(limit, channel_id, start_date, end_date),
+        "videos": get_videos_virais(limit, channel_id, start_date, end_date),
+        # The streamer panel has always shown the all-time ranking
+        "streamers": get_top_streamers(limit),
+        "viewers": get_top_viewers(limit, channel_id, start_date, end_date),
+    })
+
+@json_get("/api/analytics", tables=get_revenue_over_time.tables | get_distribution_by_theme.tables | get_drilldown_performance.tables)
+async def get_analytics(channel_id: Optional[int] = None, video_id: Optional[int] = None, start_date: Optional[str] = None, end_date: Optional[str] = None):
+    return await run_panels({
+        "revenue": get_revenue_over_time(channel_id, video_id, start_date, end_date),
+        "themes": get_distribution_by_theme(channel_id, start_date, end_date),
+        "performance": get_drilldown_performance(channel_id, start_date, end_date),
+    })
 
 # --- Lookups ---
+# Compact id/label rows for the form dropdowns, with ETag revalidation. The dimension
+# tables come from in-memory snapshots (revalidated on every use, since a write must show
+# up at once); the large tables page their label index and may be reused for a while.
+
+LOOKUP_MAX_LIMIT = int(os.getenv("LOOKUP_MAX_LIMIT", "50"))
+LOOKUP_MAX_AGE = int(os.getenv("LOOKUP_MAX_AGE", "30"))
+
+SNAPSHOTS = {
+    "companies": DimensionSnapshot("empresa", "nro", "nome", execute_query),
+    "countries": DimensionSnapshot("pais", "id", "nome", execute_query),
+    "platforms": DimensionSnapshot("plataforma", "nro", "nome", execute_query),
+}
+
+def warm_snapshots():
+    """Load every snapshot on a blocking connection (gunicorn master, before forking the workers)."""
+    with pool.connection() as conn:
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            for snapshot in SNAPSHOTS.values():
+                cur.execute(snapshot.query)
+                snapshot.preload([dict(row) for row in cur.fetchall()])
+    # The workers must not inherit an open socket
+    pool.closeall()
+
+def etag_response(request: Request, payload, cache_control: str, etag: Optional[str] = None):
+    body = encode(payload)
+    etag = f'"{etag or hashlib.sha1(body).hexdigest()}"'
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type="application/json", headers=headers)
+
+@app.get("/api/lookup/{entity}")
+async def lookup(entity: str, request: Request, q: str = "", limit: Optional[int] = None, channel_id: Optional[int] = None):
+    """Labels starting with ``q``; dimension tables return every match unless ``limit`` is given.
+
+    ``channel_id`` narrows ``videos`` to one channel.
+    """
+    q = q.strip()
+    if entity in SNAPSHOTS:
+        rows = await SNAPSHOTS[entity].lookup(q, limit)
+        return etag_response(request, rows, "no-cache")
+    if entity not in SEARCH_ENTITIES:
+        raise HTTPException(status_code=404, detail=f"Unknown lookup entity '{entity}'")
+    equals = {"id_canal": channel_id} if entity == "videos" and channel_id else {}
+    query, params = SEARCH_ENTITIES[entity].prefix_query(q, max(1, min(limit or LOOKUP_MAX_LIMIT, LOOKUP_MAX_LIMIT)), **equals)
+    rows = await execute_query(query, params, as_rows=True)
+    return etag_response(request, rows, f"public, max-age={LOOKUP_MAX_AGE}")
 
 @app.get("/api/companies")
-def list_companies():
-    return execute_query("SELECT nro, nome FROM system_antig.empresa ORDER BY nome")
+async def list_companies(request: Request):
+    snapshot = SNAPSHOTS["companies"]
+    return etag_response(request, await snapshot.rows(), "no-cache", snapshot.etag)
 
 @app.get("/api/countries")
-def list_countries():
-    return execute_query("SELECT id, nome FROM system_antig.pais ORDER BY nome")
+async def list_countries(request: Request):
+    snapshot = SNAPSHOTS["countries"]
+    return etag_response(request, await snapshot.rows(), "no-cache", snapshot.etag)
+
+# --- Exports ---
+# Whole tables and the unpaginated drilldown, streamed to the client instead of fetched into
+# memory (see exports.py). Table exports come in primary-key order, so an index scan can start
+# sending rows at once.
+
+ExportFormat = Literal["csv", "ndjson", "arrow"]
+
+EXPORTS = {
+    # entity: (select, {filter: condition}, order by); end_date names the column end_bound() filters
+    "donations": (
+        "SELECT d.id_video, d.id_canal, d.id_usuario, d.seq_comentario, d.seq_pg, d.valor, d.status, d.datah_comentario as datah "
+        "FROM system_antig.doacao d",
+        {"channel_id": "d.id_canal = %s", "video_id": "d.id_video = %s", "start_date": "d.datah_comentario >= %s", "end_date": "d.datah_comentario"},
+        "d.id_video, d.id_canal, d.id_usuario, d.seq_comentario, d.seq_pg",
+    ),
+    "comments": (
+        "SELECT * FROM system_antig.comentario",
+        {"channel_id": "id_canal = %s", "video_id": "id_video = %s", "start_date": "datah >= %s", "end_date": "datah"},
+        "id_video, id_canal, id_usuario, seq",
+    ),
+    "videos": (
+        "SELECT * FROM system_antig.video",
+        {"channel_id": "id_canal = %s", "start_date": "datah >= %s", "end_date": "datah"},
+        "id_video, id_canal",
+    ),
+    "channels": (
+        "SELECT * FROM system_antig.canal",
+        {"platform_id": "nro_plataforma = %s"},
+        "id",
+    ),
+}
+
+@app.get("/api/export/{entity}")
+async def export(request: Request, entity: str, format: ExportFormat = "csv", channel_id: Optional[int] = None, video_id: Optional[int] = None,
+                 platform_id: Optional[int] = None, start_date: Optional[str] = None, end_date: Optional[str] = None):
+    """Streams ``donations``, ``comments``, ``videos``, ``channels`` or ``drilldown-performance`` as CSV, NDJSON or Arrow."""
+    filters = {"channel_id": channel_id, "video_id": video_id, "platform_id": platform_id, "start_date": start_date, "end_date": end_date}
+    filters = {name: value for name, value in filters.items() if value is not None}
+    if entity == "drilldown-performance":
+        unsupported = set(filters) - {"channel_id", "start_date", "end_date"}
+        query, params = drilldown_performance_query(channel_id, start_date, end_date)
+    elif entity in EXPORTS:
+        select, conditions, order_by = EXPORTS[entity]
+        unsupported = set(filters) - set(conditions)
+        where_clauses, params = [], []
+        for name in filters:
+            if name not in conditions:
+                continue
+            clause, value = end_bound(conditions[name], filters[name]) if name == "end_date" else (conditions[name], filters[name])
+            where_clauses.append(clause)
+            params.append(value)
+        where_str = "WHERE " + " AND ".join(where_clauses) if where_clauses else ""
+        query, params = f"{select} {where_str} ORDER BY {order_by}", tuple(params)
+    else:
+        raise HTTPException(status_code=404, detail=f"Unknown export entity '{entity}'")
+    if unsupported:
+        raise HTTPException(status_code=400, detail=f"'{entity}' cannot be filtered by {', '.join(sorted(unsupported))}")
+    # The connection is taken before the response starts, so the stream stays on the chosen server
+    with replica_reads(request):
+        return await export_response(query, params, format, entity)
 
 if __name__ == "__main__":
     import uvicorn
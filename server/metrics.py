@@ -0,0 +1,304 @@
+"""Request and query instrumentation.
+
+``execute_query`` reports every statement here: connection-acquire time,
+execution time and rows returned, labelled with the route that ran it and a
+short id of the normalized SQL (whitespace collapsed, literals replaced by
+``?``), so the dynamically built variants of a query are told apart without
+one series per parameter value. ``MetricsMiddleware`` times whole requests and
+adds a ``Server-Timing`` header with the pool wait, the database time and one
+entry per statement, which the browser's network panel shows per request.
+
+Statements slower than ``SLOW_QUERY_MS`` are logged (``streamerdata.sql``
+logger, plus the last ``QUERY_LOG_SIZE`` in memory) with their normalized SQL
+and bound parameters. A share ``EXPLAIN_SAMPLE_RATE`` of the slow read-only
+ones (plain ``SELECT``/``WITH`` that call no function of the schema but the
+reporting ones in ``READ_FUNCTIONS``) is re-run under ``EXPLAIN (ANALYZE, BUFFERS)`` and the plan kept with the
+entry. With ``EXPLAIN_ON_DEMAND=1`` a request sent with ``X-Explain: 1`` gets
+a plan for every read-only statement it runs, whatever its duration.
+
+Everything is rendered in the Prometheus text format by ``registry.render()``
+(``GET /metrics``). Counters are per process: with several workers, scrape
+each of them.
+"""
+import contextvars
+import hashlib
+import logging
+import os
+import random
+import re
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+EXPLAIN_SAMPLE_RATE = float(os.getenv("EXPLAIN_SAMPLE_RATE", "0.1"))
+EXPLAIN_ON_DEMAND = os.getenv("EXPLAIN_ON_DEMAND", "0") == "1"
+QUERY_LOG_SIZE = int(os.getenv("QUERY_LOG_SIZE", "100"))
+
+# Seconds; spans a primary-key lookup to a full-table report
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Statement ids and request timings are attached to at most this many Server-Timing entries
+MAX_TIMING_ENTRIES = 20
+
+logger = logging.getLogger("streamerdata.sql")
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values):
+    return ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+
+
+class Counter:
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{{{_labels(self.labels, labels)}}} {value}")
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram, one series per label combination."""
+
+    def __init__(self, name, help, labels=(), buckets=BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        self._series = {}  # labels -> [count per bucket..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += 1
+            series[-1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, series in sorted(self._series.items()):
+                base = _labels(self.labels, labels)
+                sep = "," if base else ""
+                for bound, count in zip(self.buckets, series):
+                    lines.append(f'{self.name}_bucket{{{base}{sep}le="{bound}"}} {count}')
+                lines.append(f'{self.name}_bucket{{{base}{sep}le="+Inf"}} {series[-2]}')
+                lines.append(f"{self.name}_count{{{base}}} {series[-2]}")
+                lines.append(f"{self.name}_sum{{{base}}} {series[-1]:.6f}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.requests = Histogram(
+            "http_request_duration_seconds", "Request latency by route template.", ("method", "route", "status"),
+        )
+        self.queries = Histogram(
+            "db_query_duration_seconds", "Statement execution time, pool wait excluded.", ("route", "statement"),
+        )
+        self.acquire = Histogram(
+            "db_pool_acquire_seconds", "Time spent waiting for a pooled connection.", ("route",),
+        )
+        self.rows = Counter("db_query_rows_total", "Rows returned by statements.", ("route", "statement"))
+        self.slow = Counter("db_slow_queries_total", f"Statements slower than {SLOW_QUERY_MS:g} ms.", ("route", "statement"))
+        self.explains = Counter("db_explain_captures_total", "EXPLAIN ANALYZE plans captured.", ("reason",))
+        self.statements = {}  # id -> normalized SQL
+        self.log = deque(maxlen=QUERY_LOG_SIZE)
+        self.gauges = []  # callables returning {name: (help, value)}
+
+    def statement(self, query):
+        normalized = normalize_sql(query)
+        statement_id = hashlib.sha1(normalized.encode()).hexdigest()[:10]
+        self.statements.setdefault(statement_id, normalized)
+        return statement_id, normalized
+
+    def render(self):
+        lines = []
+        for metric in (self.requests, self.queries, self.acquire, self.rows, self.slow, self.explains):
+            lines += metric.render()
+        lines += ["# HELP db_statement_info Normalized SQL of each statement id.", "# TYPE db_statement_info gauge"]
+        for statement_id, sql in sorted(self.statements.items()):
+            lines.append(f'db_statement_info{{statement="{statement_id}",sql="{_escape(sql[:300])}"}} 1')
+        for gauges in self.gauges:
+            for name, (help, value) in gauges().items():
+                lines += [f"# HELP {name} {help}", f"# TYPE {name} gauge", f"{name} {value}"]
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_SPACE = re.compile(r"\s+")
+_WRITES = re.compile(
+    r"\b(INSERT|UPDATE|DELETE|MERGE|CALL|REFRESH|TRUNCATE|COPY|NEXTVAL|SETVAL|PG_ADVISORY_\w+)\b", re.IGNORECASE
+)
+_CALLS = re.compile(r"\bsystem_antig\.(\w+)\s*\(", re.IGNORECASE)
+
+# Functions of the schema known to only read. Any other (f_inserir_videos, f_inserir_doacoes, ...)
+# may write from inside a SELECT, and EXPLAIN ANALYZE would run it again
+READ_FUNCTIONS = frozenset({
+    "f_alteracoes_tabelas",
+    "f_doacoes_lidas_por_video",
+    "f_doacoes_por_canal",
+    "f_membros_e_desembolso",
+    "f_patrocinios_por_empresa",
+    "f_ranking_aportes_membros",
+    "f_ranking_doacoes",
+    "f_ranking_faturamento_total",
+    "f_ranking_patrocinio",
+    "f_verificar_agregados",
+})
+
+
+def normalize_sql(query):
+    return _LITERALS.sub("?", _SPACE.sub(" ", query).strip())
+
+
+def is_read_only(normalized):
+    return (
+        normalized.split(" ", 1)[0].upper() in ("SELECT", "WITH")
+        and not _WRITES.search(normalized)
+        and all(name.lower() in READ_FUNCTIONS for name in _CALLS.findall(normalized))
+    )
+
+
+# --- Per-request state ---
+
+class RequestMetrics:
+    """Timings of the request being served; shared by the tasks it spawns."""
+
+    def __init__(self, scope, explain=False):
+        self.scope = scope
+        self.explain = explain
+        self.acquire_seconds = 0.0
+        self.db_seconds = 0.0
+        self.statements = []  # (statement id, seconds, rows)
+
+    @property
+    def route(self):
+        route = self.scope.get("route")
+        return getattr(route, "path", None) or "unmatched"
+
+    def server_timing(self, total_seconds):
+        entries = [
+            f"total;dur={total_seconds * 1000:.1f}",
+            f"pool;dur={self.acquire_seconds * 1000:.1f}",
+            f'db;dur={self.db_seconds * 1000:.1f};desc="{len(self.statements)} statements"',
+        ]
+        for n, (statement_id, seconds, rows) in enumerate(self.statements[:MAX_TIMING_ENTRIES], 1):
+            entries.append(f'sql{n};dur={seconds * 1000:.1f};desc="{statement_id} rows={rows}"')
+        return ", ".join(entries)
+
+
+_current = contextvars.ContextVar("request_metrics", default=None)
+
+
+async def record_query(conn, query, params, result, acquire_seconds, seconds):
+    """Account one statement run by ``execute_query`` on ``conn`` (still checked out)."""
+    request = _current.get()
+    route = request.route if request else "background"
+    statement_id, normalized = registry.statement(query)
+    # fetchone's dict, or the list / Rows of a fetchall
+    rows = 0 if result is None else 1 if isinstance(result, dict) else len(result)
+
+    registry.acquire.observe(acquire_seconds, route)
+    registry.queries.observe(seconds, route, statement_id)
+    registry.rows.inc(route, statement_id, amount=rows)
+    if request:
+        request.acquire_seconds += acquire_seconds
+        request.db_seconds += seconds
+        request.statements.append((statement_id, seconds, rows))
+
+    slow = seconds * 1000 >= SLOW_QUERY_MS
+    on_demand = bool(request and request.explain)
+    if not (slow or on_demand):
+        return
+    if slow:
+        registry.slow.inc(route, statement_id)
+    entry = {
+        "at": datetime.now().isoformat(timespec="milliseconds"),
+        "route": route,
+        "statement": statement_id,
+        "sql": normalized,
+        "params": [repr(p) for p in params] if isinstance(params, (list, tuple)) else
+                  {k: repr(v) for k, v in params.items()} if isinstance(params, dict) else None,
+        "ms": round(seconds * 1000, 2),
+        "rows": rows,
+        "plan": None,
+    }
+    reason = "on_demand" if on_demand else "sampled" if random.random() < EXPLAIN_SAMPLE_RATE else None
+    if reason and is_read_only(normalized):
+        entry["plan"] = await _explain(conn, query, params)
+        if entry["plan"] is not None:
+            registry.explains.inc(reason)
+    registry.log.append(entry)
+    if slow:
+        logger.warning("slow query %.1f ms route=%s statement=%s sql=%s params=%s",
+                       entry["ms"], route, statement_id, normalized, entry["params"])
+
+
+async def _explain(conn, query, params):
+    try:
+        # A savepoint, so a failing EXPLAIN leaves the request's transaction usable; always rolled
+        # back, since ANALYZE runs the statement again (a write hidden in a function call included)
+        async with conn.transaction(force_rollback=True):
+            cur = await conn.execute(f"EXPLAIN (ANALYZE, BUFFERS) {query}", params)
+            return "\n".join(next(iter(row.values())) for row in await cur.fetchall())
+    except Exception as e:
+        logger.warning("EXPLAIN failed for %s: %s", normalize_sql(query)[:120], e)
+        return None
+
+
+class MetricsMiddleware:
+    """Times each request by route template and adds its ``Server-Timing`` header."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        explain = EXPLAIN_ON_DEMAND and any(
+            name == b"x-explain" and value.strip() in (b"1", b"true", b"analyze") for name, value in scope["headers"]
+        )
+        request = RequestMetrics(scope, explain)
+        token = _current.set(request)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", request.server_timing(time.perf_counter() - started).encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            registry.requests.observe(time.perf_counter() - started, scope["method"], request.route, status)
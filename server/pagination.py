@@ -0,0 +1,65 @@
+import base64
+import binascii
+import json
+
+from datetime import date, datetime
+from decimal import Decimal
+
+from fastapi import HTTPException
+
+
+def _json_default(value):
+    # Decimals and timestamps travel as strings and are passed back untyped,
+    # so Postgres compares them as the column's own type and keeps the index.
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def encode_cursor(values):
+    raw = json.dumps(values, default=_json_default, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_cursor(token, size):
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        values = json.loads(raw)
+    except (binascii.Error, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(values, list) or len(values) != size:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+
+class Keyset:
+    """Sort key of a list endpoint, used for cursor (keyset) pagination.
+
+    ``columns`` are ``(sql, field)`` pairs: the expression to sort on and the
+    name it comes back as in each row. The last columns must make the key
+    unique (usually the primary key). All columns sort in the same direction,
+    so the next page is a single row comparison that a composite index on the
+    same columns can seek to, however deep the page is.
+    """
+
+    def __init__(self, columns, descending=False):
+        self.columns = columns
+        self.descending = descending
+
+    def order_by(self):
+        direction = " DESC" if self.descending else ""
+        return ", ".join(sql + direction for sql, _ in self.columns)
+
+    def after(self, cursor):
+        """WHERE condition (and its params) selecting the rows after ``cursor``."""
+        # Cursors built from JSON rows (detail.py) carry numerics as floats: send them as
+        # text too, so they compare as the column's type rather than float8
+        values = [repr(v) if isinstance(v, float) else v for v in decode_cursor(cursor, len(self.columns))]
+        op = "<" if self.descending else ">"
+        sql = ", ".join(sql for sql, _ in self.columns)
+        return f"({sql}) {op} ({', '.join(['%s'] * len(values))})", values
+
+    def cursor_for(self, row):
+        return encode_cursor([row[field] for _, field in self.columns])
@@ -0,0 +1,140 @@
+"""Monthly partitions of ``comentario`` and ``doacao``.
+
+Both tables are partitioned by the month of the comment (``comentario.datah``,
+copied to ``doacao.datah_comentario``) and have no default partition, so a
+write into a month without a partition fails. While the API runs, each worker
+calls ``system_antig.sp_criar_particoes`` at startup and every
+``PARTITION_CHECK_INTERVAL`` seconds (0 disables it) to keep the current month
+and the next ``PARTITION_MONTHS_AHEAD`` ready. The procedure only creates what
+is missing and serializes callers with an advisory lock, so several workers
+can run it at once. Creating a partition locks the parent table; the check
+gives up after ``PARTITION_LOCK_TIMEOUT`` rather than queue the API's queries
+behind a long-running one, and tries again on the next round.
+
+As a command, from ``server/``, it lists the partitions (``v_particoes``) or
+creates, archives and restores months:
+
+    python partitions.py
+    python partitions.py create --months 6
+    python partitions.py archive 2024-10
+    python partitions.py restore 2024-10
+
+Archiving (``sp_arquivar_mes``) detaches a finished month from both tables
+and moves it, with its payment rows, to the ``system_antig_arquivo`` schema;
+the aggregates drop its donations. Dump that schema and drop its tables to
+free the space, or restore the month while it is still there.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+from datetime import date
+
+import psycopg
+import psycopg2
+
+from db import conninfo, pool
+
+PARTITION_MONTHS_AHEAD = int(os.getenv("PARTITION_MONTHS_AHEAD", "3"))
+PARTITION_CHECK_INTERVAL = float(os.getenv("PARTITION_CHECK_INTERVAL", "3600"))
+PARTITION_LOCK_TIMEOUT = os.getenv("PARTITION_LOCK_TIMEOUT", "5s")
+
+CREATE = "CALL system_antig.sp_criar_particoes(now()::timestamp, now()::timestamp + make_interval(months => %s))"
+
+logger = logging.getLogger("streamerdata.partitions")
+
+
+class PartitionMaintainer:
+    def __init__(self):
+        self._task = None
+
+    def start(self):
+        """Create the coming months now and every ``PARTITION_CHECK_INTERVAL`` seconds (app lifespan)."""
+        if PARTITION_CHECK_INTERVAL > 0 and self._task is None:
+            self._task = asyncio.create_task(self._maintain())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def ensure(self, months=PARTITION_MONTHS_AHEAD):
+        # Own connection: the DDL must not hold a pooled one while it waits for its locks
+        async with await psycopg.AsyncConnection.connect(conninfo(), autocommit=True) as conn:
+            await conn.execute(f"SET lock_timeout = '{PARTITION_LOCK_TIMEOUT}'")
+            await conn.execute(CREATE, (months,))
+
+    async def _maintain(self):
+        while True:
+            try:
+                await self.ensure()
+            except psycopg.Error as e:
+                logger.warning("could not create the coming monthly partitions: %s", e)
+            await asyncio.sleep(PARTITION_CHECK_INTERVAL)
+
+
+maintainer = PartitionMaintainer()
+
+
+def _month(value):
+    try:
+        return date.fromisoformat(f"{value}-01")
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected YYYY-MM, got {value!r}")
+
+
+def list_partitions():
+    with pool.connection() as conn:
+        cur = conn.cursor()
+        cur.execute("""
+            SELECT mes,
+                   MAX(linhas_estimadas) FILTER (WHERE tabela = 'comentario'),
+                   MAX(linhas_estimadas) FILTER (WHERE tabela = 'doacao'),
+                   SUM(bytes),
+                   bool_or(arquivada)
+            FROM system_antig.v_particoes
+            GROUP BY mes
+            ORDER BY mes
+        """)
+        rows = cur.fetchall()
+    print(f"{'month':<8} {'comments':>10} {'donations':>10} {'MB':>9}  state")
+    for mes, comments, donations, size, archived in rows:
+        print(f"{mes:%Y-%m}  {comments or 0:>10} {donations or 0:>10} {size / 2 ** 20:>9.1f}  "
+              f"{'archived' if archived else 'attached'}")
+    print("(row counts are estimates from the last ANALYZE)")
+    return 0
+
+
+def run(statement, params, done):
+    with pool.connection() as conn:
+        cur = conn.cursor()
+        try:
+            cur.execute(statement, params)
+        except psycopg2.Error as e:
+            conn.rollback()
+            print(f"Failed: {e.diag.message_primary or e}")
+            return 1
+        conn.commit()
+    print(done)
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command")
+    create = commands.add_parser("create", help="create the partitions of the current and the coming months")
+    create.add_argument("--months", type=int, default=PARTITION_MONTHS_AHEAD, help="months ahead of the current one")
+    for name, help in (("archive", "move a finished month to system_antig_arquivo"),
+                       ("restore", "bring an archived month back")):
+        commands.add_parser(name, help=help).add_argument("month", type=_month, help="YYYY-MM")
+    args = parser.parse_args()
+
+    if args.command == "create":
+        sys.exit(run(CREATE, (args.months,), f"Partitions ready up to {args.months} month(s) ahead."))
+    if args.command == "archive":
+        sys.exit(run("CALL system_antig.sp_arquivar_mes(%s)", (args.month,), f"Archived {args.month:%Y-%m}."))
+    if args.command == "restore":
+        sys.exit(run("CALL system_antig.sp_restaurar_mes(%s)", (args.month,), f"Restored {args.month:%Y-%m}."))
+    sys.exit(list_partitions())
@@ -124,12 +124,20 @@ def populate_data():
                         seq,
                         random.randint(1, 1000000), # seq_pg
                         round(random.uniform(1, 1000), 2),
-                        random.choice(['lido', 'recebido', 'recusado'])
+                        random.choice(['lido', 'recebido', 'recusado']),
+                        c_date.strftime('%Y-%m-%d %H:%M:%S')  # datah_comentario
                     ))
 
+        # Bulk-load mode: the view-count trigger only records the channels and the
+        # totals are recomputed once per round, right before the commit
+        cur.execute("SET LOCAL system_antig.carga_em_lote = 'on'")
+        # comentario/doacao are partitioned by month: make sure every month of this round has its partitions
+        c_dates = [c[5] for c in comments]
+        cur.execute("CALL system_antig.sp_criar_particoes(%s, %s)", (min(c_dates), max(c_dates)))
         execute_values(cur, "INSERT INTO system_antig.video (id_video, id_canal, titulo, datah, tema, duracao, visu_simul, visu_total) VALUES %s", videos)
         execute_values(cur, "INSERT INTO system_antig.comentario (id_video, id_canal, id_usuario, seq, texto, datah, coment_on) VALUES %s", comments)
-        execute_values(cur, "INSERT INTO system_antig.doacao (id_video, id_canal, id_usuario, seq_comentario, seq_pg, valor, status) VALUES %s", donations)
+        execute_values(cur, "INSERT INTO system_antig.doacao (id_video, id_canal, id_usuario, seq_comentario, seq_pg, valor, status, datah_comentario) VALUES %s", donations)
+        cur.execute("CALL system_antig.sp_aplicar_visualizacoes_pendentes()")
         print(f"Inserted {len(videos)} videos, {len(comments)} comments, and {len(donations)} donations.")
         conn.commit()
 
@@ -158,6 +166,8 @@ def populate_data():
         ))
     
     execute_values(cur, "INSERT INTO system_antig.inscricao (id_canal, id_membro, nivel) VALUES %s ON CONFLICT DO NOTHING", subscriptions)
+    # The ids above were picked here; move the key sequences the API allocates from past them
+    cur.execute("CALL system_antig.sp_sincronizar_sequencias()")
     conn.commit()
 
     cur.close()
@@ -0,0 +1,294 @@
+"""Background refresh of the materialized views.
+
+``POST /api/reports/refresh`` used to run ``sp_refresh_views_analiticas``
+inside the request, so the caller waited for both refreshes and every click
+started another pair. Refreshes now run here, one view at a time per view,
+outside the request:
+
+* ``request(views)`` returns a ``Job`` at once. Each view has at most one
+  refresh waiting to start; every request made while it waits joins it, so
+  ten clicks cost one refresh. A request made while a refresh is already
+  running queues one more, since that refresh may have started before the
+  caller's writes.
+* Each view is refreshed on its own connection (outside the API pool) and in
+  its own transaction, with ``system_antig.sp_atualizar_visao``. A PostgreSQL
+  advisory lock keeps several workers or hosts from refreshing the same view
+  at once.
+* Every ``REFRESH_CHECK_INTERVAL`` seconds the scheduler reads
+  ``system_antig.v_mv_atualizacao`` and refreshes a view that is older than
+  ``REFRESH_INTERVAL`` seconds or whose source tables have had at least
+  ``REFRESH_MIN_CHANGES`` rows written since its last refresh (0 disables
+  either rule). That state lives in the database, so it is shared by all
+  workers and survives restarts; a scheduled refresh another worker has just
+  done is skipped.
+
+A successful refresh clears the result cache, which also changes every ETag.
+A job's status is written to the cache backend whenever it changes and kept
+there ``REFRESH_JOB_TTL`` seconds, so every worker sharing it (Redis, which
+several workers require) answers ``GET /api/reports/refresh/{job_id}``. The
+worker running a job also keeps the last ``REFRESH_JOB_HISTORY`` in memory.
+"""
+import asyncio
+import logging
+import os
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+
+import psycopg
+from psycopg.rows import dict_row
+from psycopg_pool import PoolTimeout
+
+from cache import result_cache
+from db import async_pool, conninfo
+
+REFRESH_INTERVAL = float(os.getenv("REFRESH_INTERVAL", "3600"))
+REFRESH_MIN_CHANGES = int(os.getenv("REFRESH_MIN_CHANGES", "10000"))
+REFRESH_CHECK_INTERVAL = float(os.getenv("REFRESH_CHECK_INTERVAL", "60"))
+REFRESH_SCHEDULER = os.getenv("REFRESH_SCHEDULER", "1") == "1"
+REFRESH_JOB_HISTORY = 100
+REFRESH_JOB_TTL = 3600
+
+VIEWS = ("mv_faturamento_canal", "mv_performance_streamers")
+
+STATE = """
+    SELECT visao, atualizada_em, duracao_ms, alteracoes_pendentes,
+           EXTRACT(EPOCH FROM now() - atualizada_em) as idade
+    FROM system_antig.v_mv_atualizacao
+"""
+
+logger = logging.getLogger("streamerdata.refresh")
+
+
+def _iso(moment):
+    return moment.isoformat(timespec="milliseconds") if moment else None
+
+
+def due(row):
+    """Why the view in a ``STATE`` row needs a scheduled refresh (``schedule`` or ``changes``), or None."""
+    if REFRESH_INTERVAL > 0 and (row["idade"] is None or row["idade"] >= REFRESH_INTERVAL):
+        return "schedule"
+    if REFRESH_MIN_CHANGES > 0 and row["alteracoes_pendentes"] >= REFRESH_MIN_CHANGES:
+        return "changes"
+    return None
+
+
+async def _state():
+    async with async_pool.connection() as conn:
+        cur = await conn.execute(STATE)
+        return await cur.fetchall()
+
+
+class Run:
+    """One refresh of one view, shared by every job that asked for it while it was queued."""
+
+    def __init__(self, view, trigger):
+        self.view = view
+        self.trigger = trigger
+        self.status = "queued"
+        self.requested_at = datetime.now()
+        self.started_at = None
+        self.finished_at = None
+        self.seconds = None
+        self.error = None
+        self.done = asyncio.Event()
+        self.jobs = []  # every Job that joined this run
+
+    def as_dict(self):
+        return {
+            "status": self.status,
+            "trigger": self.trigger,
+            "requested_at": _iso(self.requested_at),
+            "started_at": _iso(self.started_at),
+            "finished_at": _iso(self.finished_at),
+            "duration_ms": round(self.seconds * 1000, 1) if self.seconds is not None else None,
+            "error": self.error,
+        }
+
+
+class Job:
+    def __init__(self, runs, trigger):
+        self.id = uuid.uuid4().hex[:12]
+        self.trigger = trigger
+        self.created_at = datetime.now()
+        self.runs = runs  # view -> Run
+
+    @property
+    def status(self):
+        statuses = {run.status for run in self.runs.values()}
+        if statuses & {"queued", "running"}:
+            return "running" if statuses - {"queued"} else "queued"
+        return "failed" if "failed" in statuses else "succeeded"
+
+    async def wait(self):
+        for run in self.runs.values():
+            await run.done.wait()
+
+    def as_dict(self):
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "trigger": self.trigger,
+            "created_at": _iso(self.created_at),
+            "views": {view: run.as_dict() for view, run in self.runs.items()},
+        }
+
+
+class Refresher:
+    def __init__(self):
+        self._pending = {}  # view -> Run waiting to start
+        self._running = {}  # view -> Run in progress
+        self._last = {}  # view -> last finished Run in this process
+        self._wake = {view: asyncio.Event() for view in VIEWS}
+        self._workers = []
+        self._scheduler = None
+        self.jobs = OrderedDict()
+
+    def start(self):
+        """Start the refresh workers and, unless ``REFRESH_SCHEDULER=0``, the scheduler (app lifespan)."""
+        self._start_workers()
+        if REFRESH_SCHEDULER and self._scheduler is None:
+            self._scheduler = asyncio.create_task(self._schedule())
+
+    async def stop(self):
+        tasks = self._workers + ([self._scheduler] if self._scheduler else [])
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._workers = []
+        self._scheduler = None
+
+    def _start_workers(self):
+        # Also started on demand, for apps driven without their lifespan (the benchmarks)
+        if not self._workers:
+            self._workers = [asyncio.create_task(self._worker(view)) for view in VIEWS]
+
+    async def request(self, views=VIEWS, trigger="api"):
+        """Queue a refresh of ``views`` (joining any refresh of them not started yet) and return its job."""
+        self._start_workers()
+        runs = {}
+        for view in views:
+            run = self._pending.get(view)
+            if run is None:
+                run = self._pending[view] = Run(view, trigger)
+                self._wake[view].set()
+            runs[view] = run
+        job = Job(runs, trigger)
+        for run in runs.values():
+            run.jobs.append(job)
+        self.jobs[job.id] = job
+        while len(self.jobs) > REFRESH_JOB_HISTORY:
+            self.jobs.popitem(last=False)
+        await self._publish(job)
+        return job
+
+    async def job(self, job_id):
+        """Status of job ``job_id``, created by this worker or another one sharing the cache backend; None if unknown."""
+        job = self.jobs.get(job_id)
+        if job is not None:
+            return job.as_dict()
+        return await result_cache.backend.get_record(f"refresh-job:{job_id}")
+
+    async def _publish(self, *jobs):
+        for job in jobs:
+            try:
+                await result_cache.backend.put_record(f"refresh-job:{job.id}", job.as_dict(), REFRESH_JOB_TTL)
+            except Exception as e:
+                # The refresh goes on; only other workers lose sight of the job
+                logger.warning("could not store the status of refresh job %s: %s", job.id, e)
+
+    async def status(self):
+        """Per view: database state (shared by all workers) plus this worker's queue; recent jobs."""
+        rows = await _state()
+        views = {}
+        for row in rows:
+            view = row["visao"]
+            local = self._running.get(view) or self._pending.get(view)
+            last = self._last.get(view)
+            views[view] = {
+                "state": local.status if local else "idle",
+                "last_refresh_at": _iso(row["atualizada_em"]),
+                "last_duration_ms": float(row["duracao_ms"]) if row["duracao_ms"] is not None else None,
+                "changed_rows": row["alteracoes_pendentes"],
+                "due": due(row),
+                "last_error": last.error if last else None,
+            }
+        return {
+            "views": views,
+            "scheduler": {
+                "enabled": self._scheduler is not None,
+                "interval_s": REFRESH_INTERVAL,
+                "min_changes": REFRESH_MIN_CHANGES,
+                "check_interval_s": REFRESH_CHECK_INTERVAL,
+            },
+            "jobs": [job.as_dict() for job in reversed(list(self.jobs.values())[-10:])],
+        }
+
+    async def _worker(self, view):
+        while True:
+            await self._wake[view].wait()
+            self._wake[view].clear()
+            run = self._pending.pop(view, None)
+            if run is None:
+                continue
+            self._running[view] = run
+            try:
+                await self._refresh(run)
+            finally:
+                del self._running[view]
+                self._last[view] = run
+                run.done.set()
+
+    async def _refresh(self, run):
+        run.status = "running"
+        run.started_at = datetime.now()
+        await self._publish(*run.jobs)
+        started = time.perf_counter()
+        lock = f"refresh:{run.view}"
+        try:
+            async with await psycopg.AsyncConnection.connect(conninfo()) as conn:
+                async with conn.transaction():
+                    if run.trigger == "api":
+                        # Asked for explicitly: wait for a refresh running elsewhere, then do ours
+                        await conn.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", (lock,))
+                    else:
+                        cur = await conn.execute("SELECT pg_try_advisory_xact_lock(hashtext(%s))", (lock,))
+                        if not (await cur.fetchone())[0]:
+                            run.status = "skipped"
+                            return
+                        # Another worker may have refreshed it since the scheduler looked
+                        cur = conn.cursor(row_factory=dict_row)
+                        await cur.execute(STATE + " WHERE visao = %s", (run.view,))
+                        if not due(await cur.fetchone()):
+                            run.status = "skipped"
+                            return
+                    await conn.execute("CALL system_antig.sp_atualizar_visao(%s)", (run.view,))
+            run.status = "succeeded"
+            await result_cache.clear()
+        except Exception as e:
+            run.status = "failed"
+            run.error = str(e)
+            logger.error("refresh of %s failed: %s", run.view, e)
+        finally:
+            run.seconds = time.perf_counter() - started
+            run.finished_at = datetime.now()
+            logger.info("refresh of %s (%s) %s in %.1f s", run.view, run.trigger, run.status, run.seconds)
+            await self._publish(*run.jobs)
+
+    async def _schedule(self):
+        while True:
+            await asyncio.sleep(REFRESH_CHECK_INTERVAL)
+            try:
+                rows = await _state()
+            except (psycopg.Error, PoolTimeout) as e:
+                logger.warning("refresh scheduler could not read the view state: %s", e)
+                continue
+            for row in rows:
+                view = row["visao"]
+                trigger = due(row)
+                if trigger and view in self._wake and view not in self._pending and view not in self._running:
+                    await self.request([view], trigger)
+
+
+refresher = Refresher()
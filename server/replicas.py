@@ -0,0 +1,205 @@
+"""Read-replica routing.
+
+With ``DB_REPLICA_HOSTS`` set (``host[:port]``, comma-separated; user,
+password and database are the primary's), each worker opens one async pool
+per streaming replica next to the primary's. Queries made by a read-only
+route (those registered with ``json_get``, plus the exports) go to a replica,
+round-robin; every other query goes to the primary, as does every read when no
+replica qualifies. A request sent with ``X-Read-Consistency: primary`` reads
+from the primary too.
+
+Every ``DB_REPLICA_CHECK_INTERVAL`` seconds each replica is asked how far its
+replay is behind the primary's current WAL position, in bytes and seconds. A
+replica qualifies while that check succeeds and its lag stays under
+``DB_REPLICA_MAX_LAG`` seconds. Every write through the API (a ``result_cache``
+invalidation) bumps a write count kept with the cache versions, and every check
+records the count it read before the primary's WAL position. A worker reads
+from a replica only once a check has shown it replayed past the highest count
+the worker has seen: those of its own writes, and the one read along with the
+versions behind each cache key and ETag. So a worker reads its own writes, and
+a replica read is never cached or tagged under versions newer than what the
+replica holds. With ``CACHE_BACKEND=redis`` the count is shared, so this holds
+across workers; with the memory backend each worker counts its own writes, as
+it keeps its own cache. Clients that must read writes made elsewhere right
+away (psql, another host without the shared backend) send the header.
+
+``GET /api/replicas`` reports each replica's health and lag.
+"""
+import asyncio
+import contextvars
+import logging
+import os
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import psycopg
+from psycopg_pool import PoolTimeout
+
+from cache import result_cache
+from db import async_pool, conninfo, make_async_pool
+
+DB_REPLICA_HOSTS = [host.strip() for host in os.getenv("DB_REPLICA_HOSTS", "").split(",") if host.strip()]
+DB_REPLICA_MAX_LAG = float(os.getenv("DB_REPLICA_MAX_LAG", "5"))
+DB_REPLICA_CHECK_INTERVAL = float(os.getenv("DB_REPLICA_CHECK_INTERVAL", "2"))
+
+CONSISTENCY_HEADER = "x-read-consistency"
+
+# A standby that replayed up to the primary's position (or all it received) has no lag;
+# pg_last_xact_replay_timestamp() alone would count an idle primary as lag
+LAG = """
+    SELECT pg_is_in_recovery() as in_recovery,
+           pg_wal_lsn_diff(%(lsn)s::pg_lsn, pg_last_wal_replay_lsn()) as lag_bytes,
+           CASE WHEN pg_wal_lsn_diff(%(lsn)s::pg_lsn, pg_last_wal_replay_lsn()) <= 0
+                  OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+                ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+           END as lag_seconds,
+           EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) as replay_age
+"""
+
+logger = logging.getLogger("streamerdata.replicas")
+
+# "replica" while a read-only route runs, "primary" if its request asked for the primary
+_reads = contextvars.ContextVar("replica_reads", default=None)
+
+
+@contextmanager
+def replica_reads(request):
+    """Let the queries run inside the block go to a replica, unless ``request`` asks for the primary."""
+    token = _reads.set("primary" if request.headers.get(CONSISTENCY_HEADER) == "primary" else "replica")
+    try:
+        yield
+    finally:
+        _reads.reset(token)
+
+
+class Replica:
+    def __init__(self, address):
+        host, _, port = address.partition(":")
+        self.name = address
+        self.pool = make_async_pool(conninfo(host=host, port=port), name=f"replica-{address}")
+        self.healthy = False
+        self.lag_seconds = None
+        self.lag_bytes = None
+        self.checked_at = None
+        # Monotonic time up to which the replica is known to have replayed the primary's writes
+        self.replayed_at = float("-inf")
+        # Write count (result_cache.writes) it is known to have replayed
+        self.replayed_writes = -1
+        self.error = None
+
+    def as_dict(self):
+        stats = self.pool.get_stats()
+        return {
+            "healthy": self.healthy,
+            "lag_seconds": self.lag_seconds,
+            "lag_bytes": self.lag_bytes,
+            "checked_ago_s": round(time.monotonic() - self.checked_at, 1) if self.checked_at else None,
+            "error": self.error,
+            "pool_size": stats.get("pool_size", 0),
+            "pool_available": stats.get("pool_available", 0),
+        }
+
+
+class Router:
+    def __init__(self, addresses):
+        self.replicas = [Replica(address) for address in addresses]
+        self._next = 0
+        # (monotonic time, write count read just before it) of recent checks, long enough
+        # to cover a replica lagging up to DB_REPLICA_MAX_LAG
+        self._writes = deque(maxlen=int(DB_REPLICA_MAX_LAG / DB_REPLICA_CHECK_INTERVAL) + 2)
+        self._checker = None
+        self.reads = {"primary": 0, "replica": 0}
+
+    def pool(self):
+        """The pool the current query should run on."""
+        reads = _reads.get()
+        if self.replicas and reads:
+            eligible = [r for r in self.replicas if r.healthy and r.replayed_writes >= result_cache.writes]
+            if reads == "replica" and eligible:
+                self._next = (self._next + 1) % len(eligible)
+                self.reads["replica"] += 1
+                return eligible[self._next].pool
+            self.reads["primary"] += 1
+        return async_pool
+
+    async def open(self):
+        """Open the replica pools and start the health checks (app lifespan)."""
+        if not self.replicas:
+            return
+        for replica in self.replicas:
+            # A replica that is down must not hold up startup; the checks find out
+            await replica.pool.open(wait=False)
+        await self.check()
+        self._checker = asyncio.create_task(self._check_forever())
+
+    async def close(self):
+        if self._checker:
+            self._checker.cancel()
+            await asyncio.gather(self._checker, return_exceptions=True)
+            self._checker = None
+        for replica in self.replicas:
+            await replica.pool.close()
+
+    async def check(self):
+        try:
+            # Every write counted here committed before the WAL position read next
+            await result_cache.versions(())
+            self._writes.append((time.monotonic(), result_cache.writes))
+        except Exception as e:
+            logger.warning("replica check could not read the write count: %s", e)
+        primary_lsn, read_at = None, time.monotonic()
+        try:
+            async with async_pool.connection(timeout=DB_REPLICA_CHECK_INTERVAL) as conn:
+                cur = await conn.execute("SELECT pg_current_wal_lsn()::text as lsn")
+                primary_lsn = (await cur.fetchone())["lsn"]
+                read_at = time.monotonic()
+        except (psycopg.Error, PoolTimeout) as e:
+            logger.warning("replica check could not read the primary's WAL position: %s", e)
+        await asyncio.gather(*(self._check(replica, primary_lsn, read_at) for replica in self.replicas))
+
+    async def _check(self, replica, primary_lsn, read_at):
+        try:
+            async with replica.pool.connection(timeout=DB_REPLICA_CHECK_INTERVAL) as conn:
+                cur = await conn.execute(LAG, {"lsn": primary_lsn})
+                row = await cur.fetchone()
+        except (psycopg.Error, PoolTimeout) as e:
+            replica.healthy, replica.error = False, str(e) or type(e).__name__
+            return
+        finally:
+            replica.checked_at = time.monotonic()
+        if not row["in_recovery"]:
+            replica.healthy, replica.error = False, "not a standby (pg_is_in_recovery() is false)"
+            return
+        replica.lag_bytes = max(int(row["lag_bytes"]), 0) if row["lag_bytes"] is not None else None
+        replica.lag_seconds = float(row["lag_seconds"]) if row["lag_seconds"] is not None else None
+        replica.error = None
+        replica.healthy = replica.lag_seconds is not None and replica.lag_seconds <= DB_REPLICA_MAX_LAG
+        if replica.lag_bytes == 0:
+            # Caught up with the position the primary reported before this check
+            replica.replayed_at = read_at
+        elif row["replay_age"] is not None:
+            # Behind: it has at least every commit up to the last one it replayed
+            replica.replayed_at = max(replica.replayed_at, replica.checked_at - float(row["replay_age"]))
+        # ...and so every write counted by a check before that
+        replica.replayed_writes = max(
+            [replica.replayed_writes] + [writes for counted_at, writes in self._writes if counted_at <= replica.replayed_at]
+        )
+        if not replica.healthy:
+            replica.error = f"lag above DB_REPLICA_MAX_LAG ({DB_REPLICA_MAX_LAG:g} s)"
+
+    async def _check_forever(self):
+        while True:
+            await asyncio.sleep(DB_REPLICA_CHECK_INTERVAL)
+            await self.check()
+
+    def status(self):
+        return {
+            "replicas": {replica.name: replica.as_dict() for replica in self.replicas},
+            "max_lag_s": DB_REPLICA_MAX_LAG,
+            "check_interval_s": DB_REPLICA_CHECK_INTERVAL,
+            "reads": dict(self.reads),
+        }
+
+
+router = Router(DB_REPLICA_HOSTS)
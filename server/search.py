@@ -0,0 +1,93 @@
+"""Ranked typeahead search over the trigram-indexed name columns.
+
+Queries of three characters or more match substrings (``ILIKE '%q%'``) and
+near misses (``<%`` word-similarity operator, which compares ``q`` with the
+closest stretch of a long label rather than with all of it), both answered by
+the pg_trgm GIN indexes. Shorter queries cannot form a trigram, so they fall back to a
+prefix match of the label on its ``lower(col) COLLATE "C"`` btree index.
+Results are ranked prefix matches first, then by word similarity.
+
+``prefix_query`` serves the form dropdowns (``/api/lookup``): a plain prefix
+match in label order, paged off the same btree index.
+"""
+import os
+
+SEARCH_MAX_LIMIT = int(os.getenv("SEARCH_MAX_LIMIT", "20"))
+
+# Shortest query that yields a trigram
+MIN_TRIGRAM_LENGTH = 3
+
+
+def escape_like(value):
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+class SearchEntity:
+    """A searchable table: its key columns, the label column and any extra columns to match."""
+
+    def __init__(self, table, key, label, extra=()):
+        self.table = table
+        self.key = key
+        self.label = label
+        self.extra = extra
+        self.prefix_key = f'lower({label}) COLLATE "C"'
+
+    def query(self, q, limit):
+        """SQL and params returning ``key..., label, score`` for ``q``, best matches first."""
+        columns = (self.label, *self.extra)
+        params = {
+            "q": q,
+            "prefix": escape_like(q.lower()) + "%",
+            "pattern": "%" + escape_like(q) + "%",
+            "limit": limit,
+        }
+        score = (
+            f"GREATEST({', '.join(f'word_similarity(%(q)s, {c})' for c in columns)})"
+            if self.extra else f"word_similarity(%(q)s, {self.label})"
+        )
+        select = f"SELECT {', '.join(self.key)}, {self.label} as label, {score} as score FROM {self.table}"
+        prefix_key = self.prefix_key
+        if len(q) < MIN_TRIGRAM_LENGTH:
+            # Walk the prefix index in order and stop at the limit instead of ranking every match
+            sql = f"""
+                {select}
+                WHERE {prefix_key} LIKE %(prefix)s
+                ORDER BY {prefix_key}
+                LIMIT %(limit)s
+            """
+        else:
+            where = " OR ".join([f"{c} ILIKE %(pattern)s" for c in columns] + [f"%(q)s <%% {self.label}"])
+            sql = f"""
+                {select}
+                WHERE {where}
+                ORDER BY {prefix_key} LIKE %(prefix)s DESC, score DESC, {self.label}
+                LIMIT %(limit)s
+            """
+        return sql, params
+
+    def prefix_query(self, q, limit, **equals):
+        """SQL and params returning ``key..., label`` for labels starting with ``q``, in label order.
+
+        ``equals`` narrows the rows to column values, e.g. ``id_canal=3``.
+        """
+        params = {"prefix": escape_like(q.lower()) + "%", "limit": limit}
+        conditions = [f"{self.prefix_key} LIKE %(prefix)s"] if q else []
+        for column, value in equals.items():
+            conditions.append(f"{column} = %({column})s")
+            params[column] = value
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        sql = f"""
+            SELECT {', '.join(self.key)}, {self.label} as label FROM {self.table}
+            {where}
+            ORDER BY {self.prefix_key}
+            LIMIT %(limit)s
+        """
+        return sql, params
+
+
+SEARCH_ENTITIES = {
+    "users": SearchEntity("system_antig.usuario", ("id",), "nick", extra=("email",)),
+    "channels": SearchEntity("system_antig.canal", ("id",), "nome"),
+    "videos": SearchEntity("system_antig.video", ("id_video", "id_canal"), "titulo"),
+    "platforms": SearchEntity("system_antig.plataforma", ("nro",), "nome"),
+}
@@ -0,0 +1,126 @@
+"""Row containers and the JSON encoding of API responses.
+
+``execute_query(..., as_rows=True)`` returns a ``Rows``: the column names
+once and each row as the plain tuple the driver produced, instead of one dict
+per row. ``dumps`` encodes responses with orjson, which writes ``datetime``
+and ``date`` natively (ISO 8601, as ``jsonable_encoder`` did) and calls
+``_default`` only for the values it does not know:
+
+* ``Decimal`` becomes an int when it has no fractional digits and a float
+  otherwise, the same rule as FastAPI's encoder, so ``SUM`` totals stay
+  integers and ``valor`` / ``faturamento`` stay numbers
+* ``Rows`` becomes a list of objects (``shape="records"``) or one array per
+  column (``shape="columns"``, ``{"col": [v1, v2, ...]}``), which is smaller
+  on the wire and is what the charts consume
+
+Routes registered with ``json_get`` in ``main.py`` return ``dumps`` output
+directly, so their results skip ``jsonable_encoder``'s walk over every value.
+"""
+from decimal import Decimal
+
+import orjson
+
+SHAPES = ("records", "columns")
+
+_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+
+class Rows:
+    """A fetched result: column names plus one tuple per row.
+
+    Sliced like a list (``rows[:10]`` is another ``Rows``); indexing or
+    iterating yields each row as a dict, for the few callers that read fields.
+    """
+
+    __slots__ = ("columns", "data")
+
+    def __init__(self, columns, data):
+        self.columns = columns
+        self.data = data
+
+    def __len__(self):
+        return len(self.data)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return Rows(self.columns, self.data[index])
+        return dict(zip(self.columns, self.data[index]))
+
+    def __iter__(self):
+        return iter(self.records())
+
+    def __eq__(self, other):
+        if not isinstance(other, Rows):
+            return NotImplemented
+        return self.columns == other.columns and self.data == other.data
+
+    def records(self):
+        columns = self.columns
+        return [dict(zip(columns, row)) for row in self.data]
+
+    def columnar(self):
+        if not self.data:
+            return {column: [] for column in self.columns}
+        return dict(zip(self.columns, map(list, zip(*self.data))))
+
+
+def _decimal(value):
+    return int(value) if value.as_tuple().exponent >= 0 else float(value)
+
+
+def _records_default(value):
+    if isinstance(value, Decimal):
+        return _decimal(value)
+    if isinstance(value, Rows):
+        return value.records()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _columns_default(value):
+    if isinstance(value, Decimal):
+        return _decimal(value)
+    if isinstance(value, Rows):
+        return value.columnar()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+_DEFAULTS = {"records": _records_default, "columns": _columns_default}
+
+
+def dumps(value, shape="records"):
+    """``value`` as JSON bytes; every ``Rows`` inside it is written in ``shape``."""
+    return orjson.dumps(value, default=_DEFAULTS[shape], option=_OPTIONS)
+
+
+# --- Storage ---
+# ``pack`` / ``unpack`` round-trip a value through bytes with its ``Rows`` intact
+# (the shared cache backend), so a cached result can still be sent in either shape.
+
+_ROWS = "$rows"
+
+
+def _pack_default(value):
+    if isinstance(value, Decimal):
+        return _decimal(value)
+    if isinstance(value, Rows):
+        return {_ROWS: [value.columns, value.data]}
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _restore(value):
+    if isinstance(value, dict):
+        if _ROWS in value and len(value) == 1:
+            columns, data = value[_ROWS]
+            return Rows(columns, [tuple(row) for row in data])
+        return {key: _restore(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_restore(item) for item in value]
+    return value
+
+
+def pack(value):
+    return orjson.dumps(value, default=_pack_default, option=_OPTIONS)
+
+
+def unpack(raw):
+    return _restore(orjson.loads(raw))
@@ -0,0 +1,82 @@
+"""In-memory snapshots of the small dimension tables behind the form dropdowns.
+
+``empresa``, ``pais`` and ``plataforma`` hold a handful of rows and rarely
+change, so their lookups are answered from a copy kept in the process instead
+of a query per request. Each copy remembers the result-cache version of its
+table: a write that calls ``result_cache.invalidate(table)`` bumps the version
+(for every worker sharing the cache backend) and the next read reloads it.
+``SNAPSHOT_TTL`` bounds how long a write made outside the API (psql, the
+populate scripts) can go unnoticed.
+
+Under gunicorn the master loads every snapshot once before forking
+(``preload``), so the workers start with them in memory instead of each
+querying on its first lookup.
+"""
+import asyncio
+import hashlib
+import os
+import time
+
+from cache import ALL, encode, result_cache
+
+SNAPSHOT_TTL = float(os.getenv("SNAPSHOT_TTL", "300"))
+
+
+class DimensionSnapshot:
+    """Rows of ``table`` as ``(key, label)``, ordered by label, with an ETag of the content."""
+
+    def __init__(self, table, key, label, load):
+        self.table = table
+        self.key = key
+        self.label = label
+        self.query = f"SELECT {key}, {label} FROM system_antig.{table} ORDER BY {label}"
+        self._load = load
+        self._lock = asyncio.Lock()
+        self._rows = None
+        self._version = None
+        self._loaded_at = 0.0
+        self.etag = None
+
+    async def rows(self):
+        version = await result_cache.versions([self.table, ALL])
+        if self._is_fresh(version):
+            if self._version is None:
+                self._version = version
+            return self._rows
+        async with self._lock:
+            # Another request may have reloaded while we waited
+            if not self._is_fresh(version):
+                rows = await self._load(self.query)
+                self._rows = rows
+                self._version = version
+                self._loaded_at = time.monotonic()
+                self.etag = hashlib.sha1(encode(rows)).hexdigest()
+        return self._rows
+
+    def preload(self, rows):
+        """Seed the snapshot with ``rows`` read outside the event loop (the gunicorn master).
+
+        The cache versions cannot be read there; the first ``rows()`` call adopts
+        the current ones, and ``SNAPSHOT_TTL`` still counts from now.
+        """
+        self._rows = rows
+        self._version = None
+        self._loaded_at = time.monotonic()
+        self.etag = hashlib.sha1(encode(rows)).hexdigest()
+
+    def _is_fresh(self, version):
+        return (
+            self._rows is not None
+            and self._version in (version, None)
+            and time.monotonic() - self._loaded_at < SNAPSHOT_TTL
+        )
+
+    async def lookup(self, q="", limit=None):
+        """Compact ``{id, label}`` rows whose label starts with ``q`` (any case), at most ``limit``."""
+        prefix = q.casefold()
+        matches = [
+            {"id": row[self.key], "label": row[self.label]}
+            for row in await self.rows()
+            if row[self.label].casefold().startswith(prefix)
+        ]
+        return matches if limit is None else matches[:limit]